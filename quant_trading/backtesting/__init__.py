@@ -2,10 +2,32 @@
 回测模块
 """
 
-from .backtest_engine import BacktestEngine
+from .backtest_engine import BacktestEngine, BacktestDataFeed
 from .backtest_result import BacktestResult
+from .cache import BacktestCache
+from .broker import FeeSchedule, Fill, SimulatedOrderManager, SimulatedPositionManager
+from .metrics import EquityCurve, PerformanceMetrics, StreamingMetrics, compute_metrics
+from .portfolio_backtest import PortfolioBacktestEngine, PortfolioBacktestResult
+from .order_book import ArrayOrderBook, BookSide
+from .tick_backtest import TickBacktestEngine, TickDataFeed
 
 __all__ = [
     "BacktestEngine",
-    "BacktestResult"
+    "BacktestDataFeed",
+    "BacktestResult",
+    "BacktestCache",
+    "FeeSchedule",
+    "Fill",
+    "SimulatedOrderManager",
+    "SimulatedPositionManager",
+    "PortfolioBacktestEngine",
+    "PortfolioBacktestResult",
+    "ArrayOrderBook",
+    "BookSide",
+    "TickBacktestEngine",
+    "TickDataFeed",
+    "EquityCurve",
+    "PerformanceMetrics",
+    "StreamingMetrics",
+    "compute_metrics"
 ]
@@ -4,32 +4,198 @@
 
 import asyncio
 import logging
+import math
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 
+from ..core.risk_manager import RiskManager
+from ..utils.clock import SimulatedClock
 from ..utils.config import Config
+from ..utils.latency import LatencyTracker
 from ..utils.logger import setup_logger
+from ..utils.ring_buffer import CandleBuffer
 from ..strategies.base_strategy import BaseStrategy
 from .backtest_result import BacktestResult
+from .broker import FeeSchedule, Fill, SimulatedOrderManager, SimulatedPositionManager
+from .cache import fingerprint_arrays
+from .metrics import MINUTES_PER_YEAR, EquityCurve, StreamingMetrics, compute_metrics, max_drawdown
+
+
+class _Resume:
+    """把已经同步推进过一次、在等待中挂起的协程交还给事件循环继续执行"""
+    
+    __slots__ = ("coro", "pending")
+    
+    def __init__(self, coro, pending):
+        self.coro = coro
+        self.pending = pending
+        
+    def __await__(self):
+        pending = self.pending
+        while True:
+            try:
+                value = yield pending
+            except BaseException as e:
+                try:
+                    pending = self.coro.throw(e)
+                except StopIteration:
+                    return
+            else:
+                try:
+                    pending = self.coro.send(value)
+                except StopIteration:
+                    return
+
+
+def to_ns(value) -> int:
+    """无时区UTC datetime（与历史K线索引一致）或 timedelta 转为整数纳秒"""
+    if isinstance(value, timedelta):
+        return int(value / timedelta(microseconds=1)) * 1000
+    return int(np.datetime64(value, "ns").astype(np.int64))
+
+
+def run_step(coro) -> Optional[_Resume]:
+    """
+    同步执行一次策略协程（快速路径）
+    
+    策略本轮没有真正等待（绝大多数K线）时协程直接执行完毕，不经过事件循环调度，返回None；
+    遇到等待时返回可await的剩余部分，由调用方交给事件循环继续
+    """
+    try:
+        pending = coro.send(None)
+    except StopIteration:
+        return None
+    return _Resume(coro, pending)
+
+
+class BacktestDataFeed:
+    """
+    回测行情
+    
+    各市场的K线预先转为numpy数组，随回测时间推进把新K线逐根追加到固定容量的CandleBuffer
+    （每步只处理新增K线，不再对DataFrame做切片），同时作为策略看到的 data_manager
+    """
+    
+    def __init__(self, lookback: int = 20):
+        """
+        Args:
+            lookback: 策略可见的K线根数，不足时该市场不推送给策略
+        """
+        self.lookback = lookback
+        self.market_data_cache: Dict[int, Dict[str, Any]] = {}
+        self._columns: Dict[int, tuple] = {}
+        self._positions: Dict[int, int] = {}
+        self._ready: Dict[int, Dict[str, Any]] = {}
+        
+    def load(self, market_id: int, df: pd.DataFrame):
+        """载入按时间排序的K线（索引为无时区的UTC时间）"""
+        times = df.index.values.astype("datetime64[ns]").view(np.int64)
+        self._columns[market_id] = (
+            times.tolist(),
+            (times // 1_000_000_000).tolist(),
+            df["open"].to_numpy(dtype=np.float64).tolist(),
+            df["high"].to_numpy(dtype=np.float64).tolist(),
+            df["low"].to_numpy(dtype=np.float64).tolist(),
+            df["close"].to_numpy(dtype=np.float64).tolist(),
+            df["volume"].to_numpy(dtype=np.float64).tolist(),
+        )
+        
+    def reset(self):
+        """回到数据起点（每次回测开始时调用）"""
+        self._ready = {}
+        for market_id in self._columns:
+            self._positions[market_id] = 0
+            cache = self.market_data_cache.setdefault(market_id, {})
+            cache.update({"candlesticks": CandleBuffer(self.lookback), "order_book": None, "trades": [],
+                          "last_price": 0.0})
+            
+    def advance(self, time_ns: int, on_bar=None) -> Dict[int, Dict[str, Any]]:
+        """
+        追加时间不晚于 time_ns 的新K线
+        
+        Args:
+            time_ns: 当前回测时间（纳秒，无时区UTC）
+            on_bar: 每根新K线的回调 on_bar(market_id, open, high, low, close)
+            
+        Returns:
+            K线数量已满足lookback的市场数据（同一个字典对象，每步原地更新）
+        """
+        for market_id, (times, stamps, opens, highs, lows, closes, volumes) in self._columns.items():
+            position = self._positions[market_id]
+            end = position
+            total = len(stamps)
+            while end < total and times[end] <= time_ns:
+                end += 1
+            if end == position:
+                continue
+            cache = self.market_data_cache[market_id]
+            candles = cache["candlesticks"]
+            for i in range(position, end):
+                candles.append(stamps[i], opens[i], highs[i], lows[i], closes[i], volumes[i])
+                if on_bar is not None:
+                    on_bar(market_id, opens[i], highs[i], lows[i], closes[i])
+            cache["last_price"] = closes[end - 1]
+            self._positions[market_id] = end
+            if len(candles) >= self.lookback:
+                self._ready[market_id] = cache
+        return self._ready
+        
+    def get_market_data(self, market_id: int) -> Optional[Dict[str, Any]]:
+        """获取指定市场的数据（与 DataManager.get_market_data 相同的接口）"""
+        return self.market_data_cache.get(market_id)
 
 
 class BacktestEngine:
-    """回测引擎"""
+    """
+    回测引擎
+    
+    策略挂到回测引擎上运行（strategy.engine 指向本引擎）：下单走 SimulatedOrderManager 在进程内撮合，
+    持仓与风控使用 SimulatedPositionManager 和 RiskManager，行情与时间由 BacktestDataFeed 和模拟时钟推进。
+    每步的 process_market_data 先同步执行，只有策略真正等待时才交给事件循环
+    """
     
-    def __init__(self, config: Config):
+    # 回测步长
+    STEP = timedelta(minutes=1)
+    
+    def __init__(self, config: Config, streaming_metrics: Optional[bool] = None):
         """
         初始化回测引擎
         
         Args:
             config: 配置对象
+            streaming_metrics: 在线累计绩效指标、不保留权益曲线，None则读取 backtest.streaming_metrics
         """
         self.config = config
         self.logger = setup_logger("BacktestEngine", config.log_level)
         
+        backtest_config = config.backtest_config
+        self.streaming_metrics = (backtest_config.get("streaming_metrics", False)
+                                  if streaming_metrics is None else streaming_metrics)
+        
         # 回测数据
         self.historical_data: Dict[int, pd.DataFrame] = {}
+        # 各市场K线数组的内容指纹（回测结果缓存键的一部分）
+        self.data_fingerprints: Dict[int, str] = {}
+        self.data_manager = BacktestDataFeed(backtest_config.get("lookback", 20))
+        
+        # 回测时钟：策略通过它读取当前时间，每步推进到 current_time
+        self.clock = SimulatedClock()
+        
+        # 模拟撮合与风控（策略通过 engine.order_manager / position_manager / risk_manager 访问）
+        self.position_manager = SimulatedPositionManager(config)
+        self.order_manager = SimulatedOrderManager(
+            config, self.position_manager,
+            slippage=backtest_config.get("slippage", 0.0005),
+            default_fees=FeeSchedule(backtest_config.get("taker_fee", 0.0), backtest_config.get("maker_fee", 0.0))
+        )
+        self.order_manager.add_fill_callback(self._on_fill)
+        self.risk_manager = RiskManager(config)
+        self.risk_manager.set_position_manager(self.position_manager)
+        for component in (self.position_manager, self.order_manager, self.risk_manager):
+            component.set_clock(self.clock)
+        self.latency = LatencyTracker(enabled=False)
         
         # 回测状态
         self.current_time = None
@@ -37,10 +203,13 @@ class BacktestEngine:
         self.end_time = None
         self.initial_capital = 10000.0
         self.current_capital = self.initial_capital
+        self._manual_pnl = 0.0  # 通过 record_trade 手动记录的盈亏
         
         # 交易记录
         self.trades: List[Dict[str, Any]] = []
-        self.equity_curve: List[float] = []
+        # 权益曲线（预分配numpy数组）；流式指标模式下为None，由 metrics_stream 在线累计
+        self.equity_curve: Optional[EquityCurve] = None
+        self.metrics_stream: Optional[StreamingMetrics] = None
         
     def load_historical_data(self, market_id: int, data: List[Dict[str, Any]]):
         """
@@ -60,8 +229,40 @@ class BacktestEngine:
         df.sort_index(inplace=True)
         
         self.historical_data[market_id] = df
+        self.data_fingerprints[market_id] = fingerprint_arrays(
+            df.index.values.astype("datetime64[ns]").view(np.int64),
+            df[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64)
+        )
+        self.data_manager.load(market_id, df)
         self.logger.info(f"加载市场 {market_id} 历史数据: {len(df)} 条记录")
         
+    def load_market_info(self, market_id: int, market_info: Any):
+        """
+        加载市场信息（OrderBookDetail），模拟撮合按其中的 taker_fee / maker_fee 收取手续费
+        
+        Args:
+            market_id: 市场ID
+            market_info: 市场信息对象或字段相同的字典
+        """
+        fees = FeeSchedule.from_market_info(market_info)
+        self.order_manager.set_fee_schedule(market_id, fees)
+        self.data_manager.market_data_cache.setdefault(market_id, {})["market_info"] = market_info
+        self.logger.info(f"市场 {market_id} 费率: taker {fees.taker_fee:.4%}, maker {fees.maker_fee:.4%}")
+        
+    def cache_settings(self) -> Dict[str, Any]:
+        """影响回测结果的引擎设置与输入数据指纹（BacktestCache 据此计算缓存键）"""
+        order_manager = self.order_manager
+        return {
+            "engine": f"{type(self).__module__}.{type(self).__qualname__}",
+            "step_seconds": self.STEP.total_seconds(),
+            "initial_capital": self.initial_capital,
+            "streaming_metrics": self.streaming_metrics,
+            "slippage": order_manager.slippage,
+            "default_fees": order_manager.default_fees,
+            "fees": {str(market_id): fees for market_id, fees in sorted(order_manager.fees.items())},
+            "data": {str(market_id): fingerprint for market_id, fingerprint in sorted(self.data_fingerprints.items())},
+        }
+        
     async def run_backtest(self, strategy: BaseStrategy, 
                           start_date: datetime, end_date: datetime) -> BacktestResult:
         """
@@ -75,155 +276,175 @@ class BacktestEngine:
         Returns:
             回测结果
         """
-        self.logger.info(f"开始回测: {strategy.name}, {start_date} - {end_date}")
-        
-        self.start_time = start_date
-        self.end_time = end_date
-        self.current_time = start_date
-        self.current_capital = self.initial_capital
-        self.trades = []
-        self.equity_curve = [self.initial_capital]
+        self._begin_run(strategy, start_date, end_date)
         
         try:
-            # 初始化策略
+            # 初始化策略与风控
+            await self.risk_manager.initialize()
             await strategy.initialize()
             
+            # 行情回到起点，开始时间之前的K线作为预热历史一次性写入
+            feed = self.data_manager
+            feed.reset()
+            time_ns = to_ns(start_date)
+            step_ns = to_ns(self.STEP)
+            end_ns = to_ns(end_date)
+            on_bar = self.order_manager.on_bar
+            
             # 运行回测循环
-            while self.current_time < end_date:
-                # 获取当前时间点的市场数据
-                market_data = self._get_market_data_at_time(self.current_time)
+            while time_ns < end_ns:
+                # 追加到当前时间为止的新K线（挂单按新K线撮合、持仓按收盘价盯市）
+                market_data = feed.advance(time_ns, on_bar)
                 
                 if market_data:
-                    # 执行策略
-                    await strategy.process_market_data(market_data)
+                    # 执行策略：同步快速路径，策略真正等待时才交给事件循环
+                    pending = run_step(strategy.process_market_data(market_data))
+                    if pending is not None:
+                        await pending
                     
-                # 更新权益曲线
-                self.equity_curve.append(self.current_capital)
+                # 更新权益曲线（含未实现盈亏）
+                self._record_equity()
                 
                 # 推进时间
-                self.current_time += timedelta(minutes=1)
+                time_ns += step_ns
+                self.current_time += self.STEP
+                self.clock.set_time(self.current_time)
                 
-            # 停止策略
-            await strategy.stop()
-            
-            # 生成回测结果
-            result = self._generate_backtest_result(strategy)
-            
-            self.logger.info(f"回测完成: 总收益 {result.total_return:.2%}, 夏普比率 {result.sharpe_ratio:.2f}")
-            
-            return result
+            return await self._finish_run(strategy)
             
         except Exception as e:
             self.logger.error(f"回测运行错误: {e}")
             raise
             
-    def _get_market_data_at_time(self, current_time: datetime) -> Optional[Dict[int, Dict[str, Any]]]:
-        """获取指定时间的市场数据"""
-        market_data = {}
+    def _begin_run(self, strategy: BaseStrategy, start_date: datetime, end_date: datetime):
+        """新一轮回测: 重置时钟、撮合、资金与权益曲线，策略挂到本引擎"""
+        self.logger.info(f"开始回测: {strategy.name}, {start_date} - {end_date}")
         
-        for market_id, df in self.historical_data.items():
-            # 找到当前时间之前的最新数据
-            available_data = df[df.index <= current_time]
-            
-            if len(available_data) < 20:  # 至少需要20个数据点
-                continue
-                
-            # 获取最近的数据
-            recent_data = available_data.tail(20)
+        self.start_time = start_date
+        self.end_time = end_date
+        self.current_time = start_date
+        self.clock.reset(start_date)
+        self._reset_broker()
+        strategy.set_engine(self)
+        self.current_capital = self.initial_capital
+        self.trades = []
+        self._reset_equity(self.initial_capital, start_date, end_date)
+        
+    def _reset_equity(self, initial_capital: float, start_date: datetime, end_date: datetime):
+        """按回测区间预分配权益曲线（流式指标模式下改为在线累计）"""
+        if self.streaming_metrics:
+            self.equity_curve = None
+            self.metrics_stream = StreamingMetrics(initial_capital, MINUTES_PER_YEAR, start_date,
+                                                   int(self.STEP.total_seconds()))
+        else:
+            steps = max(math.ceil((end_date - start_date) / self.STEP), 0)
+            self.equity_curve = EquityCurve(steps + 1)
+            self.equity_curve.append(initial_capital)
+            self.metrics_stream = None
             
-            market_data[market_id] = {
-                "candlesticks": [
-                    {
-                        "timestamp": int(ts.timestamp()),
-                        "open": row["open"],
-                        "high": row["high"],
-                        "low": row["low"],
-                        "close": row["close"],
-                        "volume": row["volume"]
-                    }
-                    for ts, row in recent_data.iterrows()
-                ],
-                "order_book": None,  # 回测中不模拟订单簿
-                "trades": []
-            }
+    def _record_equity(self):
+        """按当前持仓（含未实现盈亏）计算资金，刷新风控权益并写入权益曲线"""
+        position_manager = self.position_manager
+        self.current_capital = (self.initial_capital + self._manual_pnl
+                                + position_manager.get_total_realized_pnl()
+                                + position_manager.get_total_unrealized_pnl())
+        self.risk_manager.refresh_equity()
+        if self.metrics_stream is not None:
+            self.metrics_stream.update(self.current_capital)
+        else:
+            self.equity_curve.append(self.current_capital)
             
-        return market_data if market_data else None
+    async def _finish_run(self, strategy: BaseStrategy) -> BacktestResult:
+        """停止策略并生成回测结果"""
+        await strategy.stop()
+        result = self._generate_backtest_result(strategy)
+        self.logger.info(f"回测完成: 总收益 {result.total_return:.2%}, 夏普比率 {result.sharpe_ratio:.2f}, "
+                         f"成交 {len(self.order_manager.fills)} 笔, 手续费 {self.order_manager.total_fees:.2f}")
+        return result
+        
+    def _reset_broker(self):
+        """清空上一轮回测的订单、成交与持仓（费率设置保留）"""
+        self.order_manager.reset()
+        self.position_manager.reset()
+        self.risk_manager.initial_equity = self.initial_capital
+        self._manual_pnl = 0.0
+        
+    def _on_fill(self, fill: Fill):
+        """平仓成交计入交易记录（开仓/加仓只影响持仓）"""
+        if fill.realized_pnl is None:
+            return
+        self.trades.append({
+            "timestamp": self.current_time,
+            "market_id": fill.market_id,
+            "side": fill.side.value,
+            "size": fill.size,
+            "price": fill.price,
+            "fee": fill.fee,
+            "pnl": fill.realized_pnl,
+            "order_id": fill.order_id,
+        })
         
     def _generate_backtest_result(self, strategy: BaseStrategy) -> BacktestResult:
-        """生成回测结果"""
-        # 计算收益率
-        returns = []
-        for i in range(1, len(self.equity_curve)):
-            ret = (self.equity_curve[i] - self.equity_curve[i-1]) / self.equity_curve[i-1]
-            returns.append(ret)
-            
-        # 计算各种指标
-        total_return = (self.current_capital - self.initial_capital) / self.initial_capital
-        annual_return = (1 + total_return) ** (252 / len(returns)) - 1 if returns else 0
-        
-        # 计算夏普比率
-        sharpe_ratio = 0
-        if returns and np.std(returns) > 0:
-            sharpe_ratio = np.mean(returns) / np.std(returns) * np.sqrt(252)
-            
-        # 计算最大回撤
-        max_dd, dd_start, dd_end = self._calculate_max_drawdown(self.equity_curve)
+        """生成回测结果（指标向量化计算，流式模式下取在线累计值）"""
+        return self._build_result(strategy.name, self.initial_capital, self.current_capital, self.trades)
         
+    def _build_result(self, name: str, initial_capital: float, final_capital: float,
+                      trades: List[Dict[str, Any]]) -> BacktestResult:
+        """由当前权益曲线（或流式指标）与交易记录生成回测结果"""
+        if self.metrics_stream is not None:
+            metrics = self.metrics_stream.result()
+            equity_curve = np.empty(0)
+            monthly_return_series = self.metrics_stream.monthly_returns()
+        else:
+            equity_curve = self.equity_curve.values
+            metrics = compute_metrics(equity_curve, MINUTES_PER_YEAR)
+            monthly_return_series = None
+            
         # 计算胜率
-        trade_returns = [trade.get("pnl", 0) for trade in self.trades]
-        win_rate = len([r for r in trade_returns if r > 0]) / len(trade_returns) if trade_returns else 0
+        pnls = np.fromiter((trade.get("pnl", 0) for trade in trades), dtype=np.float64)
+        win_rate = float(np.mean(pnls > 0)) if len(pnls) else 0
         
         return BacktestResult(
-            strategy_name=strategy.name,
+            strategy_name=name,
             start_date=self.start_time,
             end_date=self.end_time,
-            initial_capital=self.initial_capital,
-            final_capital=self.current_capital,
-            total_return=total_return,
-            annual_return=annual_return,
-            sharpe_ratio=sharpe_ratio,
-            max_drawdown=max_dd,
+            initial_capital=initial_capital,
+            final_capital=final_capital,
+            total_return=(final_capital - initial_capital) / initial_capital,
+            annual_return=metrics.annual_return,
+            sharpe_ratio=metrics.sharpe_ratio,
+            max_drawdown=metrics.max_drawdown,
             win_rate=win_rate,
-            total_trades=len(self.trades),
-            equity_curve=self.equity_curve,
-            trades=self.trades
+            total_trades=len(trades),
+            equity_curve=equity_curve,
+            trades=trades,
+            sortino_ratio=metrics.sortino_ratio,
+            calmar_ratio=metrics.calmar_ratio,
+            volatility=metrics.volatility,
+            step_seconds=int(self.STEP.total_seconds()),
+            monthly_return_series=monthly_return_series
         )
         
-    def _calculate_max_drawdown(self, equity_curve: List[float]) -> tuple[float, int, int]:
+    def _calculate_max_drawdown(self, equity_curve: np.ndarray) -> tuple[float, int, int]:
         """计算最大回撤"""
-        if not equity_curve:
-            return 0, 0, 0
-            
-        peak = equity_curve[0]
-        max_dd = 0
-        dd_start = 0
-        dd_end = 0
-        
-        for i, value in enumerate(equity_curve):
-            if value > peak:
-                peak = value
-                dd_start = i
-            else:
-                dd = (peak - value) / peak
-                if dd > max_dd:
-                    max_dd = dd
-                    dd_end = i
-                    
-        return max_dd, dd_start, dd_end
+        return max_drawdown(equity_curve)
         
     def record_trade(self, trade_info: Dict[str, Any]):
-        """记录交易"""
+        """手动记录交易（不经过模拟撮合的盈亏）"""
         trade_info["timestamp"] = self.current_time
         self.trades.append(trade_info)
         
         # 更新资金
         pnl = trade_info.get("pnl", 0)
+        self._manual_pnl += pnl
         self.current_capital += pnl
         
     def get_current_capital(self) -> float:
         """获取当前资金"""
         return self.current_capital
         
-    def get_equity_curve(self) -> List[float]:
-        """获取权益曲线"""
-        return self.equity_curve.copy()
+    def get_equity_curve(self) -> np.ndarray:
+        """获取权益曲线（流式指标模式下为空数组）"""
+        if self.equity_curve is None:
+            return np.empty(0)
+        return self.equity_curve.values.copy()
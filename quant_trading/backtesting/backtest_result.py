@@ -2,11 +2,15 @@
 回测结果
 """
 
-from dataclasses import dataclass
+import json
+import os
+from dataclasses import dataclass, field, fields
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from .metrics import drawdown_series, monthly_returns, trade_statistics
 
 
 @dataclass
@@ -32,10 +36,21 @@ class BacktestResult:
     # 交易信息
     total_trades: int
     
-    # 详细数据
-    equity_curve: List[float]
+    # 详细数据（流式指标模式下不保留权益曲线，equity_curve为空数组）
+    equity_curve: np.ndarray
     trades: List[Dict[str, Any]]
     
+    # 扩展风险指标
+    sortino_ratio: float = 0.0
+    calmar_ratio: float = 0.0
+    volatility: float = 0.0
+    
+    # 权益曲线相邻元素的时间间隔（秒）
+    step_seconds: int = 60
+    
+    # 回测过程中已累计的月度收益（流式指标模式），None则由权益曲线计算
+    monthly_return_series: Optional[pd.Series] = field(default=None, repr=False)
+    
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
         return {
@@ -47,6 +62,9 @@ class BacktestResult:
             "total_return": self.total_return,
             "annual_return": self.annual_return,
             "sharpe_ratio": self.sharpe_ratio,
+            "sortino_ratio": self.sortino_ratio,
+            "calmar_ratio": self.calmar_ratio,
+            "volatility": self.volatility,
             "max_drawdown": self.max_drawdown,
             "win_rate": self.win_rate,
             "total_trades": self.total_trades
@@ -61,12 +79,16 @@ class BacktestResult:
         print(f"总收益率: {self.total_return:.2%}")
         print(f"年化收益率: {self.annual_return:.2%}")
         print(f"夏普比率: {self.sharpe_ratio:.2f}")
+        print(f"索提诺比率: {self.sortino_ratio:.2f}")
+        print(f"卡尔玛比率: {self.calmar_ratio:.2f}")
         print(f"最大回撤: {self.max_drawdown:.2%}")
         print(f"胜率: {self.win_rate:.2%}")
         print(f"总交易次数: {self.total_trades}")
         
     def plot_equity_curve(self, save_path: Optional[str] = None):
         """绘制权益曲线"""
+        import matplotlib.pyplot as plt
+        
         plt.figure(figsize=(12, 6))
         plt.plot(self.equity_curve)
         plt.title(f"{self.strategy_name} - 权益曲线")
@@ -81,15 +103,10 @@ class BacktestResult:
             
     def plot_drawdown(self, save_path: Optional[str] = None):
         """绘制回撤曲线"""
-        # 计算回撤
-        peak = self.equity_curve[0]
-        drawdowns = []
+        import matplotlib.pyplot as plt
+        
+        drawdowns = drawdown_series(self.equity_curve)
         
-        for value in self.equity_curve:
-            if value > peak:
-                peak = value
-            drawdowns.append((peak - value) / peak)
-            
         plt.figure(figsize=(12, 6))
         plt.fill_between(range(len(drawdowns)), drawdowns, 0, alpha=0.3, color='red')
         plt.plot(drawdowns, color='red')
@@ -104,36 +121,72 @@ class BacktestResult:
             plt.show()
             
     def get_monthly_returns(self) -> pd.DataFrame:
-        """获取月度收益率"""
-        if not self.equity_curve:
+        """获取月度收益率（每月最后一个权益相对上月，首月相对初始资金）"""
+        if self.monthly_return_series is not None:
+            return self.monthly_return_series.to_frame('monthly_return')
+            
+        if not len(self.equity_curve):
             return pd.DataFrame()
             
-        # 创建日期索引，长度与equity_curve匹配
-        dates = pd.date_range(start=self.start_date, periods=len(self.equity_curve), freq='D')
-        equity_series = pd.Series(self.equity_curve, index=dates)
-        
-        # 计算月度收益率
-        monthly_returns = equity_series.resample('ME').last().pct_change().dropna()
-        
-        return monthly_returns.to_frame('monthly_return')
+        return monthly_returns(self.equity_curve, self.start_date, self.step_seconds).to_frame('monthly_return')
         
     def get_trade_analysis(self) -> Dict[str, Any]:
         """获取交易分析"""
-        if not self.trades:
-            return {}
-            
-        trade_returns = [trade.get("pnl", 0) for trade in self.trades]
+        return trade_statistics(trade.get("pnl", 0) for trade in self.trades)
         
-        analysis = {
-            "total_trades": len(self.trades),
-            "winning_trades": len([r for r in trade_returns if r > 0]),
-            "losing_trades": len([r for r in trade_returns if r < 0]),
-            "win_rate": len([r for r in trade_returns if r > 0]) / max(1, len(trade_returns)),
-            "avg_win": sum([r for r in trade_returns if r > 0]) / max(1, len([r for r in trade_returns if r > 0])),
-            "avg_loss": sum([r for r in trade_returns if r < 0]) / max(1, len([r for r in trade_returns if r < 0])),
-            "profit_factor": abs(sum([r for r in trade_returns if r > 0]) / sum([r for r in trade_returns if r < 0])) if sum([r for r in trade_returns if r < 0]) != 0 else float('inf'),
-            "max_win": max(trade_returns) if trade_returns else 0,
-            "max_loss": min(trade_returns) if trade_returns else 0
+    # ==========================================
+    # 存储
+    # ==========================================
+    
+    # 以数组保存的字段，其余字段写入JSON元数据
+    _ARRAY_FIELDS = ("equity_curve", "trades", "monthly_return_series")
+    
+    def save(self, path: str):
+        """
+        保存为压缩的 .npz 文件（权益曲线为float64数组，标量与交易记录为JSON），先写临时文件再替换，
+        并发写同一路径时读取方不会看到半个文件
+        """
+        meta = {f.name: getattr(self, f.name) for f in fields(self) if f.name not in self._ARRAY_FIELDS}
+        arrays = {
+            "equity_curve": np.asarray(self.equity_curve, dtype=np.float64),
+            "meta": np.frombuffer(json.dumps(meta, default=_encode_json).encode("utf-8"), dtype=np.uint8),
+            "trades": np.frombuffer(json.dumps(self.trades, default=_encode_json).encode("utf-8"), dtype=np.uint8),
         }
+        if self.monthly_return_series is not None:
+            # 月度收益按月份（PeriodIndex）索引，只有几十个点，月份以字符串保存
+            arrays["monthly_index"] = np.array([str(month) for month in self.monthly_return_series.index])
+            arrays["monthly_values"] = self.monthly_return_series.to_numpy(dtype=np.float64)
+            
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(temp_path, path)
         
-        return analysis
+    @classmethod
+    def load(cls, path: str) -> "BacktestResult":
+        """读取 save 写入的文件"""
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"), object_hook=_decode_json)
+            trades = json.loads(data["trades"].tobytes().decode("utf-8"), object_hook=_decode_json)
+            monthly = None
+            if "monthly_index" in data:
+                monthly = pd.Series(data["monthly_values"],
+                                    index=pd.PeriodIndex(data["monthly_index"].tolist(), freq="M"),
+                                    name="monthly_return")
+            return cls(equity_curve=data["equity_curve"].copy(), trades=trades, monthly_return_series=monthly, **meta)
+
+
+def _encode_json(value: Any) -> Any:
+    """datetime与numpy标量的JSON编码（datetime带类型标记，读取时还原）"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _decode_json(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    return obj
@@ -0,0 +1,352 @@
+"""
+回测模拟撮合
+SimulatedOrderManager / SimulatedPositionManager 替换实盘的订单与持仓管理器：策略照常调用 _create_order，
+订单在进程内按当前K线（OHLC）或录制的订单簿同步撮合，不签名、不发送、不创建任务。
+手续费取自市场信息（OrderBookDetail.taker_fee / maker_fee，接口中为百分比字符串），
+K线撮合的滑点按比例计入成交价，订单簿撮合在数组订单簿（ArrayOrderBook）上按累计数量一次求出成交均价
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ..core.order_manager import Order, OrderManager, OrderSide, OrderStatus, OrderType
+from ..core.position_manager import Position, PositionManager, PositionSide
+from ..utils.config import Config
+from .order_book import ArrayOrderBook
+
+
+@dataclass
+class FeeSchedule:
+    """市场费率（小数，0.0002 即 0.02%）"""
+    taker_fee: float = 0.0
+    maker_fee: float = 0.0
+
+    @classmethod
+    def from_market_info(cls, market_info: Any) -> "FeeSchedule":
+        """从 OrderBookDetail（或字段相同的字典）读取费率"""
+        if isinstance(market_info, dict):
+            taker, maker = market_info.get("taker_fee"), market_info.get("maker_fee")
+        else:
+            taker, maker = getattr(market_info, "taker_fee", None), getattr(market_info, "maker_fee", None)
+        return cls(taker_fee=float(taker or 0) / 100, maker_fee=float(maker or 0) / 100)
+
+
+@dataclass
+class Fill:
+    """成交记录"""
+    order_id: str
+    market_id: int
+    side: OrderSide
+    size: float
+    price: float
+    fee: float
+    is_maker: bool
+    realized_pnl: Optional[float]  # 平仓部分的净盈亏（扣除本次与对应开仓的手续费），纯开仓/加仓为None
+    timestamp: datetime
+
+
+class SimulatedPositionManager(PositionManager):
+    """
+    模拟持仓管理器（每个市场一个净持仓）
+
+    由 SimulatedOrderManager 的成交驱动加仓（均价）、减仓、平仓与反手；
+    已实现盈亏扣除手续费，风控读取的权益因此与回测资金一致。不访问交易所
+    """
+
+    def __init__(self, config: Config):
+        super().__init__(config)
+        # 持仓尚未分摊的开仓手续费，平仓时按比例计入该笔交易的盈亏
+        self._entry_fees: Dict[int, float] = {}
+
+    def reset(self):
+        """清空持仓与盈亏（新一轮回测）"""
+        self.positions.clear()
+        self.position_history.clear()
+        self._entry_fees.clear()
+        self._total_realized_pnl = 0.0
+        self._rebuild_aggregates()
+
+    async def initialize(self):
+        self.logger.info("模拟持仓管理器: 无需从交易所加载持仓")
+
+    async def update_positions(self):
+        pass
+
+    async def _load_existing_positions(self):
+        pass
+
+    def apply_fill(self, market_id: int, side: OrderSide, size: float, price: float, fee: float,
+                   leverage: float = 1.0) -> Optional[float]:
+        """
+        按一笔成交更新持仓
+
+        Returns:
+            本次平仓部分的净盈亏，纯开仓/加仓为None
+        """
+        self._total_realized_pnl -= fee
+        fill_side = PositionSide.LONG if side == OrderSide.BUY else PositionSide.SHORT
+        position = self.positions.get(market_id)
+
+        if position is None or position.side == fill_side:
+            self._increase(market_id, fill_side, size, price, leverage, position)
+            self._entry_fees[market_id] = self._entry_fees.get(market_id, 0.0) + fee
+            return None
+
+        # 反向成交：先减仓/平仓，剩余部分反手开仓
+        closed = min(size, position.size)
+        direction = 1.0 if position.side == PositionSide.LONG else -1.0
+        gross = direction * (price - position.entry_price) * closed
+        position.realized_pnl += gross
+        self._total_realized_pnl += gross
+
+        entry_fee = self._entry_fees.get(market_id, 0.0) * closed / position.size
+        close_fee = fee * closed / size
+        self._entry_fees[market_id] = self._entry_fees.get(market_id, 0.0) - entry_fee
+
+        if closed >= position.size:
+            del self.positions[market_id]
+            self._remove_from_aggregates(position)
+            self._entry_fees.pop(market_id, None)
+        else:
+            remaining = position.size - closed
+            new_margin = remaining * position.entry_price / position.leverage
+            self._total_margin += new_margin - position.margin
+            position.margin = new_margin
+            position.size = remaining
+            self._mark_position(position, price)
+
+        if size > closed:
+            self._increase(market_id, fill_side, size - closed, price, leverage, None)
+            self._entry_fees[market_id] = fee - close_fee
+
+        return gross - entry_fee - close_fee
+
+    def _increase(self, market_id: int, side: PositionSide, size: float, price: float, leverage: float,
+                  position: Optional[Position]):
+        """开仓或同向加仓（按成交量加权更新开仓均价）"""
+        if position is None:
+            position = Position(
+                market_id=market_id, side=side, size=size, entry_price=price, current_price=price,
+                unrealized_pnl=0.0, realized_pnl=0.0, leverage=leverage,
+                margin=size * price / leverage, timestamp=self.clock.now()
+            )
+            self.positions[market_id] = position
+            self._add_to_aggregates(position)
+            self.position_history.append(position)
+            return
+
+        total = position.size + size
+        position.entry_price = (position.entry_price * position.size + price * size) / total
+        position.size = total
+        new_margin = total * position.entry_price / position.leverage
+        self._total_margin += new_margin - position.margin
+        position.margin = new_margin
+        self._mark_position(position, price)
+
+    def mark(self, market_id: int, price: float):
+        """按价格盯市"""
+        position = self.positions.get(market_id)
+        if position is not None and price > 0:
+            self._mark_position(position, price)
+
+
+class SimulatedOrderManager(OrderManager):
+    """
+    模拟订单管理器
+
+    - 市价单: 有订单簿时逐档吃单（与实盘一样以 下单价 * (1 ± price_slippage_tolerance) 为最差可接受价格，
+      超出部分取消），否则按当前K线收盘价加滑点成交，收取taker费
+    - 限价单: 可立即成交的部分按taker成交；否则挂单，后续K线的最低/最高价触及限价时
+      按限价（跳空时按开盘价）成交，收取maker费；有订单簿时对手价越过限价即成交
+    - 撮合在 create_order 内同步完成，成交后触发订单回调与成交回调
+    """
+
+    def __init__(self, config: Config, position_manager: SimulatedPositionManager,
+                 slippage: float = 0.0, default_fees: Optional[FeeSchedule] = None):
+        """
+        Args:
+            config: 配置对象
+            position_manager: 模拟持仓管理器
+            slippage: K线撮合时市价成交的滑点比例
+            default_fees: 未单独设置费率的市场使用的费率
+        """
+        super().__init__(None, config, None, None, position_manager, None)
+        self.slippage = slippage
+        self.default_fees = default_fees or FeeSchedule()
+        self.fees: Dict[int, FeeSchedule] = {}
+
+        # 各市场当前K线 (开, 高, 低, 收) 与最新订单簿
+        self._bars: Dict[int, Tuple[float, float, float, float]] = {}
+        self._books: Dict[int, ArrayOrderBook] = {}
+        # 挂单 {market_id: [Order]}
+        self._resting: Dict[int, List[Order]] = {}
+
+        self.fills: List[Fill] = []
+        self.total_fees = 0.0
+        self.fill_callbacks: List[Callable[[Fill], None]] = []
+
+    def reset(self):
+        """清空订单、挂单、成交与行情（新一轮回测，费率保留）"""
+        self.orders.clear()
+        self.order_history.clear()
+        self._resting.clear()
+        self._bars.clear()
+        self._books.clear()
+        self.fills.clear()
+        self.total_fees = 0.0
+
+    def set_fee_schedule(self, market_id: int, fees: FeeSchedule):
+        """设置市场费率"""
+        self.fees[market_id] = fees
+
+    def add_fill_callback(self, callback: Callable[[Fill], None]):
+        """添加成交回调 callback(Fill)"""
+        self.fill_callbacks.append(callback)
+
+    # ==========================================
+    # 行情输入
+    # ==========================================
+
+    def on_bar(self, market_id: int, open_: float, high: float, low: float, close: float):
+        """新K线: 撮合该市场的挂单，并按收盘价盯市"""
+        self._bars[market_id] = (open_, high, low, close)
+        resting = self._resting.get(market_id)
+        if resting:
+            for order in list(resting):
+                if order.side == OrderSide.BUY and low <= order.price:
+                    self._fill(order, min(order.price, open_), order.remaining_size, True)
+                elif order.side == OrderSide.SELL and high >= order.price:
+                    self._fill(order, max(order.price, open_), order.remaining_size, True)
+        self.position_manager.mark(market_id, close)
+
+    def on_order_book(self, market_id: int, order_book: Union[ArrayOrderBook, Dict[str, Any]]):
+        """
+        新订单簿: 对手价越过限价的挂单按限价成交，并按中间价盯市
+
+        Args:
+            market_id: 市场ID
+            order_book: 数组订单簿（原地更新的同一对象），或 {"bids", "asks"} 字典快照
+        """
+        if not isinstance(order_book, ArrayOrderBook):
+            order_book = ArrayOrderBook.from_dict(order_book)
+        self._books[market_id] = order_book
+        best_bid, best_ask = order_book.best_prices()
+        resting = self._resting.get(market_id)
+        if resting:
+            for order in list(resting):
+                if order.side == OrderSide.BUY and 0 < best_ask <= order.price:
+                    self._fill(order, order.price, order.remaining_size, True)
+                elif order.side == OrderSide.SELL and best_bid >= order.price > 0:
+                    self._fill(order, order.price, order.remaining_size, True)
+        if best_bid > 0 and best_ask > 0:
+            self.position_manager.mark(market_id, (best_bid + best_ask) / 2)
+
+    # ==========================================
+    # 订单
+    # ==========================================
+
+    def create_order(self, market_id: int, side: OrderSide, order_type: OrderType, size: float, price: float,
+                     **kwargs) -> Order:
+        """创建订单并立即撮合"""
+        order = super().create_order(market_id, side, order_type, size, price, **kwargs)
+        if size <= 0:
+            self._finish(order, OrderStatus.REJECTED)
+            return order
+
+        if order_type == OrderType.MARKET:
+            # 市价单不挂单：订单簿深度不足或超出滑点容忍度时剩余部分取消
+            self._take(order, self._worst_acceptable_price(order))
+            if order.is_active:
+                self._finish(order, OrderStatus.CANCELLED)
+        else:
+            self._take(order, order.price)
+            if order.is_active:
+                order.status = OrderStatus.SUBMITTED
+                self._resting.setdefault(market_id, []).append(order)
+        return order
+
+    def _take(self, order: Order, limit: Optional[float]):
+        """按taker立即成交（只成交不劣于 limit 的部分: 限价单的限价或市价单的最差可接受价格）"""
+        book = self._books.get(order.market_id)
+        if book is not None:
+            size, price = book.walk(order.side, order.remaining_size, limit)
+            if size > 0:
+                self._fill(order, price, size, False)
+            return
+
+        # K线撮合的滑点是模型参数，市价单不套用滑点容忍度，只有限价单检查限价
+        if order.order_type == OrderType.MARKET:
+            limit = None
+        bar = self._bars.get(order.market_id)
+        reference = bar[3] if bar is not None else order.price
+        if reference <= 0:
+            return
+        if order.side == OrderSide.BUY:
+            price = reference * (1 + self.slippage)
+            if limit is not None and price > limit:
+                return
+        else:
+            price = reference * (1 - self.slippage)
+            if limit is not None and price < limit:
+                return
+        self._fill(order, price, order.remaining_size, False)
+
+    @staticmethod
+    def _worst_acceptable_price(order: Order) -> Optional[float]:
+        """市价单的最差可接受价格（与实盘提交时的计算相同），关闭滑点检测时不限"""
+        if not order.slippage_enabled or order.price <= 0:
+            return None
+        tolerance = order.price_slippage_tolerance
+        return order.price * (1 + tolerance) if order.side == OrderSide.BUY else order.price * (1 - tolerance)
+
+    def _fill(self, order: Order, price: float, size: float, is_maker: bool):
+        """记录一笔成交，更新订单、持仓与手续费"""
+        fees = self.fees.get(order.market_id, self.default_fees)
+        fee = size * price * (fees.maker_fee if is_maker else fees.taker_fee)
+        realized = self.position_manager.apply_fill(order.market_id, order.side, size, price, fee,
+                                                   order.leverage)
+
+        filled = order.filled_size + size
+        order.filled_price = (order.filled_price * order.filled_size + price * size) / filled
+        order.filled_size = filled
+        self.total_fees += fee
+
+        fill = Fill(order.order_id, order.market_id, order.side, size, price, fee, is_maker,
+                    realized, self.clock.now())
+        self.fills.append(fill)
+        for callback in self.fill_callbacks:
+            try:
+                callback(fill)
+            except Exception as e:
+                self.logger.error(f"成交回调执行失败: {e}")
+
+        if order.remaining_size <= 1e-12:
+            self._finish(order, OrderStatus.FILLED)
+
+    def _finish(self, order: Order, status: OrderStatus):
+        order.status = status
+        resting = self._resting.get(order.market_id)
+        if resting and order in resting:
+            resting.remove(order)
+        self._notify_order_update(order)
+
+    async def cancel_order(self, order_id: str) -> bool:
+        order = self.orders.get(order_id)
+        if order is None or not order.is_active:
+            return False
+        self._finish(order, OrderStatus.CANCELLED)
+        return True
+
+    # 实盘的提交、状态检查与市场规则加载在回测中都不需要
+    async def initialize(self):
+        self.logger.info("模拟订单管理器: 订单在进程内撮合")
+
+    async def submit_pending_orders(self):
+        pass
+
+    async def check_submitted_orders(self):
+        pass
+
+    async def run_submission_worker(self):
+        pass
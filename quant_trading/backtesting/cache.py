@@ -0,0 +1,297 @@
+"""
+回测结果缓存
+以内容寻址: 缓存键是输入K线数组（或录制文件）的指纹、策略类及其源码、回测引擎与指标/内核模块的源码、策略参数、影响回测的配置段
+与引擎设置（初始资金、步长、滑点、费率等）的哈希，结果以 BacktestResult.save 的压缩 .npz 存盘。
+数据、参数与代码都没变时直接读取结果；参数扫描只计算缓存中还没有的网格点
+"""
+
+import hashlib
+import inspect
+import itertools
+import json
+import os
+from dataclasses import asdict, is_dataclass
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..utils.logger import setup_logger
+from .backtest_result import BacktestResult
+
+
+# 缓存文件格式变化时递增（引擎与指标代码的改动已由 _engine_fingerprint 自动计入缓存键）
+CACHE_VERSION = 1
+
+# 影响回测结果的配置段（连接、通知、日志等与结果无关的配置不参与缓存键）
+CONFIG_SECTIONS = ("trading_config", "risk_config", "strategies", "data_sources", "backtest_config")
+# 缓存自身的开关与目录不影响结果
+IGNORED_KEYS = ("cache", "cache_dir")
+
+# 除 backtesting 包本身外，同样决定回测结果的模块（指标、内核、K线缓冲、时钟，
+# 以及模拟撮合与持仓继承的订单/持仓管理器和风控）
+ENGINE_MODULES = (
+    "utils/indicators.py",
+    "utils/kernels.py",
+    "utils/data_utils.py",
+    "utils/ring_buffer.py",
+    "utils/bar_aggregator.py",
+    "utils/clock.py",
+    "core/order_manager.py",
+    "core/position_manager.py",
+    "core/risk_manager.py",
+    "core/portfolio_risk.py",
+)
+
+
+def fingerprint_arrays(*arrays: np.ndarray) -> str:
+    """一组数组的内容指纹（按dtype、形状与原始字节计算）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape}".encode())
+        digest.update(array.data)
+    return digest.hexdigest()
+
+
+def _canonical(value: Any) -> Any:
+    """把参数转换为可稳定序列化的结构（dataclass、枚举、numpy标量、集合等）"""
+    if is_dataclass(value) and not isinstance(value, type):
+        return {"__dataclass__": type(value).__qualname__, **_canonical(asdict(value))}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_canonical(item) for item in value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return {"__array__": fingerprint_arrays(value)}
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    return value
+
+
+def _source_fingerprint(strategy_cls: type) -> str:
+    """策略类所在模块及其父类模块源码的指纹（策略代码改动后旧结果失效）"""
+    digest = hashlib.blake2b(digest_size=16)
+    for cls in strategy_cls.__mro__:
+        if cls.__module__ == "builtins" or cls.__module__.startswith("abc"):
+            continue
+        try:
+            digest.update(inspect.getsource(inspect.getmodule(cls)).encode("utf-8"))
+        except (OSError, TypeError):
+            digest.update(f"{cls.__module__}.{cls.__qualname__}".encode())
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _engine_fingerprint() -> str:
+    """回测引擎源码指纹: backtesting 包全部模块与 ENGINE_MODULES（每个进程只计算一次），
+    撮合、指标或内核代码改动后旧结果自动失效，无需手动递增 CACHE_VERSION"""
+    package_root = Path(__file__).resolve().parent.parent
+    paths = sorted(Path(__file__).resolve().parent.glob("*.py"))
+    paths += [package_root / module for module in ENGINE_MODULES]
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        digest.update(str(path.relative_to(package_root)).encode())
+        try:
+            digest.update(path.read_bytes())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+class BacktestCache:
+    """
+    回测结果缓存
+
+    结果文件按缓存键存放在 <directory>/<键前2位>/<键>.npz，写入为原子替换，多进程并行扫描时可以共用同一目录
+    """
+
+    @classmethod
+    def from_config(cls, config) -> "BacktestCache":
+        """按 backtest.cache / backtest.cache_dir 创建"""
+        backtest_config = config.backtest_config
+        return cls(backtest_config.get("cache_dir", "data/backtest_cache"), backtest_config.get("cache", True),
+                   config.log_level)
+
+    def __init__(self, directory: str = "data/backtest_cache", enabled: bool = True, log_level: str = "INFO"):
+        """
+        Args:
+            directory: 缓存目录
+            enabled: 关闭时每次都重新回测（也不写入）
+            log_level: 日志级别
+        """
+        self.directory = directory
+        self.enabled = enabled
+        self.logger = setup_logger("BacktestCache", log_level)
+        self.hits = 0
+        self.misses = 0
+        self._source_fingerprints: Dict[type, str] = {}
+
+    # ==========================================
+    # 缓存键
+    # ==========================================
+
+    def key(self, engine, strategy_cls: type, params: Dict[str, Any],
+            start_date: Optional[datetime], end_date: Optional[datetime]) -> str:
+        """
+        计算缓存键
+
+        Args:
+            engine: 回测引擎（提供 cache_settings 与 config）
+            strategy_cls: 策略类
+            params: 策略构造参数（不含config）
+            start_date: 开始时间
+            end_date: 结束时间
+        """
+        if strategy_cls not in self._source_fingerprints:
+            self._source_fingerprints[strategy_cls] = _source_fingerprint(strategy_cls)
+        payload = {
+            "version": CACHE_VERSION,
+            "strategy": f"{strategy_cls.__module__}.{strategy_cls.__qualname__}",
+            "strategy_source": self._source_fingerprints[strategy_cls],
+            "engine_source": _engine_fingerprint(),
+            "params": params,
+            "config": {section: self._config_section(engine.config, section) for section in CONFIG_SECTIONS},
+            "engine": engine.cache_settings(),
+            "start": start_date,
+            "end": end_date,
+        }
+        encoded = json.dumps(_canonical(payload), sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.blake2b(encoded.encode("utf-8"), digest_size=20).hexdigest()
+
+    @staticmethod
+    def _config_section(config, section: str) -> Any:
+        values = getattr(config, section, None)
+        if isinstance(values, dict):
+            return {key: value for key, value in values.items() if key not in IGNORED_KEYS}
+        return values
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npz")
+
+    # ==========================================
+    # 读写
+    # ==========================================
+
+    def get(self, key: str) -> Optional[BacktestResult]:
+        """读取缓存结果，不存在或文件损坏时为None"""
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return BacktestResult.load(path)
+        except Exception as e:
+            self.logger.warning(f"缓存结果读取失败，将重新回测: {path}: {e}")
+            return None
+
+    def put(self, key: str, result: BacktestResult):
+        """写入结果"""
+        if not self.enabled:
+            return
+        try:
+            result.save(self.path(key))
+        except Exception as e:
+            self.logger.error(f"缓存结果写入失败: {e}")
+
+    # ==========================================
+    # 回测
+    # ==========================================
+
+    async def run_backtest(self, engine, strategy_cls: type, params: Dict[str, Any],
+                           start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                           strategy_factory: Optional[Callable[..., Any]] = None) -> BacktestResult:
+        """
+        带缓存的回测: 命中时直接返回，否则构造策略并运行 engine.run_backtest 后写入缓存
+
+        Args:
+            engine: 回测引擎（已加载数据与市场信息）
+            strategy_cls: 策略类
+            params: 策略构造参数（不含config）
+            start_date: 开始时间
+            end_date: 结束时间
+            strategy_factory: 自定义构造函数 factory(config, **params)，默认 strategy_cls(config=config, **params)
+        """
+        key = self.key(engine, strategy_cls, params, start_date, end_date)
+        result = self.get(key)
+        if result is not None:
+            self.hits += 1
+            self.logger.info(f"回测缓存命中: {strategy_cls.__name__} {params}")
+            return result
+
+        self.misses += 1
+        strategy = self._create_strategy(engine, strategy_cls, params, strategy_factory)
+        if start_date is None and end_date is None:
+            result = await engine.run_backtest(strategy)
+        else:
+            result = await engine.run_backtest(strategy, start_date, end_date)
+        self.put(key, result)
+        return result
+
+    @staticmethod
+    def _create_strategy(engine, strategy_cls: type, params: Dict[str, Any],
+                         strategy_factory: Optional[Callable[..., Any]] = None):
+        if strategy_factory is not None:
+            return strategy_factory(engine.config, **params)
+        return strategy_cls(config=engine.config, **params)
+
+    async def sweep(self, engine, strategy_cls: type, grid: Dict[str, Sequence[Any]],
+                    base_params: Optional[Dict[str, Any]] = None,
+                    start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+                    strategy_factory: Optional[Callable[..., Any]] = None
+                    ) -> List[Tuple[Dict[str, Any], BacktestResult]]:
+        """
+        参数网格扫描: 按网格的笛卡尔积逐点回测，已缓存的点直接读取。
+        engine 为 PortfolioBacktestEngine 时，未缓存的点在一次回放中一起计算
+
+        Args:
+            grid: {参数名: 取值列表}
+            base_params: 所有网格点共用的参数
+
+        Returns:
+            [(该点的完整参数, 回测结果)]，顺序与网格展开顺序一致
+        """
+        names = list(grid)
+        points = [dict(base_params or {}, **dict(zip(names, values)))
+                  for values in itertools.product(*(grid[name] for name in names))]
+        hits, misses = self.hits, self.misses
+
+        if hasattr(engine, "run_strategies") and start_date is not None and end_date is not None:
+            keys = [self.key(engine, strategy_cls, params, start_date, end_date) for params in points]
+            cached = [self.get(key) for key in keys]
+            missing = [i for i, result in enumerate(cached) if result is None]
+            self.hits += len(points) - len(missing)
+            self.misses += len(missing)
+            if missing:
+                strategies = [self._create_strategy(engine, strategy_cls, points[i], strategy_factory)
+                              for i in missing]
+                portfolio = await engine.run_strategies(strategies, start_date, end_date)
+                for i, result in zip(missing, portfolio.results):
+                    self.put(keys[i], result)
+                    cached[i] = result
+            results = list(zip(points, cached))
+        else:
+            results = []
+            for params in points:
+                result = await self.run_backtest(engine, strategy_cls, params, start_date, end_date,
+                                                 strategy_factory)
+                results.append((params, result))
+        self.logger.info(f"参数扫描完成: {len(points)} 个网格点, 缓存命中 {self.hits - hits}, "
+                         f"新计算 {self.misses - misses}")
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        return {"hits": self.hits, "misses": self.misses, "directory": self.directory, "enabled": self.enabled}
@@ -0,0 +1,285 @@
+"""
+回测绩效指标
+权益序列存放在预分配的numpy数组中，指标（夏普、索提诺、卡尔玛、回撤、月度收益、交易统计）
+以向量化方式一次计算；StreamingMetrics 在回测过程中在线累计同样的指标，不保留完整权益曲线
+"""
+
+import math
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 加密货币市场全年无休，按1分钟步长每年的周期数
+MINUTES_PER_YEAR = 365 * 24 * 60
+
+
+class EquityCurve:
+    """预分配的权益序列，容量不足时按倍数扩容"""
+
+    def __init__(self, capacity: int = 1024):
+        self._values = np.empty(max(int(capacity), 1), dtype=np.float64)
+        self._size = 0
+
+    def append(self, value: float):
+        if self._size == len(self._values):
+            self._values = np.resize(self._values, len(self._values) * 2)
+        self._values[self._size] = value
+        self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def values(self) -> np.ndarray:
+        """已写入部分的视图（不复制）"""
+        return self._values[:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self._values.nbytes
+
+
+@dataclass
+class PerformanceMetrics:
+    """权益曲线绩效指标（收益率为小数，比率已按 periods_per_year 年化）"""
+    periods: int = 0
+    total_return: float = 0.0
+    annual_return: float = 0.0
+    volatility: float = 0.0
+    sharpe_ratio: float = 0.0
+    sortino_ratio: float = 0.0
+    calmar_ratio: float = 0.0
+    max_drawdown: float = 0.0
+    max_drawdown_start: int = 0   # 最大回撤前的峰值位置
+    max_drawdown_end: int = 0     # 最大回撤的谷底位置
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _annualize(periods: int, periods_per_year: float, total_return: float, mean: float, std: float,
+               downside: float, max_dd: float) -> Dict[str, float]:
+    """由收益率的一阶/二阶统计量计算年化指标（向量化与流式两种模式共用）"""
+    if periods == 0:
+        return {"annual_return": 0.0, "volatility": 0.0, "sharpe_ratio": 0.0, "sortino_ratio": 0.0,
+                "calmar_ratio": 0.0}
+    scale = math.sqrt(periods_per_year)
+    if total_return <= -1:
+        annual_return = -1.0
+    else:
+        try:
+            annual_return = math.expm1(math.log1p(total_return) * periods_per_year / periods)
+        except OverflowError:
+            annual_return = float("inf")
+    return {
+        "annual_return": annual_return,
+        "volatility": std * scale,
+        "sharpe_ratio": mean / std * scale if std > 0 else 0.0,
+        "sortino_ratio": mean / downside * scale if downside > 0 else 0.0,
+        "calmar_ratio": annual_return / max_dd if max_dd > 0 else 0.0,
+    }
+
+
+def drawdown_series(equity: np.ndarray) -> np.ndarray:
+    """回撤序列: (历史峰值 - 当前权益) / 历史峰值"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return equity
+    peaks = np.maximum.accumulate(equity)
+    return (peaks - equity) / peaks
+
+
+def max_drawdown(equity: np.ndarray) -> Tuple[float, int, int]:
+    """
+    计算最大回撤
+
+    Returns:
+        (最大回撤, 回撤前峰值位置, 谷底位置)
+    """
+    drawdowns = drawdown_series(equity)
+    if not len(drawdowns):
+        return 0.0, 0, 0
+    end = int(np.argmax(drawdowns))
+    if drawdowns[end] <= 0:
+        return 0.0, 0, 0
+    start = int(np.argmax(np.asarray(equity)[:end + 1]))
+    return float(drawdowns[end]), start, end
+
+
+def compute_metrics(equity: np.ndarray, periods_per_year: float = MINUTES_PER_YEAR) -> PerformanceMetrics:
+    """
+    向量化计算权益曲线的绩效指标
+
+    Args:
+        equity: 权益序列（第一个元素为初始资金）
+        periods_per_year: 每年的周期数（1分钟步长为 MINUTES_PER_YEAR）
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) < 2:
+        return PerformanceMetrics()
+
+    returns = np.diff(equity) / equity[:-1]
+    downside = np.minimum(returns, 0.0)
+    max_dd, dd_start, dd_end = max_drawdown(equity)
+    total_return = float(equity[-1] / equity[0] - 1)
+    return PerformanceMetrics(
+        periods=len(returns),
+        total_return=total_return,
+        max_drawdown=max_dd,
+        max_drawdown_start=dd_start,
+        max_drawdown_end=dd_end,
+        **_annualize(len(returns), periods_per_year, total_return, float(returns.mean()), float(returns.std()),
+                     float(np.sqrt(np.mean(downside * downside))), max_dd),
+    )
+
+
+def monthly_returns(equity: np.ndarray, start: datetime, step_seconds: int = 60) -> pd.Series:
+    """
+    月度收益率: 每月最后一个权益相对上月最后一个权益（首月相对初始资金）
+
+    Args:
+        equity: 权益序列，第i个元素对应 start + i * step_seconds
+        start: 第一个元素的时间
+        step_seconds: 相邻元素的时间间隔（秒）
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) < 2:
+        return pd.Series(dtype=np.float64, name="monthly_return")
+
+    timestamps = np.datetime64(start, "s") + np.arange(len(equity)) * np.timedelta64(step_seconds, "s")
+    months = timestamps.astype("datetime64[M]")
+    # 每个月最后一个元素的位置
+    month_ends = np.append(np.flatnonzero(months[1:] != months[:-1]), len(equity) - 1)
+    closes = equity[month_ends]
+    previous = np.concatenate(([equity[0]], closes[:-1]))
+    return pd.Series(closes / previous - 1, index=pd.PeriodIndex(months[month_ends], freq="M"),
+                     name="monthly_return")
+
+
+def trade_statistics(pnls: Iterable[float]) -> Dict[str, Any]:
+    """向量化计算交易统计（胜率、平均盈亏、盈亏比、最大单笔盈亏）"""
+    pnls = np.fromiter(pnls, dtype=np.float64)
+    if not len(pnls):
+        return {}
+    wins = pnls[pnls > 0]
+    losses = pnls[pnls < 0]
+    gross_loss = float(losses.sum())
+    return {
+        "total_trades": len(pnls),
+        "winning_trades": len(wins),
+        "losing_trades": len(losses),
+        "win_rate": len(wins) / len(pnls),
+        "avg_win": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss": float(losses.mean()) if len(losses) else 0.0,
+        "profit_factor": abs(float(wins.sum()) / gross_loss) if gross_loss != 0 else float("inf"),
+        "max_win": float(pnls.max()),
+        "max_loss": float(pnls.min()),
+    }
+
+
+class StreamingMetrics:
+    """
+    在线累计绩效指标，内存占用与回测长度无关
+
+    收益率的均值/方差用Welford算法累计，回撤跟踪历史峰值，月度收益在跨月时结算。
+    结果与对完整权益曲线调用 compute_metrics / monthly_returns 一致（浮点误差内）
+    """
+
+    def __init__(self, initial_equity: float, periods_per_year: float = MINUTES_PER_YEAR,
+                 start: Optional[datetime] = None, step_seconds: int = 60):
+        """
+        Args:
+            initial_equity: 初始资金（权益序列第一个元素）
+            periods_per_year: 每年的周期数
+            start: 初始资金对应的时间（None则不统计月度收益）
+            step_seconds: 每次 update 的时间间隔（秒）
+        """
+        self.periods_per_year = periods_per_year
+        self.initial_equity = initial_equity
+        self.last_equity = initial_equity
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._downside_sq = 0.0
+
+        self.peak = initial_equity
+        self._peak_index = 0
+        self.max_drawdown = 0.0
+        self._dd_start = 0
+        self._dd_end = 0
+
+        # 月度收益: 下一个跨月位置（按元素序号）与已结算的月份
+        self.step_seconds = step_seconds
+        self._month: Optional[np.datetime64] = None
+        self._month_open = initial_equity
+        self._months: Dict[pd.Period, float] = {}
+        if start is not None:
+            self._start = np.datetime64(start, "s")
+            self._month = self._start.astype("datetime64[M]")
+            self._next_boundary = self._boundary_index(self._month + 1)
+
+    def _boundary_index(self, month: np.datetime64) -> int:
+        """月初时间对应的第一个元素序号"""
+        seconds = (month.astype("datetime64[s]") - self._start) / np.timedelta64(1, "s")
+        return int(math.ceil(seconds / self.step_seconds))
+
+    def update(self, equity: float):
+        """追加一个权益值"""
+        self.count += 1
+        index = self.count
+        ret = (equity - self.last_equity) / self.last_equity
+        delta = ret - self._mean
+        self._mean += delta / index
+        self._m2 += delta * (ret - self._mean)
+        if ret < 0:
+            self._downside_sq += ret * ret
+
+        if equity > self.peak:
+            self.peak = equity
+            self._peak_index = index
+        else:
+            drawdown = (self.peak - equity) / self.peak
+            if drawdown > self.max_drawdown:
+                self.max_drawdown = drawdown
+                self._dd_start = self._peak_index
+                self._dd_end = index
+
+        if self._month is not None and index >= self._next_boundary:
+            # 跨月: 上一个元素是上月最后一个权益
+            self._close_month(self.last_equity)
+            self._month += 1
+            self._next_boundary = self._boundary_index(self._month + 1)
+        self.last_equity = equity
+
+    def _close_month(self, close: float):
+        self._months[pd.Period(str(self._month), freq="M")] = close / self._month_open - 1
+        self._month_open = close
+
+    def result(self) -> PerformanceMetrics:
+        if self.count == 0:
+            return PerformanceMetrics()
+        total_return = self.last_equity / self.initial_equity - 1
+        std = math.sqrt(self._m2 / self.count)
+        downside = math.sqrt(self._downside_sq / self.count)
+        return PerformanceMetrics(
+            periods=self.count,
+            total_return=total_return,
+            max_drawdown=self.max_drawdown,
+            max_drawdown_start=self._dd_start,
+            max_drawdown_end=self._dd_end,
+            **_annualize(self.count, self.periods_per_year, total_return, self._mean, std, downside,
+                         self.max_drawdown),
+        )
+
+    def monthly_returns(self) -> pd.Series:
+        """已结算月份加上当前未结束月份的收益率"""
+        if self._month is None or self.count == 0:
+            return pd.Series(dtype=np.float64, name="monthly_return")
+        months = dict(self._months)
+        months[pd.Period(str(self._month), freq="M")] = self.last_equity / self._month_open - 1
+        return pd.Series(list(months.values()), index=pd.PeriodIndex(list(months.keys()), freq="M"),
+                         name="monthly_return")
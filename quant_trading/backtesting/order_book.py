@@ -0,0 +1,196 @@
+"""
+数组订单簿
+每侧档位按价格优先保存为有序列表（买方价格降序、卖方价格升序），增量更新用二分查找原地合并
+（数量为0表示删除该档），单条增量只需几次列表操作；吃单时取该侧的numpy快照（价格、数量、累计数量、
+累计成交额，档位变化后才重建），对累计数量做 searchsorted 一次求出成交到第几档，不再逐档循环，
+同一快照上的多个下单量也可以一次算出各自的成交均价
+"""
+
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..core.order_manager import OrderSide
+
+
+class BookSide:
+    """
+    订单簿单侧
+
+    以 key = sign * price 升序保存（卖方sign=1、买方sign=-1），下标0即最优价
+    """
+
+    __slots__ = ("sign", "keys", "sizes", "_snapshot")
+
+    def __init__(self, sign: float):
+        self.sign = sign
+        self.keys: List[float] = []
+        self.sizes: List[float] = []
+        # (keys, prices, 累计数量, 累计成交额) numpy快照，档位变化后失效
+        self._snapshot: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def replace(self, levels: Iterable[Dict[str, Any]]):
+        """整侧替换（订单簿快照，档位不要求有序，同价多档取最后一档）"""
+        sign = self.sign
+        merged = {}
+        for level in levels:
+            merged[sign * float(level["price"])] = float(level["size"])
+        pairs = sorted((key, size) for key, size in merged.items() if size > 0)
+        self.keys = [key for key, _ in pairs]
+        self.sizes = [size for _, size in pairs]
+        self._snapshot = None
+
+    def update(self, levels: Iterable[Dict[str, Any]]):
+        """合并增量档位（按价格覆盖数量，数量为0删除该档）"""
+        sign = self.sign
+        keys, sizes = self.keys, self.sizes
+        for level in levels:
+            key = sign * float(level["price"])
+            size = float(level["size"])
+            index = bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                if size > 0:
+                    sizes[index] = size
+                else:
+                    del keys[index]
+                    del sizes[index]
+            elif size > 0:
+                keys.insert(index, key)
+                sizes.insert(index, size)
+        self._snapshot = None
+
+    @property
+    def best_price(self) -> float:
+        return self.sign * self.keys[0] if self.keys else 0.0
+
+    @property
+    def best_size(self) -> float:
+        return self.sizes[0] if self.sizes else 0.0
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """按价格优先的 (keys, 价格, 累计数量, 累计成交额) 数组"""
+        if self._snapshot is None:
+            keys = np.array(self.keys, dtype=np.float64)
+            prices = self.sign * keys
+            sizes = np.array(self.sizes, dtype=np.float64)
+            self._snapshot = (keys, prices, np.cumsum(sizes), np.cumsum(sizes * prices))
+        return self._snapshot
+
+    def sweep(self, sizes: np.ndarray, limit: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        一次计算多个下单量逐档吃单的结果
+
+        Args:
+            sizes: 下单量数组
+            limit: 最差可接受价格，None表示不限
+
+        Returns:
+            (可成交数量, 成交均价, 最差成交价)，无可成交档位时均价与最差价为0
+        """
+        sizes = np.asarray(sizes, dtype=np.float64)
+        keys, prices, cum_sizes, cum_notional = self.snapshot()
+        depth = len(keys) if limit is None else int(np.searchsorted(keys, self.sign * limit, side="right"))
+        if depth == 0:
+            return np.zeros_like(sizes), np.zeros_like(sizes), np.zeros_like(sizes)
+        filled = np.minimum(sizes, cum_sizes[depth - 1])
+        # 第一个累计数量达到下单量的档位即最后成交的档位
+        last = np.minimum(np.searchsorted(cum_sizes[:depth], filled, side="left"), depth - 1)
+        before_sizes = np.where(last > 0, cum_sizes[last - 1], 0.0)
+        before_notional = np.where(last > 0, cum_notional[last - 1], 0.0)
+        notional = before_notional + (filled - before_sizes) * prices[last]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.where(filled > 0, notional / filled, 0.0)
+        worst = np.where(filled > 0, prices[last], 0.0)
+        return filled, average, worst
+
+    def levels(self, depth: Optional[int] = None) -> List[Dict[str, str]]:
+        """转回 [{"price": str, "size": str}] 形式（价格优先）"""
+        count = len(self.keys) if depth is None else min(depth, len(self.keys))
+        sign = self.sign
+        return [{"price": repr(sign * key), "size": repr(size)}
+                for key, size in zip(self.keys[:count], self.sizes[:count])]
+
+
+class ArrayOrderBook:
+    """
+    数组订单簿（单个市场）
+
+    接收与 WsClient 相同格式的快照与增量，最优价直接读取有序档位，吃单在numpy快照上计算；
+    需要字典形式的调用方（策略读取 market_data["order_book"]）可以按 "bids" / "asks" 取出档位列表
+    """
+
+    __slots__ = ("bids", "asks", "version")
+
+    def __init__(self):
+        self.bids = BookSide(-1.0)
+        self.asks = BookSide(1.0)
+        self.version = 0  # 每次更新递增
+
+    @classmethod
+    def from_dict(cls, order_book: Dict[str, Any]) -> "ArrayOrderBook":
+        """由 {"bids": [...], "asks": [...]} 构建（档位不要求有序）"""
+        book = cls()
+        book.apply_snapshot(order_book)
+        return book
+
+    def apply_snapshot(self, order_book: Dict[str, Any]):
+        """订单簿快照（subscribed/order_book）"""
+        self.bids.replace(order_book.get("bids", ()))
+        self.asks.replace(order_book.get("asks", ()))
+        self.version += 1
+
+    def apply_update(self, order_book: Dict[str, Any]):
+        """订单簿增量（update/order_book）"""
+        bids, asks = order_book.get("bids"), order_book.get("asks")
+        if bids:
+            self.bids.update(bids)
+        if asks:
+            self.asks.update(asks)
+        self.version += 1
+
+    def best_prices(self) -> Tuple[float, float]:
+        """(最优买价, 最优卖价)，一侧为空时为0"""
+        return self.bids.best_price, self.asks.best_price
+
+    def mid_price(self) -> float:
+        best_bid, best_ask = self.best_prices()
+        return (best_bid + best_ask) / 2 if best_bid > 0 and best_ask > 0 else 0.0
+
+    def taker_side(self, side: OrderSide) -> BookSide:
+        """吃单方向对应的对手盘（买单吃卖方、卖单吃买方）"""
+        return self.asks if side == OrderSide.BUY else self.bids
+
+    def walk(self, side: OrderSide, size: float, limit: Optional[float] = None) -> Tuple[float, float]:
+        """
+        市价/可成交限价单逐档吃单
+
+        Returns:
+            (可成交数量, 成交均价)
+        """
+        filled, average, _ = self.taker_side(side).sweep(np.array((size,)), limit)
+        return float(filled[0]), float(average[0])
+
+    def impact(self, side: OrderSide, sizes: Sequence[float],
+               limit: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """一组下单量的 (可成交数量, 成交均价, 最差成交价)，用于评估滑点与冲击成本"""
+        return self.taker_side(side).sweep(np.asarray(sizes, dtype=np.float64), limit)
+
+    def __getitem__(self, key: str) -> List[Dict[str, str]]:
+        if key == "bids":
+            return self.bids.levels()
+        if key == "asks":
+            return self.asks.levels()
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in ("bids", "asks")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def to_dict(self, depth: Optional[int] = None) -> Dict[str, List[Dict[str, str]]]:
+        return {"bids": self.bids.levels(depth), "asks": self.asks.levels(depth)}
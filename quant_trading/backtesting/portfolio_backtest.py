@@ -0,0 +1,163 @@
+"""
+多策略单次回放
+一个行情游标（BacktestDataFeed）按时间推进一次，同一步内依次驱动N个策略实例，每个策略有独立的模拟子账户
+（撮合、持仓、风控、交易记录与权益曲线），新K线对所有子账户撮合一次；
+结束时给出每个策略的回测结果与所有子账户合并后的组合结果。
+单个策略的结果与单独调用 run_backtest 完全相同，但比较N个策略变体只需遍历一次数据，
+耗时约为一次数据回放加上N份策略逻辑与撮合
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from ..utils.config import Config
+from .backtest_engine import BacktestEngine, run_step, to_ns
+from .backtest_result import BacktestResult
+
+
+@dataclass
+class PortfolioBacktestResult:
+    """多策略回测结果"""
+
+    # 各策略（子账户）的结果，顺序与传入的策略一致
+    results: List[BacktestResult]
+
+    # 所有子账户合并后的组合结果（初始资金为各子账户之和，交易记录带 strategy 字段）
+    combined: BacktestResult
+
+    def summary(self) -> pd.DataFrame:
+        """各策略与组合的主要指标（每行一个，最后一行为组合）"""
+        rows = [result.to_dict() for result in self.results + [self.combined]]
+        return pd.DataFrame(rows).drop(columns=["start_date", "end_date"])
+
+    def print_summary(self):
+        """打印各策略与组合的主要指标"""
+        print(f"\n=== 多策略回测结果 ({len(self.results)} 个策略) ===")
+        for result in self.results + [self.combined]:
+            print(f"{result.strategy_name}: 总收益率 {result.total_return:.2%}, 夏普比率 {result.sharpe_ratio:.2f}, "
+                  f"最大回撤 {result.max_drawdown:.2%}, 交易次数 {result.total_trades}")
+
+
+class PortfolioBacktestEngine(BacktestEngine):
+    """
+    多策略回测引擎
+
+    历史数据、市场信息与回测设置和 BacktestEngine 相同（load_historical_data / load_market_info）；
+    run_strategies 为每个策略创建一个共用本引擎行情与时钟的子引擎（子账户），策略通过它下单与查询持仓。
+    MultiMarketStrategyWrapper 作为一个策略传入时，其所有市场实例共用同一个子账户
+    """
+
+    def __init__(self, config: Config, streaming_metrics: Optional[bool] = None):
+        super().__init__(config, streaming_metrics)
+        self.sleeves: List[BacktestEngine] = []
+
+    def cache_settings(self) -> Dict[str, Any]:
+        # 每个策略的结果与 BacktestEngine 单独回测相同，缓存键共用
+        settings = super().cache_settings()
+        settings["engine"] = f"{BacktestEngine.__module__}.{BacktestEngine.__qualname__}"
+        return settings
+
+    def _create_sleeve(self, initial_capital: float) -> BacktestEngine:
+        """创建子账户: 独立的撮合、持仓与风控，行情与时钟共用本引擎"""
+        sleeve = BacktestEngine(self.config, self.streaming_metrics)
+        sleeve.initial_capital = initial_capital
+        sleeve.data_manager = self.data_manager
+        sleeve.clock = self.clock
+        for component in (sleeve.position_manager, sleeve.order_manager, sleeve.risk_manager):
+            component.set_clock(self.clock)
+        for market_id, fees in self.order_manager.fees.items():
+            sleeve.order_manager.set_fee_schedule(market_id, fees)
+        sleeve.order_manager.default_fees = self.order_manager.default_fees
+        sleeve.order_manager.slippage = self.order_manager.slippage
+        return sleeve
+
+    async def run_strategies(self, strategies: Sequence[Any], start_date: datetime, end_date: datetime,
+                             capital: Optional[Sequence[float]] = None) -> PortfolioBacktestResult:
+        """
+        单次回放运行多个策略
+
+        Args:
+            strategies: 策略实例列表（BaseStrategy 或 MultiMarketStrategyWrapper）
+            start_date: 开始日期
+            end_date: 结束日期
+            capital: 各子账户的初始资金，None则每个子账户都为 initial_capital（与单独回测一致）
+
+        Returns:
+            各策略与组合的回测结果
+        """
+        if capital is None:
+            capital = [self.initial_capital] * len(strategies)
+        if len(capital) != len(strategies):
+            raise ValueError(f"初始资金数量 {len(capital)} 与策略数量 {len(strategies)} 不一致")
+        self.logger.info(f"开始多策略回测: {len(strategies)} 个策略, {start_date} - {end_date}")
+
+        self.sleeves = sleeves = [self._create_sleeve(amount) for amount in capital]
+        for sleeve, strategy in zip(sleeves, strategies):
+            sleeve._begin_run(strategy, start_date, end_date)
+        self.start_time = start_date
+        self.end_time = end_date
+        self.current_time = start_date
+        total_capital = float(sum(capital))
+        self.current_capital = total_capital
+        self._reset_equity(total_capital, start_date, end_date)
+
+        try:
+            for sleeve, strategy in zip(sleeves, strategies):
+                await sleeve.risk_manager.initialize()
+                await strategy.initialize()
+
+            feed = self.data_manager
+            feed.reset()
+            time_ns = to_ns(start_date)
+            step_ns = to_ns(self.STEP)
+            end_ns = to_ns(end_date)
+            bar_handlers = [sleeve.order_manager.on_bar for sleeve in sleeves]
+
+            def on_bar(market_id: int, open_price: float, high: float, low: float, close: float):
+                for handler in bar_handlers:
+                    handler(market_id, open_price, high, low, close)
+
+            while time_ns < end_ns:
+                # 新K线只读取一次，对每个子账户的挂单撮合与盯市
+                market_data = feed.advance(time_ns, on_bar)
+
+                if market_data:
+                    for strategy in strategies:
+                        pending = run_step(strategy.process_market_data(market_data))
+                        if pending is not None:
+                            await pending
+
+                # 各子账户与组合的权益
+                total = 0.0
+                for sleeve in sleeves:
+                    sleeve._record_equity()
+                    total += sleeve.current_capital
+                self.current_capital = total
+                if self.metrics_stream is not None:
+                    self.metrics_stream.update(total)
+                else:
+                    self.equity_curve.append(total)
+
+                time_ns += step_ns
+                self.current_time += self.STEP
+                for sleeve in sleeves:
+                    sleeve.current_time = self.current_time
+                self.clock.set_time(self.current_time)
+
+            results = [await sleeve._finish_run(strategy) for sleeve, strategy in zip(sleeves, strategies)]
+            trades = sorted(
+                (dict(trade, strategy=result.strategy_name) for result in results for trade in result.trades),
+                key=lambda trade: trade["timestamp"]
+            )
+            self.trades = trades
+            combined = self._build_result("Portfolio", total_capital, self.current_capital, trades)
+            self.logger.info(f"多策略回测完成: 组合总收益 {combined.total_return:.2%}, "
+                             f"夏普比率 {combined.sharpe_ratio:.2f}")
+            return PortfolioBacktestResult(results=results, combined=combined)
+
+        except Exception as e:
+            self.logger.error(f"多策略回测运行错误: {e}")
+            raise
@@ -0,0 +1,334 @@
+"""
+逐笔订单簿回测
+把 MarketDataRecorder 录制的L2订单簿（快照 + 增量）从磁盘按数据块流式读出，合并进各市场的数组订单簿，
+按与实盘 DataManager 相同的方式生成tick与本地1分钟K线，再经与实盘引擎相同的回调
+（on_real_time_tick / on_bar_close / 按触发条件运行 on_tick）驱动策略。
+市价单在当时的订单簿上逐档吃单（含滑点容忍度），用于评估 use_real_time_ticks 模式与对滑点敏感的下单逻辑。
+内存只随市场数量与订单簿深度增长，与录制时长无关
+"""
+
+import hashlib
+import heapq
+import json
+import os
+from datetime import datetime
+from operator import itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ..core.market_recorder import MarketDataReader, RecordKind
+from ..strategies.base_strategy import BaseStrategy, StrategyTrigger
+from ..utils.bar_aggregator import BarAggregator
+from ..utils.config import Config
+from ..utils.ring_buffer import Candle, CandleBuffer, TickBuffer
+from .backtest_engine import BacktestEngine, run_step, to_ns
+from .backtest_result import BacktestResult
+from .order_book import ArrayOrderBook
+
+
+class TickDataFeed:
+    """
+    逐笔订单簿行情（同时作为策略看到的 data_manager）
+
+    多个录制来源（例如按市场分别录制的目录）按时间归并读取；
+    缓存结构与实盘 DataManager.market_data_cache 相同，order_book 为原地更新的 ArrayOrderBook
+    """
+
+    def __init__(self, candle_history_size: int = 1000, tick_history_size: int = 10000):
+        """
+        Args:
+            candle_history_size: 每个市场保留的K线数量
+            tick_history_size: 每个市场保留的tick数量
+        """
+        self.candle_history_size = candle_history_size
+        self.tick_history_size = tick_history_size
+        self.readers: List[MarketDataReader] = []
+        self.market_ids: Optional[Set[int]] = None
+        self.market_data_cache: Dict[int, Dict[str, Any]] = {}
+        self.books: Dict[int, ArrayOrderBook] = {}
+        self.bar_builders: Dict[int, BarAggregator] = {}
+        # 预热K线 {market_id: [(时间ns, K线字典)]}
+        self._history: Dict[int, List[Tuple[int, Dict[str, float]]]] = {}
+        self.messages = 0
+
+    def add_source(self, source: Union[str, MarketDataReader]):
+        """添加录制来源（目录、单个 .qtmd 文件或读取器）"""
+        self.readers.append(source if isinstance(source, MarketDataReader) else MarketDataReader(source))
+
+    def select_markets(self, market_ids: Optional[Iterable[int]]):
+        """只回放这些市场的订单簿，None表示全部"""
+        self.market_ids = set(market_ids) if market_ids is not None else None
+
+    def load(self, market_id: int, df: pd.DataFrame):
+        """载入历史K线，回测开始时间之前的部分作为策略的预热历史"""
+        times = df.index.values.astype("datetime64[ns]").view(np.int64).tolist()
+        self._history[market_id] = [
+            (time_ns, {"timestamp": time_ns // 1_000_000_000, "open": row[0], "high": row[1],
+                       "low": row[2], "close": row[3], "volume": row[4]})
+            for time_ns, row in zip(times, df[["open", "high", "low", "close", "volume"]].to_numpy().tolist())
+        ]
+
+    def time_range(self) -> Tuple[int, int]:
+        """所有录制来源覆盖的时间范围（ns）"""
+        ranges = [reader.time_range() for reader in self.readers]
+        ranges = [r for r in ranges if r != (0, 0)]
+        if not ranges:
+            return 0, 0
+        return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+    def fingerprint(self) -> Dict[str, Any]:
+        """录制内容指纹（文件名、大小与分块时间索引的哈希）与回放的市场，作为回测结果缓存键的一部分"""
+        files = []
+        for reader in self.readers:
+            for path in reader.files:
+                digest = hashlib.blake2b(repr(MarketDataReader.read_index(path)).encode(), digest_size=16)
+                files.append((os.path.basename(path), os.path.getsize(path), digest.hexdigest()))
+        return {"files": files, "markets": sorted(self.market_ids) if self.market_ids is not None else None}
+
+    def reset(self, start_ns: int):
+        """清空订单簿与缓存（保留市场信息），写入开始时间之前的预热K线"""
+        self.books.clear()
+        self.bar_builders.clear()
+        self.messages = 0
+        for market_id in set(self.market_data_cache) | set(self._history):
+            market_info = self.market_data_cache.get(market_id, {}).get("market_info")
+            cache = self.market_data_cache[market_id] = self._new_market_cache(market_info)
+            history = [candle for time_ns, candle in self._history.get(market_id, ()) if time_ns < start_ns]
+            if history:
+                cache["candlesticks"].merge(history)
+                cache["last_price"] = history[-1]["close"]
+
+    def _new_market_cache(self, market_info: Any = None) -> Dict[str, Any]:
+        return {
+            "market_info": market_info,
+            "candlesticks": CandleBuffer(self.candle_history_size),
+            "tick_history": TickBuffer(self.tick_history_size),
+            "order_book": None,
+            "trades": [],
+            "last_price": 0,
+            "last_tick": None
+        }
+
+    def stream(self, start_ns: Optional[int] = None,
+               end_ns: Optional[int] = None) -> Iterator[Tuple[int, int, ArrayOrderBook]]:
+        """
+        按录制顺序应用订单簿消息
+
+        Yields:
+            (时间ns, 市场ID, 更新后的订单簿)；同一市场每次产出的是同一个原地更新的订单簿对象
+        """
+        sources = [reader.read(start_ns, end_ns, (RecordKind.WS_MESSAGE,)) for reader in self.readers]
+        records = sources[0] if len(sources) == 1 else heapq.merge(*sources, key=itemgetter(1))
+        market_ids = self.market_ids
+        books = self.books
+        for _, time_ns, payload in records:
+            # 账户推送等其它消息不解析
+            if b"order_book" not in payload:
+                continue
+            message = json.loads(payload)
+            message_type = message.get("type")
+            if message_type not in ("subscribed/order_book", "update/order_book"):
+                continue
+            market_id = int(message["channel"].split(":")[1])
+            if market_ids is not None and market_id not in market_ids:
+                continue
+            book = books.get(market_id)
+            if message_type == "subscribed/order_book":
+                if book is None:
+                    book = books[market_id] = ArrayOrderBook()
+                book.apply_snapshot(message["order_book"])
+            elif book is None:
+                continue  # 开始时间之前的快照不在读取范围内时，等到下一个快照
+            else:
+                book.apply_update(message["order_book"])
+            self.messages += 1
+            yield time_ns, market_id, book
+
+    def on_book(self, market_id: int, book: ArrayOrderBook,
+                timestamp: float) -> Optional[Tuple[Dict[str, Any], List[Tuple[int, Candle]]]]:
+        """
+        订单簿更新后生成tick并合并进本地1分钟K线（与 DataManager._on_order_book_update 相同）
+
+        Returns:
+            (tick数据, 本次收盘的 (周期, K线) 列表)；买卖任一侧为空时为None
+        """
+        best_bid, best_ask = book.best_prices()
+        if best_bid <= 0 or best_ask <= 0:
+            return None
+        mid_price = (best_bid + best_ask) / 2
+        tick_data = {
+            "timestamp": timestamp,
+            "price": mid_price,
+            "bid": best_bid,
+            "ask": best_ask,
+            "bid_size": book.bids.best_size,
+            "ask_size": book.asks.best_size,
+            "spread": best_ask - best_bid,
+            "data_type": "order_book"
+        }
+
+        cache = self.market_data_cache.get(market_id)
+        if cache is None:
+            cache = self.market_data_cache[market_id] = self._new_market_cache()
+        cache["last_price"] = mid_price
+        cache["order_book"] = book
+        cache["last_tick"] = tick_data
+        cache["tick_history"].append(timestamp, mid_price, best_bid, best_ask,
+                                     tick_data["bid_size"], tick_data["ask_size"])
+
+        builder = self.bar_builders.get(market_id)
+        if builder is None:
+            builder = self.bar_builders[market_id] = BarAggregator([1], capacity=16)
+            candles = cache["candlesticks"]
+            if len(candles) and candles.last("timestamp") == timestamp - timestamp % 60:
+                builder.on_bar(candles[-1])
+        closed = builder.on_tick(mid_price, 0.0, timestamp)
+        current = builder.current_bar(1)
+        if current is not None:
+            cache["candlesticks"].merge((current,))
+        return tick_data, closed
+
+    def get_market_data(self, market_id: int) -> Optional[Dict[str, Any]]:
+        """获取指定市场的数据（与 DataManager.get_market_data 相同的接口）"""
+        return self.market_data_cache.get(market_id)
+
+
+class TickBacktestEngine(BacktestEngine):
+    """
+    逐笔订单簿回测引擎
+
+    每条订单簿消息: 推进模拟时钟 -> 挂单撮合与盯市 -> 生成tick与本地K线 ->
+    on_bar_close / on_real_time_tick（use_real_time_ticks时）-> 按策略触发条件运行 on_tick，
+    定时触发按 timer_interval 的行情时间计算。权益曲线仍按 STEP（1分钟）采样
+    """
+
+    def __init__(self, config: Config, streaming_metrics: Optional[bool] = None):
+        super().__init__(config, streaming_metrics)
+        self.data_manager = TickDataFeed(
+            config.data_sources.get("candle_history_size", 1000),
+            config.data_sources.get("tick_history_size", 10000)
+        )
+
+    def load_recording(self, source: Union[str, MarketDataReader], market_ids: Optional[Iterable[int]] = None):
+        """
+        添加订单簿录制
+
+        Args:
+            source: 录制目录、单个 .qtmd 文件或读取器
+            market_ids: 只回放这些市场，None表示全部
+        """
+        self.data_manager.add_source(source)
+        if market_ids is not None:
+            self.data_manager.select_markets(market_ids)
+        self.logger.info(f"添加订单簿录制: {getattr(source, 'files', source)}")
+
+    def cache_settings(self) -> Dict[str, Any]:
+        settings = super().cache_settings()
+        settings["recording"] = self.data_manager.fingerprint()
+        return settings
+
+    @staticmethod
+    def _strategy_markets(strategy: BaseStrategy) -> Optional[Set[int]]:
+        """策略关注的市场（与实盘引擎订阅事件总线时的取法相同），无法确定时为None（接收全部市场）"""
+        market_ids = {getattr(strategy, attr, None) for attr in ("market_id", "market_id_1", "market_id_2")}
+        for attr in ("market_ids", "active_markets"):
+            market_ids.update(getattr(strategy, attr, None) or [])
+        market_ids.discard(None)
+        return market_ids or None
+
+    async def run_backtest(self, strategy: BaseStrategy, start_date: Optional[datetime] = None,
+                           end_date: Optional[datetime] = None) -> BacktestResult:
+        """
+        运行逐笔回测
+
+        Args:
+            strategy: 策略实例
+            start_date: 开始时间（无时区UTC），None为录制开始
+            end_date: 结束时间（无时区UTC），None为录制结束
+
+        Returns:
+            回测结果
+        """
+        feed = self.data_manager
+        first_ns, last_ns = feed.time_range()
+        start_ns = to_ns(start_date) if start_date is not None else first_ns
+        end_ns = to_ns(end_date) if end_date is not None else last_ns
+        start_date = pd.Timestamp(start_ns).to_pydatetime()
+        end_date = pd.Timestamp(end_ns).to_pydatetime()
+        self._begin_run(strategy, start_date, end_date)
+        # 模拟时钟按录制时间（ns）推进，与tick时间戳一致
+        self.clock.reset(start_ns)
+
+        try:
+            await self.risk_manager.initialize()
+            await strategy.initialize()
+            feed.reset(start_ns)
+
+            order_manager = self.order_manager
+            clock = self.clock
+            cache = feed.market_data_cache
+            markets = self._strategy_markets(strategy)
+            step_ns = to_ns(self.STEP)
+            next_sample = start_ns + step_ns
+            timer_ns = int(strategy.timer_interval * 1e9)
+            next_timer = start_ns
+            ticks = 0
+
+            for time_ns, market_id, book in feed.stream(start_ns, end_ns):
+                # 权益按分钟采样（取本条消息之前的状态）
+                while time_ns >= next_sample:
+                    self._record_equity()
+                    next_sample += step_ns
+                    self.current_time += self.STEP
+                clock.set_time(time_ns)
+
+                # 挂单按新订单簿撮合，持仓按中间价盯市
+                order_manager.on_order_book(market_id, book)
+                update = feed.on_book(market_id, book, time_ns / 1e9)
+                if update is None:
+                    continue
+                ticks += 1
+                self.risk_manager.refresh_equity()
+                tick_data, closed = update
+
+                triggered = False
+                if markets is None or market_id in markets:
+                    for timeframe, candle in closed:
+                        strategy.on_bar_close(market_id, timeframe, candle)
+                    if strategy.use_real_time_ticks:
+                        await self._step(strategy.on_real_time_tick(market_id, tick_data))
+                    triggers = strategy.triggers
+                    triggered = (StrategyTrigger.TICK in triggers
+                                 or (closed and StrategyTrigger.BAR_CLOSE in triggers))
+
+                if time_ns >= next_timer and StrategyTrigger.TIMER in strategy.triggers:
+                    next_timer = time_ns + timer_ns
+                    if strategy.use_real_time_ticks:
+                        # 实时tick策略主要通过tick处理，定时器只做定期检查
+                        await self._step(strategy.on_periodic_update(cache))
+                    else:
+                        await self._step(strategy.on_tick(cache))
+                elif triggered:
+                    await self._step(strategy.on_tick(cache))
+
+            while next_sample <= end_ns:
+                self._record_equity()
+                next_sample += step_ns
+                self.current_time += self.STEP
+            self._record_equity()
+
+            self.logger.info(f"逐笔回放: {feed.messages} 条订单簿消息, {ticks} 个tick")
+            return await self._finish_run(strategy)
+
+        except Exception as e:
+            self.logger.error(f"逐笔回测运行错误: {e}")
+            raise
+
+    @staticmethod
+    async def _step(coro):
+        """同步快速路径执行策略回调，真正等待时才交给事件循环"""
+        pending = run_step(coro)
+        if pending is not None:
+            await pending
@@ -0,0 +1,5 @@
+"""
+性能基准模块
+各基准脚本可通过 python -m quant_trading.benchmarks.<模块名> 单独运行；
+python -m quant_trading.benchmarks.suite 运行覆盖全链路热点的基准套件，结果保存为JSON便于跨提交对比
+"""
@@ -0,0 +1,225 @@
+"""
+模拟交易所压测
+在子进程中启动本机模拟交易所，本进程用 DataManager 订阅全部市场的订单簿（WebSocket），
+同时用Lighter SDK的 TransactionApi 以设定速率并发下单（sendTx），报告：
+  - 行情: 实际收到的tick速率、从服务端生成到DataManager回调完成的延迟分位数
+  - 下单: 实际下单速率、sendTx往返延迟分位数、被拒绝/出错的数量
+
+交易签名依赖原生签名库（不随仓库分发），模拟交易所不校验签名，这里直接发送未签名的tx_info
+
+运行: python -m quant_trading.benchmarks.bench_exchange [--tick-rate 10000] [--order-rate 200] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+from typing import Any, Dict, List
+
+import aiohttp
+import lighter
+import numpy as np
+
+from ..core.data_manager import DataManager
+from ..simulator import ExchangeSimulator, SimulatorOptions
+from ..utils.config import Config
+from ..utils.logger import LogOptions, configure_logging
+
+
+ACCOUNT_INDEX = 1
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve(options: SimulatorOptions):
+    """子进程入口：运行模拟交易所"""
+    configure_logging(LogOptions(level="WARNING"))
+    asyncio.run(ExchangeSimulator(options).serve_forever())
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    values = np.asarray(samples)
+    return {"p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99)),
+            "max": float(values.max())}
+
+
+async def _wait_ready(base_url: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            try:
+                async with session.get(f"{base_url}/simulator/stats") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError("模拟交易所未能启动")
+            await asyncio.sleep(0.1)
+
+
+async def _load(base_url: str, market_ids: List[int], order_rate: float, duration: float,
+                concurrency: int) -> Dict[str, Any]:
+    """订阅行情并按速率下单，返回统计"""
+    configure_logging(LogOptions(level="WARNING"))
+    await _wait_ready(base_url)
+    config = Config.from_dict({
+        "lighter": {"base_url": base_url, "ws_url": base_url.replace("http://", "ws://") + "/stream",
+                    "account_index": ACCOUNT_INDEX},
+        "data_sources": {"extra_markets": market_ids, "bar_reconcile_interval": 3600},
+        "log": {"level": "WARNING"},
+    })
+    api_client = lighter.ApiClient(configuration=lighter.Configuration(host=base_url))
+    data_manager = DataManager(api_client, config, market_ids)
+
+    # 行情延迟: 服务端在消息中带生成时间，合并与DataManager回调完成后计时
+    tick_latencies: List[float] = []
+    await data_manager.initialize()
+    ws_client = data_manager.ws_client
+    handle_update = ws_client.handle_update_order_book
+
+    def timed_update(message):
+        handle_update(message)
+        tick_latencies.append((time.time_ns() - message["timestamp"]) / 1e3)
+
+    ws_client.handle_update_order_book = timed_update
+
+    tx_api = lighter.TransactionApi(api_client)
+    order_api = lighter.OrderApi(api_client)
+    markets = {m.market_id: m for m in (await order_api.order_books()).order_books}
+    nonce = (await lighter.TransactionApi(api_client).next_nonce(account_index=ACCOUNT_INDEX, api_key_index=0)).nonce
+    order_latencies: List[float] = []
+    results = {"accepted": 0, "rejected": 0, "errors": 0}
+    nonce_lock = asyncio.Lock()
+
+    async def send_order(i: int):
+        nonlocal nonce
+        market_id = market_ids[i % len(market_ids)]
+        market = markets[market_id]
+        price = data_manager.real_time_prices.get(market_id) or 1.0
+        is_ask = i % 2 == 1
+        # 远离盘口的限价单（挂单）与穿越盘口的IOC单交替，覆盖撮合与挂单两条路径
+        aggressive = i % 4 < 2
+        limit = price * (0.99 if is_ask else 1.01) if aggressive else price * (1.05 if is_ask else 0.95)
+        size = max(float(market.min_base_amount), float(market.min_quote_amount) / price) * 1.5
+        async with nonce_lock:
+            tx_nonce = nonce
+            nonce += 1
+        tx_info = json.dumps({
+            "AccountIndex": ACCOUNT_INDEX, "ApiKeyIndex": 0, "MarketIndex": market_id, "ClientOrderIndex": i,
+            "BaseAmount": int(size * 10 ** market.supported_size_decimals),
+            "Price": int(limit * 10 ** market.supported_price_decimals), "IsAsk": int(is_ask),
+            "Type": lighter.SignerClient.ORDER_TYPE_LIMIT,
+            "TimeInForce": (lighter.SignerClient.ORDER_TIME_IN_FORCE_IMMEDIATE_OR_CANCEL if aggressive
+                            else lighter.SignerClient.ORDER_TIME_IN_FORCE_GOOD_TILL_TIME),
+            "ReduceOnly": 0, "TriggerPrice": 0, "Nonce": tx_nonce,
+        })
+        started = time.perf_counter()
+        try:
+            response = await tx_api.send_tx(tx_type=lighter.SignerClient.TX_TYPE_CREATE_ORDER, tx_info=tx_info)
+            order_latencies.append((time.perf_counter() - started) * 1e6)
+            results["accepted" if response.code == 200 else "rejected"] += 1
+        except lighter.ApiException:
+            results["rejected"] += 1
+        except Exception:
+            results["errors"] += 1
+
+    # 预热：等待每个市场都收到行情
+    deadline = time.monotonic() + 5
+    while len(data_manager.real_time_prices) < len(market_ids) and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    tick_latencies.clear()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = set()
+
+    async def bounded(i: int):
+        async with semaphore:
+            await send_order(i)
+
+    started = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - started < duration:
+        due = int((time.perf_counter() - started) * order_rate) - sent
+        for _ in range(due):
+            task = asyncio.create_task(bounded(sent))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            sent += 1
+        await asyncio.sleep(0.001)
+    ticks_received = len(tick_latencies)
+    await asyncio.gather(*in_flight)
+    elapsed = time.perf_counter() - started
+
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/simulator/stats") as response:
+            server_stats = await response.json()
+    await data_manager.close()
+
+    return {
+        "ticks_per_sec": ticks_received / elapsed,
+        "tick_latency_us": _percentiles(tick_latencies),
+        "orders_per_sec": (results["accepted"] + results["rejected"]) / elapsed,
+        "order_latency_us": _percentiles(order_latencies),
+        **results,
+        "server": server_stats,
+    }
+
+
+def run(tick_rate: float = 10000, order_rate: float = 200, duration: float = 10.0, markets: int = 4,
+        concurrency: int = 32, latency_ms: float = 0.0, error_rate: float = 0.0) -> Dict[str, Any]:
+    """
+    运行压测
+
+    Returns:
+        行情与下单的吞吐、延迟分位数与服务端统计
+    """
+    port = _free_port()
+    market_ids = list(range(markets))
+    options = SimulatorOptions(port=port, market_ids=market_ids, tick_rate=tick_rate,
+                               latency_ms=latency_ms, error_rate=error_rate, seed=1)
+    server = multiprocessing.get_context("spawn").Process(target=_serve, args=(options,), daemon=True)
+    server.start()
+    try:
+        return asyncio.run(_load(f"http://127.0.0.1:{port}", market_ids, order_rate, duration, concurrency))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟交易所压测")
+    parser.add_argument("--tick-rate", type=float, default=10000, help="服务端每秒推送的订单簿更新数")
+    parser.add_argument("--order-rate", type=float, default=200, help="每秒下单数")
+    parser.add_argument("--duration", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--markets", type=int, default=4, help="市场数量")
+    parser.add_argument("--concurrency", type=int, default=32, help="最大并发下单请求数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="服务端注入的REST延迟（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="服务端注入的HTTP 500概率")
+    args = parser.parse_args()
+
+    result = run(args.tick_rate, args.order_rate, args.duration, args.markets, args.concurrency,
+                 args.latency_ms, args.error_rate)
+    tick, order = result["tick_latency_us"], result["order_latency_us"]
+    print(f"模拟交易所压测: {args.markets} 个市场, 目标 {args.tick_rate:g} tick/s, {args.order_rate:g} 单/s, "
+          f"{args.duration:g} 秒")
+    print(f"  行情: {result['ticks_per_sec']:.0f} tick/s, 延迟 p50 {tick['p50']:.0f} us, "
+          f"p99 {tick['p99']:.0f} us, 最大 {tick['max']:.0f} us")
+    print(f"  下单: {result['orders_per_sec']:.0f} 单/s, 往返 p50 {order['p50'] / 1000:.2f} ms, "
+          f"p99 {order['p99'] / 1000:.2f} ms, 接受 {result['accepted']}, 拒绝 {result['rejected']}, "
+          f"错误 {result['errors']}")
+    server = result["server"]
+    print(f"  服务端: {server['ticks']} tick, 成交 {server['fills']} 笔, 挂单 {server['resting_orders']} 个, "
+          f"注入错误 {server['injected_errors']} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+指标库基准
+对比向量化Indicators与原逐点循环实现的耗时，并校验两者结果一致
+
+运行: python -m quant_trading.benchmarks.bench_indicators [--bars 10000] [--repeat 5]
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from ..utils.indicators import Indicators
+
+
+# ==========================================
+# 原循环实现（向量化之前的DataUtils），仅作基准参照
+# ==========================================
+
+def legacy_sma(prices: List[float], period: int) -> List[float]:
+    if len(prices) < period:
+        return []
+    return [np.mean(prices[i - period + 1:i + 1]) for i in range(period - 1, len(prices))]
+
+
+def legacy_ema(prices: List[float], period: int) -> List[float]:
+    if len(prices) < period:
+        return []
+    alpha = 2.0 / (period + 1)
+    ema = [prices[0]]
+    for i in range(1, len(prices)):
+        ema.append(alpha * prices[i] + (1 - alpha) * ema[-1])
+    return ema
+
+
+def legacy_rsi(prices: List[float], period: int = 14) -> List[float]:
+    if len(prices) < period + 1:
+        return []
+    deltas = [prices[i] - prices[i - 1] for i in range(1, len(prices))]
+    gains = [d if d > 0 else 0 for d in deltas]
+    losses = [-d if d < 0 else 0 for d in deltas]
+    rsi = []
+    for i in range(period, len(prices)):
+        avg_gain = np.mean(gains[i - period:i])
+        avg_loss = np.mean(losses[i - period:i])
+        rsi.append(100 if avg_loss == 0 else 100 - (100 / (1 + avg_gain / avg_loss)))
+    return rsi
+
+
+def legacy_bollinger_upper(prices: List[float], period: int = 20, std_dev: float = 2.0) -> List[float]:
+    sma = legacy_sma(prices, period)
+    return [sma[i - period + 1] + std_dev * np.std(prices[i - period + 1:i + 1])
+            for i in range(period - 1, len(prices))]
+
+
+def legacy_atr(highs: List[float], lows: List[float], closes: List[float], period: int = 14) -> List[float]:
+    if len(highs) < period + 1:
+        return []
+    true_ranges = [max(highs[i] - lows[i], abs(highs[i] - closes[i - 1]), abs(lows[i] - closes[i - 1]))
+                   for i in range(1, len(highs))]
+    return [np.mean(true_ranges[i - period + 1:i + 1]) for i in range(period - 1, len(true_ranges))]
+
+
+def legacy_volatility(prices: List[float], period: int = 20) -> List[float]:
+    if len(prices) < period + 1:
+        return []
+    returns = [prices[i] / prices[i - 1] - 1 for i in range(1, len(prices))]
+    return [np.std(returns[i - period + 1:i + 1]) * np.sqrt(252) for i in range(period - 1, len(returns))]
+
+
+def generate_ohlc(bars: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    """生成随机游走OHLC数据"""
+    rng = np.random.default_rng(seed)
+    closes = 2000.0 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    spread = np.abs(rng.normal(0, 0.001, bars)) * closes
+    return {"high": closes + spread, "low": closes - spread, "close": closes}
+
+
+def _best_time(func: Callable, repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(bars: int = 10000, repeat: int = 5) -> List[Dict[str, float]]:
+    """
+    运行指标基准
+
+    Returns:
+        每个指标一条结果: 名称、原实现耗时、向量化耗时、加速比、最大误差
+    """
+    data = generate_ohlc(bars)
+    highs, lows, closes = data["high"], data["low"], data["close"]
+    h_list, l_list, c_list = highs.tolist(), lows.tolist(), closes.tolist()
+
+    cases = [
+        ("sma(20)", lambda: legacy_sma(c_list, 20), lambda: Indicators.sma(closes, 20)),
+        ("ema(20)", lambda: legacy_ema(c_list, 20), lambda: Indicators.ema(closes, 20)),
+        ("rsi(14)", lambda: legacy_rsi(c_list, 14), lambda: Indicators.rsi(closes, 14)),
+        ("bollinger(20)", lambda: legacy_bollinger_upper(c_list, 20),
+         lambda: Indicators.bollinger_bands(closes, 20)[0]),
+        ("atr(14)", lambda: legacy_atr(h_list, l_list, c_list, 14),
+         lambda: Indicators.atr(highs, lows, closes, 14)),
+        ("volatility(20)", lambda: legacy_volatility(c_list, 20), lambda: Indicators.volatility(closes, 20)),
+    ]
+
+    results = []
+    for name, legacy, vectorized in cases:
+        max_error = float(np.max(np.abs(np.asarray(legacy(), dtype=float) - vectorized())))
+        legacy_time = _best_time(legacy, repeat)
+        vectorized_time = _best_time(vectorized, repeat)
+        results.append({
+            "name": name,
+            "legacy_ms": legacy_time * 1000,
+            "vectorized_ms": vectorized_time * 1000,
+            "speedup": legacy_time / vectorized_time if vectorized_time > 0 else float("inf"),
+            "max_error": max_error
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="指标库基准")
+    parser.add_argument("--bars", type=int, default=10000, help="K线数量")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    print(f"指标基准: {args.bars} 根K线, 重复 {args.repeat} 次")
+    print(f"{'指标':<16}{'原实现(ms)':>12}{'向量化(ms)':>12}{'加速比':>10}{'最大误差':>12}")
+    for result in run(args.bars, args.repeat):
+        print(f"{result['name']:<16}{result['legacy_ms']:>12.3f}{result['vectorized_ms']:>12.3f}"
+              f"{result['speedup']:>9.1f}x{result['max_error']:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+UT Bot内核基准
+对比逐根K线的实盘写法（CandleBuffer追加 + 窗口ATR + 单步追踪止损）与 utils.kernels 一次计算整段序列的耗时，
+校验两者的追踪止损一致，并给出参数扫描的耗时。Numba未安装时内核以纯Python执行
+
+运行: python -m quant_trading.benchmarks.bench_kernels [--bars 100000] [--repeat 3]
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+from ..utils.kernels import NUMBA_AVAILABLE, trailing_stop_step, ut_bot, ut_bot_sweep
+from ..utils.ring_buffer import CandleBuffer
+
+
+def generate_ohlc(bars: int, seed: int = 9) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    closes = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    spread = np.abs(rng.normal(0, 0.001, bars)) * closes
+    return {"open": opens, "high": np.maximum(opens, closes) + spread,
+            "low": np.minimum(opens, closes) - spread, "close": closes}
+
+
+def per_bar_trailing_stop(data: Dict[str, np.ndarray], key_value: float, atr_period: int) -> np.ndarray:
+    """逐根K线计算追踪止损（与 UTBotStrategy 实盘路径相同的写法）"""
+    bars = len(data["close"])
+    candles = CandleBuffer(bars)
+    stops = np.full(bars, np.nan)
+    stop = 0.0
+    for i in range(bars):
+        candles.append(i * 60, data["open"][i], data["high"][i], data["low"][i], data["close"][i], 0.0)
+        if len(candles) < atr_period + 1:
+            continue
+        high = candles.column("high", atr_period + 1)
+        low = candles.column("low", atr_period + 1)
+        close = candles.column("close", atr_period + 1)
+        true_range = np.maximum(high[1:] - low[1:], np.maximum(np.abs(high[1:] - close[:-1]),
+                                                               np.abs(low[1:] - close[:-1])))
+        atr = float(np.mean(true_range))
+        stop = trailing_stop_step(stop, candles.last("close"), candles.last("close", offset=2), key_value * atr)
+        stops[i] = stop
+    return stops
+
+
+def _best_time(func: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(bars: int = 100000, repeat: int = 3, key_value: float = 3.0, atr_period: int = 10) -> Dict[str, Any]:
+    """
+    运行内核基准
+
+    Returns:
+        逐根/整段耗时（毫秒）、加速比、最大误差与参数扫描耗时
+    """
+    data = generate_ohlc(bars)
+    highs, lows, closes = data["high"], data["low"], data["close"]
+
+    # 首次调用触发Numba编译，不计入耗时
+    kernel_stops = ut_bot(highs, lows, closes, key_value=key_value, atr_period=atr_period).trailing_stop
+    reference = per_bar_trailing_stop(data, key_value, atr_period)
+    max_error = float(np.nanmax(np.abs(kernel_stops - reference)))
+
+    per_bar_time = _best_time(lambda: per_bar_trailing_stop(data, key_value, atr_period), 1)
+    kernel_time = _best_time(lambda: ut_bot(highs, lows, closes, key_value=key_value, atr_period=atr_period), repeat)
+
+    key_values = [1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0]
+    atr_periods = [1, 5, 10, 14, 20]
+    sweep_time = _best_time(lambda: ut_bot_sweep(highs, lows, closes, key_values, atr_periods), 1)
+
+    return {
+        "numba": NUMBA_AVAILABLE,
+        "bars": bars,
+        "per_bar_ms": per_bar_time * 1000,
+        "kernel_ms": kernel_time * 1000,
+        "speedup": per_bar_time / kernel_time,
+        "max_error": max_error,
+        "sweep_combinations": len(key_values) * len(atr_periods),
+        "sweep_ms": sweep_time * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UT Bot内核基准")
+    parser.add_argument("--bars", type=int, default=100000, help="K线数量")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    result = run(args.bars, args.repeat)
+    print(f"UT Bot内核基准: {result['bars']} 根K线, Numba {'已启用' if result['numba'] else '未安装（纯Python内核）'}")
+    print(f"  逐根计算: {result['per_bar_ms']:.1f} ms")
+    print(f"  整段内核: {result['kernel_ms']:.1f} ms (加速 {result['speedup']:.1f}x, 最大误差 {result['max_error']:.2e})")
+    print(f"  参数扫描: {result['sweep_combinations']} 组参数 {result['sweep_ms']:.1f} ms "
+          f"(每组 {result['sweep_ms'] / result['sweep_combinations']:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+多策略单次回放基准
+同一段多市场1分钟K线上回测N个策略变体（均值回归阈值/动量周期网格），对比逐个调用 run_backtest
+与 PortfolioBacktestEngine.run_strategies 一次回放的耗时，并核对两种方式各策略的最终资金与交易次数一致
+
+运行: python -m quant_trading.benchmarks.bench_portfolio_backtest [--strategies 50] [--days 2] [--markets 2]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import numpy as np
+
+from ..backtesting import BacktestEngine, PortfolioBacktestEngine
+from ..strategies import MeanReversionStrategy, MomentumStrategy
+from ..utils.config import Config
+
+
+START = datetime(2024, 1, 1)
+
+
+def _load(engine: BacktestEngine, markets: int, minutes: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    for market_id in range(markets):
+        closes = 100.0 * (1 + market_id) * np.exp(np.cumsum(rng.normal(0, 0.002, minutes)))
+        spread = np.abs(rng.normal(0, 0.001, minutes)) * closes
+        opens = np.concatenate(([closes[0]], closes[:-1]))
+        engine.load_historical_data(market_id, [{
+            "timestamp": int((START + timedelta(minutes=i)).timestamp()),
+            "open": opens[i], "high": max(opens[i], closes[i]) + spread[i],
+            "low": min(opens[i], closes[i]) - spread[i], "close": closes[i], "volume": 1.0,
+        } for i in range(minutes)])
+        engine.load_market_info(market_id, {"taker_fee": "0.0200", "maker_fee": "0.0000"})
+
+
+def make_strategies(config: Config, count: int, markets: int) -> List[Any]:
+    """count 个策略变体: 均值回归按阈值、动量按短周期展开，轮流分配到各市场"""
+    strategies = []
+    for i in range(count):
+        market_id = i % markets
+        if i % 2 == 0:
+            strategies.append(MeanReversionStrategy(config=config, market_id=market_id,
+                                                    threshold=1.0 + 0.05 * (i // 2)))
+        else:
+            strategies.append(MomentumStrategy(config=config, market_id=market_id, short_period=3 + (i // 2) % 10,
+                                               momentum_threshold=0.001 * (1 + (i // 20))))
+    return strategies
+
+
+async def _compare(count: int, days: float, markets: int) -> Dict[str, Any]:
+    config = Config.from_dict({"log": {"level": "ERROR"}})
+    minutes = int((days + 1) * 1440)
+    # 第一天作为预热历史
+    start, end = START + timedelta(days=1), START + timedelta(days=1 + days)
+
+    engine = BacktestEngine(config)
+    _load(engine, markets, minutes)
+    started = time.perf_counter()
+    separate = [await engine.run_backtest(strategy, start, end) for strategy in make_strategies(config, count, markets)]
+    separate_time = time.perf_counter() - started
+
+    portfolio = PortfolioBacktestEngine(config)
+    _load(portfolio, markets, minutes)
+    started = time.perf_counter()
+    shared = await portfolio.run_strategies(make_strategies(config, count, markets), start, end)
+    shared_time = time.perf_counter() - started
+
+    mismatches = sum(1 for a, b in zip(separate, shared.results)
+                     if a.final_capital != b.final_capital or a.total_trades != b.total_trades)
+    return {
+        "strategies": count,
+        "bars": int(days * 1440) * markets,
+        "separate_s": separate_time,
+        "shared_s": shared_time,
+        "speedup": separate_time / shared_time if shared_time > 0 else float("inf"),
+        "mismatches": mismatches,
+        "combined_return": shared.combined.total_return,
+        "combined_trades": shared.combined.total_trades,
+    }
+
+
+def run(strategies: int = 50, days: float = 2.0, markets: int = 2) -> Dict[str, Any]:
+    """
+    运行多策略回放基准
+
+    Returns:
+        逐个回测与单次回放的耗时、加速比与结果核对
+    """
+    return asyncio.run(_compare(strategies, days, markets))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多策略单次回放基准")
+    parser.add_argument("--strategies", type=int, default=50, help="策略变体数量")
+    parser.add_argument("--days", type=float, default=2.0, help="回测天数（另加1天预热）")
+    parser.add_argument("--markets", type=int, default=2, help="市场数量")
+    args = parser.parse_args()
+
+    result = run(args.strategies, args.days, args.markets)
+    print(f"多策略单次回放基准: {result['strategies']} 个策略, {args.markets} 个市场 {args.days:g} 天 "
+          f"({result['bars']} 根K线)")
+    print(f"  逐个 run_backtest: {result['separate_s']:.2f} s")
+    print(f"  run_strategies:   {result['shared_s']:.2f} s (加速 {result['speedup']:.2f}x)")
+    print(f"  结果核对: {result['strategies'] - result['mismatches']}/{result['strategies']} 个策略一致, "
+          f"组合收益 {result['combined_return']:.4%}, 交易 {result['combined_trades']} 笔")
+
+
+if __name__ == "__main__":
+    main()
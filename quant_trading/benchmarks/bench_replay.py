@@ -0,0 +1,146 @@
+"""
+行情回放基准
+合成一段多市场订单簿/账户推送录制（或使用已有录制目录），以最快速度经 WsClient -> DataManager
+回放两遍，报告录制压缩率、回放吞吐，并检查两遍回放的最终状态是否一致（确定性）
+
+运行: python -m quant_trading.benchmarks.bench_replay [--markets 20] [--messages 200000] [--log-dir data/market_log]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..core.data_manager import DataManager
+from ..core.market_recorder import MarketDataReader, MarketDataRecorder, MarketDataReplayer
+from ..utils.clock import SimulatedClock
+from ..utils.config import Config
+
+
+def _synthesize(directory: str, markets: int, messages: int, levels: int = 10) -> Dict[str, Any]:
+    """写入合成录制：每个市场一个订单簿快照，之后是随机游走的增量更新与少量账户推送"""
+    recorder = MarketDataRecorder(directory, prefix="synthetic")
+    rng = np.random.default_rng(3)
+    timestamp_ns = time.time_ns()
+    prices = 100.0 * (1 + np.arange(markets))
+    recorder.record_ws_message({"type": "connected"}, timestamp_ns)
+    for market_id in range(markets):
+        mid = prices[market_id]
+        recorder.record_ws_message({
+            "type": "subscribed/order_book",
+            "channel": f"order_book:{market_id}",
+            "order_book": {
+                "asks": [{"price": f"{mid + 0.01 * (i + 1):.2f}", "size": "1.0"} for i in range(levels)],
+                "bids": [{"price": f"{mid - 0.01 * (i + 1):.2f}", "size": "1.0"} for i in range(levels)],
+            },
+        }, timestamp_ns)
+        recorder.record_candles(market_id, [{
+            "timestamp": timestamp_ns // 1_000_000_000 - 60, "open": mid, "high": mid, "low": mid,
+            "close": mid, "volume": 0.0,
+        }], "reconcile", timestamp_ns)
+
+    steps = rng.normal(0, 0.0005, messages)
+    sizes = rng.uniform(0.1, 2, messages)
+    last_levels: Dict[int, Any] = {}
+    for i in range(messages):
+        timestamp_ns += 100_000  # 每条消息间隔0.1ms
+        market_id = i % markets
+        if i % 1000 == 999:
+            recorder.record_ws_message({
+                "type": "update/account_all", "channel": "account_all:0",
+                "account": 0, "positions": {}, "trades": {},
+            }, timestamp_ns)
+            continue
+        prices[market_id] *= 1 + steps[i]
+        mid = prices[market_id]
+        size = f"{sizes[i]:.4f}"
+        ask, bid = f"{mid + 0.01:.2f}", f"{mid - 0.01:.2f}"
+        # 价格移动时撤掉上一档（size为0），订单簿深度保持有界
+        previous_ask, previous_bid = last_levels.get(market_id, (ask, bid))
+        asks = [{"price": ask, "size": size}]
+        bids = [{"price": bid, "size": size}]
+        if previous_ask != ask:
+            asks.insert(0, {"price": previous_ask, "size": "0"})
+        if previous_bid != bid:
+            bids.insert(0, {"price": previous_bid, "size": "0"})
+        last_levels[market_id] = (ask, bid)
+        recorder.record_ws_message({
+            "type": "update/order_book",
+            "channel": f"order_book:{market_id}",
+            "order_book": {"asks": asks, "bids": bids},
+        }, timestamp_ns)
+    recorder.close()
+    return recorder.get_stats()
+
+
+async def _replay_once(path: str) -> Dict[str, Any]:
+    """回放一遍录制，返回回放统计与最终状态"""
+    config = Config.from_dict({"log": {"level": "WARNING"}})
+    data_manager = DataManager(None, config)
+    # tick时间戳与本地K线按录制时间计算，两遍回放的K线也应完全一致
+    clock = SimulatedClock()
+    data_manager.set_clock(clock)
+    reader = MarketDataReader(path)
+    # 订阅列表只影响真实连接；回放按录制内容驱动
+    ws_client = data_manager.attach_replay_client([0])
+    replayer = MarketDataReplayer(reader, speed=0.0, clock=clock)
+    stats = await replayer.run(ws_client, data_manager)
+    stats["final_state"] = {
+        market_id: (cache["last_price"], len(cache["tick_history"]), len(cache["candlesticks"]))
+        for market_id, cache in sorted(data_manager.market_data_cache.items())
+    }
+    return stats
+
+
+def run(markets: int = 20, messages: int = 200000, log_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    运行回放基准
+
+    Returns:
+        录制统计、两遍回放的吞吐与确定性检查结果
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = log_dir or tmp
+        record_stats = _synthesize(tmp, markets, messages) if log_dir is None else None
+        first = asyncio.run(_replay_once(path))
+        second = asyncio.run(_replay_once(path))
+
+    result = {
+        "messages": first["messages"],
+        "candle_snapshots": first["candle_snapshots"],
+        "errors": first["errors"] + second["errors"],
+        "messages_per_sec": max(first["messages_per_sec"], second["messages_per_sec"]),
+        "deterministic": first["final_state"] == second["final_state"],
+        "markets": len(first["final_state"]),
+    }
+    if record_stats is not None:
+        result["bytes_raw"] = record_stats["bytes_raw"]
+        result["bytes_written"] = record_stats["bytes_written"]
+        result["compression_ratio"] = record_stats["bytes_raw"] / max(record_stats["bytes_written"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情回放基准")
+    parser.add_argument("--markets", type=int, default=20, help="合成录制的市场数量")
+    parser.add_argument("--messages", type=int, default=200000, help="合成录制的消息数量")
+    parser.add_argument("--log-dir", default=None, help="使用已有的录制目录（不再合成）")
+    args = parser.parse_args()
+
+    result = run(args.markets, args.messages, args.log_dir)
+    source = args.log_dir or f"合成 {args.markets} 个市场 {args.messages} 条消息"
+    print(f"行情回放基准: {source}")
+    if "compression_ratio" in result:
+        print(f"  录制: 原始 {result['bytes_raw'] / 1e6:.1f} MB -> 写入 {result['bytes_written'] / 1e6:.1f} MB "
+              f"(压缩比 {result['compression_ratio']:.1f}x)")
+    print(f"  回放: {result['messages']} 条消息, {result['candle_snapshots']} 个K线快照, "
+          f"{result['messages_per_sec']:.0f} 条/秒, 错误 {result['errors']} 条")
+    print(f"  确定性: {'两遍回放最终状态一致' if result['deterministic'] else '两遍回放最终状态不一致'} "
+          f"({result['markets']} 个市场)")
+
+
+if __name__ == "__main__":
+    main()
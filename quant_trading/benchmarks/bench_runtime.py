@@ -0,0 +1,135 @@
+"""
+运行时延迟基准
+在合成tick流上对比默认运行时与调优运行时（uvloop、GC阈值、冻结启动对象）的端到端延迟：
+tick -> TickBuffer -> BarAggregator -> EventBus -> 策略处理，延迟从tick生成计到处理完成。
+每种配置在独立的子进程中运行，互不影响GC与事件循环状态
+
+运行: python -m quant_trading.benchmarks.bench_runtime [--markets 50] [--ticks 200000] [--burst 100]
+"""
+
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict
+
+import numpy as np
+
+from ..core.event_bus import EventBus, EventType
+from ..utils.bar_aggregator import BarAggregator
+from ..utils.ring_buffer import TickBuffer
+from ..utils.runtime import Runtime, RuntimeOptions, UVLOOP_AVAILABLE
+
+
+CASES = {
+    "default": RuntimeOptions(),
+    "tuned": RuntimeOptions(use_uvloop=True, gc_thresholds=(50000, 20, 100), gc_freeze=True),
+}
+
+
+async def _tick_stream(markets: int, ticks: int, burst: int, heap_objects: int,
+                       options: RuntimeOptions) -> Dict[str, Any]:
+    """在当前事件循环上回放合成tick流，返回延迟统计"""
+    # 启动阶段的长期对象（模拟引擎、策略与历史数据），冻结后不再参与GC扫描
+    startup_heap = [{"market_id": i % markets, "values": [float(i)] * 4} for i in range(heap_objects)]
+    buffers = {market_id: TickBuffer(1000) for market_id in range(markets)}
+    aggregators = {market_id: BarAggregator((1, 5, 15)) for market_id in range(markets)}
+    bus = EventBus(mailbox_capacity=1024)
+    Runtime.freeze_startup_objects(options)
+
+    latencies = np.empty(ticks)
+    processed = 0
+
+    async def handle(event):
+        nonlocal processed
+        tick = event.payload
+        latencies[processed] = time.perf_counter() - tick["created"]
+        processed += 1
+
+    bus.subscribe("strategy", handle, (EventType.TICK,))
+    await bus.start()
+
+    rng = np.random.default_rng(11)
+    prices = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.0005, ticks)))
+    gc_before = sum(stat["collections"] for stat in gc.get_stats())
+    now = time.time()
+
+    started = time.perf_counter()
+    for i in range(ticks):
+        market_id = i % markets
+        price = float(prices[i])
+        # 与DataManager的订单簿回调相同的形态：解析出的订单簿字典 + tick字典
+        order_book = {"bids": [[price - 0.01, 1.0]], "asks": [[price + 0.01, 1.0]]}
+        tick = {"price": price, "bid": order_book["bids"][0][0], "ask": order_book["asks"][0][0],
+                "created": time.perf_counter()}
+        buffers[market_id].append(now + i * 0.01, price, tick["bid"], tick["ask"], 1.0, 1.0)
+        aggregators[market_id].on_tick(price, 0.0, now + i * 0.01)
+        # 每个tick单独发布（不同市场），保证每条都被处理而不是被合并
+        bus.publish(EventType.TICK, i, tick)
+        if (i + 1) % burst == 0:
+            await asyncio.sleep(0)
+    while processed < ticks:
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    await bus.stop()
+    gc_collections = sum(stat["collections"] for stat in gc.get_stats()) - gc_before
+    del startup_heap
+
+    latencies_us = latencies[:processed] * 1e6
+    return {
+        "event_loop": type(asyncio.get_running_loop()).__module__.split(".")[0],
+        "ticks_per_sec": processed / elapsed,
+        "p50_us": float(np.percentile(latencies_us, 50)),
+        "p99_us": float(np.percentile(latencies_us, 99)),
+        "p999_us": float(np.percentile(latencies_us, 99.9)),
+        "max_us": float(latencies_us.max()),
+        "gc_collections": gc_collections,
+    }
+
+
+def _run_case(name: str, markets: int, ticks: int, burst: int, heap_objects: int) -> Dict[str, Any]:
+    """子进程入口：按配置引导运行时并运行tick流"""
+    options = CASES[name]
+    return Runtime.run(_tick_stream(markets, ticks, burst, heap_objects, options), options=options)
+
+
+def run(markets: int = 50, ticks: int = 200000, burst: int = 100,
+        heap_objects: int = 200000) -> Dict[str, Dict[str, Any]]:
+    """
+    运行运行时延迟基准
+
+    Returns:
+        {配置名: 延迟统计}
+    """
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in CASES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[name] = executor.submit(_run_case, name, markets, ticks, burst, heap_objects).result()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="运行时延迟基准")
+    parser.add_argument("--markets", type=int, default=50, help="市场数量")
+    parser.add_argument("--ticks", type=int, default=200000, help="tick总数")
+    parser.add_argument("--burst", type=int, default=100, help="每批连续发布的tick数（批之间让出事件循环）")
+    parser.add_argument("--heap-objects", type=int, default=200000, help="启动阶段创建的长期对象数量")
+    args = parser.parse_args()
+
+    results = run(args.markets, args.ticks, args.burst, args.heap_objects)
+    print(f"运行时延迟基准: {args.markets} 个市场, {args.ticks} 个tick, 每批 {args.burst} 个")
+    if not UVLOOP_AVAILABLE:
+        print("  注意: 未安装uvloop，调优配置只包含GC调整")
+    for name, result in results.items():
+        print(f"  {name:8s} ({result['event_loop']}): "
+              f"p50 {result['p50_us']:.1f} us, p99 {result['p99_us']:.1f} us, "
+              f"p99.9 {result['p999_us']:.1f} us, 最大 {result['max_us']:.1f} us, "
+              f"{result['ticks_per_sec']:.0f} tick/s, GC {result['gc_collections']} 次")
+
+
+if __name__ == "__main__":
+    main()
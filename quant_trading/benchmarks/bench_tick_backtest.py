@@ -0,0 +1,214 @@
+"""
+逐笔订单簿回测基准
+合成一段多市场全深度订单簿录制（或使用已有录制目录），用 TickBacktestEngine 驱动实时tick模式的UT Bot策略回放，
+报告回放吞吐、成交与手续费、进程峰值内存（流式读取，不随录制时长增长），
+并对比在同一订单簿上逐档循环吃单与累计数量 searchsorted 一次算出一批下单量成交均价的耗时
+
+运行: python -m quant_trading.benchmarks.bench_tick_backtest [--markets 4] [--hours 2] [--depth 200] [--log-dir data/market_log]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..backtesting import ArrayOrderBook, TickBacktestEngine
+from ..core.market_recorder import MarketDataRecorder
+from ..core.order_manager import OrderSide
+from ..strategies.ut_bot_strategy import UTBotConfig, UTBotStrategy
+from ..utils.config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+TICK_SIZE = 0.01
+
+
+def _levels(prices: np.ndarray, sizes: np.ndarray) -> List[Dict[str, str]]:
+    return [{"price": f"{price:.2f}", "size": f"{size:.3f}"} for price, size in zip(prices.tolist(), sizes.tolist())]
+
+
+def synthesize(directory: str, markets: int, hours: float, depth: int = 200,
+               updates_per_second: float = 4.0, seed: int = 11) -> Dict[str, Any]:
+    """
+    写入合成的全深度订单簿录制
+
+    每个市场先写一个 depth 档的快照，之后按 updates_per_second 写增量：
+    中间价按整数个最小变动单位随机游走（被越过的档位删除、新的最优档位补入），并随机修改若干档的数量；
+    每10分钟重新写一次全深度快照
+    """
+    recorder = MarketDataRecorder(directory, prefix="l2")
+    rng = np.random.default_rng(seed)
+    timestamp_ns = 1_700_000_000 * 1_000_000_000
+    # 最优买价（以最小变动单位计），卖价 = 买价 + 1
+    best_bid = (10000 * (1 + np.arange(markets))).astype(np.int64)
+    offsets = np.arange(depth)
+
+    def snapshot(market_id: int):
+        bid = best_bid[market_id]
+        recorder.record_ws_message({
+            "type": "subscribed/order_book",
+            "channel": f"order_book:{market_id}",
+            "order_book": {
+                "asks": _levels((bid + 1 + offsets) * TICK_SIZE, rng.uniform(0.1, 5, depth)),
+                "bids": _levels((bid - offsets) * TICK_SIZE, rng.uniform(0.1, 5, depth)),
+            },
+        }, timestamp_ns)
+
+    for market_id in range(markets):
+        snapshot(market_id)
+
+    count = int(hours * 3600 * updates_per_second * markets)
+    interval_ns = int(1e9 / (updates_per_second * markets))
+    snapshot_every = int(600 * updates_per_second * markets)
+    moves = rng.choice([-2, -1, 0, 0, 0, 0, 1, 2], count)
+    for i in range(count):
+        timestamp_ns += interval_ns
+        market_id = i % markets
+        if i and i % snapshot_every == 0:
+            snapshot(market_id)
+            continue
+        old, move = best_bid[market_id], int(moves[i])
+        new = old + move
+        best_bid[market_id] = new
+        asks, bids = [], []
+        if move > 0:
+            # 上涨: 原卖一到新买一之间的卖档被吃掉，补入新的买档
+            asks += _levels((old + 1 + np.arange(move)) * TICK_SIZE, np.zeros(move))
+            bids += _levels((old + 1 + np.arange(move)) * TICK_SIZE, rng.uniform(0.1, 5, move))
+        elif move < 0:
+            bids += _levels((new + 1 + np.arange(-move)) * TICK_SIZE, np.zeros(-move))
+            asks += _levels((new + 1 + np.arange(-move)) * TICK_SIZE, rng.uniform(0.1, 5, -move))
+        changed = rng.integers(0, depth, 3)
+        asks += _levels((new + 1 + changed) * TICK_SIZE, rng.uniform(0.1, 5, 3))
+        bids += _levels((new - changed) * TICK_SIZE, rng.uniform(0.1, 5, 3))
+        recorder.record_ws_message({
+            "type": "update/order_book",
+            "channel": f"order_book:{market_id}",
+            "order_book": {"asks": asks, "bids": bids},
+        }, timestamp_ns)
+    recorder.close()
+    return recorder.get_stats()
+
+
+def _max_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def _run_backtest(path: str, markets: int) -> Dict[str, Any]:
+    config = Config.from_dict({"log": {"level": "WARNING"}, "risk": {"max_daily_loss": 1.0}})
+    engine = TickBacktestEngine(config)
+    engine.load_recording(path)
+    for market_id in range(markets):
+        engine.load_market_info(market_id, {"taker_fee": "0.0200", "maker_fee": "0.0000"})
+    strategy = UTBotStrategy("UTBotTick", config, UTBotConfig(
+        market_ids=list(range(markets)), atr_period=10, ema_length=50, position_size_usd=500.0
+    ))
+    started = time.perf_counter()
+    result = await engine.run_backtest(strategy)
+    elapsed = time.perf_counter() - started
+    messages = engine.data_manager.messages
+    return {
+        "messages": messages,
+        "elapsed": elapsed,
+        "messages_per_sec": messages / elapsed if elapsed > 0 else 0.0,
+        "fills": len(engine.order_manager.fills),
+        "fees": engine.order_manager.total_fees,
+        "final_capital": result.final_capital,
+        "equity_points": len(result.equity_curve),
+    }
+
+
+def _loop_walk(book: ArrayOrderBook, size: float) -> float:
+    """逐档循环吃单的成交均价（对照实现）"""
+    side = book.asks
+    remaining, notional = size, 0.0
+    for key, available in zip(side.keys, side.sizes):
+        take = min(remaining, available)
+        notional += take * key * side.sign
+        remaining -= take
+        if remaining <= 0:
+            break
+    filled = size - remaining
+    return notional / filled if filled > 0 else 0.0
+
+
+def compare_walk(depth: int, orders: int = 1000, seed: int = 5) -> Dict[str, Any]:
+    """同一订单簿上一批下单量: 逐档循环 vs 累计数量 searchsorted"""
+    rng = np.random.default_rng(seed)
+    prices = 100.0 + TICK_SIZE * np.arange(1, depth + 1)
+    book = ArrayOrderBook.from_dict({
+        "asks": _levels(prices, rng.uniform(0.1, 5, depth)),
+        "bids": _levels(100.0 - TICK_SIZE * np.arange(depth), rng.uniform(0.1, 5, depth)),
+    })
+    sizes = rng.uniform(0.1, 2.5 * depth, orders)
+
+    started = time.perf_counter()
+    looped = np.array([_loop_walk(book, size) for size in sizes.tolist()])
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _, vectorized, _ = book.impact(OrderSide.BUY, sizes)
+    vector_time = time.perf_counter() - started
+    return {
+        "depth": depth,
+        "orders": orders,
+        "loop_ms": loop_time * 1000,
+        "vectorized_ms": vector_time * 1000,
+        "speedup": loop_time / vector_time if vector_time > 0 else float("inf"),
+        "max_error": float(np.max(np.abs(looped - vectorized))),
+    }
+
+
+def run(markets: int = 4, hours: float = 2.0, depth: int = 200, log_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    运行逐笔回测基准
+
+    Returns:
+        录制统计、回放吞吐、成交、峰值内存与吃单计算对比
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = log_dir or tmp
+        record_stats = synthesize(tmp, markets, hours, depth) if log_dir is None else None
+        rss_before = _max_rss_mb()
+        result = asyncio.run(_run_backtest(path, markets))
+        result["peak_rss_mb"] = _max_rss_mb()
+        result["rss_growth_mb"] = result["peak_rss_mb"] - rss_before
+    if record_stats is not None:
+        result["bytes_raw"] = record_stats["bytes_raw"]
+        result["bytes_written"] = record_stats["bytes_written"]
+    result["walk"] = compare_walk(depth)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="逐笔订单簿回测基准")
+    parser.add_argument("--markets", type=int, default=4, help="合成录制的市场数量")
+    parser.add_argument("--hours", type=float, default=2.0, help="合成录制的时长（小时）")
+    parser.add_argument("--depth", type=int, default=200, help="合成订单簿每侧档位数")
+    parser.add_argument("--log-dir", default=None, help="使用已有的录制目录（不再合成，--markets 为其中的市场数）")
+    args = parser.parse_args()
+
+    result = run(args.markets, args.hours, args.depth, args.log_dir)
+    source = args.log_dir or f"合成 {args.markets} 个市场 {args.hours:g} 小时, 每侧 {args.depth} 档"
+    print(f"逐笔订单簿回测基准: {source}")
+    if "bytes_raw" in result:
+        print(f"  录制: 原始 {result['bytes_raw'] / 1e6:.1f} MB -> 写入 {result['bytes_written'] / 1e6:.1f} MB")
+    print(f"  回放: {result['messages']} 条订单簿消息 {result['elapsed']:.2f} s ({result['messages_per_sec']:.0f} 条/秒), "
+          f"成交 {result['fills']} 笔, 手续费 {result['fees']:.2f}, 权益点 {result['equity_points']}")
+    print(f"  内存: 峰值 {result['peak_rss_mb']:.0f} MB (回放期间增长 {result['rss_growth_mb']:.0f} MB)")
+    walk = result["walk"]
+    print(f"  吃单: {walk['orders']} 笔 x {walk['depth']} 档, 逐档循环 {walk['loop_ms']:.1f} ms, "
+          f"searchsorted {walk['vectorized_ms']:.2f} ms (加速 {walk['speedup']:.0f}x, 最大误差 {walk['max_error']:.1e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+"""
+端到端性能基准套件
+覆盖交易链路上的热点路径：WsClient订单簿合并、DataManager订单簿回调、DataUtils指标、策略信号计算、
+ApiClient大响应反序列化、签名调用、BacktestEngine按模拟日回测、WebSocketManager广播。
+
+计时方式与asv相同：每个用例先校准单轮调用次数（单轮耗时不少于 --min-time），再重复多轮，
+记录单次调用耗时的最小值/中位数/均值/标准差。结果保存为JSON（含git提交与环境信息），
+可用 --compare 与历史结果对比，超过阈值的变化标记为回归或提升。
+依赖缺失（如原生签名库、matplotlib）的用例记为跳过并写明原因，不影响其余用例。
+
+运行: python -m quant_trading.benchmarks.suite [--filter update_orders] [--output data/benchmarks/run.json]
+                                              [--compare data/benchmarks/baseline.json] [--threshold 0.2]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import inspect
+import json
+import os
+import platform
+import re
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..utils.logger import LogOptions, configure_logging
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_OUTPUT_DIR = "data/benchmarks"
+
+
+class BenchmarkSkipped(Exception):
+    """用例在当前环境无法运行（依赖缺失等），由setup抛出"""
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    一个基准用例：setup 准备数据并返回被计时的函数（同步函数或协程函数，无参数），
+    需要释放资源时返回 (被计时的函数, 清理函数)
+    """
+    name: str
+    group: str
+    setup: Callable[[], Callable[[], Any]]
+    params: Dict[str, Any] = field(default_factory=dict)
+    description: str = ""
+
+
+CASES: List[BenchmarkCase] = []
+
+
+def register(name: str, group: str, description: str = "", **params):
+    """注册基准用例的装饰器，params 会传给 setup 并写入结果"""
+    def decorator(setup: Callable[..., Callable[[], Any]]):
+        CASES.append(BenchmarkCase(name=name, group=group, setup=lambda: setup(**params),
+                                   params=params, description=description))
+        return setup
+    return decorator
+
+
+def _random_walk(bars: int, seed: int = 42, start: float = 2000.0) -> Dict[str, np.ndarray]:
+    """生成随机游走OHLCV数据"""
+    rng = np.random.default_rng(seed)
+    closes = start * np.exp(np.cumsum(rng.normal(0, 0.002, bars)))
+    spread = np.abs(rng.normal(0, 0.001, bars)) * closes
+    opens = np.concatenate(([closes[0]], closes[:-1]))
+    return {
+        "open": opens,
+        "high": np.maximum(opens, closes) + spread,
+        "low": np.minimum(opens, closes) - spread,
+        "close": closes,
+        "volume": rng.uniform(1, 100, bars),
+    }
+
+
+def _quiet_config():
+    from ..utils.config import Config
+    return Config.from_dict({"log": {"level": "WARNING"}})
+
+
+# ==========================================
+# 行情: WsClient / DataManager
+# ==========================================
+
+def _book_levels(depth: int, mid: float = 3000.0, step: float = 0.01) -> Dict[str, List[Dict[str, str]]]:
+    return {
+        "asks": [{"price": f"{mid + step * (i + 1):.2f}", "size": "1.0000"} for i in range(depth)],
+        "bids": [{"price": f"{mid - step * (i + 1):.2f}", "size": "1.0000"} for i in range(depth)],
+    }
+
+
+def _setup_update_orders(depth: int):
+    from lighter.ws_client import WsClient
+
+    ws_client = WsClient(host="127.0.0.1", order_book_ids=[0], on_order_book_update=None)
+    book = _book_levels(depth)
+    rng = np.random.default_rng(depth)
+    # 每条增量10档: 8档改量（分布在整个深度上）+ 1档撤单再挂回，深度保持不变
+    updates = []
+    for _ in range(256):
+        asks = []
+        for index in rng.integers(0, depth, 8):
+            asks.append({"price": book["asks"][index]["price"], "size": f"{rng.uniform(0.1, 5):.4f}"})
+        removed = book["asks"][int(rng.integers(0, depth))]["price"]
+        asks += [{"price": removed, "size": "0"}, {"price": removed, "size": "1.0000"}]
+        updates.append(asks)
+    existing = book["asks"]
+    position = 0
+
+    def run():
+        nonlocal position
+        ws_client.update_orders(updates[position], existing)
+        position = (position + 1) % len(updates)
+
+    return run
+
+
+for _depth in (10, 100, 1000):
+    register(f"ws_client.update_orders[depth={_depth}]", "market_data",
+             "WsClient合并一条10档增量（订单簿每侧depth档）", depth=_depth)(_setup_update_orders)
+
+
+@register("data_manager.on_order_book_update", "market_data", "DataManager处理一次订单簿回调（tick、本地K线、回调分发）")
+def _setup_order_book_update():
+    from ..core.data_manager import DataManager
+
+    data_manager = DataManager(None, _quiet_config(), [0])
+    prices = _random_walk(1024)["close"]
+    books = [_book_levels(10, mid=float(price)) for price in prices]
+    position = 0
+
+    def run():
+        nonlocal position
+        data_manager._on_order_book_update(0, books[position])
+        position = (position + 1) % len(books)
+
+    return run
+
+
+# ==========================================
+# 指标与策略
+# ==========================================
+
+def _setup_indicator(indicator: str, bars: int):
+    from ..utils.data_utils import DataUtils
+
+    data = _random_walk(bars)
+    highs, lows, closes = (data[key].tolist() for key in ("high", "low", "close"))
+    functions = {
+        "sma": lambda: DataUtils.calculate_sma(closes, 20),
+        "ema": lambda: DataUtils.calculate_ema(closes, 20),
+        "rsi": lambda: DataUtils.calculate_rsi(closes, 14),
+        "bollinger": lambda: DataUtils.calculate_bollinger_bands(closes, 20),
+        "macd": lambda: DataUtils.calculate_macd(closes),
+        "atr": lambda: DataUtils.calculate_atr(highs, lows, closes, 14),
+        "volatility": lambda: DataUtils.calculate_volatility(closes, 20),
+    }
+    return functions[indicator]
+
+
+for _indicator in ("sma", "ema", "rsi", "bollinger", "macd", "atr", "volatility"):
+    register(f"data_utils.{_indicator}[bars=1000]", "indicators", f"DataUtils计算{_indicator}（1000根K线）",
+             indicator=_indicator, bars=1000)(_setup_indicator)
+
+
+def _candle_market_data(market_id: int, bars: int) -> Dict[int, Dict[str, Any]]:
+    from ..utils.ring_buffer import CandleBuffer
+
+    data = _random_walk(bars)
+    candles = CandleBuffer(bars)
+    start = int(time.time()) // 60 * 60 - bars * 60
+    candles.extend_arrays(np.arange(bars) * 60 + start, data["open"], data["high"], data["low"],
+                          data["close"], data["volume"])
+    return {market_id: {"candlesticks": candles, "order_book": None, "trades": []}}
+
+
+def _setup_strategy(strategy: str, bars: int):
+    from ..strategies import MeanReversionStrategy, MomentumStrategy
+
+    config = _quiet_config()
+    # 未挂引擎时信号只计算不下单，计时覆盖数据读取与指标计算
+    instance = {
+        "momentum": lambda: MomentumStrategy(config=config, market_id=0),
+        "mean_reversion": lambda: MeanReversionStrategy(config=config, market_id=0),
+    }[strategy]()
+    market_data = _candle_market_data(0, bars)
+
+    async def run():
+        await instance.process_market_data(market_data)
+
+    return run
+
+
+@register("kernels.ut_bot[bars=100000]", "strategies", "UT Bot整段内核: 追踪止损、仓位状态与买卖信号（Numba或纯Python）")
+def _setup_ut_bot_kernel():
+    from ..utils.kernels import ut_bot
+
+    data = _random_walk(100000)
+    # 首次调用触发Numba编译
+    ut_bot(data["high"], data["low"], data["close"], key_value=3.0, atr_period=10)
+    return lambda: ut_bot(data["high"], data["low"], data["close"], key_value=3.0, atr_period=10)
+
+
+for _strategy in ("momentum", "mean_reversion"):
+    register(f"strategy.{_strategy}.process_market_data[bars=200]", "strategies",
+             f"{_strategy}策略处理一次K线数据", strategy=_strategy, bars=200)(_setup_strategy)
+
+
+# ==========================================
+# SDK: 反序列化与签名
+# ==========================================
+
+def _setup_deserialize(payload: str, size: int):
+    import lighter
+    from ..simulator import SimulatedExchange, SimulatorOptions
+
+    markets = SimulatorOptions(market_ids=[0]).build_markets()
+    exchange = SimulatedExchange(markets, levels=size if payload == "order_book_orders" else 5,
+                                 history_minutes=size if payload == "candlesticks" else 1, seed=1)
+    if payload == "candlesticks":
+        now_ms = int(time.time() * 1000)
+        body, response_type = exchange.candlesticks_response(0, "1m", now_ms - size * 120000, now_ms, size), "Candlesticks"
+    else:
+        body, response_type = exchange.order_book_orders_response(0, size), "OrderBookOrders"
+    text = json.dumps(body)
+    api_client = lighter.ApiClient(configuration=lighter.Configuration(host="http://127.0.0.1"))
+
+    return lambda: api_client.deserialize(text, response_type, "application/json"), api_client.close
+
+
+register("api_client.deserialize[candlesticks=5000]", "sdk", "反序列化5000根K线的Candlesticks响应",
+         payload="candlesticks", size=5000)(_setup_deserialize)
+register("api_client.deserialize[order_book_orders=500]", "sdk", "反序列化每侧500档的OrderBookOrders响应",
+         payload="order_book_orders", size=500)(_setup_deserialize)
+
+
+@register("signer.sign_create_order", "sdk", "SignerClient签名一笔限价单（ctypes调用原生签名库）")
+def _setup_signer():
+    from lighter.signer_client import SignerClient, _initialize_signer, create_api_key
+
+    try:
+        signer = _initialize_signer()
+        private_key, _, error = create_api_key()
+    except Exception as e:
+        raise BenchmarkSkipped(f"原生签名库不可用: {e}")
+    if error:
+        raise BenchmarkSkipped(f"生成API密钥失败: {error}")
+
+    # 只初始化签名所需字段，避免构造函数访问网络获取nonce
+    client = SignerClient.__new__(SignerClient)
+    client.signer = signer
+    client.url = "http://127.0.0.1"
+    client.chain_id = 300
+    client.api_key_index = 0
+    client.account_index = 1
+    client.api_key_dict = {0: private_key[2:] if private_key.startswith("0x") else private_key}
+    client.create_client(0)
+    nonce = 0
+
+    def run():
+        nonlocal nonce
+        nonce += 1
+        return client.sign_create_order(0, nonce, 1000, 300000, 0, SignerClient.ORDER_TYPE_LIMIT,
+                                        SignerClient.ORDER_TIME_IN_FORCE_GOOD_TILL_TIME, 0,
+                                        SignerClient.NIL_TRIGGER_PRICE, nonce=nonce)
+
+    return run
+
+
+# ==========================================
+# 回测与Web推送
+# ==========================================
+
+@register("backtest_engine.run_backtest[per_day]", "backtest", "BacktestEngine回测一个模拟日（1440根1分钟K线，动量策略）")
+def _setup_backtest():
+    try:
+        from ..backtesting import BacktestEngine
+    except ImportError as e:
+        raise BenchmarkSkipped(f"回测模块依赖缺失: {e}")
+    from ..strategies import MomentumStrategy
+
+    config = _quiet_config()
+    minutes = 2 * 1440
+    data = _random_walk(minutes)
+    start = datetime(2024, 1, 1)
+    engine = BacktestEngine(config)
+    engine.load_historical_data(0, [{
+        "timestamp": int((start + timedelta(minutes=i)).timestamp()),
+        "open": data["open"][i], "high": data["high"][i], "low": data["low"][i],
+        "close": data["close"][i], "volume": data["volume"][i],
+    } for i in range(minutes)])
+    strategy = MomentumStrategy(config=config, market_id=0)
+    # 第一天作为预热历史，计时第二天
+    day_start = start + timedelta(days=1)
+
+    async def run():
+        await engine.run_backtest(strategy, day_start, day_start + timedelta(days=1))
+
+    return run
+
+
+@register("backtest_cache.run_backtest[hit]", "backtest",
+          "BacktestCache命中: 与 backtest_engine.run_backtest[per_day] 相同的回测，计算缓存键并读取已存盘的结果")
+def _setup_backtest_cache():
+    import tempfile
+    from ..backtesting import BacktestCache, BacktestEngine
+    from ..strategies import MomentumStrategy
+
+    config = _quiet_config()
+    minutes = 2 * 1440
+    data = _random_walk(minutes)
+    start = datetime(2024, 1, 1)
+    engine = BacktestEngine(config)
+    engine.load_historical_data(0, [{
+        "timestamp": int((start + timedelta(minutes=i)).timestamp()),
+        "open": data["open"][i], "high": data["high"][i], "low": data["low"][i],
+        "close": data["close"][i], "volume": data["volume"][i],
+    } for i in range(minutes)])
+    day_start = start + timedelta(days=1)
+    directory = tempfile.TemporaryDirectory()
+    cache = BacktestCache(directory.name, log_level="WARNING")
+    params = {"market_id": 0}
+
+    # 预热调用完整回测一次并写入缓存，之后计时的调用都命中
+    async def run():
+        await cache.run_backtest(engine, MomentumStrategy, params, day_start, day_start + timedelta(days=1))
+
+    return run, directory.cleanup
+
+
+@register("portfolio_backtest.run_strategies[strategies=10,per_day]", "backtest",
+          "PortfolioBacktestEngine一次回放一个模拟日驱动10个动量策略变体（各自独立子账户）")
+def _setup_portfolio_backtest():
+    from ..backtesting import PortfolioBacktestEngine
+    from ..strategies import MomentumStrategy
+
+    config = _quiet_config()
+    minutes = 2 * 1440
+    data = _random_walk(minutes)
+    start = datetime(2024, 1, 1)
+    engine = PortfolioBacktestEngine(config)
+    engine.load_historical_data(0, [{
+        "timestamp": int((start + timedelta(minutes=i)).timestamp()),
+        "open": data["open"][i], "high": data["high"][i], "low": data["low"][i],
+        "close": data["close"][i], "volume": data["volume"][i],
+    } for i in range(minutes)])
+    day_start = start + timedelta(days=1)
+
+    async def run():
+        strategies = [MomentumStrategy(config=config, market_id=0, short_period=3 + i) for i in range(10)]
+        await engine.run_strategies(strategies, day_start, day_start + timedelta(days=1))
+
+    return run
+
+
+@register("tick_backtest.run_backtest[markets=2,minutes=10]", "backtest",
+          "TickBacktestEngine逐笔回放2个市场10分钟的200档订单簿（实时tick模式UT Bot策略）")
+def _setup_tick_backtest():
+    import tempfile
+    from ..backtesting import TickBacktestEngine
+    from ..strategies.ut_bot_strategy import UTBotConfig, UTBotStrategy
+    from .bench_tick_backtest import synthesize
+
+    directory = tempfile.TemporaryDirectory()
+    synthesize(directory.name, markets=2, hours=10 / 60, depth=200)
+    config = _quiet_config()
+    engine = TickBacktestEngine(config)
+    engine.load_recording(directory.name)
+
+    async def run():
+        strategy = UTBotStrategy("UTBotTick", config, UTBotConfig(market_ids=[0, 1], atr_period=10, ema_length=50))
+        await engine.run_backtest(strategy)
+
+    return run, directory.cleanup
+
+
+def _setup_metrics(mode: str, minutes: int):
+    from ..backtesting.metrics import StreamingMetrics, compute_metrics, monthly_returns
+
+    rng = np.random.default_rng(5)
+    # 大部分分钟没有成交，权益不变
+    steps = rng.normal(0, 1e-4, minutes) * (rng.random(minutes) < 0.1)
+    equity = 10000.0 * np.exp(np.concatenate(([0.0], np.cumsum(steps))))
+    start = datetime(2024, 1, 1)
+
+    if mode == "vectorized":
+        return lambda: (compute_metrics(equity), monthly_returns(equity, start))
+
+    values = equity[1:].tolist()
+
+    def run():
+        stream = StreamingMetrics(equity[0], start=start)
+        for value in values:
+            stream.update(value)
+        return stream.result(), stream.monthly_returns()
+
+    return run
+
+
+for _mode in ("vectorized", "streaming"):
+    register(f"backtest_metrics.{_mode}[minutes=525600]", "backtest",
+             f"一年1分钟权益曲线的绩效指标与月度收益（{_mode}）", mode=_mode, minutes=525600)(_setup_metrics)
+
+
+class _NullWebSocket:
+    """只丢弃数据的连接，计时只包含WebSocketManager自身的开销与序列化"""
+
+    async def send_text(self, text: str):
+        pass
+
+
+def _setup_broadcast(clients: int):
+    path = REPO_ROOT / "web_backend" / "services" / "websocket_manager.py"
+    if not path.exists():
+        raise BenchmarkSkipped(f"未找到 {path}")
+    # 直接按文件加载，避免 services 包导入数据库等Web依赖
+    spec = importlib.util.spec_from_file_location("_bench_websocket_manager", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    manager = module.WebSocketManager()
+    for i in range(clients):
+        manager.active_connections[f"client_{i}"] = _NullWebSocket()
+    message = {"type": "market_data", "data": {"market_id": 0, "price": 3000.0, "bid": 2999.99, "ask": 3000.01,
+                                              "timestamp": datetime.now().isoformat()}}
+
+    async def run():
+        await manager.broadcast_message(message)
+
+    return run
+
+
+for _clients in (10, 100):
+    register(f"websocket_manager.broadcast[clients={_clients}]", "web",
+             f"WebSocketManager向{_clients}个连接广播一条行情", clients=_clients)(_setup_broadcast)
+
+
+# ==========================================
+# 计时、保存与对比
+# ==========================================
+
+def _timer(func: Callable[[], Any], loop: Optional[asyncio.AbstractEventLoop]) -> Callable[[int], float]:
+    """返回 timer(number): 连续调用number次的总耗时（秒）"""
+    if loop is None:
+        def timer(number: int) -> float:
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            return time.perf_counter() - started
+        return timer
+
+    async def repeat(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            await func()
+        return time.perf_counter() - started
+
+    return lambda number: loop.run_until_complete(repeat(number))
+
+
+def run_case(case: BenchmarkCase, repeat: int = 5, min_time: float = 0.1) -> Dict[str, Any]:
+    """
+    运行一个用例
+
+    Returns:
+        单次调用耗时统计（微秒）；跳过时只有 skipped 原因
+    """
+    result: Dict[str, Any] = {"group": case.group, "params": case.params, "description": case.description}
+    # setup 在事件循环内执行（DataManager、ApiClient 构造时需要运行中的事件循环）
+    loop = asyncio.new_event_loop()
+
+    async def prepare():
+        return case.setup()
+
+    teardown = None
+    try:
+        try:
+            func = loop.run_until_complete(prepare())
+        except BenchmarkSkipped as e:
+            result["skipped"] = str(e)
+            return result
+        if isinstance(func, tuple):
+            func, teardown = func
+
+        timer = _timer(func, loop if inspect.iscoroutinefunction(func) else None)
+        # 预热一次，再按 min_time 校准单轮调用次数（1, 2, 5, 10, 20, 50, ...，与timeit.autorange相同）
+        timer(1)
+        number, elapsed, scale = 1, 0.0, 1
+        while elapsed < min_time:
+            for factor in (1, 2, 5):
+                number = scale * factor
+                elapsed = timer(number)
+                if elapsed >= min_time:
+                    break
+            scale *= 10
+        rounds = np.array([elapsed] + [timer(number) for _ in range(repeat - 1)]) / number * 1e6
+    finally:
+        if teardown is not None:
+            outcome = teardown()
+            if inspect.isawaitable(outcome):
+                loop.run_until_complete(outcome)
+        loop.close()
+
+    median = float(np.median(rounds))
+    result.update({
+        "number": number,
+        "rounds": len(rounds),
+        "min_us": float(rounds.min()),
+        "median_us": median,
+        "mean_us": float(rounds.mean()),
+        "stddev_us": float(rounds.std()),
+        "ops_per_sec": 1e6 / median if median > 0 else float("inf"),
+    })
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=5)
+        return output.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def select_cases(pattern: Optional[str] = None) -> List[BenchmarkCase]:
+    """按名称或分组的正则过滤用例"""
+    if not pattern:
+        return list(CASES)
+    regex = re.compile(pattern)
+    return [case for case in CASES if regex.search(case.name) or regex.search(case.group)]
+
+
+def run_suite(pattern: Optional[str] = None, repeat: int = 5, min_time: float = 0.1,
+              progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    运行基准套件
+
+    Args:
+        pattern: 用例名称/分组的正则过滤
+        repeat: 每个用例的轮数
+        min_time: 单轮最短耗时（秒）
+        progress: 每个用例完成后的回调 (名称, 结果)
+
+    Returns:
+        {"meta": 环境信息, "results": {用例名称: 结果}}
+    """
+    from .. import __version__
+
+    results = {}
+    for case in select_cases(pattern):
+        results[case.name] = run_case(case, repeat, min_time)
+        if progress:
+            progress(case.name, results[case.name])
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "version": __version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+
+
+def save_results(run: Dict[str, Any], path: str):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    对比两次运行的中位数耗时
+
+    Returns:
+        每个用例一条: 名称、基线/当前中位数（微秒）、比值（当前/基线）、状态（回归/提升/持平/新增/跳过）
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        row = {"name": name, "baseline_us": None, "current_us": result.get("median_us"), "ratio": None}
+        if "skipped" in result or (base is not None and "skipped" in base):
+            row["status"] = "跳过"
+        elif base is None:
+            row["status"] = "新增"
+        else:
+            row["baseline_us"] = base["median_us"]
+            row["ratio"] = result["median_us"] / base["median_us"] if base["median_us"] > 0 else float("inf")
+            if row["ratio"] > 1 + threshold:
+                row["status"] = "回归"
+            elif row["ratio"] < 1 / (1 + threshold):
+                row["status"] = "提升"
+            else:
+                row["status"] = "持平"
+        rows.append(row)
+    return rows
+
+
+def _format_us(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value >= 1e6:
+        return f"{value / 1e6:.2f} s"
+    if value >= 1e3:
+        return f"{value / 1e3:.2f} ms"
+    return f"{value:.2f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端性能基准套件")
+    parser.add_argument("--filter", default=None, help="只运行名称或分组匹配该正则的用例")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的轮数")
+    parser.add_argument("--min-time", type=float, default=0.1, help="单轮最短耗时（秒）")
+    parser.add_argument("--output", default=None, help=f"结果JSON路径（默认 {DEFAULT_OUTPUT_DIR}/<时间>_<提交>.json）")
+    parser.add_argument("--compare", default=None, help="与该基线结果JSON对比")
+    parser.add_argument("--threshold", type=float, default=0.2, help="对比时判定回归/提升的相对变化阈值")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回归时以非零状态退出")
+    parser.add_argument("--list", action="store_true", help="只列出用例")
+    args = parser.parse_args()
+
+    if args.list:
+        for case in select_cases(args.filter):
+            print(f"{case.group:<14}{case.name:<56}{case.description}")
+        return
+
+    # lighter SDK导入时把根日志设为DEBUG，按生产级别计时
+    configure_logging(LogOptions(level="WARNING"))
+    print(f"{'用例':<56}{'中位数':>12}{'最小':>12}{'标准差':>12}{'次/秒':>14}")
+
+    def progress(name: str, result: Dict[str, Any]):
+        if "skipped" in result:
+            print(f"{name:<56}跳过: {result['skipped']}")
+        else:
+            print(f"{name:<56}{_format_us(result['median_us']):>12}{_format_us(result['min_us']):>12}"
+                  f"{_format_us(result['stddev_us']):>12}{result['ops_per_sec']:>14.0f}")
+
+    run = run_suite(args.filter, args.repeat, args.min_time, progress)
+    output = args.output or os.path.join(
+        DEFAULT_OUTPUT_DIR, f"{datetime.now():%Y%m%d_%H%M%S}_{run['meta']['commit'] or 'unknown'}.json")
+    save_results(run, output)
+    print(f"结果已保存到: {output}")
+
+    if args.compare:
+        baseline = load_results(args.compare)
+        rows = compare_results(run, baseline, args.threshold)
+        print(f"\n对比基线 {args.compare} (提交 {baseline.get('meta', {}).get('commit')}, 阈值 {args.threshold:.0%})")
+        print(f"{'用例':<56}{'基线':>12}{'当前':>12}{'比值':>8}  状态")
+        for row in rows:
+            ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+            print(f"{row['name']:<56}{_format_us(row['baseline_us']):>12}{_format_us(row['current_us']):>12}"
+                  f"{ratio:>8}  {row['status']}")
+        if args.fail_on_regression and any(row["status"] == "回归" for row in rows):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,30 @@ from .data_manager import DataManager
 from .risk_manager import RiskManager
 from .position_manager import PositionManager
 from .order_manager import OrderManager
+from .portfolio_risk import PortfolioRisk
+from .event_bus import EventBus, EventType, Event
+from .scheduler import Scheduler
+from .metrics_server import MetricsServer
+from .market_recorder import MarketDataRecorder, MarketDataReader, MarketDataReplayer, RecordKind
+from .sharding import ShardCoordinator, ShardWorkerEngine, shard_markets
 
 __all__ = [
     "TradingEngine",
     "DataManager",
     "RiskManager", 
     "PositionManager",
-    "OrderManager"
+    "OrderManager",
+    "PortfolioRisk",
+    "EventBus",
+    "EventType",
+    "Event",
+    "Scheduler",
+    "MetricsServer",
+    "MarketDataRecorder",
+    "MarketDataReader",
+    "MarketDataReplayer",
+    "RecordKind",
+    "ShardCoordinator",
+    "ShardWorkerEngine",
+    "shard_markets"
 ]
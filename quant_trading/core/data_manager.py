@@ -14,26 +14,36 @@ from lighter.api.candlestick_api import CandlestickApi
 from lighter.api.order_api import OrderApi
 from lighter.api.account_api import AccountApi
 from lighter.ws_client import WsClient
+from websockets.client import connect as connect_async
 
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.ring_buffer import Candle, CandleBuffer, TickBuffer
+from ..utils.bar_aggregator import BarAggregator, to_seconds
+from ..utils.latency import LatencyStage, LatencyTracker, now_ns
+from ..utils.metrics import WS_MESSAGES, WS_RECONNECTS
+from .market_recorder import MarketDataRecorder
 from ..data_sources import LighterDataSource, TradingViewDataSource
 
 
 class DataManager:
     """数据管理器"""
     
-    def __init__(self, api_client: lighter.ApiClient, config: Config):
+    def __init__(self, api_client: lighter.ApiClient, config: Config, market_ids: Optional[List[int]] = None):
         """
         初始化数据管理器
         
         Args:
             api_client: lighter API客户端
             config: 配置对象
+            market_ids: 只管理这些市场（分片模式下每个工作进程只订阅自己的市场），None则按配置确定
         """
         self.api_client = api_client
         self.config = config
+        self.market_ids = list(market_ids) if market_ids is not None else None
         self.logger = setup_logger("DataManager", config.log_level)
+        self.clock: Clock = REALTIME_CLOCK
         
         # API实例
         self.candlestick_api = CandlestickApi(api_client)
@@ -44,15 +54,17 @@ class DataManager:
         self.data_sources: Dict[str, Any] = {}
         self.primary_data_source = "lighter"  # 默认主数据源
         
-        # 数据缓存
+        # 数据缓存（K线与tick历史为固定容量的环形缓冲区）
         self.market_data_cache: Dict[int, Dict[str, Any]] = {}
+        self.candle_history_size = config.data_sources.get("candle_history_size", 1000)
+        self.tick_history_size = config.data_sources.get("tick_history_size", 10000)
         self.order_book_cache: Dict[int, Dict[str, Any]] = {}
         self.account_cache: Optional[Dict[str, Any]] = None
         
         # 数据更新时间
         self.last_update_time: Dict[str, datetime] = {}
         
-        # API 限流控制
+        # API 限流控制（限制的是真实网络请求，始终按系统时间计算，不使用注入的时钟）
         self.api_semaphore = asyncio.Semaphore(3)  # 最多同时3个API请求
         self.last_api_call_time = datetime.now()
         self.min_api_interval = 0.1  # API调用最小间隔（秒）
@@ -65,10 +77,39 @@ class DataManager:
         # 实时tick数据回调
         self.tick_callbacks: List[Callable[[int, Dict[str, Any]], None]] = []
         
+        # 热路径延迟埋点（引擎通过set_latency_tracker注入共享实例）
+        self.latency = LatencyTracker(enabled=False)
+        
+        # 账户流回调
+        self.account_callbacks: List[Callable[[str, Dict[str, Any]], None]] = []
+        
         # 实时价格数据
         self.real_time_prices: Dict[int, float] = {}
         self.last_tick_time: Dict[int, datetime] = {}
         
+        # 本地K线构建：由tick流合成1分钟K线，REST K线只在后台低频校正
+        self.bar_builders: Dict[int, BarAggregator] = {}
+        self.bar_callbacks: List[Callable[[int, int, Candle], None]] = []
+        self.bar_reconcile_interval = config.data_sources.get("bar_reconcile_interval", 300)  # REST校正间隔（秒）
+        self.bar_reconcile_count = config.data_sources.get("bar_reconcile_count", 100)  # 每次校正拉取的K线数量
+        self.bar_flush_interval = config.data_sources.get("bar_flush_interval", 1.0)  # 按时钟收盘的检查间隔（秒）
+        self.bar_reconcile_concurrency = config.data_sources.get("bar_reconcile_concurrency", 4)  # 同时校正的市场数
+        self.bar_task: Optional[asyncio.Task] = None
+        self.reconcile_task: Optional[asyncio.Task] = None
+        self.last_bar_reconcile_time: Dict[int, float] = {}
+        
+        # 行情录制：WebSocket原始消息与REST K线快照写入二进制日志，供离线回放
+        self.recorder: Optional[MarketDataRecorder] = None
+        recorder_config = config.data_sources.get("recorder", {})
+        if recorder_config.get("enabled", False):
+            self.recorder = MarketDataRecorder(
+                recorder_config.get("directory", "data/market_log"),
+                prefix=recorder_config.get("prefix", "market"),
+                chunk_bytes=int(recorder_config.get("chunk_mb", 64) * 1024 * 1024),
+                chunk_seconds=recorder_config.get("chunk_seconds", 3600),
+                compression_level=recorder_config.get("compression_level", 1)
+            )
+        
     async def initialize(self):
         """初始化数据管理器"""
         self.logger.info("初始化数据管理器...")
@@ -82,6 +123,10 @@ class DataManager:
         # 初始化WebSocket实时数据流
         await self._initialize_websocket()
         
+        # 启动本地K线维护任务（按时钟收盘）与REST后台校正任务，校正耗时不影响收盘节奏
+        self.bar_task = asyncio.create_task(self._run_bar_maintenance())
+        self.reconcile_task = asyncio.create_task(self._run_bar_reconcile())
+        
         self.logger.info("数据管理器初始化完成")
         
     async def _initialize_data_sources(self):
@@ -137,12 +182,7 @@ class DataManager:
             # 为每个市场初始化数据缓存
             for market in markets.order_books:
                 market_id = market.market_id
-                self.market_data_cache[market_id] = {
-                    "market_info": market,
-                    "candlesticks": [],
-                    "order_book": None,
-                    "trades": []
-                }
+                self.market_data_cache[market_id] = self._new_market_cache(market)
                 
         except Exception as e:
             self.logger.error(f"加载初始数据失败: {e}")
@@ -162,8 +202,13 @@ class DataManager:
             # 获取需要更新的市场ID
             required_markets = set()
             
+            # 0. 分片模式：市场范围固定
+            if self.market_ids is not None:
+                required_markets.update(self.market_ids)
+                extra_markets = None
+            
             # 1. 从策略配置中获取
-            if hasattr(self.config, 'strategies') and self.config.strategies:
+            elif hasattr(self.config, 'strategies') and self.config.strategies:
                 for strategy_name, strategy_config in self.config.strategies.items():
                     if strategy_config.get("enabled", False):
                         if "market_id" in strategy_config:
@@ -198,13 +243,7 @@ class DataManager:
             for market_id in required_markets:
                 if market_id not in self.market_data_cache:
                     # 初始化市场缓存
-                    self.market_data_cache[market_id] = {
-                        "market_info": None,
-                        "candlesticks": [],
-                        "order_book": None,
-                        "trades": [],
-                        "last_price": 0
-                    }
+                    self.market_data_cache[market_id] = self._new_market_cache()
                 
                 await self._update_market_data(market_id)
                 
@@ -286,22 +325,13 @@ class DataManager:
     async def _update_market_data(self, market_id: int):
         """更新指定市场的数据 - 仅使用实时数据源"""
         try:
-            current_time = datetime.now()
-            
             # ⚠️ 注意：为了确保market_data_cache只包含实时数据，
             # 这里不再更新K线、订单簿、交易数据
             # 这些数据现在只通过WebSocket实时更新
             
             # 只初始化市场缓存结构，不填充历史数据
             if market_id not in self.market_data_cache:
-                self.market_data_cache[market_id] = {
-                    "market_info": None,
-                    "candlesticks": [],  # 空，等待实时数据填充
-                    "order_book": None,  # 空，等待实时数据填充
-                    "trades": [],        # 空，等待实时数据填充
-                    "last_price": 0,     # 从实时数据更新
-                    "last_tick": None    # 从实时数据更新
-                }
+                self.market_data_cache[market_id] = self._new_market_cache()
             
             # 只获取市场信息（一次性，非实时数据）
             if not self.market_data_cache[market_id].get("market_info"):
@@ -484,7 +514,7 @@ class DataManager:
         }
         
         interval = intervals.get(data_type, timedelta(seconds=30))
-        return datetime.now() - last_update > interval
+        return self.clock.now() - last_update > interval
         
     async def _rate_limit(self):
         """API 限流控制"""
@@ -500,9 +530,8 @@ class DataManager:
         try:
             await self._rate_limit()  # 限流
             
-            self.logger.info(f"[DataManager] 开始更新市场 {market_id} 的K线数据")
-            self.logger.info(f"[DataManager] 当前主数据源: {self.primary_data_source}")
-            self.logger.info(f"[DataManager] 可用数据源: {list(self.data_sources.keys())}")
+            self.logger.debug("[DataManager] 开始更新市场 %s 的K线数据: 主数据源 %s, 可用数据源 %s",
+                              market_id, self.primary_data_source, list(self.data_sources))
             
             # 使用主数据源获取K线数据
             if self.primary_data_source != "lighter" and self.primary_data_source in self.data_sources:
@@ -513,7 +542,7 @@ class DataManager:
                     # 获取市场符号（简化处理：使用market_id作为符号）
                     # 实际应该从市场信息中获取正确的符号
                     symbol = self._get_symbol_for_market(market_id)
-                    self.logger.info(f"[DataManager] 市场 {market_id} 映射到符号: {symbol}")
+                    self.logger.debug(f"[DataManager] 市场 {market_id} 映射到符号: {symbol}")
                     
                     candlesticks_data = await data_source.get_candlesticks(
                         symbol=symbol,
@@ -522,12 +551,14 @@ class DataManager:
                     )
                     
                     if candlesticks_data:
-                        self.market_data_cache[market_id]["candlesticks"] = candlesticks_data
+                        self.market_data_cache[market_id]["candlesticks"].merge(candlesticks_data)
+                        if self.recorder is not None:
+                            self.recorder.record_candles(market_id, candlesticks_data, "merge")
                         # 更新last_price为最新K线的收盘价
                         if len(candlesticks_data) > 0:
                             self.market_data_cache[market_id]["last_price"] = candlesticks_data[-1].get("close", 0)
                             self.logger.debug(f"[DataManager] 市场 {market_id} last_price 更新为: {self.market_data_cache[market_id]['last_price']}")
-                        self.logger.info(f"[DataManager] 从 {self.primary_data_source} 获取到 {len(candlesticks_data)} 条K线数据 (市场 {market_id})")
+                        self.logger.debug(f"[DataManager] 从 {self.primary_data_source} 获取到 {len(candlesticks_data)} 条K线数据 (市场 {market_id})")
                         return
                     else:
                         self.logger.warning(f"[DataManager] {self.primary_data_source} 返回空数据")
@@ -537,7 +568,7 @@ class DataManager:
                     self.logger.warning(traceback.format_exc())
             
             # 回退到Lighter数据源
-            end_time = int(datetime.now().timestamp())
+            end_time = int(self.clock.time())
             start_time = end_time - 3600  # 获取最近1小时的数据
             
             candlesticks = await self.candlestick_api.candlesticks(
@@ -551,7 +582,7 @@ class DataManager:
             if candlesticks and candlesticks.candlesticks:
                 candlesticks_list = [
                     {
-                        "timestamp": c.timestamp,
+                        "timestamp": to_seconds(float(c.timestamp)),  # 统一为秒，与本地K线一致
                         "open": float(c.open),
                         "high": float(c.high),
                         "low": float(c.low),
@@ -559,7 +590,9 @@ class DataManager:
                         "volume": float(c.volume0)  # 使用 volume0
                     } for c in candlesticks.candlesticks
                 ]
-                self.market_data_cache[market_id]["candlesticks"] = candlesticks_list
+                self.market_data_cache[market_id]["candlesticks"].merge(candlesticks_list)
+                if self.recorder is not None:
+                    self.recorder.record_candles(market_id, candlesticks_list, "merge")
                 # 更新last_price为最新K线的收盘价
                 if len(candlesticks_list) > 0:
                     self.market_data_cache[market_id]["last_price"] = candlesticks_list[-1]["close"]
@@ -584,7 +617,7 @@ class DataManager:
                 self.market_data_cache[market_id]["order_book"] = {
                     "bids": bids,
                     "asks": asks,
-                    "timestamp": datetime.now().timestamp()
+                    "timestamp": self.clock.time()
                 }
                 
                 # 从订单簿更新last_price（使用中间价）
@@ -644,7 +677,7 @@ class DataManager:
                     "l1_address": account.l1_address,
                     "positions": account.positions,
                     "balance": account.balance,
-                    "timestamp": datetime.now().timestamp()
+                    "timestamp": self.clock.time()
                 }
                 
             return self.account_cache
@@ -653,6 +686,18 @@ class DataManager:
             self.logger.error(f"获取账户数据失败: {e}")
             return self.account_cache
             
+    def _new_market_cache(self, market_info: Any = None) -> Dict[str, Any]:
+        """创建单个市场的数据缓存结构"""
+        return {
+            "market_info": market_info,
+            "candlesticks": CandleBuffer(self.candle_history_size),
+            "tick_history": TickBuffer(self.tick_history_size),
+            "order_book": None,
+            "trades": [],
+            "last_price": 0,
+            "last_tick": None
+        }
+        
     def get_market_data(self, market_id: int) -> Optional[Dict[str, Any]]:
         """获取指定市场的数据"""
         return self.market_data_cache.get(market_id)
@@ -707,7 +752,7 @@ class DataManager:
                     self.logger.warning(f"从 {self.primary_data_source} 获取历史K线数据失败: {e}，回退到Lighter")
             
             # 回退到Lighter数据源
-            end_time = int(datetime.now().timestamp())
+            end_time = int(self.clock.time())
             start_time = end_time - (limit * 60)  # 根据limit计算时间范围
             
             candlesticks = await self.candlestick_api.candlesticks(
@@ -721,7 +766,7 @@ class DataManager:
             if candlesticks and candlesticks.candlesticks:
                 candlesticks_list = [
                     {
-                        "timestamp": c.timestamp,
+                        "timestamp": to_seconds(float(c.timestamp)),  # 统一为秒，与本地K线一致
                         "open": float(c.open),
                         "high": float(c.high),
                         "low": float(c.low),
@@ -755,6 +800,13 @@ class DataManager:
                 on_order_book_update=self._on_order_book_update,
                 on_account_update=self._on_account_update
             )
+            # 自定义WebSocket地址（如本机模拟交易所 ws://127.0.0.1:8800/stream）
+            ws_url = self.config.lighter_config.get("ws_url")
+            if ws_url:
+                self.ws_client.base_url = ws_url
+            self.latency.instrument_ws_client(self.ws_client)
+            if self.recorder is not None:
+                self.recorder.instrument_ws_client(self.ws_client)
             
             # 启动WebSocket任务
             self.ws_running = True
@@ -768,6 +820,9 @@ class DataManager:
     
     def _get_required_market_ids(self) -> List[int]:
         """获取需要订阅的市场ID列表"""
+        if self.market_ids is not None:
+            return list(self.market_ids)
+        
         market_ids = set()
         
         # 从策略配置中获取
@@ -797,12 +852,12 @@ class DataManager:
         try:
             while self.ws_running:
                 try:
-                    # 运行WebSocket客户端
-                    self.ws_client.run()
+                    await self._consume_websocket()
                 except Exception as e:
                     self.logger.error(f"WebSocket连接错误: {e}")
                     if self.ws_running:
                         self.logger.info("5秒后重连WebSocket...")
+                        WS_RECONNECTS.inc()
                         await asyncio.sleep(5)
         except asyncio.CancelledError:
             self.logger.info("WebSocket任务被取消")
@@ -811,12 +866,33 @@ class DataManager:
         finally:
             self.ws_running = False
     
+    async def _consume_websocket(self):
+        """
+        在事件循环上接收WebSocket消息（WsClient.run 是同步阻塞的，会卡住整个事件循环）
+        
+        连接确认消息需要异步发送订阅请求，其余原始消息交给 WsClient.on_message 解析与合并
+        """
+        async with connect_async(self.ws_client.base_url, max_size=None) as ws:
+            self.ws_client.ws = ws
+            async for message in ws:
+                if '"connected"' in message and json.loads(message).get("type") == "connected":
+                    await self.ws_client.handle_connected_async(ws)
+                    continue
+                self.ws_client.on_message(ws, message)
+        raise ConnectionError("WebSocket连接已关闭")
+    
     def _on_order_book_update(self, market_id: int, order_book: Dict[str, Any]):
         """
         订单簿更新回调 - 实时tick数据处理
         ⭐ 这是market_data_cache的唯一实时数据来源
         """
+        started = now_ns()
         try:
+            # WebSocket频道解析出的market_id是字符串，统一为int与缓存键保持一致
+            market_id = int(market_id)
+            WS_MESSAGES.labels("order_book", market_id).inc()
+            self.latency.mark_tick(market_id, getattr(self.ws_client, "message_received_ns", None) or started)
+            
             # 提取实时价格数据
             if "bids" in order_book and "asks" in order_book:
                 bids = order_book["bids"]
@@ -832,11 +908,11 @@ class DataManager:
                         
                         # 更新实时价格
                         self.real_time_prices[market_id] = mid_price
-                        self.last_tick_time[market_id] = datetime.now()
+                        self.last_tick_time[market_id] = self.clock.now()
                         
                         # 构建tick数据
                         tick_data = {
-                            "timestamp": datetime.now().timestamp(),
+                            "timestamp": self.clock.time(),
                             "price": mid_price,
                             "bid": best_bid,
                             "ask": best_ask,
@@ -847,37 +923,217 @@ class DataManager:
                         }
                         
                         # ⭐ 更新market_data_cache - 唯一的实时数据来源
-                        if market_id not in self.market_data_cache:
-                            self.market_data_cache[market_id] = {
-                                "market_info": None,
-                                "candlesticks": [],
-                                "order_book": None,
-                                "trades": [],
-                                "last_price": 0,
-                                "last_tick": None
-                            }
+                        cache = self.market_data_cache.get(market_id)
+                        if cache is None:
+                            cache = self.market_data_cache[market_id] = self._new_market_cache()
                         
                         # 只更新实时数据字段
-                        self.market_data_cache[market_id]["last_price"] = mid_price
-                        self.market_data_cache[market_id]["order_book"] = order_book
-                        self.market_data_cache[market_id]["last_tick"] = tick_data
+                        cache["last_price"] = mid_price
+                        cache["order_book"] = order_book
+                        cache["last_tick"] = tick_data
+                        cache["tick_history"].append(
+                            tick_data["timestamp"], mid_price, best_bid, best_ask,
+                            tick_data["bid_size"], tick_data["ask_size"]
+                        )
+                        
+                        # 合并进本地1分钟K线（跨分钟时触发收盘事件）
+                        self._update_local_bar(market_id, cache, mid_price, tick_data["timestamp"])
                         
                         # 触发tick回调 - 类似Pine Script的calc_on_every_tick
                         self._trigger_tick_callbacks(market_id, tick_data)
                         
-                        self.logger.debug(f"实时数据更新: 市场 {market_id}, 价格 {mid_price}")
+                        self.logger.debug("实时数据更新: 市场 %s, 价格 %s", market_id, mid_price)
                         
         except Exception as e:
             self.logger.error(f"处理订单簿更新失败 (市场 {market_id}): {e}")
+        finally:
+            self.latency.record(LatencyStage.TICK_CALLBACK, now_ns() - started, market_id)
+    
+    def _update_local_bar(self, market_id: int, cache: Dict[str, Any], price: float, timestamp: float):
+        """将一笔tick合并进本地K线，并把当前未走完的K线写入缓存"""
+        builder = self.bar_builders.get(market_id)
+        if builder is None:
+            # 已收盘K线保存在缓存的CandleBuffer中，构建器只需保留少量历史
+            builder = BarAggregator([1], capacity=16, logger=self.logger)
+            builder.add_callback(lambda timeframe, candle: self._trigger_bar_callbacks(market_id, timeframe, candle))
+            # 缓存中已有当前分钟的K线（REST种子数据）时以它为起点，保留其开高低与成交量
+            candles = cache["candlesticks"]
+            if len(candles) and candles.last("timestamp") == timestamp - timestamp % 60:
+                builder.on_bar(candles[-1])
+            self.bar_builders[market_id] = builder
+        
+        builder.on_tick(price, 0.0, timestamp)
+        current = builder.current_bar(1)
+        if current is not None:
+            cache["candlesticks"].merge((current,))
+    
+    async def _run_bar_maintenance(self):
+        """
+        本地K线维护任务: 每 bar_flush_interval 秒按时钟关闭已到期的K线（行情清淡时也能准时收盘）
+        """
+        try:
+            while True:
+                now = self.clock.time()
+                for market_id, builder in list(self.bar_builders.items()):
+                    builder.flush(now)
+                
+                await asyncio.sleep(self.bar_flush_interval)
+        except asyncio.CancelledError:
+            self.logger.info("本地K线维护任务被取消")
+        except Exception as e:
+            self.logger.error(f"本地K线维护任务错误: {e}")
+    
+    async def _run_bar_reconcile(self):
+        """
+        REST K线校正任务: 每 bar_reconcile_interval 秒用REST K线校正已收盘K线（补成交量、修正断流期间的缺口）；
+        到期的市场并发校正（最多 bar_reconcile_concurrency 个，请求仍经过 _rate_limit 限流）
+        """
+        semaphore = asyncio.Semaphore(max(1, self.bar_reconcile_concurrency))
+        
+        async def reconcile(market_id: int):
+            async with semaphore:
+                await self._reconcile_candlesticks(market_id)
+        
+        try:
+            while True:
+                now = self.clock.time()
+                due = []
+                for market_id in self._get_required_market_ids():
+                    last = self.last_bar_reconcile_time.get(market_id, 0.0)
+                    if now - last >= self.bar_reconcile_interval:
+                        self.last_bar_reconcile_time[market_id] = now
+                        due.append(market_id)
+                if due:
+                    await asyncio.gather(*(reconcile(market_id) for market_id in due))
+                
+                await asyncio.sleep(self.bar_flush_interval)
+        except asyncio.CancelledError:
+            self.logger.info("REST K线校正任务被取消")
+        except Exception as e:
+            self.logger.error(f"REST K线校正任务错误: {e}")
+    
+    async def _reconcile_candlesticks(self, market_id: int):
+        """用REST K线校正本地已收盘K线（当前未走完的K线以本地tick为准）"""
+        try:
+            await self._rate_limit()
+            candles = await self.get_historical_candlesticks(market_id, self.bar_reconcile_count)
+            if not candles:
+                return
+            
+            cache = self.market_data_cache.get(market_id)
+            if cache is None:
+                cache = self.market_data_cache[market_id] = self._new_market_cache()
+            
+            # 本地tick已接管的分钟以本地为准：只校正当前分钟之前的K线
+            # （尚无本地构建器时全部写入，作为启动时的历史种子）
+            if market_id in self.bar_builders:
+                now = self.clock.time()
+                cutoff = now - now % 60
+                candles = [c for c in candles if float(c["timestamp"]) < cutoff]
+            
+            changed = cache["candlesticks"].reconcile(candles)
+            if self.recorder is not None:
+                self.recorder.record_candles(market_id, candles, "reconcile")
+            if changed:
+                self.logger.debug(f"市场 {market_id} REST校正K线 {changed} 根")
+            if cache["last_price"] == 0 and len(cache["candlesticks"]):
+                cache["last_price"] = cache["candlesticks"].last("close")
+                
+        except Exception as e:
+            self.logger.error(f"校正K线数据失败 (市场 {market_id}): {e}")
+    
+    def _trigger_bar_callbacks(self, market_id: int, timeframe: int, candle: Candle):
+        """触发K线收盘回调"""
+        for callback in self.bar_callbacks:
+            try:
+                callback(market_id, timeframe, candle)
+            except Exception as e:
+                self.logger.error(f"K线收盘回调执行失败: {e}")
+    
+    def attach_replay_client(self, market_ids: Optional[List[int]] = None) -> WsClient:
+        """
+        创建不连接网络的WsClient供回放使用（订单簿合并与回调与实盘相同）
+        
+        Args:
+            market_ids: 回放的市场（只用于WsClient的订阅列表，不过滤消息）
+            
+        Returns:
+            WsClient，交给 MarketDataReplayer.run 作为消息入口
+        """
+        self.ws_client = WsClient(
+            host="replay",
+            order_book_ids=market_ids or self._get_required_market_ids(),
+            account_ids=[str(self.config.lighter_config.get("account_index", 0))],
+            on_order_book_update=self._on_order_book_update,
+            on_account_update=self._on_account_update
+        )
+        self.latency.instrument_ws_client(self.ws_client)
+        return self.ws_client
+    
+    def apply_candle_snapshot(self, market_id: int, candles: List[Dict[str, Any]], mode: str = "merge"):
+        """写入一次K线快照（回放录制的REST K线，mode与录制时写入缓存的方式一致）"""
+        cache = self.market_data_cache.get(market_id)
+        if cache is None:
+            cache = self.market_data_cache[market_id] = self._new_market_cache()
+        if mode == "reconcile":
+            cache["candlesticks"].reconcile(candles)
+            if cache["last_price"] == 0 and len(cache["candlesticks"]):
+                cache["last_price"] = cache["candlesticks"].last("close")
+        elif candles:
+            cache["candlesticks"].merge(candles)
+            cache["last_price"] = candles[-1].get("close", 0)
+    
+    def set_recorder(self, recorder: Optional[MarketDataRecorder]):
+        """设置行情录制器"""
+        self.recorder = recorder
+        if recorder is not None and self.ws_client is not None:
+            recorder.instrument_ws_client(self.ws_client)
+    
+    def set_latency_tracker(self, latency: LatencyTracker):
+        """设置延迟埋点记录器"""
+        self.latency = latency
+        if self.ws_client is not None:
+            latency.instrument_ws_client(self.ws_client)
+    
+    def set_clock(self, clock: Clock):
+        """设置时钟（tick时间戳、本地K线收盘与数据更新间隔都按它计算；回放时由回放器推进）"""
+        self.clock = clock
+    
+    def add_bar_callback(self, callback: Callable[[int, int, Candle], None]):
+        """添加K线收盘回调 callback(market_id, 周期分钟数, 已走完的K线)"""
+        self.bar_callbacks.append(callback)
+        self.logger.info(f"添加K线收盘回调，当前回调数量: {len(self.bar_callbacks)}")
+    
+    def remove_bar_callback(self, callback: Callable[[int, int, Candle], None]):
+        """移除K线收盘回调"""
+        if callback in self.bar_callbacks:
+            self.bar_callbacks.remove(callback)
     
     def _on_account_update(self, account_id: str, account_data: Dict[str, Any]):
         """账户更新回调"""
         try:
-            self.logger.debug(f"账户 {account_id} 更新: {account_data}")
-            # 这里可以处理账户余额、持仓等更新
+            WS_MESSAGES.labels("account", "").inc()
+            self.logger.debug("账户 %s 更新: %s", account_id, account_data)
+            
+            for callback in self.account_callbacks:
+                try:
+                    callback(account_id, account_data)
+                except Exception as e:
+                    self.logger.error(f"账户回调执行失败: {e}")
         except Exception as e:
             self.logger.error(f"处理账户更新失败: {e}")
     
+    def add_account_callback(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """添加账户流回调"""
+        self.account_callbacks.append(callback)
+        self.logger.info(f"添加账户回调，当前回调数量: {len(self.account_callbacks)}")
+    
+    def remove_account_callback(self, callback: Callable[[str, Dict[str, Any]], None]):
+        """移除账户流回调"""
+        if callback in self.account_callbacks:
+            self.account_callbacks.remove(callback)
+            self.logger.info(f"移除账户回调，当前回调数量: {len(self.account_callbacks)}")
+    
     def _trigger_tick_callbacks(self, market_id: int, tick_data: Dict[str, Any]):
         """触发tick数据回调"""
         for callback in self.tick_callbacks:
@@ -925,5 +1181,14 @@ class DataManager:
     async def close(self):
         """关闭数据管理器"""
         await self.stop_websocket()
+        for task in (self.bar_task, self.reconcile_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self.recorder is not None:
+            self.recorder.close()
         if self.api_client:
             await self.api_client.close()
@@ -0,0 +1,256 @@
+"""
+事件总线
+按市场索引订阅，每个订阅者一个有界邮箱：tick按市场合并为最新值，
+订单/成交与K线收盘事件走优先通道，由订阅者自己的任务按序处理
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+
+class EventType(Enum):
+    """事件类型"""
+    TICK = "tick"
+    BAR_CLOSE = "bar_close"
+    ORDER = "order"
+    FILL = "fill"
+
+
+# 优先通道: 0 = 订单/成交，1 = K线收盘；tick不排队，按市场合并后最后处理
+EVENT_LANES = {
+    EventType.ORDER: 0,
+    EventType.FILL: 0,
+    EventType.BAR_CLOSE: 1,
+}
+
+
+@dataclass
+class Event:
+    """总线事件"""
+    event_type: EventType
+    market_id: Optional[int]
+    payload: Any
+    created_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class SubscriberStats:
+    """订阅者背压统计"""
+    received: int = 0       # 投递到邮箱的事件数
+    processed: int = 0      # 处理完成的事件数
+    conflated: int = 0      # 被同市场更新的tick覆盖的数量
+    dropped: int = 0        # 邮箱满时丢弃的最旧事件数
+    errors: int = 0         # 处理异常次数
+    max_depth: int = 0      # 邮箱最大积压
+    last_latency: float = 0.0   # 最近一次事件从发布到处理完成的耗时（秒）
+    max_latency: float = 0.0
+
+
+class Mailbox:
+    """
+    有界邮箱
+
+    tick按市场只保留最新一条（字典按首次到达顺序出队，同一市场不会乱序），
+    其余事件按优先级分道排队，每条通道满时丢弃最旧事件
+    """
+
+    def __init__(self, capacity: int, stats: SubscriberStats):
+        self.capacity = capacity
+        self.stats = stats
+        self._lanes: Tuple[Deque[Event], ...] = (deque(), deque())
+        self._ticks: Dict[Optional[int], Event] = {}
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._lanes[0]) + len(self._lanes[1]) + len(self._ticks)
+
+    def put(self, event: Event):
+        """投递事件（同步，可在行情回调中直接调用）"""
+        self.stats.received += 1
+
+        if event.event_type == EventType.TICK:
+            if event.market_id in self._ticks:
+                self.stats.conflated += 1
+            self._ticks[event.market_id] = event
+        else:
+            lane = self._lanes[EVENT_LANES[event.event_type]]
+            if len(lane) >= self.capacity:
+                lane.popleft()
+                self.stats.dropped += 1
+            lane.append(event)
+
+        depth = len(self)
+        if depth > self.stats.max_depth:
+            self.stats.max_depth = depth
+        self._ready.set()
+
+    def get_nowait(self) -> Optional[Event]:
+        """按优先级取出一条事件，邮箱为空时返回None"""
+        for lane in self._lanes:
+            if lane:
+                return lane.popleft()
+        if self._ticks:
+            market_id = next(iter(self._ticks))
+            return self._ticks.pop(market_id)
+        return None
+
+    async def get(self) -> Event:
+        """等待并取出一条事件"""
+        while True:
+            event = self.get_nowait()
+            if event is not None:
+                return event
+            self._ready.clear()
+            await self._ready.wait()
+
+
+EventHandler = Callable[[Event], Awaitable[None]]
+
+
+class Subscriber:
+    """订阅者：一个邮箱 + 一个按序消费的任务"""
+
+    def __init__(self, name: str, handler: EventHandler, capacity: int, logger: logging.Logger):
+        self.name = name
+        self.handler = handler
+        self.logger = logger
+        self.stats = SubscriberStats()
+        self.mailbox = Mailbox(capacity, self.stats)
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        self.task = None
+
+    async def _run(self):
+        while True:
+            event = await self.mailbox.get()
+            try:
+                await self.handler(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats.errors += 1
+                self.logger.error(f"订阅者 {self.name} 处理{event.event_type.value}事件失败: {e}")
+            latency = time.monotonic() - event.created_at
+            self.stats.processed += 1
+            self.stats.last_latency = latency
+            if latency > self.stats.max_latency:
+                self.stats.max_latency = latency
+
+
+class EventBus:
+    """
+    事件总线
+
+    订阅按 (事件类型, 市场ID) 建立索引，发布时只触达关注该市场的订阅者
+    （market_ids为None的订阅者接收所有市场）；发布为同步O(订阅者数)操作，
+    内存由每个邮箱的容量和tick的按市场合并限定
+    """
+
+    def __init__(self, mailbox_capacity: int = 1024, logger: Optional[logging.Logger] = None):
+        """
+        初始化事件总线
+
+        Args:
+            mailbox_capacity: 每个订阅者每条优先通道的容量
+            logger: 日志器
+        """
+        self.mailbox_capacity = mailbox_capacity
+        self.logger = logger or logging.getLogger(__name__)
+        self.subscribers: List[Subscriber] = []
+        self._routes: Dict[Tuple[EventType, Optional[int]], List[Subscriber]] = {}
+        self.is_running = False
+        self.published: Dict[EventType, int] = {event_type: 0 for event_type in EventType}
+
+    def subscribe(self, name: str, handler: EventHandler, event_types: Iterable[EventType],
+                  market_ids: Optional[Iterable[int]] = None) -> Subscriber:
+        """
+        订阅事件
+
+        Args:
+            name: 订阅者名称（用于统计）
+            handler: 异步事件处理函数
+            event_types: 订阅的事件类型
+            market_ids: 关注的市场，None表示全部市场
+
+        Returns:
+            订阅者对象（用于取消订阅和查看统计）
+        """
+        subscriber = Subscriber(name, handler, self.mailbox_capacity, self.logger)
+        keys = [None] if market_ids is None else list(market_ids)
+        for event_type in event_types:
+            for market_id in keys:
+                self._routes.setdefault((event_type, market_id), []).append(subscriber)
+
+        self.subscribers.append(subscriber)
+        if self.is_running:
+            subscriber.start()
+        return subscriber
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        """取消订阅"""
+        for route in self._routes.values():
+            if subscriber in route:
+                route.remove(subscriber)
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        await subscriber.stop()
+
+    def publish(self, event_type: EventType, market_id: Optional[int], payload: Any):
+        """发布事件（同步，不等待处理）"""
+        self.published[event_type] += 1
+        event = Event(event_type, market_id, payload)
+        for subscriber in self._routes.get((event_type, market_id), ()):
+            subscriber.mailbox.put(event)
+        if market_id is not None:
+            for subscriber in self._routes.get((event_type, None), ()):
+                subscriber.mailbox.put(event)
+
+    async def start(self):
+        """启动所有订阅者的消费任务"""
+        self.is_running = True
+        for subscriber in self.subscribers:
+            subscriber.start()
+        self.logger.info(f"事件总线已启动，订阅者数量: {len(self.subscribers)}")
+
+    async def stop(self):
+        """停止所有消费任务"""
+        self.is_running = False
+        for subscriber in self.subscribers:
+            await subscriber.stop()
+        self.logger.info("事件总线已停止")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各订阅者的积压、合并、丢弃与延迟统计"""
+        return {
+            "published": {event_type.value: count for event_type, count in self.published.items()},
+            "subscribers": {
+                subscriber.name: {
+                    "depth": len(subscriber.mailbox),
+                    "received": subscriber.stats.received,
+                    "processed": subscriber.stats.processed,
+                    "conflated": subscriber.stats.conflated,
+                    "dropped": subscriber.stats.dropped,
+                    "errors": subscriber.stats.errors,
+                    "max_depth": subscriber.stats.max_depth,
+                    "last_latency_ms": subscriber.stats.last_latency * 1000,
+                    "max_latency_ms": subscriber.stats.max_latency * 1000,
+                }
+                for subscriber in self.subscribers
+            }
+        }
@@ -0,0 +1,417 @@
+"""
+行情录制与回放
+把WebSocket收到的原始消息（订单簿、账户）与REST K线快照追加写入压缩的二进制日志，
+并按原始时间间隔（1x / Nx / 最快速度）回放到 WsClient.on_message 与 DataManager，
+用于复现线上问题、确定性回归测试和离线吞吐基准
+
+文件格式（每个分块一个 .qtmd 文件 + 一个 .idx 时间索引）:
+    文件头   <4sBB>  魔数 b"QTMD", 版本, 压缩方式
+    数据块   <IIIqq> 压缩后长度, 原始长度, 记录数, 首条时间(ns), 末条时间(ns)，之后是压缩数据
+    记录     <BqI>   类型, 时间(ns), 负载长度，之后是负载（WebSocket原始消息或K线快照JSON）
+    索引项   <qqQI>  首条时间(ns), 末条时间(ns), 数据块在文件中的偏移, 记录数
+"""
+
+import asyncio
+import glob
+import json
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from enum import IntEnum
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from ..utils.clock import SimulatedClock
+from ..utils.logger import setup_logger
+
+
+MAGIC = b"QTMD"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sBB")
+BLOCK_HEADER = struct.Struct("<IIIqq")
+RECORD_HEADER = struct.Struct("<BqI")
+INDEX_ENTRY = struct.Struct("<qqQI")
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+
+
+class RecordKind(IntEnum):
+    """记录类型"""
+    WS_MESSAGE = 1     # WebSocket原始消息（订单簿快照/增量、账户推送）
+    CANDLES = 2        # REST K线快照 {"market_id", "mode": "merge"/"reconcile", "candles"}
+
+
+# 读取出的一条记录: (类型, 时间ns, 负载)
+Record = Tuple[RecordKind, int, bytes]
+
+
+class MarketDataRecorder:
+    """
+    行情录制器
+
+    记录先在内存中攒成数据块（默认64KB），攒满后交给单独的写线程压缩并写盘，
+    调用方（事件循环）只做一次拼接；文件超过分块大小或时长后切换到新文件
+    """
+
+    def __init__(self, directory: str, prefix: str = "market", block_bytes: int = 64 * 1024,
+                 chunk_bytes: int = 64 * 1024 * 1024, chunk_seconds: float = 3600.0,
+                 compression_level: int = 1):
+        """
+        Args:
+            directory: 录制目录
+            prefix: 文件名前缀
+            block_bytes: 数据块大小（压缩前）
+            chunk_bytes: 单个文件的最大大小（压缩后）
+            chunk_seconds: 单个文件覆盖的最长时间
+            compression_level: zlib压缩级别，0表示不压缩
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.block_bytes = block_bytes
+        self.chunk_bytes = chunk_bytes
+        self.chunk_seconds = chunk_seconds
+        self.compression_level = compression_level
+        self.logger = setup_logger("MarketDataRecorder")
+        os.makedirs(directory, exist_ok=True)
+
+        # 当前数据块（调用方线程）
+        self._parts: List[bytes] = []
+        self._block_size = 0
+        self._block_count = 0
+        self._block_first_ts = 0
+        self._block_last_ts = 0
+
+        # 当前文件（写线程）
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="market_recorder")
+        self._pending: Optional[Future] = None
+        self._file = None
+        self._index = None
+        self._file_started = 0.0
+        self._sequence = 0
+        self.files: List[str] = []
+
+        self.records = 0
+        self.bytes_raw = 0
+        self.bytes_written = 0
+        self.closed = False
+
+    # ==========================================
+    # 录制
+    # ==========================================
+
+    def record(self, kind: RecordKind, payload: Union[bytes, str], timestamp_ns: Optional[int] = None):
+        """追加一条记录"""
+        if self.closed:
+            return
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        if self._block_count == 0:
+            self._block_first_ts = timestamp_ns
+        self._block_last_ts = timestamp_ns
+        self._parts.append(RECORD_HEADER.pack(kind, timestamp_ns, len(payload)))
+        self._parts.append(payload)
+        self._block_size += RECORD_HEADER.size + len(payload)
+        self._block_count += 1
+        self.records += 1
+        if self._block_size >= self.block_bytes:
+            self._submit_block()
+
+    def record_ws_message(self, message: Union[str, bytes, Dict[str, Any]], timestamp_ns: Optional[int] = None):
+        """记录一条WebSocket原始消息（已解析的字典会重新序列化）"""
+        if isinstance(message, dict):
+            message = json.dumps(message, separators=(",", ":"))
+        self.record(RecordKind.WS_MESSAGE, message, timestamp_ns)
+
+    def record_candles(self, market_id: int, candles: Sequence[Dict[str, Any]], mode: str = "merge",
+                       timestamp_ns: Optional[int] = None):
+        """记录一次REST K线快照（mode与DataManager写入缓存的方式一致: merge / reconcile）"""
+        payload = json.dumps({"market_id": market_id, "mode": mode, "candles": list(candles)},
+                             separators=(",", ":"), default=float)
+        self.record(RecordKind.CANDLES, payload, timestamp_ns)
+
+    def instrument_ws_client(self, ws_client):
+        """包装WsClient.on_message，在处理前记录收到的原始消息"""
+        on_message = ws_client.on_message
+        recorder = self
+
+        @wraps(on_message)
+        def recorded_on_message(ws, message):
+            recorder.record_ws_message(message)
+            return on_message(ws, message)
+
+        ws_client.on_message = recorded_on_message
+        return ws_client
+
+    # ==========================================
+    # 写盘（写线程）
+    # ==========================================
+
+    def _submit_block(self):
+        if not self._block_count:
+            return
+        raw = b"".join(self._parts)
+        block = (raw, self._block_count, self._block_first_ts, self._block_last_ts)
+        self._parts = []
+        self._block_size = 0
+        self._block_count = 0
+        self.bytes_raw += len(raw)
+        self._pending = self._executor.submit(self._write_block, *block)
+
+    def _open_chunk(self, first_ts: int):
+        started = datetime.fromtimestamp(first_ts / 1e9).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, f"{self.prefix}-{started}-{self._sequence:04d}.qtmd")
+        self._sequence += 1
+        codec = CODEC_ZLIB if self.compression_level > 0 else CODEC_NONE
+        self._file = open(path, "wb")
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, codec))
+        self._index = open(path[:-5] + ".idx", "wb")
+        self._file_started = time.time()
+        self.files.append(path)
+        self.logger.info(f"开始录制文件: {path}")
+
+    def _close_chunk(self):
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+
+    def _write_block(self, raw: bytes, count: int, first_ts: int, last_ts: int):
+        try:
+            if self._file is not None and (self._file.tell() >= self.chunk_bytes
+                                           or time.time() - self._file_started >= self.chunk_seconds):
+                self._close_chunk()
+            if self._file is None:
+                self._open_chunk(first_ts)
+            data = zlib.compress(raw, self.compression_level) if self.compression_level > 0 else raw
+            offset = self._file.tell()
+            self._file.write(BLOCK_HEADER.pack(len(data), len(raw), count, first_ts, last_ts))
+            self._file.write(data)
+            self._file.flush()
+            self._index.write(INDEX_ENTRY.pack(first_ts, last_ts, offset, count))
+            self._index.flush()
+            self.bytes_written += BLOCK_HEADER.size + len(data)
+        except Exception as e:
+            self.logger.error(f"写入行情录制文件失败: {e}")
+
+    def flush(self):
+        """写出当前未满的数据块并等待写盘完成"""
+        self._submit_block()
+        if self._pending is not None:
+            self._pending.result()
+
+    def close(self):
+        """写出剩余数据并关闭文件"""
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self._executor.submit(self._close_chunk).result()
+        self._executor.shutdown(wait=True)
+        self.logger.info(f"行情录制结束: {self.records} 条记录, 原始 {self.bytes_raw} 字节, "
+                         f"写入 {self.bytes_written} 字节, 文件 {len(self.files)} 个")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """录制统计"""
+        return {
+            "records": self.records,
+            "bytes_raw": self.bytes_raw,
+            "bytes_written": self.bytes_written,
+            "files": list(self.files),
+        }
+
+
+class MarketDataReader:
+    """行情录制文件读取器（按文件名顺序读取目录下所有分块，可按时间范围借助索引跳过数据块）"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 录制目录，或单个 .qtmd 文件
+        """
+        if os.path.isdir(path):
+            self.files = sorted(glob.glob(os.path.join(path, "*.qtmd")))
+        else:
+            self.files = [path]
+        if not self.files:
+            raise FileNotFoundError(f"没有找到行情录制文件: {path}")
+
+    @staticmethod
+    def read_index(path: str) -> List[Tuple[int, int, int, int]]:
+        """读取分块的时间索引 [(首条时间, 末条时间, 偏移, 记录数)]；索引缺失时扫描数据块头重建"""
+        index_path = path[:-5] + ".idx"
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            return [entry for entry in INDEX_ENTRY.iter_unpack(data[:usable])]
+
+        entries = []
+        with open(path, "rb") as f:
+            f.seek(FILE_HEADER.size)
+            while True:
+                offset = f.tell()
+                header = f.read(BLOCK_HEADER.size)
+                if len(header) < BLOCK_HEADER.size:
+                    break
+                compressed_len, _, count, first_ts, last_ts = BLOCK_HEADER.unpack(header)
+                entries.append((first_ts, last_ts, offset, count))
+                f.seek(compressed_len, os.SEEK_CUR)
+        return entries
+
+    def time_range(self) -> Tuple[int, int]:
+        """录制覆盖的时间范围（ns）"""
+        first = [entries[0][0] for entries in map(self.read_index, self.files) if entries]
+        last = [entries[-1][1] for entries in map(self.read_index, self.files) if entries]
+        return (min(first), max(last)) if first else (0, 0)
+
+    def __iter__(self) -> Iterator[Record]:
+        return self.read()
+
+    def read(self, start_ns: Optional[int] = None, end_ns: Optional[int] = None,
+             kinds: Optional[Sequence[RecordKind]] = None) -> Iterator[Record]:
+        """
+        按录制顺序读取记录
+
+        Args:
+            start_ns: 起始时间（含），None表示从头
+            end_ns: 结束时间（含），None表示到尾
+            kinds: 只读取这些类型
+        """
+        kinds = set(kinds) if kinds else None
+        for path in self.files:
+            entries = self.read_index(path)
+            with open(path, "rb") as f:
+                magic, version, codec = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+                if magic != MAGIC:
+                    raise ValueError(f"不是行情录制文件: {path}")
+                for first_ts, last_ts, offset, _ in entries:
+                    if (start_ns is not None and last_ts < start_ns) or (end_ns is not None and first_ts > end_ns):
+                        continue
+                    f.seek(offset)
+                    header = f.read(BLOCK_HEADER.size)
+                    if len(header) < BLOCK_HEADER.size:
+                        break
+                    compressed_len, raw_len, count, _, _ = BLOCK_HEADER.unpack(header)
+                    data = f.read(compressed_len)
+                    if len(data) < compressed_len:
+                        break  # 录制中断导致的不完整数据块
+                    raw = zlib.decompress(data) if codec == CODEC_ZLIB else data
+                    yield from self._iter_block(raw, count, start_ns, end_ns, kinds)
+
+    @staticmethod
+    def _iter_block(raw: bytes, count: int, start_ns: Optional[int], end_ns: Optional[int],
+                    kinds: Optional[set]) -> Iterator[Record]:
+        position = 0
+        header_size = RECORD_HEADER.size
+        unpack_from = RECORD_HEADER.unpack_from
+        for _ in range(count):
+            kind, timestamp_ns, length = unpack_from(raw, position)
+            position += header_size
+            payload = raw[position:position + length]
+            position += length
+            if start_ns is not None and timestamp_ns < start_ns:
+                continue
+            if end_ns is not None and timestamp_ns > end_ns:
+                return
+            if kinds is None or kind in kinds:
+                yield RecordKind(kind), timestamp_ns, payload
+
+
+class MarketDataReplayer:
+    """
+    行情回放器
+
+    WebSocket消息送入 WsClient.on_message（订单簿合并、DataManager回调、K线合成与事件总线发布
+    都与实盘走同一条路径），K线快照按录制时的方式写入DataManager缓存。
+    speed为1按原始节奏回放，N为N倍速，0为最快速度（每批消息之间让出事件循环）。
+    传入模拟时钟时，每条记录处理前把时钟推进到其录制时间，策略与各管理器按行情时间运行
+    """
+
+    def __init__(self, reader: MarketDataReader, speed: float = 0.0, yield_every: int = 256,
+                 clock: Optional[SimulatedClock] = None):
+        """
+        Args:
+            reader: 录制文件读取器
+            speed: 回放速度倍数，0表示最快
+            yield_every: 最快速度时每回放多少条消息让出一次事件循环
+            clock: 由录制时间驱动的模拟时钟（通常与引擎/DataManager共用）
+        """
+        self.reader = reader
+        self.speed = speed
+        self.yield_every = yield_every
+        self.clock = clock
+        self.logger = setup_logger("MarketDataReplayer")
+        self.messages = 0
+        self.candle_snapshots = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    async def run(self, ws_client=None, data_manager=None,
+                  start_ns: Optional[int] = None, end_ns: Optional[int] = None) -> Dict[str, Any]:
+        """
+        回放录制
+
+        Args:
+            ws_client: 接收WebSocket消息的WsClient（通常由 DataManager.attach_replay_client 创建）
+            data_manager: 接收K线快照的DataManager
+            start_ns: 起始时间
+            end_ns: 结束时间
+
+        Returns:
+            回放统计
+        """
+        started = time.perf_counter()
+        first_ts = None
+        since_yield = 0
+        for kind, timestamp_ns, payload in self.reader.read(start_ns, end_ns):
+            if first_ts is None:
+                first_ts = timestamp_ns
+            if self.speed > 0:
+                delay = (timestamp_ns - first_ts) / 1e9 / self.speed - (time.perf_counter() - started)
+                if delay > 0.0005:
+                    await asyncio.sleep(delay)
+                    since_yield = 0
+            if self.clock is not None:
+                self.clock.set_time(timestamp_ns)
+            try:
+                if kind == RecordKind.WS_MESSAGE:
+                    # 连接确认需要向真实连接发送订阅请求，回放时跳过；
+                    # 其余消息以原始文本送入，JSON解析也与实盘一样由WsClient完成
+                    if ws_client is not None and not self._is_connected_message(payload):
+                        ws_client.on_message(None, payload.decode("utf-8"))
+                    self.messages += 1
+                elif kind == RecordKind.CANDLES and data_manager is not None:
+                    snapshot = json.loads(payload)
+                    data_manager.apply_candle_snapshot(snapshot["market_id"], snapshot["candles"], snapshot["mode"])
+                    self.candle_snapshots += 1
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"回放消息失败: {e}")
+            since_yield += 1
+            if since_yield >= self.yield_every:
+                since_yield = 0
+                await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.elapsed = time.perf_counter() - started
+        return self.get_stats()
+
+    @staticmethod
+    def _is_connected_message(payload: bytes) -> bool:
+        return b'"connected"' in payload and json.loads(payload).get("type") == "connected"
+
+    def get_stats(self) -> Dict[str, Any]:
+        """回放统计"""
+        return {
+            "messages": self.messages,
+            "candle_snapshots": self.candle_snapshots,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "messages_per_sec": self.messages / self.elapsed if self.elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,65 @@
+"""
+指标HTTP服务
+在交易进程内以独立端口提供Prometheus文本格式的 /metrics
+"""
+
+import logging
+from typing import Callable, List, Optional
+
+from aiohttp import web
+
+
+# 指标提供者: 返回Prometheus文本格式的字符串
+MetricsProvider = Callable[[], str]
+
+
+class MetricsServer:
+    """Prometheus指标HTTP服务"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, port: int, host: str = "127.0.0.1", logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            port: 监听端口
+            host: 监听地址（默认只监听本机）
+            logger: 日志器
+        """
+        self.port = port
+        self.host = host
+        self.logger = logger or logging.getLogger(__name__)
+        self.providers: List[MetricsProvider] = []
+        self._runner: Optional[web.AppRunner] = None
+
+    def add_provider(self, provider: MetricsProvider):
+        """添加指标提供者"""
+        self.providers.append(provider)
+
+    def render(self) -> str:
+        """拼接所有提供者的指标文本"""
+        chunks = []
+        for provider in self.providers:
+            try:
+                chunks.append(provider())
+            except Exception as e:
+                self.logger.error(f"生成指标失败: {e}")
+        return "".join(chunks)
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.render().encode("utf-8"), headers={"Content-Type": self.CONTENT_TYPE})
+
+    async def start(self):
+        """启动HTTP服务"""
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.logger.info(f"指标服务已启动: http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        """停止HTTP服务"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self.logger.info("指标服务已停止")
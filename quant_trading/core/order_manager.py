@@ -5,15 +5,20 @@
 
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+import time
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 import lighter
 import lighter.exceptions
+from lighter.api.order_api import OrderApi
 
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.latency import LatencyStage, LatencyTracker
+from ..utils.metrics import ORDER_SUBMIT_LATENCY
 from ..notifications.notification_manager import NotificationManager
 
 
@@ -84,7 +89,7 @@ class Order:
 class OrderManager:
     """订单管理器"""
     
-    def __init__(self, signer_client: lighter.SignerClient, config: Config, notification_manager: Optional[NotificationManager] = None, data_manager=None, position_manager=None):
+    def __init__(self, signer_client: lighter.SignerClient, config: Config, notification_manager: Optional[NotificationManager] = None, data_manager=None, position_manager=None, risk_manager=None):
         """
         初始化订单管理器
         
@@ -94,13 +99,16 @@ class OrderManager:
             notification_manager: 通知管理器
             data_manager: 数据管理器（用于获取当前价格进行滑点检查和市场规则）
             position_manager: 持仓管理器（用于订单后持仓同步）
+            risk_manager: 风险管理器（用于签名前的下单风控检查）
         """
         self.signer_client = signer_client
         self.config = config
         self.logger = setup_logger("OrderManager", config.log_level)
+        self.clock: Clock = REALTIME_CLOCK
         self.notification_manager = notification_manager
         self.data_manager = data_manager
         self.position_manager = position_manager
+        self.risk_manager = risk_manager
         
         # 价格滑点容忍度（默认0.05%）
         self.price_slippage_tolerance = 0.0005  # 0.05%
@@ -131,6 +139,15 @@ class OrderManager:
         # 客户端订单索引计数器
         self.client_order_index = 0
         
+        # 订单状态变化回调（提交/拒绝/取消后触发）
+        self.order_callbacks: List[Callable[[Order], None]] = []
+        
+        # 新订单信号：create_order后唤醒提交任务，无需等待轮询
+        self._pending_signal = asyncio.Event()
+        
+        # 热路径延迟埋点（引擎通过set_latency_tracker注入共享实例）
+        self.latency = LatencyTracker(enabled=False)
+        
     async def initialize(self):
         """初始化订单管理器"""
         self.logger.info("初始化订单管理器...")
@@ -204,35 +221,84 @@ class OrderManager:
         
     async def process_orders(self):
         """处理订单"""
+        await self.submit_pending_orders()
+        await self.check_submitted_orders()
+    
+    async def submit_pending_orders(self):
+        """提交所有待处理订单"""
         try:
-            # 检查待处理订单
             pending_orders = [order for order in self.orders.values() if order.status == OrderStatus.PENDING]
             
             for order in pending_orders:
                 await self._submit_order(order)
                 
-            # 检查已提交订单的状态
-            submitted_orders = [order for order in self.orders.values() if order.status == OrderStatus.SUBMITTED]
-            
-            for order in submitted_orders:
-                await self._check_order_status(order)
-                
         except Exception as e:
             self.logger.error(f"处理订单失败: {e}")
+    
+    async def check_submitted_orders(self):
+        """检查已提交订单的状态（每个市场查询一次交易所订单）"""
+        try:
+            submitted_by_market: Dict[int, List[Order]] = {}
+            for order in self.orders.values():
+                if order.status == OrderStatus.SUBMITTED:
+                    submitted_by_market.setdefault(order.market_id, []).append(order)
+                    
+            for market_id, orders in submitted_by_market.items():
+                await self._check_market_orders(market_id, orders)
+                
+        except Exception as e:
+            self.logger.error(f"检查订单状态失败: {e}")
+    
+    async def run_submission_worker(self):
+        """订单提交任务：有新订单时立即提交，空闲时挂起等待"""
+        try:
+            while True:
+                await self._pending_signal.wait()
+                self._pending_signal.clear()
+                await self.submit_pending_orders()
+        except asyncio.CancelledError:
+            self.logger.info("订单提交任务被取消")
             
     async def _submit_order(self, order: Order):
-        """提交订单"""
+        """提交订单（风控、签名与发送的耗时归到下单的市场与策略）"""
+        started = time.perf_counter()
+        with self.latency.order_labels(order.order_id, order.market_id):
+            await self._submit_order_with_checks(order)
+        ORDER_SUBMIT_LATENCY.labels(order.market_id, order.status.value).observe(time.perf_counter() - started)
+            
+    async def _submit_order_with_checks(self, order: Order):
+        """风控检查后按订单类型提交"""
         try:
+            # 签名前风控检查（常数时间）
+            if self.risk_manager is not None:
+                with self.latency.span(LatencyStage.RISK_CHECK):
+                    passed, reason = self.risk_manager.check_order(
+                        order.market_id, order.side == OrderSide.BUY, order.size, order.price
+                    )
+                if not passed:
+                    self.logger.warning("订单 %s 未通过风控检查: %s", order.order_id, reason)
+                    order.status = OrderStatus.REJECTED
+                    return
+                    
             if order.order_type == OrderType.LIMIT:
                 await self._submit_limit_order(order)
             elif order.order_type == OrderType.MARKET:
                 await self._submit_market_order(order)
             else:
-                self.logger.warning(f"不支持的订单类型: {order.order_type}")
+                self.logger.warning("不支持的订单类型: %s", order.order_type)
+                
+            if self.risk_manager is not None and order.status == OrderStatus.SUBMITTED:
+                self.risk_manager.record_order(order.size * order.price)
+                # 市价单提交即成交或被撤销，不占用挂单额度
+                if order.order_type == OrderType.MARKET:
+                    self.risk_manager.record_order_filled()
                 
         except Exception as e:
             self.logger.error(f"提交订单失败: {e}")
             order.status = OrderStatus.REJECTED
+        finally:
+            self.latency.order_sent(order.order_id, order.status in (OrderStatus.SUBMITTED, OrderStatus.FILLED))
+            self._notify_order_update(order)
             
     async def _submit_limit_order(self, order: Order):
         """提交限价订单"""
@@ -248,13 +314,10 @@ class OrderManager:
             base_amount_units = int(order.size / size_unit)  # 转换为Lighter的单位
             price_cents = int(order.price * 100)  # 转换为美分
             
-            self.logger.info(f"单位转换: 市场{order.market_id}使用size_unit={size_unit}, {order.size} → {base_amount_units} units")
-            
-            self.logger.debug(f"准备提交限价订单:")
-            self.logger.debug(f"  市场ID: {order.market_id}")
-            self.logger.debug(f"  数量: {order.size} → {base_amount_units} units")
-            self.logger.debug(f"  价格: {order.price} → {price_cents} cents")
-            self.logger.debug(f"  方向: {'卖出' if is_ask else '买入'}")
+            # 热路径日志使用%参数，由日志后台线程格式化
+            self.logger.debug("准备提交限价订单: 市场 %s, 数量 %s → %s units (size_unit=%s), 价格 %s → %s cents, 方向 %s",
+                              order.market_id, order.size, base_amount_units, size_unit, order.price, price_cents,
+                              "卖出" if is_ask else "买入")
             
             result = await self.signer_client.create_order(
                 market_index=order.market_id,
@@ -331,7 +394,8 @@ class OrderManager:
                     worst_acceptable_price = order.price * (1 + slippage_tolerance)
                 
                 price_cents = int(worst_acceptable_price * 100)  # 转换为美分
-                self.logger.info(f"滑点保护: 最差可接受价格 ${worst_acceptable_price:.6f} (容忍度: {slippage_tolerance*100:.1f}%)")
+                self.logger.debug("滑点保护: 最差可接受价格 $%.6f (容忍度: %.1f%%)",
+                                  worst_acceptable_price, slippage_tolerance * 100)
             else:
                 # 关闭滑点检测：使用宽松价格范围确保成交
                 if is_ask:  # 卖出订单：使用很低的价格确保能卖出
@@ -339,19 +403,15 @@ class OrderManager:
                 else:  # 买入订单：使用很高的价格确保能买入
                     price_cents = int(order.price * 2.0 * 100)  # 200%的价格
                 
-                self.logger.info(f"滑点检测已关闭: 使用宽松价格范围确保成交")
-            
-            self.logger.info(f"单位转换: 市场{order.market_id}使用size_unit={size_unit}, {order.size} → {base_amount_units} units")
+                self.logger.debug("滑点检测已关闭: 使用宽松价格范围确保成交")
             
             # Lighter SDK的BaseAmount限制（48位整数）
             MAX_BASE_AMOUNT = 281474976710655  # 2^48 - 1
             
-            self.logger.debug(f"准备提交市价订单:")
-            self.logger.debug(f"  市场ID: {order.market_id}")
-            self.logger.debug(f"  客户订单ID: {order.client_order_index}")
-            self.logger.debug(f"  数量: {order.size} → {base_amount_units} units (Lighter单位: 0.0001)")
-            self.logger.debug(f"  价格: {order.price} → {price_cents} cents (美分)")
-            self.logger.debug(f"  方向: {'卖出' if is_ask else '买入'}")
+            self.logger.debug("准备提交市价订单: 市场 %s, 客户订单ID %s, 数量 %s → %s units (size_unit=%s), "
+                              "价格 %s → %s cents, 方向 %s",
+                              order.market_id, order.client_order_index, order.size, base_amount_units, size_unit,
+                              order.price, price_cents, "卖出" if is_ask else "买入")
             
             # 参数验证
             if base_amount_units <= 0:
@@ -377,7 +437,6 @@ class OrderManager:
             
             # 市场规则检查 ⭐
             order_type_name = "市价单" if order.order_type == OrderType.MARKET else "限价单"
-            self.logger.info(f"开始校验订单参数 - 市场ID: {order.market_id}, 订单类型: {order_type_name}")
             
             if order.market_id in self.market_rules_cache:
                 market_rules = self.market_rules_cache[order.market_id]
@@ -391,23 +450,17 @@ class OrderManager:
                 
                 order_value = order.size * order.price
                 
-                # 打印当前市场规则
-                self.logger.info(f"市场 {order.market_id} ({symbol}) 的订单要求:")
-                self.logger.info(f"  ├─ 最小订单量: {min_base} {symbol} {'(自定义)' if is_custom_size else '(API)'}")
-                if is_custom_size:
-                    self.logger.info(f"  │   (API原始值: {api_min_base})")
-                self.logger.info(f"  ├─ 最小报价金额: ${min_quote:.6f} USDT {'(自定义)' if is_custom_quote else '(API)'}")
-                if is_custom_quote:
-                    self.logger.info(f"  │   (API原始值: ${api_min_quote:.6f})")
-                self.logger.info(f"  └─ 订单类型: {order_type_name}")
-                
-                # 打印您的订单参数
-                self.logger.info(f"您的订单参数:")
-                self.logger.info(f"  ├─ 订单数量: {order.size} {symbol}")
-                self.logger.info(f"  ├─ 订单价格: ${order.price:.6f}")
-                self.logger.info(f"  ├─ 订单价值: ${order_value:.6f} USDT")
-                self.logger.info(f"  ├─ 杠杆倍数: {order.leverage}x")
-                self.logger.info(f"  └─ 保证金模式: {'全仓' if order.margin_mode == MarginMode.CROSS else '逐仓'}")
+                # 市场规则与订单参数（一条结构化日志，JSON输出时extra字段单独成列）
+                self.logger.info(
+                    "校验%s: 市场 %s (%s), 数量 %s (最小 %s%s), 价值 $%.6f (最小 $%.6f%s), 杠杆 %sx, %s",
+                    order_type_name, order.market_id, symbol, order.size, min_base,
+                    f", 自定义, API {api_min_base}" if is_custom_size else "",
+                    order_value, min_quote, f", 自定义, API ${api_min_quote:.6f}" if is_custom_quote else "",
+                    order.leverage, "全仓" if order.margin_mode == MarginMode.CROSS else "逐仓",
+                    extra={"order_id": order.order_id, "market_id": order.market_id, "size": order.size,
+                           "price": order.price, "order_value": order_value,
+                           "min_base_amount": min_base, "min_quote_amount": min_quote}
+                )
                 
                 # 检查最小订单量
                 if min_base > 0:
@@ -429,7 +482,7 @@ class OrderManager:
                         order.status = OrderStatus.REJECTED
                         return
                     else:
-                        self.logger.info(f"  ✅ 订单量检查通过: {order.size} >= {min_base}")
+                        self.logger.debug("订单量检查通过: %s >= %s", order.size, min_base)
                 
                 # 检查最小报价金额
                 if min_quote > 0:
@@ -458,12 +511,12 @@ class OrderManager:
                         order.status = OrderStatus.REJECTED
                         return
                     else:
-                        self.logger.info(f"  ✅ 订单价值检查通过: ${order_value:.6f} >= ${min_quote:.6f}")
+                        self.logger.debug("订单价值检查通过: $%.6f >= $%.6f", order_value, min_quote)
                 
-                self.logger.info(f"✅ 市场规则校验通过 - 订单参数满足市场 {order.market_id} ({symbol}) 的所有要求")
+                self.logger.debug("市场规则校验通过: 市场 %s (%s)", order.market_id, symbol)
             else:
-                self.logger.warning(f"⚠️  市场 {order.market_id} 规则未加载，跳过市场规则检查")
-                self.logger.warning(f"  建议: 确保data_manager已初始化并加载了市场数据")
+                self.logger.warning("市场 %s 规则未加载，跳过市场规则检查（确保data_manager已初始化并加载了市场数据）",
+                                    order.market_id)
             
             # 使用订单传入的滑点配置
             slippage_tolerance = getattr(order, 'price_slippage_tolerance', self.price_slippage_tolerance)
@@ -472,10 +525,10 @@ class OrderManager:
             
             # 检查是否开启滑点检测
             if not slippage_enabled:
-                self.logger.info(f"✅ 市场 {order.market_id} 滑点检测已关闭，直接按市价成交")
+                self.logger.debug("市场 %s 滑点检测已关闭，直接按市价成交", order.market_id)
                 # 不return，继续执行订单提交
             else:
-                self.logger.info(f"🔍 滑点检测: 市场 {order.market_id}, 容忍度 {slippage_tolerance*100:.2f}%")
+                self.logger.debug("滑点检测: 市场 %s, 容忍度 %.2f%%", order.market_id, slippage_tolerance * 100)
                 
                 if self.data_manager is not None:
                     try:
@@ -489,43 +542,41 @@ class OrderManager:
                                 min_acceptable_price = order.price * (1 - slippage_tolerance)
                                 if current_price < min_acceptable_price:
                                     slippage_pct = ((order.price - current_price) / order.price) * 100
-                                    self.logger.warning(f"卖出价格滑点过大，订单拒绝:")
-                                    self.logger.warning(f"  订单价格: ${order.price:.4f}")
-                                    self.logger.warning(f"  当前价格: ${current_price:.4f}")
-                                    self.logger.warning(f"  价格滑点: {slippage_pct:.2f}%")
-                                    self.logger.warning(f"  容忍限制: {slippage_tolerance * 100:.2f}%")
-                                    self.logger.warning(f"  建议: 在config.yaml中增加price_slippage_tolerance")
+                                    self.logger.warning(
+                                        "卖出价格滑点过大，订单拒绝: 订单价格 $%.4f, 当前价格 $%.4f, 滑点 -%.2f%%, "
+                                        "容忍 %.2f%%（可在config.yaml中增加price_slippage_tolerance）",
+                                        order.price, current_price, slippage_pct, slippage_tolerance * 100,
+                                        extra={"order_id": order.order_id, "market_id": order.market_id,
+                                               "price": order.price, "current_price": current_price}
+                                    )
                                     order.status = OrderStatus.REJECTED
                                     return
                                 elif current_price < order.price:
                                     slippage_pct = ((order.price - current_price) / order.price) * 100
-                                    self.logger.info(f"卖出价格略低于预期，但在可接受范围内:")
-                                    self.logger.info(f"  订单价格: ${order.price:.4f}")
-                                    self.logger.info(f"  当前价格: ${current_price:.4f}")
-                                    self.logger.info(f"  价格差异: -{slippage_pct:.2f}% (可接受)")
+                                    self.logger.info("卖出价格略低于预期，在可接受范围内: 订单价格 $%.4f, 当前价格 $%.4f, "
+                                                     "差异 -%.2f%%", order.price, current_price, slippage_pct)
                             else:  # 买入订单
                                 # 当前价格不能超过订单价格的(1 + 滑点容忍度)
                                 max_acceptable_price = order.price * (1 + slippage_tolerance)
                                 if current_price > max_acceptable_price:
                                     slippage_pct = ((current_price - order.price) / order.price) * 100
-                                    self.logger.warning(f"买入价格滑点过大，订单拒绝:")
-                                    self.logger.warning(f"  订单价格: ${order.price:.4f}")
-                                    self.logger.warning(f"  当前价格: ${current_price:.4f}")
-                                    self.logger.warning(f"  价格滑点: +{slippage_pct:.2f}%")
-                                    self.logger.warning(f"  容忍限制: {slippage_tolerance * 100:.2f}%")
-                                    self.logger.warning(f"  建议: 在config.yaml中增加price_slippage_tolerance")
+                                    self.logger.warning(
+                                        "买入价格滑点过大，订单拒绝: 订单价格 $%.4f, 当前价格 $%.4f, 滑点 +%.2f%%, "
+                                        "容忍 %.2f%%（可在config.yaml中增加price_slippage_tolerance）",
+                                        order.price, current_price, slippage_pct, slippage_tolerance * 100,
+                                        extra={"order_id": order.order_id, "market_id": order.market_id,
+                                               "price": order.price, "current_price": current_price}
+                                    )
                                     order.status = OrderStatus.REJECTED
                                     return
                                 elif current_price > order.price:
                                     slippage_pct = ((current_price - order.price) / order.price) * 100
-                                    self.logger.info(f"买入价格略高于预期，但在可接受范围内:")
-                                    self.logger.info(f"  订单价格: ${order.price:.4f}")
-                                    self.logger.info(f"  当前价格: ${current_price:.4f}")
-                                    self.logger.info(f"  价格差异: +{slippage_pct:.2f}% (可接受)")
+                                    self.logger.info("买入价格略高于预期，在可接受范围内: 订单价格 $%.4f, 当前价格 $%.4f, "
+                                                     "差异 +%.2f%%", order.price, current_price, slippage_pct)
                         else:
-                            self.logger.warning(f"无法获取市场 {order.market_id} 的当前价格，跳过滑点检查")
+                            self.logger.warning("无法获取市场 %s 的当前价格，跳过滑点检查", order.market_id)
                     except Exception as e:
-                        self.logger.warning(f"价格滑点检查失败: {e}，继续提交订单")
+                        self.logger.warning("价格滑点检查失败: %s，继续提交订单", e)
                 else:
                     self.logger.debug("未配置data_manager，跳过价格滑点检查")
             
@@ -538,7 +589,7 @@ class OrderManager:
                     avg_execution_price=price_cents,  # 使用美分
                 is_ask=is_ask
             )
-                self.logger.debug(f"create_market_order 调用完成，返回值类型: {type(result)}")
+                self.logger.debug("create_market_order 调用完成，返回值类型: %s", type(result))
             except AttributeError as ae:
                 # Lighter SDK内部错误：'NoneType' object has no attribute 'code'
                 self.logger.error(f"Lighter SDK内部错误: {ae}")
@@ -631,40 +682,65 @@ class OrderManager:
             self.logger.error(traceback.format_exc())
             order.status = OrderStatus.REJECTED
             
-    async def _check_order_status(self, order: Order):
-        """检查订单状态 - 从Lighter API实际查询"""
+    async def _check_market_orders(self, market_id: int, orders: List[Order]):
+        """
+        查询一个市场已提交订单的交易所状态
+        
+        不在活跃订单中的订单再到非活跃订单中确认是成交还是撤销；两边都查不到的（交易所尚未索引）下次再查。
+        限价单成交或撤销后释放风控的挂单额度
+        """
         try:
-            # 从Lighter API查询订单状态
-            from lighter.api.order_api import OrderApi
-            
-            # 需要api_client来查询订单
-            # 注意：signer_client没有查询订单的方法，需要使用api_client
-            # 但OrderManager初始化时只传入了signer_client
-            # 这里我们暂时使用signer_client的内部api_client
-            
-            # 尝试查询订单历史来确认订单状态
-            # 注意：Lighter可能没有直接查询单个订单的API
-            # 我们需要查询账户的订单历史
-            
-            self.logger.debug(f"正在查询订单状态: {order.order_id} (market={order.market_id}, client_order_index={order.client_order_index})")
-            
-            # 由于Lighter API的限制，我们采用保守策略：
-            # 对于市价订单，等待一段时间后假设已成交或已取消
-            # 但不应该立即标记为已成交
-            
-            # 实际上，我们需要从账户的订单历史查询
-            # 但这需要api_client访问权限
-            
-            # 临时方案：不自动标记为FILLED，保持SUBMITTED状态
-            # 让用户通过监控任务查看实际状态
-            
-            # TODO: 实现真正的订单状态查询
-            # 需要访问 OrderApi.orders() 或类似方法
+            auth, error = self.signer_client.create_auth_token_with_expiry()
+            if error is not None:
+                self.logger.warning(f"创建认证令牌失败，跳过订单状态查询: {error}")
+                return
+                
+            order_api = OrderApi(self.signer_client.api_client)
+            account_index = self.signer_client.account_index
             
-            self.logger.debug(f"订单 {order.order_id} 保持SUBMITTED状态，等待手动确认或API状态更新")
+            active = await order_api.account_active_orders(account_index, market_id, auth=auth)
+            active_indexes = {remote.client_order_index for remote in active.orders}
+            closed = [order for order in orders if order.client_order_index not in active_indexes]
+            if not closed:
+                return
+                
+            inactive = await order_api.account_inactive_orders(account_index, limit=100, auth=auth,
+                                                               market_id=market_id)
+            history = {remote.client_order_index: remote for remote in inactive.orders}
+            for order in closed:
+                remote = history.get(order.client_order_index)
+                if remote is None:
+                    self.logger.debug("订单 %s 尚未出现在交易所订单中，下次再查", order.order_id)
+                    continue
+                self._apply_remote_status(order, remote)
                 
         except Exception as e:
-            self.logger.error(f"检查订单状态失败: {e}")
+            self.logger.error(f"检查订单状态失败 (市场 {market_id}): {e}")
+            
+    def _apply_remote_status(self, order: Order, remote: Any):
+        """按交易所的非活跃订单更新本地订单（成交数量、均价与最终状态）"""
+        filled_size = float(remote.filled_base_amount or 0)
+        if filled_size > 0:
+            order.filled_size = filled_size
+            order.filled_price = float(remote.filled_quote_amount or 0) / filled_size
+            
+        if remote.status == "filled":
+            order.status = OrderStatus.FILLED
+        elif remote.status.startswith("canceled"):
+            order.status = OrderStatus.CANCELLED
+        else:
+            return
+            
+        # 市价单提交时已释放挂单额度
+        if self.risk_manager is not None and order.order_type == OrderType.LIMIT:
+            if order.status == OrderStatus.FILLED:
+                self.risk_manager.record_order_filled()
+            else:
+                self.risk_manager.record_order_cancelled()
+                
+        self.logger.info("订单状态更新: %s -> %s (成交 %.6f @ %.6f, 交易所状态 %s)", order.order_id,
+                         order.status.value, order.filled_size, order.filled_price, remote.status)
+        self._notify_order_update(order)
             
     def create_order(self, market_id: int, side: OrderSide, order_type: OrderType,
                      size: float, price: float, leverage: float = 1.0,
@@ -690,7 +766,7 @@ class OrderManager:
         """
         try:
             # 生成订单ID
-            order_id = f"{market_id}_{self.client_order_index}_{int(datetime.now().timestamp())}"
+            order_id = f"{market_id}_{self.client_order_index}_{int(self.clock.time())}"
             
             # 创建订单
             order = Order(
@@ -703,7 +779,7 @@ class OrderManager:
                 status=OrderStatus.PENDING,
                 filled_size=0.0,
                 filled_price=0.0,
-                timestamp=datetime.now(),
+                timestamp=self.clock.now(),
                 client_order_index=self.client_order_index,
                 leverage=leverage,
                 margin_mode=margin_mode,
@@ -714,15 +790,22 @@ class OrderManager:
             # 添加到订单字典
             self.orders[order_id] = order
             
+            # 端到端延迟起点：触发本次决策的tick（策略名取自当前运行策略的上下文）
+            self.latency.order_created(order_id, market_id)
+            
             # 添加到历史记录
             self.order_history.append(order)
             
             # 增加客户端订单索引
             self.client_order_index += 1
             
+            # 唤醒订单提交任务
+            self._pending_signal.set()
+            
             # 打印订单信息（包括杠杆和保证金模式）
             margin_mode_zh = "全仓" if margin_mode == MarginMode.CROSS else "逐仓"
-            self.logger.info(f"创建订单: {order_id}, 市场 {market_id}, {side.value}, {order_type.value}, 大小 {size}, 价格 {price}, 杠杆 {leverage}x, 保证金模式 {margin_mode_zh}")
+            self.logger.info("创建订单: %s, 市场 %s, %s, %s, 大小 %s, 价格 %s, 杠杆 %sx, 保证金模式 %s",
+                             order_id, market_id, side.value, order_type.value, size, price, leverage, margin_mode_zh)
             
             return order
             
@@ -778,11 +861,16 @@ class OrderManager:
                 self.logger.error(f"取消订单失败: {err}")
                 return False
             elif tx is not None:
+                # 已提交的限价单占用挂单额度，撤单后释放
+                if (self.risk_manager is not None and order.status == OrderStatus.SUBMITTED
+                        and order.order_type == OrderType.LIMIT):
+                    self.risk_manager.record_order_cancelled()
                 order.status = OrderStatus.CANCELLED
                 log_msg = f"订单已取消: {order_id}"
                 if tx_hash:
                     log_msg += f", tx_hash: {tx_hash}"
                 self.logger.info(log_msg)
+                self._notify_order_update(order)
                 return True
             else:
                 self.logger.error(f"取消订单失败: 返回值异常")
@@ -792,6 +880,31 @@ class OrderManager:
             self.logger.error(f"取消订单失败: {e}")
             return False
             
+    def set_latency_tracker(self, latency: LatencyTracker):
+        """设置延迟埋点记录器"""
+        self.latency = latency
+        
+    def set_clock(self, clock: Clock):
+        """设置时钟（订单时间戳与订单ID使用）"""
+        self.clock = clock
+        
+    def add_order_callback(self, callback: Callable[[Order], None]):
+        """添加订单状态变化回调"""
+        self.order_callbacks.append(callback)
+    
+    def remove_order_callback(self, callback: Callable[[Order], None]):
+        """移除订单状态变化回调"""
+        if callback in self.order_callbacks:
+            self.order_callbacks.remove(callback)
+    
+    def _notify_order_update(self, order: Order):
+        """触发订单状态变化回调"""
+        for callback in self.order_callbacks:
+            try:
+                callback(order)
+            except Exception as e:
+                self.logger.error(f"订单回调执行失败: {e}")
+    
     def get_order(self, order_id: str) -> Optional[Order]:
         """获取订单"""
         return self.orders.get(order_id)
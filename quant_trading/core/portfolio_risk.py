@@ -0,0 +1,187 @@
+"""
+组合风险分析
+以NumPy滚动收益率矩阵维护所有订阅市场的协方差、相关性与组合VaR
+"""
+
+from statistics import NormalDist
+from typing import Dict, List, Optional, Any
+
+import numpy as np
+
+
+class PortfolioRisk:
+    """
+    组合风险分析器
+
+    每根K线调用一次update_bar，收益率写入环形矩阵，同时增量维护
+    列和与叉积和，协方差矩阵无需重新扫描整个窗口即可得到；
+    evaluate在一次向量化计算中给出净/总敞口、参数法VaR和历史VaR
+    """
+
+    def __init__(self, market_ids: Optional[List[int]] = None, window: int = 1440,
+                 confidence: float = 0.99):
+        """
+        初始化组合风险分析器
+
+        Args:
+            market_ids: 初始市场ID列表，新市场会在首次出现时自动加入
+            window: 滚动窗口长度（K线根数）
+            confidence: VaR置信度
+        """
+        self.window = window
+        self.confidence = confidence
+        self.z_score = NormalDist().inv_cdf(confidence)
+
+        self.market_index: Dict[int, int] = {}
+        self._returns = np.zeros((window, 0))
+        self._last_prices = np.zeros(0)
+        self._sum = np.zeros(0)
+        self._cross = np.zeros((0, 0))
+
+        # 环形写入位置与有效行数
+        self._pos = 0
+        self._count = 0
+
+        # 累计和会有浮点漂移，每写满一个窗口从矩阵重算一次
+        self._updates_since_rebuild = 0
+
+        for market_id in market_ids or []:
+            self._add_market(market_id)
+
+    def _add_market(self, market_id: int) -> int:
+        """新增一列市场，已有窗口内该市场收益率记为0"""
+        column = len(self.market_index)
+        self.market_index[market_id] = column
+
+        self._returns = np.hstack([self._returns, np.zeros((self.window, 1))])
+        self._last_prices = np.append(self._last_prices, np.nan)
+        self._sum = np.append(self._sum, 0.0)
+
+        cross = np.zeros((column + 1, column + 1))
+        cross[:column, :column] = self._cross
+        self._cross = cross
+
+        return column
+
+    def update_bar(self, prices: Dict[int, float]):
+        """
+        写入一根K线的收盘价
+
+        Args:
+            prices: {market_id: 收盘价}，缺失的市场本根收益率记为0
+        """
+        for market_id in prices:
+            if market_id not in self.market_index:
+                self._add_market(market_id)
+
+        price_vector = self._last_prices.copy()
+        for market_id, price in prices.items():
+            if price > 0:
+                price_vector[self.market_index[market_id]] = price
+
+        # 首根K线只记录价格，没有可计算的收益率
+        if np.isnan(self._last_prices).all():
+            self._last_prices = price_vector
+            return
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            row = price_vector / self._last_prices - 1.0
+        row[~np.isfinite(row)] = 0.0
+        self._last_prices = price_vector
+
+        # 淘汰最旧的一行
+        if self._count == self.window:
+            old_row = self._returns[self._pos]
+            self._sum -= old_row
+            self._cross -= np.outer(old_row, old_row)
+        else:
+            self._count += 1
+
+        self._returns[self._pos] = row
+        self._sum += row
+        self._cross += np.outer(row, row)
+        self._pos = (self._pos + 1) % self.window
+
+        self._updates_since_rebuild += 1
+        if self._updates_since_rebuild >= self.window:
+            self._rebuild_sums()
+
+    def _rebuild_sums(self):
+        """从收益率矩阵重算累计和"""
+        valid = self._valid_returns()
+        self._sum = valid.sum(axis=0)
+        self._cross = valid.T @ valid
+        self._updates_since_rebuild = 0
+
+    def _valid_returns(self) -> np.ndarray:
+        """窗口内的有效收益率行（顺序不影响统计量）"""
+        if self._count == self.window:
+            return self._returns
+        return self._returns[:self._count]
+
+    @property
+    def sample_count(self) -> int:
+        """窗口内有效样本数"""
+        return self._count
+
+    def covariance_matrix(self) -> np.ndarray:
+        """协方差矩阵（样本不足2个时返回零矩阵）"""
+        n = self._count
+        size = len(self.market_index)
+        if n < 2:
+            return np.zeros((size, size))
+        return (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+    def correlation_matrix(self) -> np.ndarray:
+        """相关系数矩阵（零波动市场的相关性记为0）"""
+        cov = self.covariance_matrix()
+        std = np.sqrt(np.clip(np.diag(cov), 0.0, None))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+        corr[~np.isfinite(corr)] = 0.0
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def exposure_vector(self, exposures: Dict[int, float]) -> np.ndarray:
+        """将 {market_id: 带方向名义敞口} 转换为按列排列的向量"""
+        weights = np.zeros(len(self.market_index))
+        for market_id, exposure in exposures.items():
+            column = self.market_index.get(market_id)
+            if column is not None:
+                weights[column] = exposure
+        return weights
+
+    def evaluate(self, exposures: Dict[int, float]) -> Dict[str, Any]:
+        """
+        计算组合风险指标
+
+        Args:
+            exposures: {market_id: 带方向名义敞口}，多头为正、空头为负
+
+        Returns:
+            净敞口、总敞口、组合波动、参数法VaR与历史VaR（均为金额，单根K线周期）
+        """
+        weights = self.exposure_vector(exposures)
+        exposure_values = np.fromiter(exposures.values(), dtype=float, count=len(exposures))
+
+        result = {
+            "net_exposure": float(exposure_values.sum()),
+            "gross_exposure": float(np.abs(exposure_values).sum()),
+            "portfolio_volatility": 0.0,
+            "parametric_var": 0.0,
+            "historical_var": 0.0,
+            "sample_count": self._count
+        }
+
+        if self._count < 2 or not weights.any():
+            return result
+
+        variance = float(weights @ self.covariance_matrix() @ weights)
+        volatility = np.sqrt(max(variance, 0.0))
+        result["portfolio_volatility"] = float(volatility)
+        result["parametric_var"] = float(self.z_score * volatility)
+
+        pnl = self._valid_returns() @ weights
+        result["historical_var"] = float(max(-np.quantile(pnl, 1.0 - self.confidence), 0.0))
+
+        return result
@@ -9,6 +9,7 @@ from datetime import datetime
 from dataclasses import dataclass
 from enum import Enum
 
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
 
@@ -58,6 +59,7 @@ class PositionManager:
         """
         self.config = config
         self.logger = setup_logger("PositionManager", config.log_level)
+        self.clock: Clock = REALTIME_CLOCK
         
         # 仓位字典 {market_id: Position}
         self.positions: Dict[int, Position] = {}
@@ -65,6 +67,16 @@ class PositionManager:
         # 仓位历史
         self.position_history: List[Position] = []
         
+        # 组合汇总（随开平仓和每个tick增量维护，避免get_*时遍历求和）
+        self._total_unrealized_pnl = 0.0
+        self._total_realized_pnl = 0.0
+        self._total_margin = 0.0
+        self._side_counts: Dict[PositionSide, int] = {PositionSide.LONG: 0, PositionSide.SHORT: 0}
+        
+        # 对账状态：账户流推送的持仓即为对账结果，REST同步只在账户流长时间静默时兜底
+        self.reconcile_interval = config.trading_config.get("position_reconcile_interval", 300)
+        self.last_reconcile_time: Optional[datetime] = None
+        
         # API客户端引用（稍后设置）
         self.api_client = None
         self.signer_client = None
@@ -75,6 +87,10 @@ class PositionManager:
         self.signer_client = signer_client
         self.logger.info("API客户端已设置")
         
+    def set_clock(self, clock: Clock):
+        """设置时钟"""
+        self.clock = clock
+        
     async def initialize(self):
         """初始化仓位管理器"""
         self.logger.info("初始化仓位管理器...")
@@ -148,7 +164,7 @@ class PositionManager:
                                     realized_pnl=0.0,
                                     leverage=leverage,
                                     margin=margin,
-                                    timestamp=datetime.now()
+                                    timestamp=self.clock.now()
                                 )
                                 
                                 self.positions[market_id] = position
@@ -173,42 +189,162 @@ class PositionManager:
             # 即使失败也清空缓存，避免使用过期的仓位信息
             self.positions.clear()
             self.logger.warning("已清空本地仓位缓存，避免使用过期信息")
+        finally:
+            # 持仓被整体替换，重建一次汇总；失败时同样等待一个对账周期再重试
+            self._rebuild_aggregates()
+            self.last_reconcile_time = self.clock.now()
             
     async def update_positions(self):
-        """更新仓位信息"""
+        """
+        更新仓位信息
+        
+        盯市由tick回调(on_tick)实时完成，这里只在账户流长时间没有推送时
+        通过REST兜底对账一次，因此可以在每次引擎循环或下单前廉价调用
+        """
         try:
-            # 定期从交易所同步持仓信息（每100次调用同步一次）
-            if not hasattr(self, '_update_counter'):
-                self._update_counter = 0
-            
-            self._update_counter += 1
-            if self._update_counter % 100 == 0:  # 每100次更新时同步一次
-                self.logger.info("执行定期持仓同步...")
+            if (self.last_reconcile_time is None or
+                    (self.clock.now() - self.last_reconcile_time).total_seconds() >= self.reconcile_interval):
+                self.logger.info("账户流长时间无持仓推送，执行REST持仓同步...")
                 await self._load_existing_positions()
-            
-            # 更新所有仓位的当前价格和未实现盈亏
-            for market_id, position in self.positions.items():
-                await self._update_position_price(position)
                 
         except Exception as e:
             self.logger.error(f"更新仓位失败: {e}")
             
-    async def _update_position_price(self, position: Position):
-        """更新仓位价格"""
+    def on_tick(self, market_id: int, tick_data: Dict[str, Any]):
+        """
+        实时tick回调 - 按最新价格对持仓盯市
+        
+        Args:
+            market_id: 市场ID
+            tick_data: tick数据，使用其中的price字段
+        """
+        position = self.positions.get(market_id)
+        if position is None:
+            return
+            
+        price = tick_data.get("price", 0)
+        if price > 0:
+            self._mark_position(position, price)
+            
+    def on_account_update(self, account_id: str, account_data: Dict[str, Any]):
+        """
+        账户流回调 - 用交易所推送的持仓对本地持仓进行对账
+        
+        Args:
+            account_id: 账户ID
+            account_data: account_all频道推送的消息
+        """
         try:
-            # 这里应该从市场数据获取当前价格
-            # 暂时使用模拟数据
-            current_price = position.current_price * (1 + (datetime.now().second % 10 - 5) * 0.001)
-            position.current_price = current_price
-            
-            # 计算未实现盈亏
-            if position.side == PositionSide.LONG:
-                position.unrealized_pnl = (current_price - position.entry_price) * position.size
-            else:
-                position.unrealized_pnl = (position.entry_price - current_price) * position.size
+            positions_data = account_data.get("positions")
+            if positions_data is None:
+                return
                 
+            if isinstance(positions_data, dict):
+                positions_data = positions_data.values()
+                
+            seen_markets = set()
+            for position_data in positions_data:
+                market_id = position_data.get("market_id")
+                if market_id is None:
+                    continue
+                market_id = int(market_id)
+                
+                size = abs(float(position_data.get("position", 0) or 0))
+                sign = int(position_data.get("sign", 0) or 0)
+                if size <= 0 or sign == 0:
+                    continue
+                    
+                seen_markets.add(market_id)
+                side = PositionSide.LONG if sign > 0 else PositionSide.SHORT
+                entry_price = float(position_data.get("avg_entry_price", 0) or 0)
+                margin = float(position_data.get("allocated_margin", 0) or 0)
+                
+                position = self.positions.get(market_id)
+                if position is None or position.side != side:
+                    if position is not None:
+                        # 反手：原仓位按最后盯市价格全部平掉
+                        self._realize(position, position.size, position.current_price)
+                        self._remove_from_aggregates(position)
+                    position = Position(
+                        market_id=market_id,
+                        side=side,
+                        size=size,
+                        entry_price=entry_price,
+                        current_price=entry_price,
+                        unrealized_pnl=0.0,
+                        realized_pnl=0.0,
+                        leverage=1.0,
+                        margin=margin,
+                        timestamp=self.clock.now()
+                    )
+                    self.positions[market_id] = position
+                    self._add_to_aggregates(position)
+                    self.logger.info(f"账户流对账: 新增持仓 市场{market_id}, {side.value}, 数量{size:.6f}")
+                else:
+                    if size < position.size:
+                        # 减仓部分按最后盯市价格计入已实现盈亏
+                        self._realize(position, position.size - size, position.current_price)
+                    self._total_margin += margin - position.margin
+                    position.size = size
+                    position.entry_price = entry_price
+                    position.margin = margin
+                    
+                self._mark_position(position, position.current_price)
+                
+            # 账户流中已不存在的持仓视为已平仓
+            for market_id in [m for m in self.positions if m not in seen_markets]:
+                position = self.positions.pop(market_id)
+                realized_pnl = self._realize(position, position.size, position.current_price)
+                self._remove_from_aggregates(position)
+                self.logger.info(f"账户流对账: 移除持仓 市场{market_id}, 实现盈亏 {realized_pnl:.4f}")
+                
+            self.last_reconcile_time = self.clock.now()
+            
         except Exception as e:
-            self.logger.error(f"更新仓位价格失败: {e}")
+            self.logger.error(f"账户流持仓对账失败: {e}")
+            
+    def _mark_position(self, position: Position, price: float):
+        """按价格对单个仓位盯市，并增量更新未实现盈亏汇总"""
+        position.current_price = price
+        
+        if position.side == PositionSide.LONG:
+            unrealized_pnl = (price - position.entry_price) * position.size
+        else:
+            unrealized_pnl = (position.entry_price - price) * position.size
+            
+        self._total_unrealized_pnl += unrealized_pnl - position.unrealized_pnl
+        position.unrealized_pnl = unrealized_pnl
+        
+    def _realize(self, position: Position, closed_size: float, price: float) -> float:
+        """按价格平掉仓位的closed_size部分，计入该仓位与组合的已实现盈亏（不修改仓位大小）"""
+        if position.side == PositionSide.LONG:
+            realized_pnl = (price - position.entry_price) * closed_size
+        else:
+            realized_pnl = (position.entry_price - price) * closed_size
+            
+        position.realized_pnl += realized_pnl
+        self._total_realized_pnl += realized_pnl
+        return realized_pnl
+        
+    def _add_to_aggregates(self, position: Position):
+        """将仓位计入组合汇总"""
+        self._total_unrealized_pnl += position.unrealized_pnl
+        self._total_margin += position.margin
+        self._side_counts[position.side] += 1
+        
+    def _remove_from_aggregates(self, position: Position):
+        """将仓位移出组合汇总"""
+        self._total_unrealized_pnl -= position.unrealized_pnl
+        self._total_margin -= position.margin
+        self._side_counts[position.side] -= 1
+        
+    def _rebuild_aggregates(self):
+        """根据当前持仓重建组合汇总（仅在持仓被整体替换时使用）"""
+        self._total_unrealized_pnl = 0.0
+        self._total_margin = 0.0
+        self._side_counts = {PositionSide.LONG: 0, PositionSide.SHORT: 0}
+        for position in self.positions.values():
+            self._add_to_aggregates(position)
             
     def open_position(self, market_id: int, side: PositionSide, size: float, 
                      price: float, leverage: float = 1.0) -> Optional[Position]:
@@ -245,11 +381,12 @@ class PositionManager:
                 realized_pnl=0.0,
                 leverage=leverage,
                 margin=margin,
-                timestamp=datetime.now()
+                timestamp=self.clock.now()
             )
             
             # 添加到仓位字典
             self.positions[market_id] = position
+            self._add_to_aggregates(position)
             
             # 添加到历史记录
             self.position_history.append(position)
@@ -280,17 +417,12 @@ class PositionManager:
                 
             position = self.positions[market_id]
             
-            # 计算实现盈亏
-            if position.side == PositionSide.LONG:
-                realized_pnl = (price - position.entry_price) * position.size
-            else:
-                realized_pnl = (position.entry_price - price) * position.size
-                
-            # 更新实现盈亏
-            position.realized_pnl += realized_pnl
+            # 计算并记录实现盈亏
+            realized_pnl = self._realize(position, position.size, price)
             
             # 从仓位字典中移除
             del self.positions[market_id]
+            self._remove_from_aggregates(position)
             
             self.logger.info(f"平仓成功: 市场 {market_id}, 实现盈亏 {realized_pnl}")
             
@@ -322,17 +454,14 @@ class PositionManager:
             
             # 计算部分平仓的盈亏
             if new_size < old_size:
-                partial_size = old_size - new_size
-                if position.side == PositionSide.LONG:
-                    partial_pnl = (price - position.entry_price) * partial_size
-                else:
-                    partial_pnl = (position.entry_price - price) * partial_size
-                    
-                position.realized_pnl += partial_pnl
+                self._realize(position, old_size - new_size, price)
                 
             # 更新仓位大小
             position.size = new_size
-            position.margin = (new_size * price) / position.leverage
+            new_margin = (new_size * price) / position.leverage
+            self._total_margin += new_margin - position.margin
+            position.margin = new_margin
+            self._mark_position(position, price)
             
             self.logger.info(f"更新仓位大小: 市场 {market_id}, {old_size} -> {new_size}")
             
@@ -356,21 +485,21 @@ class PositionManager:
         
     def get_total_unrealized_pnl(self) -> float:
         """获取总未实现盈亏"""
-        return sum(pos.unrealized_pnl for pos in self.positions.values())
+        return self._total_unrealized_pnl
         
     def get_total_realized_pnl(self) -> float:
         """获取总实现盈亏"""
-        return sum(pos.realized_pnl for pos in self.position_history)
+        return self._total_realized_pnl
         
     def get_total_margin(self) -> float:
         """获取总保证金"""
-        return sum(pos.margin for pos in self.positions.values())
+        return self._total_margin
         
     def get_position_summary(self) -> Dict[str, Any]:
         """获取仓位摘要"""
         total_positions = len(self.positions)
-        long_positions = len(self.get_positions_by_side(PositionSide.LONG))
-        short_positions = len(self.get_positions_by_side(PositionSide.SHORT))
+        long_positions = self._side_counts[PositionSide.LONG]
+        short_positions = self._side_counts[PositionSide.SHORT]
         
         return {
             "total_positions": total_positions,
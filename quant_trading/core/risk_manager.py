@@ -4,12 +4,16 @@
 """
 
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-from dataclasses import dataclass
+from collections import deque
+from typing import Deque, Dict, List, Optional, Any, Tuple
+from datetime import date
+from dataclasses import dataclass, field
 
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from .position_manager import PositionSide
+from .portfolio_risk import PortfolioRisk
 
 
 @dataclass
@@ -21,6 +25,10 @@ class RiskLimits:
     max_leverage: float = 10.0      # 最大杠杆
     max_orders_per_minute: int = 10 # 每分钟最大订单数
     max_open_orders: int = 20       # 最大开仓订单数
+    max_notional_per_minute: float = 0.0  # 每分钟最大下单名义金额（0表示不限制）
+    max_market_exposure: float = 0.0      # 单市场最大净敞口占权益比例（0表示不限制）
+    market_exposure_limits: Dict[int, float] = field(default_factory=dict)  # 按市场覆盖的敞口比例
+    max_portfolio_var: float = 0.0        # 组合VaR占权益比例上限（0表示不限制）
 
 
 class RiskManager:
@@ -35,6 +43,7 @@ class RiskManager:
         """
         self.config = config
         self.logger = setup_logger("RiskManager", config.log_level)
+        self.clock: Clock = REALTIME_CLOCK
         
         # 风险限制
         self.risk_limits = RiskLimits(
@@ -43,17 +52,54 @@ class RiskManager:
             max_drawdown=config.risk_config.get("max_drawdown", 0.15),
             max_leverage=config.risk_config.get("max_leverage", 10.0),
             max_orders_per_minute=config.risk_config.get("max_orders_per_minute", 10),
-            max_open_orders=config.risk_config.get("max_open_orders", 20)
+            max_open_orders=config.risk_config.get("max_open_orders", 20),
+            max_notional_per_minute=config.risk_config.get("max_notional_per_minute", 0.0),
+            max_market_exposure=config.risk_config.get("max_market_exposure", 0.0),
+            market_exposure_limits={
+                int(market_id): float(ratio)
+                for market_id, ratio in config.risk_config.get("market_exposure_limits", {}).items()
+            },
+            max_portfolio_var=config.risk_config.get("max_portfolio_var", 0.0)
         )
         
+        # 初始权益（持仓管理器只提供盈亏，权益 = 初始权益 + 已实现 + 未实现）
+        # 设置了API客户端时初始化会改用交易所账户的抵押品余额，配置值只作为回测与查询失败时的后备
+        self.initial_equity = config.risk_config.get("initial_equity", 10000.0)
+        
         # 风险状态
         self.daily_pnl = 0.0
         self.max_equity = 0.0
         self.current_equity = 0.0
+        self.day_start_equity = 0.0
+        self.trading_day: Optional[date] = None
         self.order_count_minute = 0
         self.last_order_time = None
         self.open_orders_count = 0
         
+        # 滚动窗口订单记录 (时钟单调时间, 名义金额)，配合累计值使检查为O(1)
+        self.order_window_seconds = 60.0
+        self._order_window: Deque[Tuple[float, float]] = deque()
+        self._window_notional = 0.0
+        
+        # 日亏损/回撤熔断标志，在权益变化时增量更新，检查时直接读取
+        self._daily_loss_breached = False
+        self._drawdown_breached = False
+        
+        # 持仓管理器引用（用于读取增量维护的盈亏与单市场敞口）
+        self.position_manager = None
+        
+        # API客户端（用于初始化时读取账户余额）
+        self.api_client = None
+        
+        # 组合风险：每根1分钟K线写入一次全部市场价格
+        self.portfolio_risk = PortfolioRisk(
+            window=config.risk_config.get("portfolio_var_window", 1440),
+            confidence=config.risk_config.get("portfolio_var_confidence", 0.99)
+        )
+        self.portfolio_metrics: Dict[str, Any] = {}
+        self._last_portfolio_bar: Optional[int] = None
+        self._portfolio_var_breached = False
+        
         # 风险事件记录
         self.risk_events: List[Dict[str, Any]] = []
         
@@ -61,19 +107,72 @@ class RiskManager:
         """初始化风险管理器"""
         self.logger.info("初始化风险管理器...")
         
+        # 以账户实际余额作为初始权益
+        await self._load_account_equity()
+        
         # 重置日统计
         self._reset_daily_stats()
         
         self.logger.info("风险管理器初始化完成")
         
+    def set_position_manager(self, position_manager):
+        """设置持仓管理器引用"""
+        self.position_manager = position_manager
+        
+    def set_api_client(self, api_client):
+        """设置API客户端引用（初始化时读取账户余额作为初始权益）"""
+        self.api_client = api_client
+        
+    async def _load_account_equity(self):
+        """从交易所读取账户抵押品余额作为初始权益（未实现盈亏由持仓管理器另行计入）"""
+        if self.api_client is None:
+            return
+            
+        try:
+            from lighter.api.account_api import AccountApi
+            account_info = await AccountApi(self.api_client).account(
+                by="index", value=str(self.config.lighter_config["account_index"])
+            )
+            accounts = getattr(account_info, "accounts", None) or []
+            if not accounts:
+                self.logger.warning(f"未查询到账户信息，使用配置的初始权益: {self.initial_equity}")
+                return
+                
+            equity = float(accounts[0].collateral)
+            if equity <= 0:
+                self.logger.warning(f"账户余额为 {equity}，使用配置的初始权益: {self.initial_equity}")
+                return
+                
+            self.initial_equity = equity
+            self.logger.info(f"初始权益取自账户余额: {equity:.2f}")
+            
+        except Exception as e:
+            self.logger.error(f"读取账户余额失败，使用配置的初始权益 {self.initial_equity}: {e}")
+            
+    def set_clock(self, clock: Clock):
+        """设置时钟（跨日、订单频率窗口与组合风险的分钟划分都按它计算）"""
+        self.clock = clock
+        
     def _reset_daily_stats(self):
         """重置日统计"""
         self.daily_pnl = 0.0
-        self.max_equity = 0.0
-        self.current_equity = 0.0
+        self.current_equity = self.initial_equity
+        self.max_equity = self.current_equity
+        self.day_start_equity = self.current_equity
+        self.trading_day = self.clock.today()
         self.order_count_minute = 0
         self.last_order_time = None
-        
+        self._order_window.clear()
+        self._window_notional = 0.0
+        self._daily_loss_breached = False
+        self._drawdown_breached = False
+
+    def reset_drawdown(self):
+        """人工确认后解除回撤熔断，并以当前权益作为新的最大权益"""
+        self.max_equity = self.current_equity
+        self._drawdown_breached = False
+        self.logger.info(f"回撤熔断已重置，最大权益: {self.max_equity:.2f}")
+
     async def check_risk_limits(self, market_data: Dict[int, Dict[str, Any]]) -> bool:
         """
         检查风险限制
@@ -88,12 +187,16 @@ class RiskManager:
             # 更新当前权益
             await self._update_equity()
             
+            # 每根K线刷新一次组合风险
+            self._update_portfolio_risk(market_data)
+            
             # 检查各种风险限制
             checks = [
                 self._check_daily_loss_limit(),
                 self._check_drawdown_limit(),
                 self._check_order_frequency_limit(),
-                self._check_open_orders_limit()
+                self._check_open_orders_limit(),
+                self._check_portfolio_var_limit()
             ]
             
             # 如果任何检查失败，记录风险事件
@@ -108,45 +211,134 @@ class RiskManager:
             self.logger.error(f"风险检查失败: {e}")
             return False
             
+    def check_order(self, market_id: int, is_buy: bool, size: float, price: float) -> Tuple[bool, str]:
+        """
+        下单前风控检查 - 每项均为常数时间，供OrderManager在签名前内联调用
+        
+        Args:
+            market_id: 市场ID
+            is_buy: 是否买入
+            size: 订单数量
+            price: 订单价格
+            
+        Returns:
+            (是否通过, 未通过原因)
+        """
+        if self._daily_loss_breached:
+            return False, "daily_loss"
+        if self._drawdown_breached:
+            return False, "drawdown"
+            
+        self._expire_order_window(self.clock.monotonic())
+        
+        limits = self.risk_limits
+        if len(self._order_window) >= limits.max_orders_per_minute:
+            return False, "order_frequency"
+        if self.open_orders_count >= limits.max_open_orders:
+            return False, "open_orders"
+            
+        notional = size * price
+        if limits.max_notional_per_minute > 0 and self._window_notional + notional > limits.max_notional_per_minute:
+            return False, "order_notional"
+            
+        current_exposure = self.get_market_exposure(market_id)
+        new_exposure = current_exposure + (notional if is_buy else -notional)
+        
+        exposure_limit = limits.market_exposure_limits.get(market_id, limits.max_market_exposure)
+        if exposure_limit > 0 and self.current_equity > 0:
+            if abs(new_exposure) / self.current_equity > exposure_limit:
+                return False, "market_exposure"
+                
+        # 组合VaR超限时只允许降低敞口的订单
+        if self._portfolio_var_breached and abs(new_exposure) >= abs(current_exposure):
+            return False, "portfolio_var"
+                
+        return True, ""
+        
+    def _expire_order_window(self, now: float):
+        """淘汰滚动窗口外的订单记录（均摊O(1)）"""
+        window = self._order_window
+        cutoff = now - self.order_window_seconds
+        while window and window[0][0] <= cutoff:
+            self._window_notional -= window.popleft()[1]
+        self.order_count_minute = len(window)
+        
+    def get_market_exposure(self, market_id: int) -> float:
+        """获取单市场带方向的名义敞口（多头为正，空头为负）"""
+        if self.position_manager is None:
+            return 0.0
+        position = self.position_manager.positions.get(market_id)
+        if position is None:
+            return 0.0
+        exposure = position.size * position.current_price
+        return exposure if position.side == PositionSide.LONG else -exposure
+        
+    def get_market_exposures(self) -> Dict[int, float]:
+        """获取所有持仓市场带方向的名义敞口"""
+        if self.position_manager is None:
+            return {}
+        return {market_id: self.get_market_exposure(market_id) for market_id in self.position_manager.positions}
+        
+    def _update_portfolio_risk(self, market_data: Dict[int, Dict[str, Any]]):
+        """新的一分钟K线开始时写入各市场价格，并重新计算组合VaR与敞口"""
+        bar = int(self.clock.time() // 60)
+        if bar == self._last_portfolio_bar:
+            return
+        self._last_portfolio_bar = bar
+        
+        prices = {
+            market_id: data.get("last_price", 0)
+            for market_id, data in market_data.items()
+            if data and data.get("last_price")
+        }
+        if not prices:
+            return
+            
+        self.portfolio_risk.update_bar(prices)
+        self.portfolio_metrics = self.portfolio_risk.evaluate(self.get_market_exposures())
+        
+        if self.risk_limits.max_portfolio_var > 0 and self.current_equity > 0:
+            var = max(self.portfolio_metrics["parametric_var"], self.portfolio_metrics["historical_var"])
+            self._portfolio_var_breached = var / self.current_equity > self.risk_limits.max_portfolio_var
+            
+    def _check_portfolio_var_limit(self) -> tuple[str, bool]:
+        """检查组合VaR限制"""
+        passed = not self._portfolio_var_breached
+        
+        if not passed:
+            var = max(self.portfolio_metrics["parametric_var"], self.portfolio_metrics["historical_var"])
+            self.logger.warning(f"组合VaR限制触发: {var / self.current_equity:.2%} > {self.risk_limits.max_portfolio_var:.2%}")
+            
+        return "portfolio_var", passed
+        
     def _check_daily_loss_limit(self) -> tuple[str, bool]:
         """检查日亏损限制"""
-        if self.current_equity <= 0:
-            return "daily_loss", True
-            
-        daily_loss_ratio = abs(self.daily_pnl) / self.current_equity
-        passed = daily_loss_ratio <= self.risk_limits.max_daily_loss
+        passed = not self._daily_loss_breached
         
         if not passed:
+            daily_loss_ratio = -self.daily_pnl / self.day_start_equity
             self.logger.warning(f"日亏损限制触发: {daily_loss_ratio:.2%} > {self.risk_limits.max_daily_loss:.2%}")
             
         return "daily_loss", passed
         
     def _check_drawdown_limit(self) -> tuple[str, bool]:
         """检查回撤限制"""
-        if self.max_equity <= 0:
-            return "drawdown", True
-            
-        drawdown_ratio = (self.max_equity - self.current_equity) / self.max_equity
-        passed = drawdown_ratio <= self.risk_limits.max_drawdown
+        passed = not self._drawdown_breached
         
         if not passed:
+            drawdown_ratio = (self.max_equity - self.current_equity) / self.max_equity
             self.logger.warning(f"回撤限制触发: {drawdown_ratio:.2%} > {self.risk_limits.max_drawdown:.2%}")
             
         return "drawdown", passed
         
     def _check_order_frequency_limit(self) -> tuple[str, bool]:
         """检查订单频率限制"""
-        current_time = datetime.now()
-        
-        # 重置分钟计数器
-        if (self.last_order_time is None or 
-            current_time - self.last_order_time > timedelta(minutes=1)):
-            self.order_count_minute = 0
+        self._expire_order_window(self.clock.monotonic())
             
         passed = self.order_count_minute < self.risk_limits.max_orders_per_minute
         
         if not passed:
-            self.logger.warning(f"订单频率限制触发: {self.order_count_minute} > {self.risk_limits.max_orders_per_minute}")
+            self.logger.warning(f"订单频率限制触发: {self.order_count_minute} >= {self.risk_limits.max_orders_per_minute}")
             
         return "order_frequency", passed
         
@@ -155,21 +347,57 @@ class RiskManager:
         passed = self.open_orders_count < self.risk_limits.max_open_orders
         
         if not passed:
-            self.logger.warning(f"开仓订单限制触发: {self.open_orders_count} > {self.risk_limits.max_open_orders}")
+            self.logger.warning(f"开仓订单限制触发: {self.open_orders_count} >= {self.risk_limits.max_open_orders}")
             
         return "open_orders", passed
         
     async def _update_equity(self):
         """更新权益信息"""
-        # 这里应该从账户数据中获取实际权益
-        # 暂时使用模拟数据
-        if self.current_equity == 0:
-            self.current_equity = 10000.0  # 初始资金
-            self.max_equity = self.current_equity
+        self.refresh_equity()
+        
+    def on_tick(self, market_id: int, tick_data: Dict[str, Any]):
+        """实时tick回调 - 持仓盯市后刷新权益、日盈亏与回撤状态"""
+        self.refresh_equity()
+        
+    def on_account_update(self, account_id: str, account_data: Dict[str, Any]):
+        """账户流回调 - 持仓对账（含平仓/减仓计入的已实现盈亏）之后立即刷新权益，不等下一个tick"""
+        self.refresh_equity()
+        
+    def refresh_equity(self):
+        """
+        根据持仓管理器增量维护的盈亏刷新权益
+        
+        持仓管理器的汇总值为O(1)读取，因此每个tick调用也不会成为瓶颈
+        """
+        if self.position_manager is not None:
+            equity = (self.initial_equity
+                      + self.position_manager.get_total_realized_pnl()
+                      + self.position_manager.get_total_unrealized_pnl())
+            self._set_equity(equity)
             
-        # 更新最大权益
-        if self.current_equity > self.max_equity:
-            self.max_equity = self.current_equity
+    def _set_equity(self, equity: float):
+        """设置当前权益并增量更新日盈亏、最大权益与熔断标志"""
+        today = self.clock.today()
+        if today != self.trading_day:
+            # 跨日：以当前权益作为新的日初权益
+            self.trading_day = today
+            self.day_start_equity = self.current_equity if self.current_equity > 0 else equity
+            self._daily_loss_breached = False
+            
+        self.current_equity = equity
+        self.daily_pnl = equity - self.day_start_equity
+        
+        if equity > self.max_equity:
+            self.max_equity = equity
+            
+        if self.day_start_equity > 0 and self.daily_pnl < 0:
+            if -self.daily_pnl / self.day_start_equity > self.risk_limits.max_daily_loss:
+                self._daily_loss_breached = True
+                
+        # 回撤熔断触发后保持，直到重置（跨日不自动解除）
+        if self.max_equity > 0 and not self._drawdown_breached:
+            if (self.max_equity - equity) / self.max_equity > self.risk_limits.max_drawdown:
+                self._drawdown_breached = True
             
     def check_position_size(self, market_id: int, size: float, price: float) -> bool:
         """
@@ -247,42 +475,44 @@ class RiskManager:
             
         return passed
         
-    def record_order(self):
-        """记录订单"""
-        current_time = datetime.now()
+    def record_order(self, notional: float = 0.0):
+        """
+        记录订单
+        
+        Args:
+            notional: 订单名义金额
+        """
+        now = self.clock.monotonic()
+        self._expire_order_window(now)
         
-        # 更新分钟计数器
-        if (self.last_order_time is None or 
-            current_time - self.last_order_time > timedelta(minutes=1)):
-            self.order_count_minute = 1
-        else:
-            self.order_count_minute += 1
-            
-        self.last_order_time = current_time
+        self._order_window.append((now, notional))
+        self._window_notional += notional
+        self.order_count_minute = len(self._order_window)
+        
+        self.last_order_time = self.clock.now()
         self.open_orders_count += 1
         
     def record_order_filled(self):
         """记录订单成交"""
         self.open_orders_count = max(0, self.open_orders_count - 1)
         
+    def record_order_cancelled(self):
+        """记录订单取消"""
+        self.open_orders_count = max(0, self.open_orders_count - 1)
+        
     def update_pnl(self, pnl: float):
         """
-        更新盈亏
+        更新盈亏（未设置持仓管理器时使用，例如回测）
         
         Args:
             pnl: 盈亏金额
         """
-        self.daily_pnl += pnl
-        self.current_equity += pnl
-        
-        # 更新最大权益
-        if self.current_equity > self.max_equity:
-            self.max_equity = self.current_equity
+        self._set_equity(self.current_equity + pnl)
             
     def _record_risk_event(self, event_type: str, description: str):
         """记录风险事件"""
         event = {
-            "timestamp": datetime.now(),
+            "timestamp": self.clock.now(),
             "type": event_type,
             "description": description,
             "daily_pnl": self.daily_pnl,
@@ -301,7 +531,12 @@ class RiskManager:
             "max_equity": self.max_equity,
             "drawdown": (self.max_equity - self.current_equity) / self.max_equity if self.max_equity > 0 else 0,
             "order_count_minute": self.order_count_minute,
+            "order_notional_minute": self._window_notional,
             "open_orders_count": self.open_orders_count,
+            "daily_loss_breached": self._daily_loss_breached,
+            "drawdown_breached": self._drawdown_breached,
+            "portfolio_var_breached": self._portfolio_var_breached,
+            "portfolio": self.portfolio_metrics,
             "risk_events_count": len(self.risk_events),
             "risk_limits": {
                 "max_position_size": self.risk_limits.max_position_size,
@@ -309,6 +544,9 @@ class RiskManager:
                 "max_drawdown": self.risk_limits.max_drawdown,
                 "max_leverage": self.risk_limits.max_leverage,
                 "max_orders_per_minute": self.risk_limits.max_orders_per_minute,
-                "max_open_orders": self.risk_limits.max_open_orders
+                "max_open_orders": self.risk_limits.max_open_orders,
+                "max_notional_per_minute": self.risk_limits.max_notional_per_minute,
+                "max_market_exposure": self.risk_limits.max_market_exposure,
+                "max_portfolio_var": self.risk_limits.max_portfolio_var
             }
         }
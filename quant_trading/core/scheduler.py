@@ -0,0 +1,142 @@
+"""
+定时任务调度器
+每个周期性任务一个独立的asyncio任务，按固定节拍运行，互不阻塞
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+TimerCallback = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class TimerStats:
+    """定时任务统计"""
+    interval: float
+    runs: int = 0
+    errors: int = 0
+    overruns: int = 0           # 执行耗时超过周期而跳过的节拍数
+    last_duration: float = 0.0  # 最近一次执行耗时（秒）
+    max_duration: float = 0.0
+
+
+class Scheduler:
+    """
+    定时任务调度器
+
+    任务按固定节拍（而非"执行完再等待interval"）运行，执行超时的节拍直接跳过而不是堆积；
+    空闲时所有任务都挂起在sleep上，不占用CPU
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._timers: Dict[str, tuple] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.stats: Dict[str, TimerStats] = {}
+        self.is_running = False
+
+    def add_timer(self, name: str, interval: float, callback: TimerCallback,
+                  run_immediately: bool = False):
+        """
+        添加定时任务
+
+        Args:
+            name: 任务名称（唯一）
+            interval: 周期（秒）
+            callback: 异步回调
+            run_immediately: 是否启动时立即执行一次
+        """
+        if interval <= 0:
+            raise ValueError(f"定时任务 {name} 的周期必须大于0")
+
+        self._timers[name] = (interval, callback, run_immediately)
+        self.stats[name] = TimerStats(interval=interval)
+        if self.is_running:
+            self._start_timer(name)
+
+    async def remove_timer(self, name: str):
+        """移除定时任务"""
+        self._timers.pop(name, None)
+        self.stats.pop(name, None)
+        task = self._tasks.pop(name, None)
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def start(self):
+        """启动所有定时任务"""
+        self.is_running = True
+        for name in self._timers:
+            self._start_timer(name)
+        self.logger.info(f"调度器已启动，定时任务: {list(self._timers.keys())}")
+
+    async def stop(self):
+        """停止所有定时任务"""
+        self.is_running = False
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.logger.info("调度器已停止")
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """各定时任务的运行统计"""
+        return {
+            name: {
+                "interval": stats.interval,
+                "runs": stats.runs,
+                "errors": stats.errors,
+                "overruns": stats.overruns,
+                "last_duration_ms": stats.last_duration * 1000,
+                "max_duration_ms": stats.max_duration * 1000,
+            }
+            for name, stats in self.stats.items()
+        }
+
+    def _start_timer(self, name: str):
+        task = self._tasks.get(name)
+        if task is None or task.done():
+            self._tasks[name] = asyncio.create_task(self._run_timer(name))
+
+    async def _run_timer(self, name: str):
+        interval, callback, run_immediately = self._timers[name]
+        stats = self.stats[name]
+        loop = asyncio.get_running_loop()
+
+        next_run = loop.time() + (0 if run_immediately else interval)
+        while True:
+            delay = next_run - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            started = loop.time()
+            try:
+                await callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                stats.errors += 1
+                self.logger.error(f"定时任务 {name} 执行失败: {e}")
+
+            finished = loop.time()
+            stats.runs += 1
+            stats.last_duration = finished - started
+            stats.max_duration = max(stats.max_duration, stats.last_duration)
+
+            # 固定节拍：跳过已经错过的节拍，避免慢任务之后连续补跑
+            next_run += interval
+            if next_run <= finished:
+                missed = int((finished - next_run) // interval) + 1
+                stats.overruns += missed
+                next_run += missed * interval
@@ -0,0 +1,812 @@
+"""
+多进程分片运行
+按市场分组把行情解析、K线构建与策略计算分散到多个工作进程，
+签名客户端（nonce）、下单风控与持仓集中在协调进程；进程间通过本地socket
+传递长度前缀的pickle消息，订单、撤单与成交回报按顺序送达，行情价格按市场合并后批量转发
+"""
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import socket
+import struct
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import lighter
+
+from ..utils.config import Config
+from ..utils.logger import LogOptions, configure_logging, setup_logger
+from ..utils.runtime import Runtime, RuntimeOptions
+from ..utils.latency import LatencyTracker
+from ..utils.metrics import REGISTRY, ClientMetrics
+from .data_manager import DataManager
+from .risk_manager import RiskManager
+from .position_manager import Position, PositionManager
+from .order_manager import Order, OrderManager, OrderStatus
+from .scheduler import Scheduler
+from .metrics_server import MetricsServer
+from .trading_engine import TradingEngine
+from ..strategies.base_strategy import BaseStrategy
+from ..notifications.notification_manager import NotificationManager
+
+
+# 工作进程的策略工厂: factory(config, 本分片的市场ID列表) -> 策略列表
+# 需为模块级函数，以便在spawn启动的子进程中反序列化
+StrategyFactory = Callable[[Config, List[int]], List[BaseStrategy]]
+
+# 本地socket地址：unix socket路径，或不支持AF_UNIX时的回环TCP (host, port)
+ShardAddress = Union[str, Tuple[str, int]]
+
+FRAME_HEADER = struct.Struct("!I")
+
+
+def shard_markets(market_ids: List[int], shards: int) -> List[List[int]]:
+    """
+    将市场轮流分配到各分片
+
+    Args:
+        market_ids: 市场ID列表
+        shards: 分片数量
+
+    Returns:
+        每个分片的市场ID列表（不含空分片）
+    """
+    shards = max(1, min(int(shards), len(market_ids)))
+    groups = [list(market_ids[i::shards]) for i in range(shards)]
+    return [group for group in groups if group]
+
+
+class ShardChannel:
+    """进程间消息通道：4字节长度前缀 + pickle消息，单连接内按发送顺序送达"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, address: ShardAddress) -> "ShardChannel":
+        """连接到协调进程"""
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        return cls(reader, writer)
+
+    def send(self, message: Dict[str, Any]):
+        """发送消息（同步写入缓冲区，可在回调中直接调用）"""
+        if self.writer.is_closing():
+            return
+        payload = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        self.writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+    async def drain(self):
+        """等待发送缓冲区写出（对端读取过慢时形成背压）"""
+        if not self.writer.is_closing():
+            await self.writer.drain()
+
+    async def recv(self) -> Optional[Dict[str, Any]]:
+        """接收一条消息，连接关闭时返回None"""
+        try:
+            header = await self.reader.readexactly(FRAME_HEADER.size)
+            (length,) = FRAME_HEADER.unpack(header)
+            return pickle.loads(await self.reader.readexactly(length))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+
+    async def close(self):
+        """关闭连接"""
+        if not self.writer.is_closing():
+            self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except Exception:
+            pass
+
+
+async def start_shard_server(handler: Callable[[ShardChannel], Any]) -> Tuple[asyncio.AbstractServer, ShardAddress]:
+    """
+    启动协调进程的本地服务端
+
+    Args:
+        handler: 每个工作进程连接的异步处理函数
+
+    Returns:
+        (服务端, 供工作进程连接的地址)
+    """
+    async def on_connect(reader, writer):
+        await handler(ShardChannel(reader, writer))
+
+    if hasattr(socket, "AF_UNIX"):
+        path = os.path.join(tempfile.mkdtemp(prefix="lighter_shards_"), "coordinator.sock")
+        server = await asyncio.start_unix_server(on_connect, path)
+        return server, path
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[:2]
+
+
+class MarketDataMirror:
+    """
+    协调进程中的行情镜像
+
+    只保存下单检查需要的最新价格与市场信息，代替DataManager传给OrderManager和RiskManager
+    （OrderManager的滑点检查与市场规则、RiskManager的组合VaR都只读取market_data_cache）
+    """
+
+    def __init__(self):
+        self.market_data_cache: Dict[int, Dict[str, Any]] = {}
+
+    def update_price(self, market_id: int, price: float):
+        """更新最新价格"""
+        if price > 0:
+            self.market_data_cache.setdefault(market_id, {})["last_price"] = price
+
+    def update_market_info(self, market_id: int, market_info: Any):
+        """更新市场信息（最小下单量等规则）"""
+        self.market_data_cache.setdefault(market_id, {})["market_info"] = market_info
+
+    def get_market_data(self, market_id: int) -> Optional[Dict[str, Any]]:
+        """获取市场数据"""
+        return self.market_data_cache.get(market_id)
+
+
+# ==========================================
+# 工作进程
+# ==========================================
+
+class ShardPositionManager(PositionManager):
+    """工作进程中的持仓镜像：由协调进程推送本分片持仓快照，本地只用tick盯市"""
+
+    async def initialize(self):
+        """持仓由协调进程推送，不从交易所加载"""
+        self.logger.info("持仓由协调进程同步，跳过交易所加载")
+
+    async def update_positions(self):
+        """持仓由协调进程推送，无需REST对账"""
+        pass
+
+    def apply_snapshot(self, positions: Dict[int, Position]):
+        """用协调进程推送的本分片持仓整体替换本地持仓"""
+        self.positions = dict(positions)
+        self._rebuild_aggregates()
+
+
+class RemoteOrderManager(OrderManager):
+    """
+    工作进程中的订单管理器
+
+    订单照常在本地创建和记账，提交与撤单转发给协调进程统一签名（避免多进程争用nonce），
+    协调进程回报的状态变化再写回本地订单并触发订单回调
+    """
+
+    def __init__(self, config: Config, channel: ShardChannel, data_manager=None,
+                 position_manager=None, risk_manager=None):
+        super().__init__(None, config, None, data_manager, position_manager, risk_manager)
+        self.channel = channel
+        self.cancel_timeout = config.trading_config.get("shard_cancel_timeout", 10.0)
+        self._forwarded: set = set()
+        self._cancel_waiters: Dict[str, asyncio.Future] = {}
+
+    async def initialize(self):
+        """市场规则由协调进程加载和检查"""
+        self.logger.info("订单由协调进程签名提交，跳过客户端检查与市场规则加载")
+
+    async def submit_pending_orders(self):
+        """将新订单转发给协调进程（附带本进程看到的最新价格用于滑点检查）"""
+        try:
+            for order in list(self.orders.values()):
+                if order.status != OrderStatus.PENDING or order.order_id in self._forwarded:
+                    continue
+                market_data = self.data_manager.market_data_cache.get(order.market_id, {}) if self.data_manager else {}
+                self.channel.send({"type": "order", "order": order, "last_price": market_data.get("last_price", 0)})
+                self._forwarded.add(order.order_id)
+            await self.channel.drain()
+        except Exception as e:
+            self.logger.error(f"转发订单失败: {e}")
+
+    async def check_submitted_orders(self):
+        """订单状态由协调进程检查并回报"""
+        pass
+
+    async def cancel_order(self, order_id: str) -> bool:
+        """
+        通过协调进程取消订单
+
+        Args:
+            order_id: 本地订单ID
+
+        Returns:
+            是否成功
+        """
+        order = self.orders.get(order_id)
+        if order is None or not order.is_active:
+            self.logger.warning(f"订单不存在或不是活跃状态: {order_id}")
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._cancel_waiters[order_id] = future
+        try:
+            self.channel.send({"type": "cancel", "order_id": order_id})
+            await self.channel.drain()
+            return await asyncio.wait_for(future, self.cancel_timeout)
+        except asyncio.TimeoutError:
+            self.logger.error(f"取消订单超时: {order_id}")
+            return False
+        except Exception as e:
+            self.logger.error(f"取消订单失败: {e}")
+            return False
+        finally:
+            self._cancel_waiters.pop(order_id, None)
+
+    def apply_order_update(self, message: Dict[str, Any]):
+        """写入协调进程回报的订单状态"""
+        order = self.orders.get(message["order_id"])
+        if order is None:
+            return
+        order.status = message["status"]
+        order.filled_size = message["filled_size"]
+        order.filled_price = message["filled_price"]
+        if order.status != OrderStatus.PENDING:
+            # 端到端延迟计到协调进程完成发送
+            self.latency.order_sent(order.order_id, order.status in (OrderStatus.SUBMITTED, OrderStatus.FILLED))
+        if not order.is_active:
+            self._forwarded.discard(order.order_id)
+        self._notify_order_update(order)
+
+    def apply_cancel_result(self, message: Dict[str, Any]):
+        """唤醒等待撤单结果的调用方"""
+        future = self._cancel_waiters.get(message["order_id"])
+        if future is not None and not future.done():
+            future.set_result(message["success"])
+
+
+class ShardWorkerEngine(TradingEngine):
+    """
+    分片工作进程的交易引擎
+
+    只订阅本分片的市场，自行完成行情解析、K线构建与策略计算；
+    订单转发给协调进程，持仓与风控状态由协调进程推送
+    """
+
+    def __init__(self, config: Config, shard_id: int, market_ids: List[int], channel: ShardChannel):
+        self.shard_id = shard_id
+        self.market_ids = list(market_ids)
+        self.channel = channel
+        self._latest_prices: Dict[int, float] = {}
+        super().__init__(config)
+        self.logger = setup_logger(f"ShardWorker_{shard_id}", config.log_level)
+        self.event_bus.logger = self.logger
+        self.scheduler.logger = self.logger
+        # 协调进程占用metrics_port，工作进程依次使用后续端口
+        if self.metrics_server is not None:
+            self.metrics_server.port += shard_id + 1
+            self.metrics_server.logger = self.logger
+
+    def _build_components(self):
+        """只创建行情客户端；签名、通知由协调进程负责"""
+        config = self.config
+
+        ClientMetrics.instrument_rest()
+        self.api_client = lighter.ApiClient(
+            configuration=lighter.Configuration(host=config.lighter_config["base_url"])
+        )
+        self.signer_client = None
+        self.notification_manager = None
+
+        self.data_manager = DataManager(self.api_client, config, market_ids=self.market_ids)
+        self.risk_manager = RiskManager(config)
+        self.position_manager = ShardPositionManager(config)
+
+        # 持仓只来自协调进程按分片推送的快照：账户流包含整个账户，在这里对账会混入其他分片的持仓
+        self.data_manager.add_tick_callback(self.position_manager.on_tick)
+        self.risk_manager.set_position_manager(self.position_manager)
+        self.data_manager.add_tick_callback(self.risk_manager.on_tick)
+
+        self.order_manager = RemoteOrderManager(config, self.channel, self.data_manager,
+                                                self.position_manager, self.risk_manager)
+        self.data_manager.set_latency_tracker(self.latency)
+        self.order_manager.set_latency_tracker(self.latency)
+
+        # 最新价格按市场合并，定时批量转发给协调进程
+        self.data_manager.add_tick_callback(self._record_price)
+        # 账户流只由0号分片转发，避免协调进程重复处理
+        if self.shard_id == 0:
+            self.data_manager.add_account_callback(
+                lambda account_id, account_data: self.channel.send(
+                    {"type": "account", "account_id": account_id, "account_data": account_data})
+            )
+
+    def _record_price(self, market_id: int, tick_data: Dict[str, Any]):
+        price = tick_data.get("price", 0)
+        if price > 0:
+            self._latest_prices[market_id] = price
+
+    async def _forward_prices(self):
+        """将合并后的最新价格转发给协调进程"""
+        if not self._latest_prices:
+            return
+        prices, self._latest_prices = self._latest_prices, {}
+        self.channel.send({"type": "prices", "prices": prices})
+        await self.channel.drain()
+
+    async def _initialize_modules(self):
+        """初始化后把本分片的市场信息发给协调进程（用于市场规则检查）"""
+        await super()._initialize_modules()
+        infos = {
+            market_id: self.data_manager.market_data_cache.get(market_id, {}).get("market_info")
+            for market_id in self.market_ids
+        }
+        self.channel.send({"type": "market_info", "infos": {k: v for k, v in infos.items() if v is not None}})
+        await self.channel.drain()
+
+    async def _main_loop(self):
+        self.scheduler.add_timer("price_forward", self.config.trading_config.get("shard_price_interval", 0.5),
+                                 self._forward_prices)
+        await super()._main_loop()
+
+    async def _check_risk(self):
+        """风控状态由协调进程推送"""
+        pass
+
+    async def _check_connection(self):
+        """连接健康检查由协调进程负责"""
+        pass
+
+    async def handle_message(self, message: Dict[str, Any]):
+        """处理协调进程的消息"""
+        message_type = message.get("type")
+        if message_type == "order_update":
+            self.order_manager.apply_order_update(message)
+        elif message_type == "cancel_result":
+            self.order_manager.apply_cancel_result(message)
+        elif message_type == "positions":
+            self.position_manager.apply_snapshot(message["positions"])
+        elif message_type == "risk":
+            if message["trading_allowed"] != self.trading_allowed:
+                self.logger.info(f"协调进程风控状态: {'允许交易' if message['trading_allowed'] else '暂停交易'}")
+            self.trading_allowed = message["trading_allowed"]
+        elif message_type == "stop":
+            # 只唤醒主循环，由start()的收尾流程完整停止
+            self._stop_event.set()
+        else:
+            self.logger.warning(f"未知的协调进程消息: {message_type}")
+
+    def get_status(self) -> Dict[str, Any]:
+        status = super().get_status()
+        status["shard_id"] = self.shard_id
+        status["market_ids"] = self.market_ids
+        return status
+
+
+async def _run_shard_worker(config: Config, shard_id: int, market_ids: List[int],
+                            address: ShardAddress, strategy_factory: StrategyFactory):
+    channel = await ShardChannel.connect(address)
+    engine = ShardWorkerEngine(config, shard_id, market_ids, channel)
+    for strategy in strategy_factory(config, market_ids):
+        engine.add_strategy(strategy)
+
+    channel.send({"type": "hello", "shard_id": shard_id, "market_ids": market_ids, "pid": os.getpid()})
+    await channel.drain()
+
+    async def read_messages():
+        while True:
+            message = await channel.recv()
+            if message is None:
+                if engine.is_running:
+                    engine.logger.error("与协调进程的连接已断开，停止工作进程")
+                engine._stop_event.set()
+                return
+            try:
+                await engine.handle_message(message)
+            except Exception as e:
+                engine.logger.error(f"处理协调进程消息失败: {e}")
+
+    reader_task = asyncio.create_task(read_messages())
+    Runtime.freeze_startup_objects(RuntimeOptions.from_config(config))
+    try:
+        await engine.start()
+    finally:
+        reader_task.cancel()
+        try:
+            await reader_task
+        except asyncio.CancelledError:
+            pass
+        await channel.close()
+
+
+def run_shard_worker(config: Config, shard_id: int, market_ids: List[int],
+                     address: ShardAddress, strategy_factory: StrategyFactory):
+    """工作进程入口"""
+    # 各工作进程写各自的日志文件，避免多进程交错写同一文件
+    log_options = LogOptions.from_config(config)
+    if log_options.file:
+        root, ext = os.path.splitext(log_options.file)
+        log_options.file = f"{root}.shard{shard_id}{ext}"
+    configure_logging(log_options)
+    try:
+        Runtime.run(_run_shard_worker(config, shard_id, market_ids, address, strategy_factory), config)
+    except KeyboardInterrupt:
+        pass
+
+
+# ==========================================
+# 协调进程
+# ==========================================
+
+class ShardCoordinator:
+    """
+    分片协调进程
+
+    持有唯一的签名客户端（nonce只在一个进程内递增）、订单管理、下单风控与持仓，
+    按市场分组启动工作进程，接收其转发的订单、价格与账户推送，
+    并把订单回报、持仓快照与风控状态推送回对应分片
+    """
+
+    def __init__(self, config: Config, market_ids: List[int], shards: int,
+                 strategy_factory: StrategyFactory):
+        """
+        初始化协调进程
+
+        Args:
+            config: 配置对象（会被序列化传给工作进程）
+            market_ids: 全部交易市场
+            shards: 工作进程数量
+            strategy_factory: 工作进程的策略工厂（模块级函数）
+        """
+        self.config = config
+        self.logger = setup_logger("ShardCoordinator", config.log_level)
+        self.groups = shard_markets(market_ids, shards)
+        self.strategy_factory = strategy_factory
+
+        self.api_client = lighter.ApiClient(
+            configuration=lighter.Configuration(host=config.lighter_config["base_url"])
+        )
+        self.signer_client = lighter.SignerClient(
+            url=config.lighter_config["base_url"],
+            private_key=config.lighter_config["api_key_private_key"],
+            account_index=config.lighter_config["account_index"],
+            api_key_index=config.lighter_config["api_key_index"]
+        )
+        notification_config = config.notifications_config if hasattr(config, 'notifications_config') else {}
+        self.notification_manager = NotificationManager(notification_config)
+
+        self.market_data = MarketDataMirror()
+        self.risk_manager = RiskManager(config)
+        self.position_manager = PositionManager(config)
+        self.position_manager.set_api_clients(self.api_client, self.signer_client)
+        self.risk_manager.set_position_manager(self.position_manager)
+        self.risk_manager.set_api_client(self.api_client)
+        self.order_manager = OrderManager(self.signer_client, config, self.notification_manager,
+                                          self.market_data, self.position_manager, self.risk_manager)
+        self.order_manager.add_order_callback(self._on_order_update)
+
+        # 协调进程只有风控、签名与发送阶段
+        self.latency = LatencyTracker(enabled=config.trading_config.get("latency_tracking", True))
+        self.latency.instrument_signer(self.signer_client)
+        self.order_manager.set_latency_tracker(self.latency)
+
+        # REST请求、nonce重新同步与待提交订单指标
+        ClientMetrics.instrument_rest()
+        ClientMetrics.instrument_nonce_manager(self.signer_client)
+        REGISTRY.gauge("quant_trading_pending_orders", "等待提交的订单数").set_function(
+            lambda: len(self.order_manager.get_pending_orders()))
+        REGISTRY.add_collector(self.latency.to_prometheus)
+        self.metrics_server: Optional[MetricsServer] = None
+        metrics_port = config.trading_config.get("metrics_port", 0)
+        if metrics_port:
+            self.metrics_server = MetricsServer(metrics_port, config.trading_config.get("metrics_host", "127.0.0.1"),
+                                                logger=self.logger)
+            self.metrics_server.add_provider(REGISTRY.render)
+
+        self.scheduler = Scheduler(logger=self.logger)
+
+        # 分片状态
+        self.channels: Dict[int, ShardChannel] = {}
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self._market_shard: Dict[int, int] = {
+            market_id: shard_id for shard_id, group in enumerate(self.groups) for market_id in group
+        }
+        # 协调进程订单ID -> (分片ID, 工作进程订单ID)，以及工作进程订单ID -> 协调进程订单ID
+        self._remote_orders: Dict[str, Tuple[int, str]] = {}
+        self._local_orders: Dict[Tuple[int, str], str] = {}
+        self._reported: Dict[str, Tuple[OrderStatus, float]] = {}
+
+        self.is_running = False
+        self.trading_allowed = True
+        self._stop_event = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._address: Optional[ShardAddress] = None
+
+    async def run(self):
+        """启动协调进程和所有工作进程，直到stop()"""
+        self.is_running = True
+        self.logger.info(f"分片模式启动: {len(self.groups)} 个工作进程, 市场分组 {self.groups}")
+
+        try:
+            await self.order_manager.initialize()
+            await self.risk_manager.initialize()
+            await self.position_manager.initialize()
+
+            self._server, self._address = await start_shard_server(self._serve_worker)
+            self._spawn_workers()
+
+            trading_config = self.config.trading_config
+            tick_interval = trading_config["tick_interval"]
+            self.scheduler.add_timer("risk_check", trading_config.get("risk_check_interval", tick_interval),
+                                     self._check_risk)
+            self.scheduler.add_timer("position_sync", trading_config.get("position_sync_interval", tick_interval),
+                                     self._sync_positions)
+            self.scheduler.add_timer("order_status", trading_config.get("order_status_interval", tick_interval),
+                                     self._check_orders)
+            self.scheduler.add_timer("worker_check", trading_config.get("connection_check_interval", 300),
+                                     self._check_workers)
+
+            submission_task = asyncio.create_task(self.order_manager.run_submission_worker())
+            await self.scheduler.start()
+            if self.metrics_server is not None:
+                try:
+                    await self.metrics_server.start()
+                except Exception as e:
+                    self.logger.error(f"启动指标服务失败: {e}")
+            try:
+                await self._stop_event.wait()
+            finally:
+                submission_task.cancel()
+                try:
+                    await submission_task
+                except asyncio.CancelledError:
+                    pass
+        except Exception as e:
+            self.logger.error(f"分片协调进程运行错误: {e}")
+            raise
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """通知工作进程退出并释放资源"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        self._stop_event.set()
+        self.logger.info("停止分片协调进程...")
+
+        await self.scheduler.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        for channel in list(self.channels.values()):
+            channel.send({"type": "stop"})
+            await channel.drain()
+
+        # 等待工作进程退出，超时则强制结束
+        loop = asyncio.get_running_loop()
+        timeout = self.config.trading_config.get("shard_stop_timeout", 15.0)
+        for shard_id, process in self.processes.items():
+            await loop.run_in_executor(None, process.join, timeout)
+            if process.is_alive():
+                self.logger.warning(f"工作进程 {shard_id} 未按时退出，强制结束")
+                process.terminate()
+
+        for channel in list(self.channels.values()):
+            await channel.close()
+        if self._server is not None:
+            self._server.close()
+        if isinstance(self._address, str) and os.path.exists(self._address):
+            os.unlink(self._address)
+
+        await self.api_client.close()
+        await self.signer_client.close()
+        await self.notification_manager.close()
+        self.logger.info("分片协调进程已停止")
+
+    def _spawn_workers(self):
+        """以spawn方式启动工作进程（各自独立的事件循环与解释器）"""
+        context = multiprocessing.get_context("spawn")
+        for shard_id, market_ids in enumerate(self.groups):
+            process = context.Process(
+                target=run_shard_worker,
+                args=(self.config, shard_id, market_ids, self._address, self.strategy_factory),
+                name=f"shard-{shard_id}",
+                daemon=True
+            )
+            process.start()
+            self.processes[shard_id] = process
+            self.logger.info(f"工作进程 {shard_id} 已启动 (pid {process.pid}), 市场 {market_ids}")
+
+    # ==========================================
+    # 工作进程消息
+    # ==========================================
+
+    async def _serve_worker(self, channel: ShardChannel):
+        """处理一个工作进程的连接"""
+        hello = await channel.recv()
+        if not hello or hello.get("type") != "hello":
+            await channel.close()
+            return
+
+        shard_id = hello["shard_id"]
+        self.channels[shard_id] = channel
+        self.logger.info(f"工作进程 {shard_id} 已连接 (pid {hello.get('pid')}), 市场 {hello['market_ids']}")
+        channel.send({"type": "risk", "trading_allowed": self.trading_allowed})
+        self._send_positions(shard_id)
+
+        try:
+            while True:
+                message = await channel.recv()
+                if message is None:
+                    break
+                try:
+                    await self._handle_message(shard_id, channel, message)
+                except Exception as e:
+                    self.logger.error(f"处理工作进程 {shard_id} 消息失败: {e}")
+        finally:
+            self.channels.pop(shard_id, None)
+            if self.is_running:
+                self.logger.error(f"工作进程 {shard_id} 连接断开")
+                await self.notification_manager.send_system_error(
+                    f"分片工作进程 {shard_id} 连接断开，市场 {self.groups[shard_id]} 暂停交易",
+                    error_type="shard_worker_disconnected"
+                )
+
+    async def _handle_message(self, shard_id: int, channel: ShardChannel, message: Dict[str, Any]):
+        message_type = message.get("type")
+
+        if message_type == "prices":
+            for market_id, price in message["prices"].items():
+                self._update_price(market_id, price)
+
+        elif message_type == "order":
+            order: Order = message["order"]
+            self._update_price(order.market_id, message.get("last_price", 0))
+            local = self.order_manager.create_order(
+                market_id=order.market_id,
+                side=order.side,
+                order_type=order.order_type,
+                size=order.size,
+                price=order.price,
+                leverage=order.leverage,
+                margin_mode=order.margin_mode,
+                price_slippage_tolerance=order.price_slippage_tolerance,
+                slippage_enabled=order.slippage_enabled
+            )
+            self._remote_orders[local.order_id] = (shard_id, order.order_id)
+            self._local_orders[(shard_id, order.order_id)] = local.order_id
+
+        elif message_type == "cancel":
+            local_id = self._local_orders.get((shard_id, message["order_id"]))
+            success = local_id is not None and await self.order_manager.cancel_order(local_id)
+            channel.send({"type": "cancel_result", "order_id": message["order_id"], "success": success})
+            await channel.drain()
+
+        elif message_type == "market_info":
+            for market_id, market_info in message["infos"].items():
+                self.market_data.update_market_info(market_id, market_info)
+            await self.order_manager._load_market_rules()
+
+        elif message_type == "account":
+            self.position_manager.on_account_update(message["account_id"], message["account_data"])
+            self.risk_manager.on_account_update(message["account_id"], message["account_data"])
+            self._broadcast_positions()
+
+        else:
+            self.logger.warning(f"未知的工作进程消息: {message_type}")
+
+    def _update_price(self, market_id: int, price: float):
+        """更新价格镜像并对持仓盯市"""
+        if not price or price <= 0:
+            return
+        self.market_data.update_price(market_id, price)
+        tick_data = {"price": price}
+        self.position_manager.on_tick(market_id, tick_data)
+        self.risk_manager.on_tick(market_id, tick_data)
+
+    # ==========================================
+    # 推送给工作进程
+    # ==========================================
+
+    def _on_order_update(self, order: Order):
+        """订单状态变化回调：回报给下单的分片"""
+        self._report_order(order)
+
+    def _report_order(self, order: Order):
+        remote = self._remote_orders.get(order.order_id)
+        if remote is None:
+            return
+        shard_id, remote_id = remote
+        state = (order.status, order.filled_size)
+        if self._reported.get(order.order_id) != state:
+            self._reported[order.order_id] = state
+            channel = self.channels.get(shard_id)
+            if channel is not None:
+                channel.send({
+                    "type": "order_update",
+                    "order_id": remote_id,
+                    "status": order.status,
+                    "filled_size": order.filled_size,
+                    "filled_price": order.filled_price
+                })
+
+        # 终态订单不再跟踪
+        if not order.is_active:
+            self._remote_orders.pop(order.order_id, None)
+            self._local_orders.pop(remote, None)
+            self._reported.pop(order.order_id, None)
+
+    def _send_positions(self, shard_id: int):
+        channel = self.channels.get(shard_id)
+        if channel is None:
+            return
+        markets = set(self.groups[shard_id])
+        positions = {
+            market_id: position
+            for market_id, position in self.position_manager.get_all_positions().items()
+            if market_id in markets
+        }
+        channel.send({"type": "positions", "positions": positions})
+
+    def _broadcast_positions(self):
+        for shard_id in list(self.channels):
+            self._send_positions(shard_id)
+
+    # ==========================================
+    # 定时任务
+    # ==========================================
+
+    async def _check_risk(self):
+        """全账户风控检查，结果推送给所有分片"""
+        passed = await self.risk_manager.check_risk_limits(self.market_data.market_data_cache)
+        if not passed and self.trading_allowed:
+            self.logger.warning("风险检查失败，暂停所有分片运行策略")
+            await self.notification_manager.send_risk_limit_exceeded(
+                risk_type="general",
+                current_value=0,
+                limit_value=0,
+                message="风险检查失败，暂停所有分片运行策略"
+            )
+        elif passed and not self.trading_allowed:
+            self.logger.info("风险检查恢复正常，所有分片继续运行策略")
+        if passed != self.trading_allowed:
+            for channel in self.channels.values():
+                channel.send({"type": "risk", "trading_allowed": passed})
+        self.trading_allowed = passed
+
+    async def _sync_positions(self):
+        """持仓对账后推送各分片的持仓快照"""
+        await self.position_manager.update_positions()
+        self._broadcast_positions()
+
+    async def _check_orders(self):
+        """检查已提交订单，把变化回报给各分片"""
+        await self.order_manager.check_submitted_orders()
+        for local_id in list(self._remote_orders):
+            order = self.order_manager.get_order(local_id)
+            if order is not None:
+                self._report_order(order)
+
+    async def _check_workers(self):
+        """检查工作进程是否存活"""
+        for shard_id, process in self.processes.items():
+            if not process.is_alive():
+                self.logger.error(f"工作进程 {shard_id} 已退出 (exitcode {process.exitcode})")
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取协调进程状态"""
+        return {
+            "is_running": self.is_running,
+            "shards": {
+                shard_id: {
+                    "market_ids": self.groups[shard_id],
+                    "pid": process.pid,
+                    "alive": process.is_alive(),
+                    "connected": shard_id in self.channels
+                }
+                for shard_id, process in self.processes.items()
+            },
+            "positions": self.position_manager.get_all_positions(),
+            "orders": self.order_manager.get_pending_orders(),
+            "tracked_remote_orders": len(self._remote_orders),
+            "scheduler": self.scheduler.get_stats(),
+            "latency": self.latency.get_stats(),
+            "trading_allowed": self.trading_allowed
+        }
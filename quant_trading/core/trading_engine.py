@@ -5,32 +5,92 @@
 
 import asyncio
 import logging
+from functools import partial
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
 import lighter
 
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.runtime import Runtime
+from ..utils.latency import LatencyStage, LatencyTracker
+from ..utils.metrics import REGISTRY, ClientMetrics
 from .data_manager import DataManager
 from .risk_manager import RiskManager
 from .position_manager import PositionManager
 from .order_manager import OrderManager
-from ..strategies.base_strategy import BaseStrategy
+from .event_bus import EventBus, EventType, Event
+from .scheduler import Scheduler
+from .metrics_server import MetricsServer
+from ..strategies.base_strategy import BaseStrategy, StrategyTrigger
 from ..notifications.notification_manager import NotificationManager
 
 
 class TradingEngine:
     """量化交易引擎"""
     
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, clock: Optional[Clock] = None):
         """
         初始化交易引擎
         
         Args:
             config: 配置对象
+            clock: 时钟，None则使用系统时钟（回测/回放时传入 SimulatedClock）
         """
         self.config = config
         self.logger = setup_logger("TradingEngine", config.log_level)
+        self.clock: Clock = clock or REALTIME_CLOCK
+        
+        # 热路径延迟埋点（行情、策略、风控、签名、发送共用一个记录器）
+        self.latency = LatencyTracker(enabled=config.trading_config.get("latency_tracking", True))
+        
+        # 客户端与核心模块（所有时间相关的模块共用引擎的时钟）
+        self._build_components()
+        self.set_clock(self.clock)
+        
+        # 事件总线：行情、K线收盘、订单与账户事件按市场路由到各策略的有界邮箱
+        self.event_bus = EventBus(
+            mailbox_capacity=config.trading_config.get("event_mailbox_capacity", 1024),
+            logger=self.logger
+        )
+        self.data_manager.add_tick_callback(
+            lambda market_id, tick_data: self.event_bus.publish(EventType.TICK, market_id, tick_data)
+        )
+        self.data_manager.add_bar_callback(
+            lambda market_id, timeframe, candle: self.event_bus.publish(EventType.BAR_CLOSE, market_id, (timeframe, candle))
+        )
+        self.order_manager.add_order_callback(
+            lambda order: self.event_bus.publish(EventType.ORDER, order.market_id, order)
+        )
+        self.data_manager.add_account_callback(
+            lambda account_id, account_data: self.event_bus.publish(EventType.FILL, None, (account_id, account_data))
+        )
+        
+        # 定时维护任务（连接检查、风控、持仓对账、订单状态、定时策略）
+        self.scheduler = Scheduler(logger=self.logger)
+        
+        # Prometheus指标：队列深度在抓取时读取，延迟直方图作为采集器导出；metrics_port为0时不启动独立服务
+        self._register_metrics()
+        self.metrics_server: Optional[MetricsServer] = None
+        metrics_port = config.trading_config.get("metrics_port", 0)
+        if metrics_port:
+            self.metrics_server = MetricsServer(metrics_port, config.trading_config.get("metrics_host", "127.0.0.1"),
+                                                logger=self.logger)
+            self.metrics_server.add_provider(REGISTRY.render)
+        
+        # 策略列表
+        self.strategies: List[BaseStrategy] = []
+        self._strategy_locks: Dict[int, asyncio.Lock] = {}
+        
+        # 运行状态
+        self.is_running = False
+        self.start_time = None
+        self.trading_allowed = True  # 最近一次风控检查结果，未通过时暂停运行策略
+        self._stop_event = asyncio.Event()
+        
+    def _build_components(self):
+        """创建客户端与核心模块（分片工作进程重写此方法，改为转发到协调进程）"""
+        config = self.config
         
         # 初始化lighter客户端
         self.api_client = lighter.ApiClient(
@@ -56,15 +116,52 @@ class TradingEngine:
         # 设置PositionManager的API客户端引用
         self.position_manager.set_api_clients(self.api_client, self.signer_client)
         
+        # 持仓由实时tick盯市、由账户流对账
+        self.data_manager.add_tick_callback(self.position_manager.on_tick)
+        self.data_manager.add_account_callback(self.position_manager.on_account_update)
+        
+        # 风控读取持仓的增量盈亏，在盯市之后刷新权益与熔断状态
+        self.risk_manager.set_position_manager(self.position_manager)
+        self.risk_manager.set_api_client(self.api_client)
+        self.data_manager.add_tick_callback(self.risk_manager.on_tick)
+        self.data_manager.add_account_callback(self.risk_manager.on_account_update)
+        
         # OrderManager需要data_manager来进行价格滑点检查，需要position_manager进行持仓同步
-        self.order_manager = OrderManager(self.signer_client, config, self.notification_manager, self.data_manager, self.position_manager)
+        self.order_manager = OrderManager(self.signer_client, config, self.notification_manager, self.data_manager, self.position_manager, self.risk_manager)
         
-        # 策略列表
-        self.strategies: List[BaseStrategy] = []
+        # REST请求与nonce重新同步计数
+        ClientMetrics.instrument_rest()
+        ClientMetrics.instrument_nonce_manager(self.signer_client)
         
-        # 运行状态
-        self.is_running = False
-        self.start_time = None
+        # 延迟埋点：签名与发送、行情处理、风控与端到端
+        self.latency.instrument_signer(self.signer_client)
+        self.data_manager.set_latency_tracker(self.latency)
+        self.order_manager.set_latency_tracker(self.latency)
+        
+    def _register_metrics(self):
+        """注册事件总线邮箱与订单提交队列的深度指标（抓取时读取当前统计）"""
+        subscribers = lambda: self.event_bus.get_stats()["subscribers"]
+        REGISTRY.gauge("quant_trading_event_bus_depth", "事件总线各订阅者邮箱的当前积压", ("subscriber",)).set_function(
+            lambda: {(name,): stats["depth"] for name, stats in subscribers().items()})
+        REGISTRY.gauge("quant_trading_event_bus_max_depth", "事件总线各订阅者邮箱的历史最大积压", ("subscriber",)).set_function(
+            lambda: {(name,): stats["max_depth"] for name, stats in subscribers().items()})
+        REGISTRY.counter("quant_trading_event_bus_dropped_total", "事件总线邮箱满时丢弃的事件数", ("subscriber",)).set_function(
+            lambda: {(name,): stats["dropped"] for name, stats in subscribers().items()})
+        REGISTRY.counter("quant_trading_events_published_total", "事件总线发布的事件数", ("event_type",)).set_function(
+            lambda: {(event_type,): count for event_type, count in self.event_bus.get_stats()["published"].items()})
+        REGISTRY.gauge("quant_trading_pending_orders", "等待提交的订单数").set_function(
+            lambda: len(self.order_manager.get_pending_orders()))
+        REGISTRY.add_collector(self.latency.to_prometheus)
+        
+    def set_clock(self, clock: Clock):
+        """设置时钟并下发给各核心模块与已添加的策略"""
+        self.clock = clock
+        for component in (self.data_manager, self.risk_manager, self.position_manager,
+                          self.order_manager, self.notification_manager):
+            if component is not None:
+                component.set_clock(clock)
+        for strategy in getattr(self, "strategies", ()):
+            strategy.set_clock(clock)
         
     def add_strategy(self, strategy: BaseStrategy):
         """
@@ -75,7 +172,75 @@ class TradingEngine:
         """
         strategy.set_engine(self)
         self.strategies.append(strategy)
+        self._strategy_locks[id(strategy)] = asyncio.Lock()
+        self._subscribe_strategy(strategy)
         self.logger.info(f"添加策略: {strategy.name}")
+    
+    def _subscribe_strategy(self, strategy: BaseStrategy):
+        """按策略关注的市场订阅事件总线（账户事件不区分市场）"""
+        market_ids = {getattr(strategy, attr, None) for attr in ('market_id', 'market_id_1', 'market_id_2')}
+        for attr in ('market_ids', 'active_markets'):
+            market_ids.update(getattr(strategy, attr, None) or [])
+        market_ids.discard(None)
+        
+        async def handle(event: Event):
+            if not strategy.is_active():
+                return
+            if event.event_type == EventType.TICK:
+                if strategy.use_real_time_ticks:
+                    with self.latency.labels(event.market_id, strategy.name):
+                        await strategy.on_real_time_tick(event.market_id, event.payload)
+                trigger = StrategyTrigger.TICK
+            elif event.event_type == EventType.BAR_CLOSE:
+                timeframe, candle = event.payload
+                strategy.on_bar_close(event.market_id, timeframe, candle)
+                trigger = StrategyTrigger.BAR_CLOSE
+            elif event.event_type == EventType.ORDER:
+                await strategy.on_order_update(event.payload)
+                trigger = StrategyTrigger.FILL
+            else:
+                await strategy.on_fill(*event.payload)
+                trigger = StrategyTrigger.FILL
+            
+            # 声明了该触发条件的策略在事件发生时立即运行
+            if trigger in strategy.triggers:
+                await self._run_strategy(strategy)
+        
+        name = self._strategy_key(strategy)
+        self.event_bus.subscribe(name, handle, (EventType.TICK, EventType.BAR_CLOSE, EventType.ORDER), market_ids)
+        self.event_bus.subscribe(f"{name}/account", handle, (EventType.FILL,))
+    
+    def _strategy_key(self, strategy: BaseStrategy) -> str:
+        """策略在总线和调度器中的唯一名称"""
+        return f"{strategy.name}#{self.strategies.index(strategy) + 1}"
+    
+    async def _run_strategy(self, strategy: BaseStrategy, from_timer: bool = False):
+        """
+        运行一次策略
+        
+        Args:
+            strategy: 策略实例
+            from_timer: 是否由定时器触发（策略仍在运行时跳过本次，而不是排队）
+        """
+        lock = self._strategy_locks[id(strategy)]
+        if from_timer and lock.locked():
+            return
+        
+        async with lock:
+            if not self.trading_allowed or not strategy.is_active():
+                return
+            
+            market_data = self.data_manager.market_data_cache
+            try:
+                # 策略内创建的订单与其签名/发送耗时都归到该策略
+                with self.latency.labels(strategy=strategy.name), self.latency.span(LatencyStage.SIGNAL):
+                    if from_timer and strategy.use_real_time_ticks:
+                        # 实时tick策略主要通过事件处理，定时器只做定期检查
+                        await strategy.on_periodic_update(market_data)
+                    else:
+                        await strategy.on_tick(market_data)
+            except Exception as e:
+                self.logger.error(f"策略 {strategy.name} 执行错误: {e}")
         
     async def start(self):
         """启动交易引擎"""
@@ -85,7 +250,7 @@ class TradingEngine:
             
         self.logger.info("启动交易引擎...")
         self.is_running = True
-        self.start_time = datetime.now()
+        self.start_time = self.clock.now()
         
         try:
             # 初始化各个模块
@@ -107,8 +272,13 @@ class TradingEngine:
             
         self.logger.info("停止交易引擎...")
         self.is_running = False
+        self._stop_event.set()
         
-        # 停止所有策略
+        # 停止定时任务、事件分发与所有策略
+        await self.scheduler.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.stop()
+        await self.event_bus.stop()
         for strategy in self.strategies:
             await strategy.stop()
         
@@ -118,12 +288,14 @@ class TradingEngine:
         # 关闭数据管理器
         await self.data_manager.close()
             
-        # 关闭客户端连接
+        # 关闭客户端连接（分片工作进程没有签名客户端和通知管理器）
         await self.api_client.close()
-        await self.signer_client.close()
+        if self.signer_client is not None:
+            await self.signer_client.close()
         
         # 关闭通知管理器
-        await self.notification_manager.close()
+        if self.notification_manager is not None:
+            await self.notification_manager.close()
         
         self.logger.info("交易引擎已停止")
         
@@ -171,123 +343,115 @@ class TradingEngine:
         # 初始化所有策略
         for strategy in self.strategies:
             await strategy.initialize()
+        
+        # 启动事件总线（策略初始化后再开始投递）
+        await self.event_bus.start()
             
         self.logger.info("模块初始化完成")
         
     async def _main_loop(self):
-        """主循环 - 支持实时tick数据流"""
-        self.logger.info("进入主循环...")
+        """
+        主循环 - 事件驱动
         
-        # 连接健康检查计数器
-        loop_count = 0
-        connection_check_interval = 100  # 每100次循环检查一次连接（约5分钟，如果tick_interval=3秒）
+        策略只在声明的触发条件（tick / K线收盘 / 成交 / 定时）发生时运行，
+        连接检查、风控、持仓对账、订单状态检查各自作为独立定时任务；
+        新订单由提交任务立即处理。空闲时所有任务都挂起等待，不再轮询
+        """
+        self.logger.info("进入事件驱动主循环...")
         
-        # 设置实时tick回调
-        self.data_manager.add_tick_callback(self._on_real_time_tick)
+        trading_config = self.config.trading_config
+        tick_interval = trading_config["tick_interval"]
         
-        while self.is_running:
+        self.scheduler.add_timer("market_cache", trading_config.get("market_refresh_interval", 60),
+                                 self._refresh_market_cache, run_immediately=True)
+        self.scheduler.add_timer("risk_check", trading_config.get("risk_check_interval", tick_interval),
+                                 self._check_risk, run_immediately=True)
+        self.scheduler.add_timer("position_sync", trading_config.get("position_sync_interval", tick_interval),
+                                 self.position_manager.update_positions)
+        self.scheduler.add_timer("order_status", trading_config.get("order_status_interval", tick_interval),
+                                 self.order_manager.check_submitted_orders)
+        self.scheduler.add_timer("connection_check", trading_config.get("connection_check_interval", 300),
+                                 self._check_connection)
+        
+        for strategy in self.strategies:
+            if StrategyTrigger.TIMER in strategy.triggers:
+                self.scheduler.add_timer(f"strategy:{self._strategy_key(strategy)}", strategy.timer_interval,
+                                         partial(self._run_strategy, strategy, True))
+        
+        submission_task = asyncio.create_task(self.order_manager.run_submission_worker())
+        await self.scheduler.start()
+        if self.metrics_server is not None:
             try:
-                # 定期测试连接健康状态
-                loop_count += 1
-                if loop_count % connection_check_interval == 0:
-                    self.logger.info("执行定期连接健康检查...")
-                    connection_ok = await self._test_connection()
-                    if not connection_ok:
-                        self.logger.error("连接健康检查失败，系统将继续运行但可能无法交易")
-                        # 发送通知
-                        if self.notification_manager:
-                            await self.notification_manager.send_system_error(
-                                error_type="connection_check_failed",
-                                message="定期连接检查失败，请检查网络和配置"
-                            )
-                    else:
-                        self.logger.info("连接健康检查通过")
-                
-                # 收集所有策略使用的市场ID
-                strategy_markets = set()
-                for strategy in self.strategies:
-                    if hasattr(strategy, 'market_id'):
-                        strategy_markets.add(strategy.market_id)
-                    if hasattr(strategy, 'market_id_1'):
-                        strategy_markets.add(strategy.market_id_1)
-                    if hasattr(strategy, 'market_id_2'):
-                        strategy_markets.add(strategy.market_id_2)
-                
-                # 获取市场数据（包含所有策略使用的市场）
-                # 注意：现在主要依赖WebSocket实时数据，这里主要用于补充K线等历史数据
-                market_data = await self.data_manager.get_latest_data(extra_markets=list(strategy_markets))
-                
-                # 风险检查
-                if not await self.risk_manager.check_risk_limits(market_data):
-                    self.logger.warning("风险检查失败，跳过本次交易")
-                    # 发送风险警告通知
-                    await self.notification_manager.send_risk_limit_exceeded(
-                        risk_type="general",
-                        current_value=0,
-                        limit_value=0,
-                        message="风险检查失败，跳过本次交易"
-                    )
-                    await asyncio.sleep(1)
-                    continue
-                
-                # 更新仓位信息
-                await self.position_manager.update_positions()
-                
-                # 执行策略（现在主要依赖实时tick回调，这里作为备用）
-                for strategy in self.strategies:
-                    if strategy.is_active():
-                        try:
-                            # 检查策略是否支持实时tick模式
-                            if hasattr(strategy, 'use_real_time_ticks') and strategy.use_real_time_ticks:
-                                # 实时tick策略主要通过回调处理，这里只做定期检查
-                                await strategy.on_periodic_update(market_data)
-                            else:
-                                # 传统策略仍使用定时更新
-                                await strategy.on_tick(market_data)
-                        except Exception as e:
-                            self.logger.error(f"策略 {strategy.name} 执行错误: {e}")
-                
-                # 处理订单
-                await self.order_manager.process_orders()
-                
-                # 等待下次循环
-                await asyncio.sleep(self.config.trading_config["tick_interval"])
-                
+                await self.metrics_server.start()
             except Exception as e:
-                self.logger.error(f"主循环错误: {e}")
-                await asyncio.sleep(1)
-    
-    def _on_real_time_tick(self, market_id: int, tick_data: Dict[str, Any]):
-        """实时tick数据回调 - 类似Pine Script的calc_on_every_tick"""
+                self.logger.error(f"启动指标服务失败: {e}")
+        
         try:
-            # 为支持实时tick的策略执行实时计算
-            for strategy in self.strategies:
-                if strategy.is_active():
-                    try:
-                        # 检查策略是否支持实时tick模式
-                        if hasattr(strategy, 'use_real_time_ticks') and strategy.use_real_time_ticks:
-                            # 检查策略是否关注这个市场
-                            if (hasattr(strategy, 'market_id') and strategy.market_id == market_id) or \
-                               (hasattr(strategy, 'market_id_1') and strategy.market_id_1 == market_id) or \
-                               (hasattr(strategy, 'market_id_2') and strategy.market_id_2 == market_id):
-                                
-                                # 执行实时tick处理
-                                asyncio.create_task(strategy.on_real_time_tick(market_id, tick_data))
-                                
-                    except Exception as e:
-                        self.logger.error(f"策略 {strategy.name} 实时tick处理错误: {e}")
-                        
-        except Exception as e:
-            self.logger.error(f"实时tick回调处理错误: {e}")
-                
+            await self._stop_event.wait()
+        finally:
+            submission_task.cancel()
+            try:
+                await submission_task
+            except asyncio.CancelledError:
+                pass
+    
+    def _get_strategy_markets(self) -> List[int]:
+        """收集所有策略使用的市场ID"""
+        strategy_markets = set()
+        for strategy in self.strategies:
+            for attr in ('market_id', 'market_id_1', 'market_id_2'):
+                if hasattr(strategy, attr):
+                    strategy_markets.add(getattr(strategy, attr))
+        return list(strategy_markets)
+    
+    async def _refresh_market_cache(self):
+        """确保策略使用的市场都有数据缓存与市场信息（行情本身由WebSocket实时推送）"""
+        await self.data_manager.get_latest_data(extra_markets=self._get_strategy_markets())
+    
+    async def _check_risk(self):
+        """定时风控检查，未通过时暂停运行策略直到恢复"""
+        passed = await self.risk_manager.check_risk_limits(self.data_manager.market_data_cache)
+        if not passed and self.trading_allowed:
+            self.logger.warning("风险检查失败，暂停运行策略")
+            # 发送风险警告通知
+            await self.notification_manager.send_risk_limit_exceeded(
+                risk_type="general",
+                current_value=0,
+                limit_value=0,
+                message="风险检查失败，暂停运行策略"
+            )
+        elif passed and not self.trading_allowed:
+            self.logger.info("风险检查恢复正常，继续运行策略")
+        self.trading_allowed = passed
+    
+    async def _check_connection(self):
+        """定期测试连接健康状态"""
+        self.logger.info("执行定期连接健康检查...")
+        connection_ok = await self._test_connection()
+        if not connection_ok:
+            self.logger.error("连接健康检查失败，系统将继续运行但可能无法交易")
+            # 发送通知
+            if self.notification_manager:
+                await self.notification_manager.send_system_error(
+                    error_type="connection_check_failed",
+                    message="定期连接检查失败，请检查网络和配置"
+                )
+        else:
+            self.logger.info("连接健康检查通过")
+    
     def get_status(self) -> Dict[str, Any]:
         """获取引擎状态"""
         return {
             "is_running": self.is_running,
             "start_time": self.start_time,
-            "uptime": datetime.now() - self.start_time if self.start_time else None,
+            "uptime": self.clock.now() - self.start_time if self.start_time else None,
             "strategies_count": len(self.strategies),
             "active_strategies": sum(1 for s in self.strategies if s.is_active()),
             "positions": self.position_manager.get_all_positions(),
-            "orders": self.order_manager.get_pending_orders()
+            "orders": self.order_manager.get_pending_orders(),
+            "event_bus": self.event_bus.get_stats(),
+            "scheduler": self.scheduler.get_stats(),
+            "runtime": Runtime.get_stats(),
+            "latency": self.latency.get_stats(),
+            "trading_allowed": self.trading_allowed
         }
@@ -37,7 +37,8 @@ class Notification:
                  level: NotificationLevel,
                  title: str,
                  message: str,
-                 data: Optional[Dict[str, Any]] = None):
+                 data: Optional[Dict[str, Any]] = None,
+                 timestamp: Optional[datetime] = None):
         """
         初始化通知消息
         
@@ -47,13 +48,14 @@ class Notification:
             title: 通知标题
             message: 通知内容
             data: 附加数据
+            timestamp: 通知时间，默认为当前时间
         """
         self.notification_type = notification_type
         self.level = level
         self.title = title
         self.message = message
         self.data = data or {}
-        self.timestamp = datetime.now()
+        self.timestamp = timestamp or datetime.now()
         
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
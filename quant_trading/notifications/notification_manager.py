@@ -6,9 +6,10 @@
 import asyncio
 import logging
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from datetime import timedelta
 from collections import deque
 
+from ..utils.clock import REALTIME_CLOCK, Clock
 from .base_notifier import BaseNotifier, Notification, NotificationType, NotificationLevel
 from .email_notifier import EmailNotifier
 
@@ -25,6 +26,7 @@ class NotificationManager:
         """
         self.config = config
         self.logger = logging.getLogger("NotificationManager")
+        self.clock: Clock = REALTIME_CLOCK
         
         # 初始化通知器
         self.notifiers: Dict[str, BaseNotifier] = {}
@@ -34,7 +36,7 @@ class NotificationManager:
         self.notification_queue = deque()
         self.batch_size = config.get("batch_size", 10)
         self.batch_interval = config.get("batch_interval", 60)  # 秒
-        self.last_batch_time = datetime.now()
+        self.last_batch_time = self.clock.now()
         
         # 通知历史（用于去重和限制频率）
         self.notification_history = deque(maxlen=1000)
@@ -44,6 +46,11 @@ class NotificationManager:
         self._batch_task = None
         self._start_batch_processor()
         
+    def set_clock(self, clock: Clock):
+        """设置时钟（通知时间戳、去重与频率限制窗口按它计算）"""
+        self.clock = clock
+        self.last_batch_time = clock.now()
+        
     def _initialize_notifiers(self):
         """初始化通知器"""
         # 邮件通知器
@@ -72,7 +79,7 @@ class NotificationManager:
                 
                 if len(self.notification_queue) >= self.batch_size or \
                    (self.notification_queue and 
-                    datetime.now() - self.last_batch_time > timedelta(seconds=self.batch_interval)):
+                    self.clock.now() - self.last_batch_time > timedelta(seconds=self.batch_interval)):
                     
                     # 获取批量通知
                     batch_notifications = []
@@ -82,7 +89,7 @@ class NotificationManager:
                     
                     if batch_notifications:
                         await self._send_batch_notifications(batch_notifications)
-                        self.last_batch_time = datetime.now()
+                        self.last_batch_time = self.clock.now()
                         
             except Exception as e:
                 self.logger.error(f"批处理任务错误: {e}")
@@ -114,7 +121,8 @@ class NotificationManager:
             level=level,
             title=title,
             message=message,
-            data=data or {}
+            data=data or {},
+            timestamp=self.clock.now()
         )
         
         # 检查是否应该发送
@@ -187,7 +195,7 @@ class NotificationManager:
         time_window = rate_limit_config.get("time_window", 300)  # 5分钟
         max_count = rate_limit_config.get("max_count", 10)
         
-        cutoff_time = datetime.now() - timedelta(seconds=time_window)
+        cutoff_time = self.clock.now() - timedelta(seconds=time_window)
         recent_notifications = [
             n for n in self.notification_history
             if n.notification_type == notification.notification_type and
@@ -199,7 +207,7 @@ class NotificationManager:
     def _is_duplicate_notification(self, notification: Notification) -> bool:
         """检查是否是重复通知"""
         # 检查最近5分钟内是否有相同的通知
-        cutoff_time = datetime.now() - timedelta(minutes=5)
+        cutoff_time = self.clock.now() - timedelta(minutes=5)
         recent_notifications = [
             n for n in self.notification_history
             if n.notification_type == notification.notification_type and
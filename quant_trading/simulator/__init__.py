@@ -0,0 +1,19 @@
+"""
+模拟交易所模块
+本机运行的Lighter交易所替身（REST + WebSocket），用于无网络的联调、压测与延迟测试
+
+运行: python -m quant_trading.simulator [--port 8800] [--tick-rate 1000] [--latency-ms 2]
+"""
+
+from .exchange import SimMarket, SimOrder, SimPosition, SimulatedExchange, SimulatorError
+from .server import ExchangeSimulator, SimulatorOptions
+
+__all__ = [
+    "SimMarket",
+    "SimOrder",
+    "SimPosition",
+    "SimulatedExchange",
+    "SimulatorError",
+    "ExchangeSimulator",
+    "SimulatorOptions"
+]
@@ -0,0 +1,51 @@
+"""
+启动模拟交易所
+
+运行: python -m quant_trading.simulator [--config config.yaml] [--port 8800] [--tick-rate 1000]
+
+交易系统配置中把 lighter.base_url 设为 http://127.0.0.1:8800、lighter.ws_url 设为
+ws://127.0.0.1:8800/stream 即可连接（模拟交易所不校验签名）
+"""
+
+import argparse
+import asyncio
+
+from ..utils.config import Config
+from .server import ExchangeSimulator, SimulatorOptions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lighter模拟交易所")
+    parser.add_argument("--config", default=None, help="读取配置文件的simulator配置段")
+    parser.add_argument("--host", default=None, help="监听地址")
+    parser.add_argument("--port", type=int, default=None, help="监听端口")
+    parser.add_argument("--markets", default=None, help="市场ID列表，逗号分隔，如 0,1,2")
+    parser.add_argument("--tick-rate", type=float, default=None, help="所有市场合计每秒推送的订单簿更新数")
+    parser.add_argument("--latency-ms", type=float, default=None, help="REST固定延迟（毫秒）")
+    parser.add_argument("--latency-jitter-ms", type=float, default=None, help="REST随机延迟上限（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=None, help="REST返回500的概率")
+    parser.add_argument("--rate-limit-rate", type=float, default=None, help="REST返回429的概率")
+    parser.add_argument("--ws-disconnect-interval", type=float, default=None, help="周期性断开WebSocket的间隔（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    options = SimulatorOptions.from_config(Config.from_file(args.config)) if args.config else SimulatorOptions()
+    overrides = {
+        "host": args.host, "port": args.port, "tick_rate": args.tick_rate, "latency_ms": args.latency_ms,
+        "latency_jitter_ms": args.latency_jitter_ms, "error_rate": args.error_rate,
+        "rate_limit_rate": args.rate_limit_rate, "ws_disconnect_interval": args.ws_disconnect_interval,
+        "seed": args.seed,
+        "market_ids": [int(m) for m in args.markets.split(",")] if args.markets else None,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            setattr(options, name, value)
+
+    try:
+        asyncio.run(ExchangeSimulator(options).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
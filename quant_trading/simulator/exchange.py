@@ -0,0 +1,649 @@
+"""
+模拟交易所
+在内存中实现本系统用到的Lighter交易所子集：市场列表、订单簿、K线、账户持仓、nonce与下单/撤单交易，
+附带一个简单的撮合引擎（价格-时间优先）。行情由每个市场的随机游走中间价驱动，
+做市深度在每个tick按中间价重建，用户挂单被新的做市报价穿越时按挂单价成交。
+
+本模块只有同步的状态与撮合逻辑，HTTP/WebSocket接口见 server.py
+"""
+
+import json
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+
+# 与 lighter.SignerClient 的常量一致
+TX_TYPE_CREATE_ORDER = 14
+TX_TYPE_CANCEL_ORDER = 15
+TX_TYPE_CANCEL_ALL_ORDERS = 16
+TX_TYPE_MODIFY_ORDER = 17
+
+ORDER_TYPE_LIMIT = 0
+ORDER_TYPE_MARKET = 1
+
+TIME_IN_FORCE_IOC = 0
+TIME_IN_FORCE_GTT = 1
+TIME_IN_FORCE_POST_ONLY = 2
+
+CODE_OK = 200
+CODE_INVALID_NONCE = 21104
+CODE_INVALID_ORDER = 21700
+CODE_ORDER_NOT_FOUND = 21701
+CODE_INVALID_TX = 21500
+
+# 做市方的账户索引（不记账）
+MARKET_MAKER_ACCOUNT = -1
+
+# K线周期（分钟）
+RESOLUTIONS = {"1m": 1, "5m": 5, "15m": 15, "30m": 30, "1h": 60, "4h": 240, "1d": 1440}
+
+
+class SimulatorError(Exception):
+    """交易被拒绝（code为Lighter风格的业务错误码，http_status为返回的HTTP状态码）"""
+
+    def __init__(self, code: int, message: str, http_status: int = 400):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.http_status = http_status
+
+
+@dataclass
+class SimMarket:
+    """模拟市场"""
+    market_id: int
+    symbol: str
+    price: float                          # 当前中间价
+    price_decimals: int = 2
+    size_decimals: int = 4
+    min_base_amount: float = 0.001
+    min_quote_amount: float = 1.0
+    volatility: float = 0.0005            # 每个tick中间价对数收益的标准差
+    spread_ticks: int = 1                 # 做市买一/卖一距中间价的最小价位数
+    depth_size: float = 1.0               # 做市每档挂单量
+
+    # 做市深度 [[价格, 剩余数量], ...]，买卖各自按最优价在前
+    mm_bids: List[List[float]] = field(default_factory=list)
+    mm_asks: List[List[float]] = field(default_factory=list)
+    # 用户挂单（按价格-时间优先排序）
+    resting_bids: List["SimOrder"] = field(default_factory=list)
+    resting_asks: List["SimOrder"] = field(default_factory=list)
+    # 1分钟K线（毫秒时间戳）
+    candles: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=2000))
+    # 上一次推送给WebSocket订阅者的价位
+    published: Dict[str, List[str]] = field(default_factory=lambda: {"bids": [], "asks": []})
+    last_trade_id: int = 0
+
+    @property
+    def tick_size(self) -> float:
+        return 10 ** -self.price_decimals
+
+    def format_price(self, price: float) -> str:
+        return f"{price:.{self.price_decimals}f}"
+
+    def format_size(self, size: float) -> str:
+        return f"{size:.{self.size_decimals}f}"
+
+
+@dataclass
+class SimOrder:
+    """模拟订单"""
+    order_index: int
+    client_order_index: int
+    account_index: int
+    market_id: int
+    is_ask: bool
+    price: float
+    initial_size: float
+    remaining_size: float
+    order_type: int = ORDER_TYPE_LIMIT
+    time_in_force: int = TIME_IN_FORCE_GTT
+    reduce_only: bool = False
+    expiry: int = 0
+    created_at: float = 0.0
+
+
+@dataclass
+class SimPosition:
+    """模拟持仓（size带符号，正为多头）"""
+    size: float = 0.0
+    avg_entry_price: float = 0.0
+    realized_pnl: float = 0.0
+
+    def apply_fill(self, is_buy: bool, size: float, price: float) -> float:
+        """按成交更新持仓，返回本次实现的盈亏"""
+        signed = size if is_buy else -size
+        realized = 0.0
+        if self.size == 0 or (self.size > 0) == is_buy:
+            # 开仓或加仓
+            total = abs(self.size) + size
+            self.avg_entry_price = (self.avg_entry_price * abs(self.size) + price * size) / total
+            self.size += signed
+        else:
+            closed = min(abs(self.size), size)
+            direction = 1 if self.size > 0 else -1
+            realized = (price - self.avg_entry_price) * closed * direction
+            self.size += signed
+            if abs(self.size) < 1e-12:
+                self.size = 0.0
+                self.avg_entry_price = 0.0
+            elif (self.size > 0) != (direction > 0):
+                # 反手：剩余部分按成交价开仓
+                self.avg_entry_price = price
+        self.realized_pnl += realized
+        return realized
+
+
+@dataclass
+class SimAccount:
+    """模拟账户"""
+    index: int
+    collateral: float
+    positions: Dict[int, SimPosition] = field(default_factory=dict)
+    orders: Dict[int, SimOrder] = field(default_factory=dict)      # 活动挂单
+    trades: Dict[int, List[Dict[str, Any]]] = field(default_factory=dict)   # 自上次推送以来的成交
+    total_order_count: int = 0
+
+
+class SimulatedExchange:
+    """模拟交易所状态与撮合引擎"""
+
+    def __init__(self, markets: List[SimMarket], collateral: float = 100000.0, levels: int = 5,
+                 history_minutes: int = 500, seed: Optional[int] = None):
+        """
+        Args:
+            markets: 市场列表
+            collateral: 新账户的初始保证金（USDC）
+            levels: 做市深度每侧的档数
+            history_minutes: 启动时生成的历史1分钟K线数量
+            seed: 随机种子（行情可复现）
+        """
+        self.markets: Dict[int, SimMarket] = {market.market_id: market for market in markets}
+        self.collateral = collateral
+        self.levels = levels
+        self.rng = random.Random(seed)
+        self.accounts: Dict[int, SimAccount] = {}
+        # nonce: (账户, API密钥) -> 下一个nonce / 低水位 / 低水位之上已使用的nonce
+        self.nonces: Dict[Tuple[int, int], int] = {}
+        self.nonce_low: Dict[Tuple[int, int], int] = {}
+        self.nonces_used: Dict[Tuple[int, int], Set[int]] = {}
+        self.orders: Dict[int, SimOrder] = {}
+        self.next_order_index = 1
+        self.tx_count = 0
+        self.fills = 0
+        # 自上次推送以来状态有变化的账户（由服务端推送account_all更新后清空）
+        self.dirty_accounts: Set[int] = set()
+
+        for market in self.markets.values():
+            self._seed_history(market, history_minutes)
+            self._rebuild_depth(market)
+
+    # ==========================================
+    # 行情
+    # ==========================================
+
+    def _seed_history(self, market: SimMarket, minutes: int):
+        """生成历史K线（从当前价格向前随机游走），使策略启动时有足够的预热数据"""
+        now_minute = int(time.time()) // 60 * 60
+        sigma = market.volatility * math.sqrt(60)
+        closes = [market.price]
+        for _ in range(minutes - 1):
+            closes.append(closes[-1] * math.exp(-self.rng.gauss(0, sigma)))
+        closes.reverse()
+        previous = closes[0]
+        for i, close in enumerate(closes):
+            high = max(previous, close) * (1 + abs(self.rng.gauss(0, sigma / 2)))
+            low = min(previous, close) * (1 - abs(self.rng.gauss(0, sigma / 2)))
+            market.candles.append({
+                "timestamp": (now_minute - (minutes - 1 - i) * 60) * 1000,
+                "open": previous, "high": high, "low": low, "close": close,
+                "volume0": 0.0, "volume1": 0.0, "last_trade_id": 0,
+            })
+            previous = close
+
+    def _rebuild_depth(self, market: SimMarket):
+        """按当前中间价重建做市深度"""
+        tick = market.tick_size
+        best_bid = math.floor(market.price / tick - market.spread_ticks + 1e-9) * tick
+        best_ask = math.ceil(market.price / tick + market.spread_ticks - 1e-9) * tick
+        market.mm_bids = [[round(best_bid - i * tick, market.price_decimals), market.depth_size]
+                          for i in range(self.levels)]
+        market.mm_asks = [[round(best_ask + i * tick, market.price_decimals), market.depth_size]
+                          for i in range(self.levels)]
+
+    def tick(self, market_id: int) -> SimMarket:
+        """
+        推进一个市场的行情：中间价随机游走、重建做市深度、撮合被穿越的用户挂单、更新当前K线
+
+        Returns:
+            市场对象
+        """
+        market = self.markets[market_id]
+        market.price *= math.exp(self.rng.gauss(0, market.volatility))
+        self._rebuild_depth(market)
+
+        # 新的做市报价穿越用户挂单时，挂单按自身价格成交（用户为maker）
+        best_ask = market.mm_asks[0][0]
+        best_bid = market.mm_bids[0][0]
+        while market.resting_bids and market.resting_bids[0].price >= best_ask:
+            order = market.resting_bids[0]
+            self._fill(market, order, order.remaining_size, order.price, taker=False)
+        while market.resting_asks and market.resting_asks[0].price <= best_bid:
+            order = market.resting_asks[0]
+            self._fill(market, order, order.remaining_size, order.price, taker=False)
+
+        self._update_candle(market, market.price, 0.0)
+        return market
+
+    def _update_candle(self, market: SimMarket, price: float, volume: float):
+        minute_ms = int(time.time()) // 60 * 60 * 1000
+        candle = market.candles[-1] if market.candles else None
+        if candle is None or candle["timestamp"] < minute_ms:
+            open_price = candle["close"] if candle else price
+            market.candles.append({
+                "timestamp": minute_ms, "open": open_price, "high": max(open_price, price),
+                "low": min(open_price, price), "close": price,
+                "volume0": volume, "volume1": volume * price, "last_trade_id": market.last_trade_id,
+            })
+            return
+        candle["high"] = max(candle["high"], price)
+        candle["low"] = min(candle["low"], price)
+        candle["close"] = price
+        candle["volume0"] += volume
+        candle["volume1"] += volume * price
+        candle["last_trade_id"] = market.last_trade_id
+
+    def book_levels(self, market: SimMarket, depth: Optional[int] = None) -> Dict[str, List[Tuple[str, str]]]:
+        """聚合做市深度与用户挂单后的价位 {"bids": [(价格, 数量)], "asks": [...]}，最优价在前"""
+        depth = depth or self.levels
+        result = {}
+        for side, mm_levels, resting, reverse in (("bids", market.mm_bids, market.resting_bids, True),
+                                                   ("asks", market.mm_asks, market.resting_asks, False)):
+            if not resting:
+                # 无用户挂单时做市深度本身已按最优价排序
+                full = market.format_size(market.depth_size)
+                result[side] = [(market.format_price(price), full if size == market.depth_size
+                                 else market.format_size(size)) for price, size in mm_levels[:depth] if size > 0]
+                continue
+            sizes: Dict[float, float] = {}
+            for price, size in mm_levels:
+                if size > 0:
+                    sizes[price] = sizes.get(price, 0.0) + size
+            # 挂单按最优价在前排序，超过depth个不同价位后不可能进入前depth档
+            for order in resting:
+                if order.price not in sizes and len(sizes) >= 2 * depth:
+                    break
+                sizes[order.price] = sizes.get(order.price, 0.0) + order.remaining_size
+            prices = sorted(sizes, reverse=reverse)[:depth]
+            result[side] = [(market.format_price(price), market.format_size(sizes[price])) for price in prices]
+        return result
+
+    def book_update(self, market: SimMarket) -> Dict[str, List[Dict[str, str]]]:
+        """
+        生成一次订单簿增量（WebSocket update/order_book 的order_book字段）
+
+        先把上次推送的价位全部置0，再给出当前全部价位：lighter.WsClient按顺序合并增量
+        （新价位追加到末尾），这样合并后的列表始终与服务端一致且最优价在前
+        """
+        levels = self.book_levels(market)
+        update = {}
+        for side in ("bids", "asks"):
+            update[side] = [{"price": price, "size": "0"} for price in market.published[side]]
+            update[side].extend({"price": price, "size": size} for price, size in levels[side])
+            market.published[side] = [price for price, _ in levels[side]]
+        return update
+
+    def book_snapshot(self, market: SimMarket) -> Dict[str, List[Dict[str, str]]]:
+        """订单簿快照（WebSocket subscribed/order_book 的order_book字段）"""
+        levels = self.book_levels(market)
+        market.published = {side: [price for price, _ in levels[side]] for side in ("bids", "asks")}
+        return {side: [{"price": price, "size": size} for price, size in levels[side]]
+                for side in ("bids", "asks")}
+
+    # ==========================================
+    # 账户与nonce
+    # ==========================================
+
+    def get_account(self, account_index: int) -> SimAccount:
+        """获取账户（不存在时按初始保证金创建）"""
+        account = self.accounts.get(account_index)
+        if account is None:
+            account = self.accounts[account_index] = SimAccount(account_index, self.collateral)
+        return account
+
+    def next_nonce(self, account_index: int, api_key_index: int) -> int:
+        """下一个可用的nonce（已使用的最大nonce + 1）"""
+        return self.nonces.get((account_index, api_key_index), 0)
+
+    def _consume_nonce(self, tx: Dict[str, Any]):
+        """
+        校验并消耗nonce
+
+        并发请求到达顺序可能与nonce顺序不同，因此接受低水位之上任何未使用过的nonce；
+        重复使用或低于低水位（已连续使用的部分）的nonce返回 invalid nonce
+        """
+        key = (int(tx.get("AccountIndex", 0)), int(tx.get("ApiKeyIndex", 0)))
+        nonce = tx.get("Nonce")
+        low = self.nonce_low.get(key, 0)
+        used = self.nonces_used.setdefault(key, set())
+        if nonce is None or int(nonce) < low or int(nonce) in used:
+            raise SimulatorError(CODE_INVALID_NONCE, f"invalid nonce: {nonce} (next {self.next_nonce(*key)})")
+        nonce = int(nonce)
+        used.add(nonce)
+        self.nonces[key] = max(self.nonces.get(key, 0), nonce + 1)
+        while low in used:
+            used.discard(low)
+            low += 1
+        self.nonce_low[key] = low
+
+    # ==========================================
+    # 交易
+    # ==========================================
+
+    def send_tx(self, tx_type: int, tx_info: str) -> str:
+        """
+        处理一笔交易（不校验签名）
+
+        Returns:
+            交易哈希
+
+        Raises:
+            SimulatorError: 交易被拒绝
+        """
+        try:
+            tx = json.loads(tx_info)
+        except (TypeError, ValueError):
+            raise SimulatorError(CODE_INVALID_TX, "invalid tx info")
+        self._consume_nonce(tx)
+        if tx_type == TX_TYPE_CREATE_ORDER:
+            self._create_order(tx)
+        elif tx_type == TX_TYPE_CANCEL_ORDER:
+            self._cancel_order(tx)
+        elif tx_type == TX_TYPE_CANCEL_ALL_ORDERS:
+            self._cancel_all_orders(tx)
+        elif tx_type == TX_TYPE_MODIFY_ORDER:
+            self._modify_order(tx)
+        else:
+            raise SimulatorError(CODE_INVALID_TX, f"unsupported tx type: {tx_type}")
+        self.tx_count += 1
+        return f"{self.tx_count:064x}"
+
+    def _market_of(self, tx: Dict[str, Any]) -> SimMarket:
+        market_id = tx.get("MarketIndex", tx.get("OrderBookIndex"))
+        market = self.markets.get(int(market_id)) if market_id is not None else None
+        if market is None:
+            raise SimulatorError(CODE_INVALID_ORDER, f"invalid market index: {market_id}")
+        return market
+
+    def _create_order(self, tx: Dict[str, Any]):
+        market = self._market_of(tx)
+        account = self.get_account(int(tx.get("AccountIndex", 0)))
+        size = int(tx["BaseAmount"]) / 10 ** market.size_decimals
+        price = int(tx["Price"]) / 10 ** market.price_decimals
+        is_ask = bool(tx.get("IsAsk"))
+        order_type = int(tx.get("Type", tx.get("OrderType", ORDER_TYPE_LIMIT)))
+        time_in_force = int(tx.get("TimeInForce", TIME_IN_FORCE_GTT))
+        reduce_only = bool(tx.get("ReduceOnly"))
+
+        if size < market.min_base_amount or size * price < market.min_quote_amount:
+            raise SimulatorError(CODE_INVALID_ORDER, "order size below minimum")
+        if reduce_only:
+            position = account.positions.get(market.market_id)
+            held = position.size if position else 0.0
+            # 只减仓：数量截断到当前持仓，方向不对或无持仓时拒绝
+            if held == 0 or (held > 0) != is_ask:
+                raise SimulatorError(CODE_INVALID_ORDER, "reduce only order would increase position")
+            size = min(size, abs(held))
+
+        order = SimOrder(
+            order_index=self.next_order_index, client_order_index=int(tx.get("ClientOrderIndex", 0)),
+            account_index=account.index, market_id=market.market_id, is_ask=is_ask, price=price,
+            initial_size=size, remaining_size=size, order_type=order_type, time_in_force=time_in_force,
+            reduce_only=reduce_only, expiry=int(tx.get("OrderExpiry", 0) or 0), created_at=time.time()
+        )
+        self.next_order_index += 1
+        account.total_order_count += 1
+
+        crosses = self._crosses(market, order)
+        if time_in_force == TIME_IN_FORCE_POST_ONLY and crosses:
+            raise SimulatorError(CODE_INVALID_ORDER, "post only order would cross")
+        if crosses:
+            self._match(market, order)
+        # 市价单与IOC的剩余部分直接取消，限价GTT挂单
+        if order.remaining_size > 0 and order_type == ORDER_TYPE_LIMIT and time_in_force != TIME_IN_FORCE_IOC:
+            self._rest(market, order)
+        self.dirty_accounts.add(account.index)
+
+    def _crosses(self, market: SimMarket, order: SimOrder) -> bool:
+        best = self._best_opposite(market, order)
+        if best is None:
+            return False
+        return best <= order.price if not order.is_ask else best >= order.price
+
+    def _best_opposite(self, market: SimMarket, order: SimOrder) -> Optional[float]:
+        if order.is_ask:
+            candidates = [level[0] for level in market.mm_bids if level[1] > 0][:1]
+            candidates += [o.price for o in market.resting_bids if o.account_index != order.account_index][:1]
+            return max(candidates) if candidates else None
+        candidates = [level[0] for level in market.mm_asks if level[1] > 0][:1]
+        candidates += [o.price for o in market.resting_asks if o.account_index != order.account_index][:1]
+        return min(candidates) if candidates else None
+
+    def _match(self, market: SimMarket, order: SimOrder):
+        """按价格-时间优先与做市深度和其他账户的挂单撮合（不与自己的挂单成交）"""
+        buying = not order.is_ask
+        mm_levels = market.mm_asks if buying else market.mm_bids
+        resting = market.resting_asks if buying else market.resting_bids
+        while order.remaining_size > 1e-12:
+            mm_level = next((level for level in mm_levels if level[1] > 1e-12), None)
+            maker = next((o for o in resting if o.account_index != order.account_index), None)
+            if mm_level is None and maker is None:
+                break
+            use_maker = maker is not None and (mm_level is None or (
+                maker.price <= mm_level[0] if buying else maker.price >= mm_level[0]))
+            price = maker.price if use_maker else mm_level[0]
+            if (buying and price > order.price) or (not buying and price < order.price):
+                break
+            if use_maker:
+                size = min(order.remaining_size, maker.remaining_size)
+                self._fill(market, maker, size, price, taker=False)
+            else:
+                size = min(order.remaining_size, mm_level[1])
+                mm_level[1] -= size
+            self._fill(market, order, size, price, taker=True)
+
+    def _fill(self, market: SimMarket, order: SimOrder, size: float, price: float, taker: bool):
+        """记录一笔成交：更新订单剩余数量、账户持仓与保证金"""
+        order.remaining_size -= size
+        if order.remaining_size <= 1e-12:
+            order.remaining_size = 0.0
+            self._remove_resting(market, order)
+        account = self.get_account(order.account_index)
+        position = account.positions.setdefault(market.market_id, SimPosition())
+        account.collateral += position.apply_fill(not order.is_ask, size, price)
+        market.last_trade_id += 1
+        account.trades.setdefault(market.market_id, []).append({
+            "trade_id": market.last_trade_id, "market_id": market.market_id,
+            "order_index": order.order_index, "client_order_index": order.client_order_index,
+            "size": market.format_size(size), "price": market.format_price(price),
+            "is_ask": order.is_ask, "is_maker": not taker, "timestamp": int(time.time() * 1000),
+        })
+        self.dirty_accounts.add(account.index)
+        if taker:
+            self.fills += 1
+            self._update_candle(market, price, size)
+
+    def _rest(self, market: SimMarket, order: SimOrder):
+        book = market.resting_asks if order.is_ask else market.resting_bids
+        book.append(order)
+        if order.is_ask:
+            book.sort(key=lambda o: (o.price, o.order_index))
+        else:
+            book.sort(key=lambda o: (-o.price, o.order_index))
+        self.orders[order.order_index] = order
+        self.get_account(order.account_index).orders[order.order_index] = order
+
+    def _remove_resting(self, market: SimMarket, order: SimOrder):
+        book = market.resting_asks if order.is_ask else market.resting_bids
+        if order in book:
+            book.remove(order)
+        self.orders.pop(order.order_index, None)
+        self.get_account(order.account_index).orders.pop(order.order_index, None)
+
+    def _find_order(self, tx: Dict[str, Any]) -> SimOrder:
+        order_index = tx.get("Index", tx.get("OrderIndex"))
+        order = self.orders.get(int(order_index)) if order_index is not None else None
+        if order is None or order.account_index != int(tx.get("AccountIndex", 0)):
+            # 撤单/改单允许使用client_order_index
+            for candidate in self.get_account(int(tx.get("AccountIndex", 0))).orders.values():
+                if order_index is not None and candidate.client_order_index == int(order_index):
+                    return candidate
+            raise SimulatorError(CODE_ORDER_NOT_FOUND, f"order not found: {order_index}")
+        return order
+
+    def _cancel_order(self, tx: Dict[str, Any]):
+        order = self._find_order(tx)
+        self._remove_resting(self.markets[order.market_id], order)
+        self.dirty_accounts.add(order.account_index)
+
+    def _cancel_all_orders(self, tx: Dict[str, Any]):
+        account = self.get_account(int(tx.get("AccountIndex", 0)))
+        for order in list(account.orders.values()):
+            self._remove_resting(self.markets[order.market_id], order)
+        self.dirty_accounts.add(account.index)
+
+    def _modify_order(self, tx: Dict[str, Any]):
+        order = self._find_order(tx)
+        market = self.markets[order.market_id]
+        self._remove_resting(market, order)
+        order.price = int(tx["Price"]) / 10 ** market.price_decimals
+        order.remaining_size = int(tx["BaseAmount"]) / 10 ** market.size_decimals
+        order.initial_size = order.remaining_size
+        if self._crosses(market, order):
+            self._match(market, order)
+        if order.remaining_size > 0:
+            self._rest(market, order)
+        self.dirty_accounts.add(order.account_index)
+
+    # ==========================================
+    # REST响应（字段与lighter.models一致）
+    # ==========================================
+
+    def order_books_response(self) -> Dict[str, Any]:
+        return {"code": CODE_OK, "order_books": [{
+            "symbol": market.symbol, "market_id": market.market_id, "status": "active",
+            "taker_fee": "0.0000", "maker_fee": "0.0000", "liquidation_fee": "1.0000",
+            "min_base_amount": str(market.min_base_amount), "min_quote_amount": str(market.min_quote_amount),
+            "supported_size_decimals": market.size_decimals, "supported_price_decimals": market.price_decimals,
+            "supported_quote_decimals": market.size_decimals + market.price_decimals,
+        } for market in self.markets.values()]}
+
+    def order_book_orders_response(self, market_id: int, limit: int) -> Dict[str, Any]:
+        market = self.markets.get(market_id)
+        if market is None:
+            raise SimulatorError(CODE_INVALID_ORDER, f"invalid market id: {market_id}")
+
+        def simple_orders(mm_levels, resting):
+            orders = [{
+                "order_index": order.order_index, "order_id": str(order.order_index),
+                "owner_account_index": order.account_index,
+                "initial_base_amount": market.format_size(order.initial_size),
+                "remaining_base_amount": market.format_size(order.remaining_size),
+                "price": market.format_price(order.price), "order_expiry": order.expiry,
+            } for order in resting]
+            orders += [{
+                "order_index": 0, "order_id": "0", "owner_account_index": MARKET_MAKER_ACCOUNT,
+                "initial_base_amount": market.format_size(market.depth_size),
+                "remaining_base_amount": market.format_size(size),
+                "price": market.format_price(price), "order_expiry": 0,
+            } for price, size in mm_levels if size > 0]
+            return orders
+
+        bids = sorted(simple_orders(market.mm_bids, market.resting_bids), key=lambda o: -float(o["price"]))[:limit]
+        asks = sorted(simple_orders(market.mm_asks, market.resting_asks), key=lambda o: float(o["price"]))[:limit]
+        return {"code": CODE_OK, "total_asks": len(asks), "asks": asks, "total_bids": len(bids), "bids": bids}
+
+    def candlesticks_response(self, market_id: int, resolution: str, start_timestamp: int,
+                              end_timestamp: int, count_back: int) -> Dict[str, Any]:
+        market = self.markets.get(market_id)
+        if market is None or resolution not in RESOLUTIONS:
+            raise SimulatorError(CODE_INVALID_TX, f"invalid market or resolution: {market_id} {resolution}")
+        # 兼容秒与毫秒时间戳
+        start_ms = start_timestamp if start_timestamp > 10 ** 11 else start_timestamp * 1000
+        end_ms = end_timestamp if end_timestamp > 10 ** 11 else end_timestamp * 1000
+        period_ms = RESOLUTIONS[resolution] * 60 * 1000
+
+        buckets: Dict[int, Dict[str, Any]] = {}
+        for candle in market.candles:
+            bucket = candle["timestamp"] // period_ms * period_ms
+            if bucket < start_ms - period_ms or bucket > end_ms:
+                continue
+            merged = buckets.get(bucket)
+            if merged is None:
+                buckets[bucket] = dict(candle, timestamp=bucket)
+            else:
+                merged["high"] = max(merged["high"], candle["high"])
+                merged["low"] = min(merged["low"], candle["low"])
+                merged["close"] = candle["close"]
+                merged["volume0"] += candle["volume0"]
+                merged["volume1"] += candle["volume1"]
+                merged["last_trade_id"] = candle["last_trade_id"]
+        candles = [buckets[key] for key in sorted(buckets)][-count_back:] if count_back > 0 else []
+        return {"code": CODE_OK, "resolution": resolution, "candlesticks": candles}
+
+    def _position_entries(self, account: SimAccount) -> List[Dict[str, Any]]:
+        entries = []
+        for market_id, position in account.positions.items():
+            market = self.markets[market_id]
+            unrealized = (market.price - position.avg_entry_price) * position.size
+            entries.append({
+                "market_id": market_id, "symbol": market.symbol, "initial_margin_fraction": "10.00",
+                "open_order_count": sum(1 for o in account.orders.values() if o.market_id == market_id),
+                "pending_order_count": 0, "position_tied_order_count": 0,
+                "sign": (position.size > 0) - (position.size < 0),
+                "position": market.format_size(abs(position.size)),
+                "avg_entry_price": market.format_price(position.avg_entry_price),
+                "position_value": f"{abs(position.size) * market.price:.6f}",
+                "unrealized_pnl": f"{unrealized:.6f}", "realized_pnl": f"{position.realized_pnl:.6f}",
+                "liquidation_price": "0", "total_funding_paid_out": "0",
+                "margin_mode": 0, "allocated_margin": "0",
+            })
+        return entries
+
+    def account_response(self, account_index: int) -> Dict[str, Any]:
+        account = self.get_account(account_index)
+        positions = self._position_entries(account)
+        unrealized = sum(float(p["unrealized_pnl"]) for p in positions)
+        total = f"{account.collateral + unrealized:.6f}"
+        return {"code": CODE_OK, "total": 1, "accounts": [{
+            "code": CODE_OK, "account_type": 0, "index": account.index, "l1_address": "0x" + "0" * 40,
+            "cancel_all_time": 0, "total_order_count": account.total_order_count,
+            "total_isolated_order_count": 0, "pending_order_count": 0,
+            "available_balance": f"{account.collateral:.6f}", "status": 1,
+            "collateral": f"{account.collateral:.6f}", "account_index": account.index,
+            "name": "", "description": "simulator", "can_invite": True, "referral_points_percentage": "0",
+            "positions": positions, "total_asset_value": total, "cross_asset_value": total,
+            "pool_info": None, "shares": [],
+        }]}
+
+    def account_message(self, account_index: int, subscribed: bool = False) -> Dict[str, Any]:
+        """account_all频道消息（持仓按市场ID为键，附带自上次推送以来的成交）"""
+        account = self.get_account(account_index)
+        trades, account.trades = account.trades, {}
+        return {
+            "type": "subscribed/account_all" if subscribed else "update/account_all",
+            "channel": f"account_all:{account_index}",
+            "account": account_index,
+            "positions": {str(entry["market_id"]): entry for entry in self._position_entries(account)},
+            "orders": {str(order.order_index): {
+                "order_index": order.order_index, "client_order_index": order.client_order_index,
+                "market_index": order.market_id, "is_ask": order.is_ask,
+                "price": self.markets[order.market_id].format_price(order.price),
+                "remaining_base_amount": self.markets[order.market_id].format_size(order.remaining_size),
+            } for order in account.orders.values()},
+            "trades": {str(market_id): items for market_id, items in trades.items()},
+        }
@@ -0,0 +1,332 @@
+"""
+模拟交易所服务
+以aiohttp提供与Lighter一致的REST接口（orderBooks、orderBookOrders、candlesticks、account、nextNonce、
+sendTx、sendTxBatch）和 /stream WebSocket（order_book、account_all频道），
+行情按设定的tick速率推送，可注入固定/随机延迟、HTTP 500、429限流与周期性断线。
+
+交易所的 base_url 指向 http://host:port、ws_url 指向 ws://host:port/stream 即可在本机无网络地压测
+"""
+
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from aiohttp import WSMsgType, web
+
+from ..utils.logger import setup_logger
+from .exchange import CODE_OK, SimMarket, SimulatedExchange, SimulatorError
+
+
+# 默认市场（与Lighter主网前几个市场的ID和精度一致）
+DEFAULT_MARKETS = {
+    0: dict(symbol="ETH", price=3000.0, price_decimals=2, size_decimals=4, min_base_amount=0.005, min_quote_amount=10.0),
+    1: dict(symbol="BTC", price=60000.0, price_decimals=1, size_decimals=5, min_base_amount=0.0002, min_quote_amount=10.0),
+    2: dict(symbol="SOL", price=150.0, price_decimals=3, size_decimals=3, min_base_amount=0.05, min_quote_amount=10.0),
+    3: dict(symbol="DOGE", price=0.15, price_decimals=6, size_decimals=0, min_base_amount=10.0, min_quote_amount=5.0),
+}
+
+
+@dataclass
+class SimulatorOptions:
+    """模拟交易所选项（对应config.yaml的simulator配置段）"""
+    host: str = "127.0.0.1"
+    port: int = 8800
+    market_ids: List[int] = field(default_factory=lambda: [0, 1, 2, 3])
+    tick_rate: float = 100.0              # 所有市场合计每秒推送的订单簿更新数
+    levels: int = 5                       # 每侧深度档数
+    collateral: float = 100000.0          # 新账户初始保证金
+    history_minutes: int = 500            # 启动时生成的历史K线数量
+    latency_ms: float = 0.0               # REST固定延迟
+    latency_jitter_ms: float = 0.0        # REST随机延迟上限（均匀分布）
+    error_rate: float = 0.0               # REST返回HTTP 500的概率
+    rate_limit_rate: float = 0.0          # REST返回HTTP 429的概率
+    ws_disconnect_interval: float = 0.0   # 每隔多少秒断开所有WebSocket连接，0表示不断开
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_config(cls, config) -> "SimulatorOptions":
+        """从配置读取模拟交易所选项"""
+        simulator_config = getattr(config, "simulator_config", None) or {}
+        defaults = cls()
+        return cls(**{name: simulator_config.get(name, getattr(defaults, name))
+                      for name in cls.__dataclass_fields__})
+
+    def build_markets(self) -> List[SimMarket]:
+        """按市场ID创建模拟市场（未知ID使用通用参数）"""
+        markets = []
+        for market_id in self.market_ids:
+            params = DEFAULT_MARKETS.get(market_id, dict(symbol=f"SIM{market_id}", price=100.0 * (market_id + 1)))
+            markets.append(SimMarket(market_id=market_id, **params))
+        return markets
+
+
+class _Subscriber:
+    """一个WebSocket连接及其订阅"""
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+        self.markets: Set[int] = set()
+        self.accounts: Set[int] = set()
+
+
+class ExchangeSimulator:
+    """模拟交易所HTTP/WebSocket服务"""
+
+    def __init__(self, options: Optional[SimulatorOptions] = None, exchange: Optional[SimulatedExchange] = None):
+        """
+        Args:
+            options: 模拟交易所选项
+            exchange: 交易所状态（默认按选项创建）
+        """
+        self.options = options or SimulatorOptions()
+        self.exchange = exchange or SimulatedExchange(
+            self.options.build_markets(), collateral=self.options.collateral, levels=self.options.levels,
+            history_minutes=self.options.history_minutes, seed=self.options.seed
+        )
+        self.logger = setup_logger("ExchangeSimulator")
+        self.rng = random.Random(self.options.seed)
+        self.subscribers: Set[_Subscriber] = set()
+        self.tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+        self.stats: Dict[str, int] = {
+            "rest_requests": 0, "injected_errors": 0, "injected_rate_limits": 0,
+            "tx_accepted": 0, "tx_rejected": 0, "ticks": 0, "ws_messages": 0, "ws_disconnects": 0,
+        }
+
+    # ==========================================
+    # 生命周期
+    # ==========================================
+
+    def build_app(self) -> web.Application:
+        """创建aiohttp应用"""
+        app = web.Application(middlewares=[self._inject_faults])
+        app.router.add_get("/api/v1/orderBooks", self._handle_order_books)
+        app.router.add_get("/api/v1/orderBookOrders", self._handle_order_book_orders)
+        app.router.add_get("/api/v1/candlesticks", self._handle_candlesticks)
+        app.router.add_get("/api/v1/account", self._handle_account)
+        app.router.add_get("/api/v1/nextNonce", self._handle_next_nonce)
+        app.router.add_post("/api/v1/sendTx", self._handle_send_tx)
+        app.router.add_post("/api/v1/sendTxBatch", self._handle_send_tx_batch)
+        app.router.add_get("/stream", self._handle_stream)
+        app.router.add_get("/simulator/stats", self._handle_stats)
+        return app
+
+    async def start(self):
+        """启动服务与行情推送"""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.options.host, self.options.port).start()
+        if self.options.tick_rate > 0:
+            self.tasks.append(asyncio.create_task(self._run_ticker()))
+        if self.options.ws_disconnect_interval > 0:
+            self.tasks.append(asyncio.create_task(self._run_disconnects()))
+        self.logger.info(f"模拟交易所已启动: http://{self.options.host}:{self.options.port} "
+                         f"(市场 {list(self.exchange.markets)}, {self.options.tick_rate:g} tick/s)")
+
+    async def stop(self):
+        """停止服务"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+        for subscriber in list(self.subscribers):
+            await subscriber.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        self.logger.info(f"模拟交易所已停止: {self.stats}")
+
+    async def serve_forever(self):
+        """启动并一直运行，直到被取消"""
+        await self.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    # ==========================================
+    # 故障注入
+    # ==========================================
+
+    @web.middleware
+    async def _inject_faults(self, request: web.Request, handler):
+        if not request.path.startswith("/api/"):
+            return await handler(request)
+        self.stats["rest_requests"] += 1
+        delay = self.options.latency_ms + self.rng.uniform(0, self.options.latency_jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        roll = self.rng.random()
+        if roll < self.options.rate_limit_rate:
+            self.stats["injected_rate_limits"] += 1
+            return web.json_response({"code": 429, "message": "too many requests"}, status=429)
+        if roll < self.options.rate_limit_rate + self.options.error_rate:
+            self.stats["injected_errors"] += 1
+            return web.json_response({"code": 500, "message": "injected server error"}, status=500)
+        try:
+            return await handler(request)
+        except SimulatorError as e:
+            return web.json_response({"code": e.code, "message": e.message}, status=e.http_status)
+        except (KeyError, ValueError) as e:
+            return web.json_response({"code": 400, "message": f"invalid request: {e}"}, status=400)
+
+    async def _run_disconnects(self):
+        while True:
+            await asyncio.sleep(self.options.ws_disconnect_interval)
+            for subscriber in list(self.subscribers):
+                self.stats["ws_disconnects"] += 1
+                await subscriber.ws.close()
+
+    # ==========================================
+    # REST
+    # ==========================================
+
+    async def _handle_order_books(self, request: web.Request) -> web.Response:
+        return web.json_response(self.exchange.order_books_response())
+
+    async def _handle_order_book_orders(self, request: web.Request) -> web.Response:
+        query = request.query
+        return web.json_response(self.exchange.order_book_orders_response(
+            int(query["market_id"]), int(query.get("limit", 20))))
+
+    async def _handle_candlesticks(self, request: web.Request) -> web.Response:
+        query = request.query
+        return web.json_response(self.exchange.candlesticks_response(
+            int(query["market_id"]), query["resolution"], int(query["start_timestamp"]),
+            int(query["end_timestamp"]), int(query.get("count_back", 100))))
+
+    async def _handle_account(self, request: web.Request) -> web.Response:
+        if request.query.get("by", "index") != "index":
+            raise SimulatorError(400, "only lookup by index is supported")
+        return web.json_response(self.exchange.account_response(int(request.query["value"])))
+
+    async def _handle_next_nonce(self, request: web.Request) -> web.Response:
+        nonce = self.exchange.next_nonce(int(request.query["account_index"]),
+                                         int(request.query.get("api_key_index", 0)))
+        return web.json_response({"code": CODE_OK, "nonce": nonce})
+
+    def _apply_tx(self, tx_type: int, tx_info: str) -> str:
+        try:
+            tx_hash = self.exchange.send_tx(tx_type, tx_info)
+        except SimulatorError:
+            self.stats["tx_rejected"] += 1
+            raise
+        self.stats["tx_accepted"] += 1
+        return tx_hash
+
+    async def _handle_send_tx(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        tx_hash = self._apply_tx(int(form["tx_type"]), form["tx_info"])
+        await self._publish_accounts()
+        return web.json_response({"code": CODE_OK, "message": "", "tx_hash": tx_hash,
+                                  "predicted_execution_time_ms": int(time.time() * 1000)})
+
+    async def _handle_send_tx_batch(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        tx_types = json.loads(form["tx_types"])
+        tx_infos = json.loads(form["tx_infos"])
+        if len(tx_types) != len(tx_infos):
+            raise SimulatorError(400, "tx_types and tx_infos length mismatch")
+        try:
+            hashes = [self._apply_tx(int(tx_type), tx_info) for tx_type, tx_info in zip(tx_types, tx_infos)]
+        finally:
+            await self._publish_accounts()
+        return web.json_response({"code": CODE_OK, "message": "", "tx_hash": hashes,
+                                  "predicted_execution_time_ms": int(time.time() * 1000)})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats, subscribers=len(self.subscribers),
+                                      fills=self.exchange.fills, resting_orders=len(self.exchange.orders)))
+
+    # ==========================================
+    # WebSocket
+    # ==========================================
+
+    async def _handle_stream(self, request: web.Request) -> web.WebSocketResponse:
+        # 本机压测不启用permessage-deflate，避免每条消息的压缩开销
+        ws = web.WebSocketResponse(compress=False)
+        await ws.prepare(request)
+        subscriber = _Subscriber(ws)
+        self.subscribers.add(subscriber)
+        try:
+            await ws.send_str(json.dumps({"type": "connected", "session_id": f"sim-{id(ws):x}"}))
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                message = json.loads(msg.data)
+                if message.get("type") == "subscribe":
+                    await self._subscribe(subscriber, message.get("channel", ""))
+        except Exception as e:
+            self.logger.error(f"WebSocket连接处理失败: {e}")
+        finally:
+            self.subscribers.discard(subscriber)
+        return ws
+
+    async def _subscribe(self, subscriber: _Subscriber, channel: str):
+        name, _, key = channel.partition("/")
+        if name == "order_book" and int(key) in self.exchange.markets:
+            market = self.exchange.markets[int(key)]
+            # 先把已有订阅者同步到当前价位，新订阅者的快照与之后的增量才一致
+            await self._broadcast_book(market)
+            subscriber.markets.add(market.market_id)
+            await self._send(subscriber, json.dumps({
+                "type": "subscribed/order_book", "channel": f"order_book:{market.market_id}",
+                "order_book": self.exchange.book_snapshot(market),
+            }))
+        elif name == "account_all":
+            account_index = int(key)
+            subscriber.accounts.add(account_index)
+            await self._send(subscriber, json.dumps(self.exchange.account_message(account_index, subscribed=True)))
+        else:
+            await self._send(subscriber, json.dumps({"type": "error", "message": f"invalid channel: {channel}"}))
+
+    async def _send(self, subscriber: _Subscriber, data: str):
+        try:
+            await subscriber.ws.send_str(data)
+            self.stats["ws_messages"] += 1
+        except Exception:
+            # 连接已断开，由连接处理协程清理
+            self.subscribers.discard(subscriber)
+
+    async def _broadcast_book(self, market: SimMarket):
+        subscribers = [s for s in self.subscribers if market.market_id in s.markets]
+        if not subscribers:
+            return
+        data = json.dumps({
+            "type": "update/order_book", "channel": f"order_book:{market.market_id}",
+            "timestamp": time.time_ns(), "order_book": self.exchange.book_update(market),
+        })
+        for subscriber in subscribers:
+            await self._send(subscriber, data)
+
+    async def _publish_accounts(self):
+        """推送状态有变化的账户（无人订阅的账户只清空待推送的成交）"""
+        dirty, self.exchange.dirty_accounts = self.exchange.dirty_accounts, set()
+        for account_index in dirty:
+            subscribers = [s for s in self.subscribers if account_index in s.accounts]
+            message = self.exchange.account_message(account_index)
+            if not subscribers:
+                continue
+            data = json.dumps(message)
+            for subscriber in subscribers:
+                await self._send(subscriber, data)
+
+    async def _run_ticker(self):
+        """按tick速率轮流推进各市场行情并推送订单簿增量"""
+        loop = asyncio.get_running_loop()
+        market_ids = list(self.exchange.markets)
+        started = loop.time()
+        sent = 0
+        while True:
+            due = min(int((loop.time() - started) * self.options.tick_rate) - sent, 1000)
+            for _ in range(due):
+                market = self.exchange.tick(market_ids[sent % len(market_ids)])
+                sent += 1
+                await self._broadcast_book(market)
+            self.stats["ticks"] = sent
+            if self.exchange.dirty_accounts:
+                await self._publish_accounts()
+            await asyncio.sleep(0.001 if due < 1000 else 0)
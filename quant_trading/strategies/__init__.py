@@ -3,7 +3,7 @@
 包含各种量化交易策略的实现
 """
 
-from .base_strategy import BaseStrategy
+from .base_strategy import BaseStrategy, StrategyTrigger
 from .mean_reversion import MeanReversionStrategy
 from .momentum import MomentumStrategy
 from .arbitrage import ArbitrageStrategy
@@ -12,6 +12,7 @@ from .multi_market_strategy import MultiMarketStrategyWrapper
 
 __all__ = [
     "BaseStrategy",
+    "StrategyTrigger",
     "MeanReversionStrategy", 
     "MomentumStrategy",
     "ArbitrageStrategy",
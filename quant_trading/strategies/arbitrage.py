@@ -6,11 +6,12 @@
 import logging
 from typing import Dict, List, Optional, Any, Tuple
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from .base_strategy import BaseStrategy
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.ring_buffer import as_candle_buffer
 
 
 class ArbitrageStrategy(BaseStrategy):
@@ -51,6 +52,9 @@ class ArbitrageStrategy(BaseStrategy):
         self.kline_types = arb_config.get('kline_types', [1])  # 默认只对1分钟K线发出信号
         self.logger.info(f"K线类型配置: {self.kline_types}分钟 - 策略将对这些时间周期的K线发出交易信号")
         
+        # 触发条件：默认定时运行，可配置为 bar_close / tick / fill 事件驱动
+        self.set_triggers(arb_config.get('triggers', ['timer']), arb_config.get('timer_interval'))
+        
         self.logger.info(f"策略配置: position_size=${self.position_size_usd} USD (将根据市场价格自动计算加密货币数量)")
         
         # 状态变量
@@ -92,7 +96,7 @@ class ArbitrageStrategy(BaseStrategy):
         
         # 检查信号冷却
         if (self.last_signal_time and 
-            datetime.now() - self.last_signal_time < self.signal_cooldown):
+            self.clock.now() - self.last_signal_time < self.signal_cooldown):
             return
             
         # 生成套利信号
@@ -100,11 +104,11 @@ class ArbitrageStrategy(BaseStrategy):
         
     def _get_current_price(self, market_data: Dict[str, Any]) -> Optional[float]:
         """获取当前价格"""
-        candlesticks = market_data.get("candlesticks", [])
-        if not candlesticks:
+        candlesticks = as_candle_buffer(market_data.get("candlesticks"))
+        if not len(candlesticks):
             return None
             
-        return candlesticks[-1]["close"]
+        return candlesticks.last("close")
         
     def _calculate_price_difference(self, price_1: float, price_2: float) -> float:
         """计算价格差异"""
@@ -195,7 +199,7 @@ class ArbitrageStrategy(BaseStrategy):
                     "short_size": short_size,  # 记录实际数量
                     "long_size": long_size,  # 记录实际数量
                     "size_usd": self.position_size_usd,  # 记录USD金额
-                    "entry_time": datetime.now(),
+                    "entry_time": self.clock.now(),
                     "price_diff": price_diff
                 }
                 
@@ -205,7 +209,7 @@ class ArbitrageStrategy(BaseStrategy):
                                price_diff=price_diff, size_usd=self.position_size_usd,
                                short_size=short_size, long_size=long_size)
                 
-                self.last_signal_time = datetime.now()
+                self.last_signal_time = self.clock.now()
                 
         except Exception as e:
             self.logger.error(f"执行套利交易失败: {e}")
@@ -3,15 +3,28 @@
 定义所有交易策略的通用接口
 """
 
+import contextlib
 import logging
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Any, Union
 from datetime import datetime
 
+import numpy as np
+
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
 
 
+class StrategyTrigger(Enum):
+    """策略触发条件 - 引擎只在声明的触发条件发生时运行策略"""
+    TICK = "tick"            # 关注市场有新tick（按市场合并，不会积压）
+    BAR_CLOSE = "bar_close"  # 关注市场有K线收盘
+    TIMER = "timer"          # 按timer_interval定时运行（默认，与原主循环行为一致）
+    FILL = "fill"            # 订单状态变化或账户成交推送
+
+
 class BaseStrategy(ABC):
     """策略基类"""
     
@@ -31,6 +44,9 @@ class BaseStrategy(ABC):
         self.is_active_flag = True
         self.engine = None
         
+        # 时钟（实盘为系统时钟，回测/回放时由引擎注入模拟时钟），策略内的时间逻辑都应读取它
+        self.clock: Clock = REALTIME_CLOCK
+        
         # 策略统计
         self.trades_count = 0
         self.total_pnl = 0.0
@@ -40,14 +56,30 @@ class BaseStrategy(ABC):
         self.use_real_time_ticks = False  # 是否启用实时tick模式
         self.last_tick_time: Dict[int, datetime] = {}  # 记录每个市场的最后tick时间
         
+        # 多市场包装器批量计算后分发的最新指标 {market_id: {指标名: 值}}
+        self.batch_indicators: Dict[int, Dict[str, float]] = {}
+        # 批量指标来源（多市场包装器），指标与当前K线不一致时由它重新计算全部市场
+        self.batch_source = None
+        
+        # 触发条件（子类可通过set_triggers按配置修改）
+        self.triggers = {StrategyTrigger.TIMER}
+        self.timer_interval = config.trading_config.get("tick_interval", 3.0)
+        
     def set_engine(self, engine):
-        """设置交易引擎"""
+        """设置交易引擎（同时使用引擎的时钟）"""
         self.engine = engine
+        clock = getattr(engine, "clock", None)
+        if clock is not None:
+            self.set_clock(clock)
+        
+    def set_clock(self, clock: Clock):
+        """设置时钟"""
+        self.clock = clock
         
     async def initialize(self):
         """初始化策略"""
         self.logger.info(f"初始化策略: {self.name}")
-        self.start_time = datetime.now()
+        self.start_time = self.clock.now()
         await self.on_initialize()
         
     async def start(self):
@@ -116,7 +148,7 @@ class BaseStrategy(ABC):
         """
         try:
             # 更新最后tick时间
-            self.last_tick_time[market_id] = datetime.now()
+            self.last_tick_time[market_id] = self.clock.now()
             
             # 调用子类的实时tick处理方法
             await self.process_real_time_tick(market_id, tick_data)
@@ -159,6 +191,99 @@ class BaseStrategy(ABC):
         # 默认实现：调用传统的市场数据处理方法
         await self.process_market_data(market_data)
     
+    def on_batch_indicators(self, market_id: int, indicators: Dict[str, float]):
+        """
+        批量指标回调 - 多市场包装器一次算出全部市场的指标后分发，子类可重写
+        
+        Args:
+            market_id: 市场ID
+            indicators: 最新一根K线的指标值（close/atr/ema/zscore/momentum）
+        """
+        self.batch_indicators[market_id] = indicators
+        
+    def set_batch_source(self, source):
+        """设置批量指标来源（提供 refresh_batch_indicators(market_data) 的多市场包装器）"""
+        self.batch_source = source
+        
+    def batch_window(self) -> int:
+        """批量计算本策略指标所需的K线数，0表示没有策略专用的批量指标"""
+        return 0
+        
+    def compute_batch_columns(self, stacked: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        批量计算本策略专用的指标 - 包装器对所有市场只调用一次（各实例参数相同），子类可重写
+        
+        Args:
+            stacked: 对齐后的K线 {"open"/"high"/"low"/"close"/"volume": (市场数, K线数) 二维数组}
+            
+        Returns:
+            {指标名: 每个市场最新值的一维数组}
+        """
+        return {}
+        
+    def _batch_values(self, market_data: Dict[int, Dict[str, Any]], candlesticks) -> Optional[Dict[str, float]]:
+        """
+        本市场与当前K线一致的批量指标，没有则为None（策略自行计算）
+        
+        指标的K线时间戳或收盘价与candlesticks最新一根不同时，先请包装器按market_data重新计算一次全部市场，
+        同一批数据上运行的其他实例直接读取结果
+        """
+        batch = self.batch_indicators.get(self.market_id)
+        if not self._batch_is_current(batch, candlesticks) and self.batch_source is not None:
+            self.batch_source.refresh_batch_indicators(market_data)
+            batch = self.batch_indicators.get(self.market_id)
+        return batch if self._batch_is_current(batch, candlesticks) else None
+        
+    @staticmethod
+    def _batch_is_current(batch: Optional[Dict[str, float]], candlesticks) -> bool:
+        return (batch is not None and len(candlesticks) > 0
+                and batch.get("timestamp") == candlesticks.last("timestamp")
+                and batch.get("close") == candlesticks.last("close"))
+
+    def on_bar_close(self, market_id: int, timeframe: int, candle):
+        """
+        K线收盘回调 - BarAggregator在某周期K线走完时触发，子类可重写
+
+        Args:
+            market_id: 市场ID
+            timeframe: 周期（分钟）
+            candle: 已走完的K线（Candle，支持字典式访问）
+        """
+        pass
+
+    async def on_order_update(self, order):
+        """
+        订单状态变化回调（提交/拒绝/取消），经事件总线优先通道投递，子类可重写
+
+        Args:
+            order: 订单对象
+        """
+        pass
+
+    async def on_fill(self, account_id: str, account_data: Dict[str, Any]):
+        """
+        账户流推送回调（成交、持仓变化），经事件总线优先通道投递，子类可重写
+
+        Args:
+            account_id: 账户ID
+            account_data: 账户数据
+        """
+        pass
+
+    def set_triggers(self, triggers: Iterable[Union[str, StrategyTrigger]],
+                     timer_interval: Optional[float] = None):
+        """
+        设置策略触发条件
+        
+        Args:
+            triggers: 触发条件列表，如 ["bar_close", "fill"]
+            timer_interval: 定时触发间隔（秒），None则保持tick_interval
+        """
+        self.triggers = {StrategyTrigger(t) for t in triggers}
+        if timer_interval is not None:
+            self.timer_interval = timer_interval
+        self.logger.info(f"策略 {self.name} 触发条件: {sorted(t.value for t in self.triggers)}")
+    
     def enable_real_time_ticks(self):
         """启用实时tick模式"""
         self.use_real_time_ticks = True
@@ -175,7 +300,7 @@ class BaseStrategy(ABC):
             "name": self.name,
             "is_active": self.is_active(),
             "start_time": self.start_time,
-            "uptime": datetime.now() - self.start_time if self.start_time else None,
+            "uptime": self.clock.now() - self.start_time if self.start_time else None,
             "trades_count": self.trades_count,
             "total_pnl": self.total_pnl
         }
@@ -236,6 +361,13 @@ class BaseStrategy(ABC):
             slippage_enabled=slippage_enabled
         )
         
+    def _latency_span(self, stage, market_id: Optional[int] = None):
+        """阶段计时区间（未挂到引擎时不计时）"""
+        if not self.engine:
+            return contextlib.nullcontext()
+            
+        return self.engine.latency.span(stage, market_id, self.name)
+        
     def _get_position(self, market_id: int):
         """获取仓位"""
         if not self.engine:
@@ -4,13 +4,14 @@
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from .base_strategy import BaseStrategy
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.ring_buffer import CandleBuffer, as_candle_buffer
 
 
 class MeanReversionStrategy(BaseStrategy):
@@ -98,8 +99,15 @@ class MeanReversionStrategy(BaseStrategy):
         self.kline_types = mr_config.get('kline_types', [1])  # 默认只对1分钟K线发出信号
         self.logger.info(f"K线类型配置: {self.kline_types}分钟 - 策略将对这些时间周期的K线发出交易信号")
         
+        # 触发条件：默认定时运行，可配置为 bar_close / tick / fill 事件驱动
+        self.set_triggers(mr_config.get('triggers', ['timer']), mr_config.get('timer_interval'))
+        
         self.logger.info(f"策略配置: position_size=${self.position_size_usd} USD (将根据市场价格自动计算加密货币数量)")
         self.logger.info(f"市场 {self.market_id} 滑点配置: {'开启' if self.slippage_enabled else '关闭'}, 容忍度={self.slippage_tolerance*100:.2f}%")
+        
+        # 状态变量
+        self.last_signal_time = None
+        self.signal_cooldown = timedelta(minutes=5)  # 信号冷却时间
     
     async def _check_market_level_risk_management(self, current_price: float):
         """⭐ 新需求：检查市场级止盈止损条件"""
@@ -134,10 +142,6 @@ class MeanReversionStrategy(BaseStrategy):
         take_profit_status = f"{'开启' if self.market_take_profit_enabled else '关闭'}({self.market_take_profit*100:.1f}%)"
         self.logger.debug(f"市场 {self.market_id} 当前盈亏: {pnl_ratio*100:.2f}% (止损: {stop_loss_status}, 止盈: {take_profit_status})")
         
-        # 状态变量
-        self.last_signal_time = None
-        self.signal_cooldown = timedelta(minutes=5)  # 信号冷却时间
-        
     async def on_initialize(self):
         """策略初始化"""
         self.logger.info(f"初始化均值回归策略: 市场 {self.market_id}, 回望周期 {self.lookback_period}, 阈值 {self.threshold}")
@@ -156,7 +160,7 @@ class MeanReversionStrategy(BaseStrategy):
             return
             
         market_data_info = market_data[self.market_id]
-        candlesticks = market_data_info.get("candlesticks", [])
+        candlesticks = as_candle_buffer(market_data_info.get("candlesticks"))
         
         if len(candlesticks) < self.lookback_period:
             return
@@ -166,10 +170,14 @@ class MeanReversionStrategy(BaseStrategy):
         if current_price is None:
             return
             
-        # 计算均值和标准差
-        prices = [c["close"] for c in candlesticks[-self.lookback_period:]]
-        mean_price = np.mean(prices)
-        std_price = np.std(prices)
+        # 计算均值和标准差（多市场包装器已批量算出时直接使用）
+        batch = self._batch_values(market_data, candlesticks)
+        if batch is not None and "std_price" in batch:
+            mean_price, std_price = batch["mean_price"], batch["std_price"]
+        else:
+            prices = candlesticks.column("close", self.lookback_period)
+            mean_price = np.mean(prices)
+            std_price = np.std(prices)
         
         if std_price == 0:
             return
@@ -179,19 +187,28 @@ class MeanReversionStrategy(BaseStrategy):
         
         # 检查信号冷却
         if (self.last_signal_time and 
-            datetime.now() - self.last_signal_time < self.signal_cooldown):
+            self.clock.now() - self.last_signal_time < self.signal_cooldown):
             return
             
         # 生成交易信号
         await self._generate_signal(current_price, z_score, mean_price)
         
-    def _get_current_price(self, candlesticks: List[Dict[str, Any]]) -> Optional[float]:
+    def batch_window(self) -> int:
+        """批量计算均值与标准差所需的K线数"""
+        return self.lookback_period
+        
+    def compute_batch_columns(self, stacked: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """所有市场回望窗口的收盘价均值与标准差"""
+        prices = stacked["close"][:, -self.lookback_period:]
+        return {"mean_price": prices.mean(axis=1), "std_price": prices.std(axis=1)}
+        
+    def _get_current_price(self, candlesticks: CandleBuffer) -> Optional[float]:
         """获取当前价格"""
-        if not candlesticks:
+        if not len(candlesticks):
             return None
             
         # 使用最新K线的收盘价
-        return candlesticks[-1]["close"]
+        return candlesticks.last("close")
         
     async def _generate_signal(self, current_price: float, z_score: float, mean_price: float):
         """生成交易信号"""
@@ -218,10 +235,9 @@ class MeanReversionStrategy(BaseStrategy):
             from ..core.position_manager import PositionSide
             if position.side == PositionSide.SHORT:
                 self.logger.warning(f"⚠️  检测到反向持仓（空仓），先平仓再开多仓")
-                await self._close_position(price, z_score, "信号反向：从空仓转为多仓")
+                await self._close_position(price, "信号反向：从空仓转为多仓")
                 # 等待平仓完成
-                import asyncio
-                await asyncio.sleep(0.5)
+                await self.clock.sleep(0.5)
         
         # 将USD金额转换为实际的加密货币数量
         actual_size = self.position_size_usd / price
@@ -253,7 +269,7 @@ class MeanReversionStrategy(BaseStrategy):
         if order:
             self._log_signal("LONG", self.market_id, 
                            price=price, z_score=z_score, size=actual_size, size_usd=self.position_size_usd)
-            self.last_signal_time = datetime.now()
+            self.last_signal_time = self.clock.now()
             
     async def _open_short_position(self, price: float, z_score: float):
         """开空仓"""
@@ -263,10 +279,9 @@ class MeanReversionStrategy(BaseStrategy):
             from ..core.position_manager import PositionSide
             if position.side == PositionSide.LONG:
                 self.logger.warning(f"⚠️  检测到反向持仓（多仓），先平仓再开空仓")
-                await self._close_position(price, z_score, "信号反向：从多仓转为空仓")
+                await self._close_position(price, "信号反向：从多仓转为空仓")
                 # 等待平仓完成
-                import asyncio
-                await asyncio.sleep(0.5)
+                await self.clock.sleep(0.5)
         
         # 将USD金额转换为实际的加密货币数量
         actual_size = self.position_size_usd / price
@@ -298,7 +313,7 @@ class MeanReversionStrategy(BaseStrategy):
         if order:
             self._log_signal("SHORT", self.market_id, 
                            price=price, z_score=z_score, size=actual_size, size_usd=self.position_size_usd)
-            self.last_signal_time = datetime.now()
+            self.last_signal_time = self.clock.now()
             
     async def _check_exit_conditions(self, position, current_price: float):
         """检查平仓条件"""
@@ -340,8 +355,32 @@ class MeanReversionStrategy(BaseStrategy):
             if order:
                 self._log_signal("EXIT", self.market_id, 
                                reason=exit_reason, pnl_ratio=pnl_ratio)
-                self.last_signal_time = datetime.now()
+                self.last_signal_time = self.clock.now()
                 
+    async def _close_position(self, price: float, reason: str):
+        """市价平仓"""
+        position = self._get_position(self.market_id)
+        if not position:
+            return
+            
+        from ..core.position_manager import PositionSide
+        
+        order = self._create_order(
+            market_id=self.market_id,
+            side="sell" if position.side == PositionSide.LONG else "buy",
+            order_type="market",
+            size=position.size,
+            price=price,
+            leverage=self.leverage,
+            margin_mode=self.margin_mode,
+            price_slippage_tolerance=self.slippage_tolerance,  # 使用市场特定的滑点容忍度
+            slippage_enabled=self.slippage_enabled  # 使用市场特定的滑点开关
+        )
+        
+        if order:
+            self._log_signal("EXIT", self.market_id, reason=reason, price=price)
+            self.last_signal_time = self.clock.now()
+            
     def get_strategy_params(self) -> Dict[str, Any]:
         """获取策略参数"""
         return {
@@ -4,13 +4,14 @@
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from .base_strategy import BaseStrategy
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.ring_buffer import CandleBuffer, as_candle_buffer
 from ..core.position_manager import PositionSide
 
 
@@ -90,8 +91,15 @@ class MomentumStrategy(BaseStrategy):
         self.kline_types = mom_config.get('kline_types', [1])  # 默认只对1分钟K线发出信号
         self.logger.info(f"K线类型配置: {self.kline_types}分钟 - 策略将对这些时间周期的K线发出交易信号")
         
+        # 触发条件：默认定时运行，可配置为 bar_close / tick / fill 事件驱动
+        self.set_triggers(mom_config.get('triggers', ['timer']), mom_config.get('timer_interval'))
+        
         self.logger.info(f"策略配置: position_size=${self.position_size_usd} USD (将根据市场价格自动计算加密货币数量)")
         self.logger.info(f"市场 {self.market_id} 滑点配置: {'开启' if self.slippage_enabled else '关闭'}, 容忍度={self.slippage_tolerance*100:.2f}%")
+        
+        # 状态变量
+        self.last_signal_time = None
+        self.signal_cooldown = timedelta(minutes=10)  # 信号冷却时间
     
     async def _check_market_level_risk_management(self, current_price: float):
         """⭐ 新需求：检查市场级止盈止损条件"""
@@ -126,10 +134,6 @@ class MomentumStrategy(BaseStrategy):
         take_profit_status = f"{'开启' if self.market_take_profit_enabled else '关闭'}({self.market_take_profit*100:.1f}%)"
         self.logger.debug(f"市场 {self.market_id} 当前盈亏: {pnl_ratio*100:.2f}% (止损: {stop_loss_status}, 止盈: {take_profit_status})")
         
-        # 状态变量
-        self.last_signal_time = None
-        self.signal_cooldown = timedelta(minutes=10)  # 信号冷却时间
-        
     async def on_initialize(self):
         """策略初始化"""
         self.logger.info(f"初始化动量策略: 市场 {self.market_id}, 短期 {self.short_period}, 长期 {self.long_period}")
@@ -148,7 +152,7 @@ class MomentumStrategy(BaseStrategy):
             return
             
         market_data_info = market_data[self.market_id]
-        candlesticks = market_data_info.get("candlesticks", [])
+        candlesticks = as_candle_buffer(market_data_info.get("candlesticks"))
         
         if len(candlesticks) < self.long_period:
             return
@@ -158,57 +162,71 @@ class MomentumStrategy(BaseStrategy):
         if current_price is None:
             return
             
-        # 计算动量指标
-        momentum = self._calculate_momentum(candlesticks)
+        # 计算动量指标（多市场包装器已批量算出均线时直接使用）
+        batch = self._batch_values(market_data, candlesticks)
+        if batch is not None and "long_ma" in batch:
+            momentum = self._momentum_from_averages(batch["short_ma"], batch["long_ma"])
+        else:
+            momentum = self._calculate_momentum(candlesticks)
         if momentum is None:
             return
             
         # 检查信号冷却
         if (self.last_signal_time and 
-            datetime.now() - self.last_signal_time < self.signal_cooldown):
+            self.clock.now() - self.last_signal_time < self.signal_cooldown):
             return
             
         # 生成交易信号
         await self._generate_signal(current_price, momentum)
         
-    def _get_current_price(self, candlesticks: List[Dict[str, Any]]) -> Optional[float]:
+    def _get_current_price(self, candlesticks: CandleBuffer) -> Optional[float]:
         """获取当前价格"""
-        if not candlesticks:
+        if not len(candlesticks):
             return None
             
-        latest_candle = candlesticks[-1]
-        if not isinstance(latest_candle, dict) or "close" not in latest_candle:
-            return None
-            
-        price = latest_candle["close"]
-        if not isinstance(price, (int, float)) or price <= 0:
+        price = candlesticks.last("close")
+        if not np.isfinite(price) or price <= 0:
             return None
             
         return price
         
-    def _calculate_momentum(self, candlesticks: List[Dict[str, Any]]) -> Optional[float]:
+    def _calculate_momentum(self, candlesticks: CandleBuffer) -> Optional[float]:
         """计算动量指标"""
         if len(candlesticks) < self.long_period:
             return None
             
-        prices = [c["close"] for c in candlesticks[-self.long_period:]]
+        prices = candlesticks.column("close", self.long_period)
         
         # 检查价格数据有效性
-        if not prices or any(p <= 0 for p in prices):
+        if len(prices) == 0 or (prices <= 0).any():
             return None
         
         # 计算短期和长期移动平均
         short_ma = np.mean(prices[-self.short_period:])
         long_ma = np.mean(prices)
         
+        return self._momentum_from_averages(short_ma, long_ma)
+        
+    @staticmethod
+    def _momentum_from_averages(short_ma: float, long_ma: float) -> Optional[float]:
+        """由短期与长期均线计算动量（批量计算时无效窗口的均线为NaN）"""
         # 防止除零错误
-        if long_ma == 0:
+        if long_ma == 0 or not np.isfinite(long_ma):
             return None
         
-        # 计算动量
-        momentum = (short_ma - long_ma) / long_ma
+        return (short_ma - long_ma) / long_ma
+        
+    def batch_window(self) -> int:
+        """批量计算均线所需的K线数"""
+        return self.long_period
         
-        return momentum
+    def compute_batch_columns(self, stacked: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """所有市场的短期与长期均线（窗口内有非正价格的市场为NaN，与逐市场计算的检查一致）"""
+        prices = stacked["close"][:, -self.long_period:]
+        invalid = (prices <= 0).any(axis=1)
+        short_ma = np.where(invalid, np.nan, prices[:, -self.short_period:].mean(axis=1))
+        long_ma = np.where(invalid, np.nan, prices.mean(axis=1))
+        return {"short_ma": short_ma, "long_ma": long_ma}
         
     async def _generate_signal(self, current_price: float, momentum: float):
         """生成交易信号"""
@@ -237,10 +255,9 @@ class MomentumStrategy(BaseStrategy):
             from ..core.position_manager import PositionSide
             if position.side == PositionSide.SHORT:
                 self.logger.warning(f"⚠️  检测到反向持仓（空仓），先平仓再开多仓")
-                await self._close_position(price, momentum, "信号反向：从空仓转为多仓")
+                await self._close_position(price, "信号反向：从空仓转为多仓")
                 # 等待平仓完成
-                import asyncio
-                await asyncio.sleep(0.5)
+                await self.clock.sleep(0.5)
         
         # 将USD金额转换为实际的加密货币数量
         actual_size = self.position_size_usd / price
@@ -263,7 +280,7 @@ class MomentumStrategy(BaseStrategy):
         if order:
             self._log_signal("LONG", self.market_id, 
                            price=price, momentum=momentum, size=actual_size, size_usd=self.position_size_usd)
-            self.last_signal_time = datetime.now()
+            self.last_signal_time = self.clock.now()
             
     async def _open_short_position(self, price: float, momentum: float):
         """开空仓"""
@@ -273,10 +290,9 @@ class MomentumStrategy(BaseStrategy):
             from ..core.position_manager import PositionSide
             if position.side == PositionSide.LONG:
                 self.logger.warning(f"⚠️  检测到反向持仓（多仓），先平仓再开空仓")
-                await self._close_position(price, momentum, "信号反向：从多仓转为空仓")
+                await self._close_position(price, "信号反向：从多仓转为空仓")
                 # 等待平仓完成
-                import asyncio
-                await asyncio.sleep(0.5)
+                await self.clock.sleep(0.5)
         
         # 将USD金额转换为实际的加密货币数量
         actual_size = self.position_size_usd / price
@@ -299,7 +315,7 @@ class MomentumStrategy(BaseStrategy):
         if order:
             self._log_signal("SHORT", self.market_id, 
                            price=price, momentum=momentum, size=actual_size, size_usd=self.position_size_usd)
-            self.last_signal_time = datetime.now()
+            self.last_signal_time = self.clock.now()
             
     async def _check_exit_conditions(self, position, current_price: float, momentum: float):
         """检查平仓条件"""
@@ -340,7 +356,7 @@ class MomentumStrategy(BaseStrategy):
             if order:
                 self._log_signal("EXIT", self.market_id, 
                                reason=exit_reason, pnl_ratio=pnl_ratio, momentum=momentum)
-                self.last_signal_time = datetime.now()
+                self.last_signal_time = self.clock.now()
                 
     def _is_momentum_reversal(self, position_side, momentum: float) -> bool:
         """检查动量是否反转"""
@@ -349,6 +365,26 @@ class MomentumStrategy(BaseStrategy):
         else:
             return momentum > self.momentum_threshold * 0.5
             
+    async def _close_position(self, price: float, reason: str):
+        """市价平仓"""
+        position = self._get_position(self.market_id)
+        if not position:
+            return
+            
+        order = self._create_order(
+            market_id=self.market_id,
+            side="sell" if position.side == PositionSide.LONG else "buy",
+            order_type="market",
+            size=position.size,
+            price=price,
+            price_slippage_tolerance=self.slippage_tolerance,  # 使用市场特定的滑点容忍度
+            slippage_enabled=self.slippage_enabled  # 使用市场特定的滑点开关
+        )
+        
+        if order:
+            self._log_signal("EXIT", self.market_id, reason=reason, price=price)
+            self.last_signal_time = self.clock.now()
+            
     def get_strategy_params(self) -> Dict[str, Any]:
         """获取策略参数"""
         return {
@@ -5,13 +5,17 @@
 
 import asyncio
 import aiohttp
+import numpy as np
 from typing import Dict, List, Any, Set
-from datetime import datetime
 import logging
 
 from .base_strategy import BaseStrategy
+from ..utils.clock import REALTIME_CLOCK, Clock
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.data_utils import DataUtils
+from ..utils.indicators import Indicators
+from ..utils.ring_buffer import CandleBuffer
 
 
 class MultiMarketStrategyWrapper:
@@ -39,6 +43,7 @@ class MultiMarketStrategyWrapper:
         self.config = config
         self.market_ids = market_ids
         self.strategy_kwargs = strategy_kwargs
+        self.name = f"MultiMarket_{strategy_class.__name__}"
         
         self.logger = setup_logger("MultiMarketStrategy", config.log_level)
         
@@ -62,12 +67,40 @@ class MultiMarketStrategyWrapper:
         self.rate_limit_window = 60  # 1分钟
         self.max_requests_per_window = 60  # 每分钟最多60个请求
         self.request_timestamps: List[float] = []
+        self.clock: Clock = REALTIME_CLOCK
+        
+        # 批量指标：所有市场的K线对齐为二维数组后一次计算（默认关闭）
+        batch_config = config.trading_config.get('batch_indicators', {})
+        self.batch_enabled = batch_config.get('enabled', False)
+        self.batch_lookback = batch_config.get('lookback', 200)
+        self.batch_atr_period = batch_config.get('atr_period', 14)
+        self.batch_ema_period = batch_config.get('ema_period', 20)
+        self.batch_zscore_period = batch_config.get('zscore_period', 20)
+        self.batch_momentum_period = batch_config.get('momentum_period', 10)
+        if self.batch_enabled:
+            # 实例单独注册到引擎时，由实例在处理数据时按需触发批量计算
+            for strategy in self.strategy_instances.values():
+                strategy.set_batch_source(self)
         
         self.logger.info(f"多市场策略初始化完成: 管理 {len(market_ids)} 个市场")
         self.logger.info(f"最大并发任务数: {self.max_concurrent_tasks}")
         self.logger.info(f"连接池配置: 最大{self.connector_limit}连接, 每主机{self.connector_limit_per_host}连接")
         self.logger.info(f"限流配置: 每{self.rate_limit_window}秒最多{self.max_requests_per_window}请求")
     
+    def set_clock(self, clock: Clock):
+        """设置时钟（限流窗口与所有策略实例共用）"""
+        self.clock = clock
+        for strategy in self.strategy_instances.values():
+            strategy.set_clock(clock)
+    
+    def set_engine(self, engine):
+        """设置交易引擎（所有策略实例共用同一引擎与时钟，回测时即共用同一模拟账户）"""
+        for strategy in self.strategy_instances.values():
+            strategy.set_engine(engine)
+        clock = getattr(engine, "clock", None)
+        if clock is not None:
+            self.clock = clock
+    
     async def initialize(self):
         """初始化所有策略实例"""
         self.logger.info("初始化所有市场的策略实例...")
@@ -157,6 +190,10 @@ class MultiMarketStrategyWrapper:
             self.logger.warning("达到限流限制，跳过本次数据处理")
             return
         
+        # 一次向量化计算所有市场的指标并分发给各策略实例
+        if self.batch_enabled:
+            self.refresh_batch_indicators(market_data)
+        
         # 为每个市场创建处理任务
         process_tasks = []
         for market_id, strategy in self.strategy_instances.items():
@@ -180,6 +217,79 @@ class MultiMarketStrategyWrapper:
                     market_id = list(self.strategy_instances.keys())[i]
                     self.logger.error(f"市场 {market_id} 数据处理失败: {result}")
     
+    def compute_batch_indicators(self, market_data: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
+        """
+        批量计算所有管理市场的最新指标
+        
+        通用指标为 close/atr/ema/zscore/momentum；策略专用指标由策略的 compute_batch_columns 计算，
+        只提供给最近 batch_window 根K线与对齐时间轴完全一致的市场（与策略自行计算的结果相同）
+        
+        Args:
+            market_data: 所有市场的数据字典（使用其中的candlesticks）
+            
+        Returns:
+            {market_id: {"timestamp", "close", 通用指标..., 策略专用指标...}}，K线不足的市场只有timestamp与close
+        """
+        candles_by_market = {
+            market_id: market_data[market_id].get("candlesticks", [])
+            for market_id in self.strategy_instances
+            if market_id in market_data and market_data[market_id]
+        }
+        if not candles_by_market:
+            return {}
+        template = next(iter(self.strategy_instances.values()))
+        window = template.batch_window()
+        market_ids, timestamps, stacked, bars = DataUtils.stack_candlesticks(
+            candles_by_market, max(self.batch_lookback, window))
+        if not market_ids:
+            return {}
+            
+        # 每个市场都带上自己最新K线的时间戳与收盘价，策略据此判断指标是否对应当前K线（缺少的指标自行计算）
+        closes = stacked["close"]
+        results: Dict[int, Dict[str, float]] = {
+            market_id: {"timestamp": float(self._last_timestamps(candles_by_market[market_id], 1)[-1]),
+                        "close": float(closes[i, -1])}
+            for i, market_id in enumerate(market_ids)
+        }
+        
+        required_bars = max(self.batch_atr_period + 1, self.batch_ema_period,
+                            self.batch_zscore_period, self.batch_momentum_period + 1)
+        if closes.shape[1] >= required_bars:
+            atr = Indicators.atr(stacked["high"], stacked["low"], closes, self.batch_atr_period)[:, -1]
+            ema = Indicators.ema(closes, self.batch_ema_period)[:, -1]
+            zscore = Indicators.zscore(closes, self.batch_zscore_period)[:, -1]
+            momentum = Indicators.momentum(closes, self.batch_momentum_period)[:, -1]
+            for i in np.flatnonzero(bars >= required_bars):
+                results[market_ids[i]].update({
+                    "atr": float(atr[i]),
+                    "ema": float(ema[i]),
+                    "zscore": float(zscore[i]),
+                    "momentum": float(momentum[i])
+                })
+                
+        if 0 < window <= closes.shape[1]:
+            columns = template.compute_batch_columns(stacked)
+            for i, market_id in enumerate(market_ids):
+                own = self._last_timestamps(candles_by_market[market_id], window)
+                if len(own) == window and np.array_equal(own, timestamps[-window:]):
+                    results[market_id].update({name: float(column[i]) for name, column in columns.items()})
+        return results
+    
+    @staticmethod
+    def _last_timestamps(candles, n: int) -> np.ndarray:
+        """最近n根K线的时间戳"""
+        if isinstance(candles, CandleBuffer):
+            return candles.column("timestamp", n)
+        return np.array([candle["timestamp"] for candle in candles[-n:]], dtype=float)
+    
+    def refresh_batch_indicators(self, market_data: Dict[int, Dict[str, Any]]):
+        """计算批量指标并分发到对应市场的策略实例"""
+        try:
+            for market_id, indicators in self.compute_batch_indicators(market_data).items():
+                self.strategy_instances[market_id].on_batch_indicators(market_id, indicators)
+        except Exception as e:
+            self.logger.error(f"批量指标计算失败: {e}")
+    
     async def _process_market_with_semaphore(self, market_id: int, strategy: BaseStrategy, 
                                             market_data: Dict[int, Dict[str, Any]]):
         """使用信号量限制并发处理"""
@@ -192,7 +302,7 @@ class MultiMarketStrategyWrapper:
     
     async def _check_rate_limit(self) -> bool:
         """检查是否超过限流限制"""
-        current_time = datetime.now().timestamp()
+        current_time = self.clock.time()
         
         # 清理过期的时间戳
         self.request_timestamps = [
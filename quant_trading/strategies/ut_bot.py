@@ -4,14 +4,15 @@ UT Bot策略
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, Optional, Any
 import numpy as np
-import asyncio
-from datetime import datetime, timedelta
 
 from .base_strategy import BaseStrategy
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.ring_buffer import Candle, CandleBuffer, RingBuffer, as_candle_buffer
+from ..utils.bar_aggregator import BarAggregator
+from ..utils.kernels import heikin_ashi_close, trailing_stop_step
 
 
 class UTBotStrategy(BaseStrategy):
@@ -78,14 +79,19 @@ class UTBotStrategy(BaseStrategy):
         self.last_signal_time = None
         self.signal_cooldown = 300  # 5分钟冷却时间
         
-        # 历史数据缓存
-        self.price_history = []
-        self.atr_history = []
+        # 历史数据缓存（固定容量环形缓冲区）
+        self.price_history = self._new_price_history()
+        self.atr_history = RingBuffer(1000, ("atr",))
+        # 多市场包装器批量算出的本次1分钟K线ATR（收盘价相邻差的均值），None时自行计算
+        self._batch_atr: Optional[float] = None
         
         # ⭐ 需求①：K线类型配置（需要先初始化，供后续使用）
         self.kline_types = ut_config.get('kline_types', [1])  # 默认只对1分钟K线发出信号
         self.logger.info(f"K线类型配置: {self.kline_types}分钟 - 策略将对这些时间周期的K线发出交易信号")
         
+        # 触发条件：默认定时运行，可配置为 bar_close / tick / fill 事件驱动
+        self.set_triggers(ut_config.get('triggers', ['timer']), ut_config.get('timer_interval'))
+        
         # ⭐ 多时间周期状态（动态初始化）
         if self.enable_multi_timeframe:
             # 根据kline_types配置动态初始化多时间周期状态
@@ -96,15 +102,26 @@ class UTBotStrategy(BaseStrategy):
                     # 初始化追踪止损
                     setattr(self, f'tf_{timeframe_minutes}m_trailing_stop', 0.0)
                     # 初始化价格历史
-                    setattr(self, f'tf_{timeframe_minutes}m_price_history', [])
+                    setattr(self, f'tf_{timeframe_minutes}m_price_history', self._new_price_history())
             
             # 为1分钟时间周期初始化独立状态（多时间周期模式需要）
             self.tf_1m_signal = 0
             self.tf_1m_trailing_stop = 0.0
-            self.tf_1m_price_history = []
+            self.tf_1m_price_history = self._new_price_history()
             
             self.logger.info(f"多时间周期状态已初始化: {self.kline_types}分钟")
         
+        # ⭐ 高周期K线由流式聚合器按时钟对齐增量合成，只在K线收盘时重新分析
+        higher_timeframes = [tf for tf in self.kline_types if tf != 1]
+        self.bar_aggregator: Optional[BarAggregator] = None
+        self._closed_timeframes = set()  # 上次分析后有新K线收盘的周期
+        self._timeframe_signals: Dict[int, int] = {}  # 各高周期最近一次分析的信号
+        if higher_timeframes:
+            self.bar_aggregator = BarAggregator(higher_timeframes, capacity=1000, logger=self.logger)
+            self.bar_aggregator.add_callback(
+                lambda timeframe, candle: self.on_bar_close(self.market_id, timeframe, candle)
+            )
+        
         # ⭐ 需求③：K线完成确认状态
         self.wait_for_kline_completion = ut_config.get('wait_for_kline_completion', True)  # 是否等待K线走完
         self.current_kline_signal = 0  # 当前K线的信号: 1=buy, -1=sell, 0=neutral
@@ -210,11 +227,14 @@ class UTBotStrategy(BaseStrategy):
             return
             
         market_data_info = market_data[self.market_id]
-        candlesticks = market_data_info.get("candlesticks", [])
+        candlesticks = as_candle_buffer(market_data_info.get("candlesticks"))
         
         if len(candlesticks) < self.atr_period + 1:
             return
             
+        batch = self._batch_values(market_data, candlesticks)
+        self._batch_atr = batch.get("close_atr") if batch is not None else None
+            
         # ⭐ 如果启用多时间周期，使用新的处理逻辑
         if self.enable_multi_timeframe:
             await self._process_multi_timeframe(candlesticks)
@@ -222,7 +242,7 @@ class UTBotStrategy(BaseStrategy):
             # 原有的单时间周期逻辑
             await self._process_single_timeframe(candlesticks)
     
-    async def _process_single_timeframe(self, candlesticks: List[Dict[str, Any]]):
+    async def _process_single_timeframe(self, candlesticks: CandleBuffer):
         """⭐ 处理单时间周期数据（根据kline_types配置）"""
         # 使用统一的时间周期分析方法
         signals_analyzed = self._analyze_kline_types_signals(candlesticks, is_multi_timeframe=False)
@@ -231,13 +251,13 @@ class UTBotStrategy(BaseStrategy):
         
         # 检查现有持仓的止盈止损条件
         if signals_analyzed:
-            await self._check_market_level_risk_management(candlesticks[-1]['close'])
+            await self._check_market_level_risk_management(candlesticks.last('close'))
         
         # 根据配置的K线类型进行决策
         if signals_analyzed:
-            await self._kline_types_decision(candlesticks[-1]['close'], signals_analyzed)
+            await self._kline_types_decision(candlesticks.last('close'), signals_analyzed)
     
-    async def _process_multi_timeframe(self, candlesticks: List[Dict[str, Any]]):
+    async def _process_multi_timeframe(self, candlesticks: CandleBuffer):
         """⭐ 处理多时间周期数据（根据kline_types配置）"""
         # 使用统一的时间周期分析方法
         signals_analyzed = self._analyze_kline_types_signals(candlesticks, is_multi_timeframe=True)
@@ -246,13 +266,17 @@ class UTBotStrategy(BaseStrategy):
         
         # 检查现有持仓的止盈止损条件
         if signals_analyzed:
-            await self._check_market_level_risk_management(candlesticks[-1]['close'])
+            await self._check_market_level_risk_management(candlesticks.last('close'))
         
         # 根据配置的K线类型进行决策
         if signals_analyzed:
-            await self._kline_types_decision(candlesticks[-1]['close'], signals_analyzed)
+            await self._kline_types_decision(candlesticks.last('close'), signals_analyzed)
     
-    def _analyze_kline_types_signals(self, candlesticks: List[Dict[str, Any]], is_multi_timeframe: bool = True) -> Dict[int, int]:
+    def _new_price_history(self) -> RingBuffer:
+        """创建价格历史缓冲区（ATR计算只需要最近 atr_period + 10 个价格）"""
+        return RingBuffer(self.atr_period + 10, ("price",))
+    
+    def _analyze_kline_types_signals(self, candlesticks: CandleBuffer, is_multi_timeframe: bool = True) -> Dict[int, int]:
         """⭐ 统一的时间周期信号分析方法
         
         Args:
@@ -264,18 +288,28 @@ class UTBotStrategy(BaseStrategy):
         """
         signals_analyzed = {}
         
+        # 只把上次之后新增/更新的1分钟K线合并进高周期K线
+        if self.bar_aggregator is not None:
+            self.bar_aggregator.sync(candlesticks)
+        
         for timeframe_minutes in self.kline_types:
             # 获取对应时间周期的K线数据
             if timeframe_minutes == 1:
                 target_candlesticks = candlesticks  # 假设输入的就是1分钟数据
             else:
-                target_candlesticks = self._resample_to_timeframe(candlesticks, f'{timeframe_minutes}m')
+                # 高周期K线未收盘时数据不变，沿用上次信号
+                if (timeframe_minutes not in self._closed_timeframes
+                        and timeframe_minutes in self._timeframe_signals):
+                    signals_analyzed[timeframe_minutes] = self._timeframe_signals[timeframe_minutes]
+                    continue
+                self._closed_timeframes.discard(timeframe_minutes)
+                target_candlesticks = self.bar_aggregator.closed_bars(timeframe_minutes)
             
             if len(target_candlesticks) >= self.atr_period + 1:
                 # 根据模式选择价格历史和追踪止损属性
                 if is_multi_timeframe:
                     # 多时间周期模式：使用独立的价格历史和追踪止损
-                    price_history = getattr(self, f'tf_{timeframe_minutes}m_price_history', [])
+                    price_history = getattr(self, f'tf_{timeframe_minutes}m_price_history', None)
                     trailing_stop_attr = f'tf_{timeframe_minutes}m_trailing_stop'
                     
                     # 检查是否支持该时间周期
@@ -287,9 +321,12 @@ class UTBotStrategy(BaseStrategy):
                     price_history = self.price_history
                     trailing_stop_attr = 'xATRTrailingStop'
                 
-                # 分析信号
-                signal = self._analyze_timeframe(target_candlesticks, price_history, trailing_stop_attr)
+                # 分析信号（1分钟K线可使用批量计算的ATR）
+                batch_atr = self._batch_atr if timeframe_minutes == 1 else None
+                signal = self._analyze_timeframe(target_candlesticks, price_history, trailing_stop_attr, batch_atr)
                 signals_analyzed[timeframe_minutes] = signal
+                if timeframe_minutes != 1:
+                    self._timeframe_signals[timeframe_minutes] = signal
                 
                 # 保持向后兼容性（多时间周期模式）
                 if is_multi_timeframe:
@@ -299,32 +336,18 @@ class UTBotStrategy(BaseStrategy):
         
         return signals_analyzed
     
-    def _resample_to_timeframe(self, candlesticks_1m: List[Dict], target_tf: str) -> List[Dict]:
-        """将1分钟K线重采样为目标时间周期"""
-        if target_tf == '5m':
-            interval = 5
-        elif target_tf == '15m':
-            interval = 15
-        else:
-            return candlesticks_1m
-        
-        resampled = []
-        for i in range(0, len(candlesticks_1m), interval):
-            chunk = candlesticks_1m[i:i+interval]
-            if len(chunk) >= interval:  # 只使用完整的周期
-                resampled.append({
-                    'open': chunk[0]['open'],
-                    'high': max(c['high'] for c in chunk),
-                    'low': min(c['low'] for c in chunk),
-                    'close': chunk[-1]['close'],
-                    'volume': sum(c.get('volume', 0) for c in chunk),
-                    'timestamp': chunk[-1]['timestamp']
-                })
-        return resampled
+    def on_bar_close(self, market_id: int, timeframe: int, candle: Candle):
+        """高周期K线收盘事件：标记该周期需要重新分析"""
+        self._closed_timeframes.add(timeframe)
+        self.logger.debug(f"🕐 {timeframe}分钟K线收盘: close={candle.close}")
     
-    def _analyze_timeframe(self, candlesticks: List[Dict], price_history: List, trailing_stop_attr: str) -> int:
+    def _analyze_timeframe(self, candlesticks: CandleBuffer, price_history: RingBuffer, trailing_stop_attr: str,
+                           batch_atr: Optional[float] = None) -> int:
         """分析单个时间周期的信号
         
+        Args:
+            batch_atr: 批量计算的ATR（按K线收盘价，每根K线运行一次时与价格历史算出的相同），None时按价格历史计算
+        
         Returns:
             1: buy信号, -1: sell信号, 0: 无信号
         """
@@ -332,9 +355,9 @@ class UTBotStrategy(BaseStrategy):
             return 0
         
         # 获取当前价格和前一价格
-        current_price = candlesticks[-1]['close']
-        prev_price = candlesticks[-2]['close']
-        current_timestamp = candlesticks[-1]['timestamp']
+        current_price = candlesticks.last('close')
+        prev_price = candlesticks.last('close', offset=2)
+        current_timestamp = candlesticks.last('timestamp')
         
         # ⭐ 需求③：检查是否是新K线
         is_new_kline = (self.last_kline_timestamp is None or 
@@ -353,29 +376,18 @@ class UTBotStrategy(BaseStrategy):
             
             self.last_kline_timestamp = current_timestamp
             
-        # 更新价格历史
+        # 更新价格历史（环形缓冲区自动淘汰最旧价格）
         price_history.append(current_price)
-        if len(price_history) > self.atr_period + 10:
-            price_history.pop(0)
             
-        # 计算ATR
+        # 计算ATR（仅有收盘价序列时真实波幅即相邻价格差的绝对值）
         if len(price_history) < self.atr_period + 1:
             return 0
         
-        true_ranges = []
-        for i in range(1, len(price_history)):
-            high = price_history[i]
-            low = price_history[i-1]
-            close_prev = price_history[i-1]
-            tr1 = high - low
-            tr2 = abs(high - close_prev)
-            tr3 = abs(low - close_prev)
-            true_ranges.append(max(tr1, tr2, tr3))
-        
-        if len(true_ranges) < self.atr_period:
-            return 0
-        
-        atr = np.mean(true_ranges[-self.atr_period:])
+        if batch_atr is not None:
+            atr = batch_atr
+        else:
+            true_ranges = np.abs(np.diff(price_history.column()))
+            atr = true_ranges[-self.atr_period:].mean()
         nLoss = self.key_value * atr
         
         # 获取或初始化追踪止损
@@ -408,17 +420,10 @@ class UTBotStrategy(BaseStrategy):
         # ⭐ 需求③：K线完成确认逻辑 - 对所有kline_types中的时间周期都有效
         if self.wait_for_kline_completion:
             # 检查当前时间周期是否在kline_types中
+            # 属性名形如 tf_{分钟}m_trailing_stop，任意周期均可解析
             current_timeframe_minutes = None
-            if trailing_stop_attr == 'tf_1m_trailing_stop':
-                current_timeframe_minutes = 1
-            elif trailing_stop_attr == 'tf_5m_trailing_stop':
-                current_timeframe_minutes = 5
-            elif trailing_stop_attr == 'tf_15m_trailing_stop':
-                current_timeframe_minutes = 15
-            elif trailing_stop_attr == 'tf_30m_trailing_stop':
-                current_timeframe_minutes = 30
-            elif trailing_stop_attr == 'tf_60m_trailing_stop':
-                current_timeframe_minutes = 60
+            if trailing_stop_attr.startswith('tf_') and trailing_stop_attr.endswith('m_trailing_stop'):
+                current_timeframe_minutes = int(trailing_stop_attr[3:-len('m_trailing_stop')])
             
             # 如果当前时间周期在kline_types中，应用K线完成确认逻辑
             if current_timeframe_minutes and current_timeframe_minutes in self.kline_types:
@@ -491,7 +496,7 @@ class UTBotStrategy(BaseStrategy):
             self.logger.info(f"📊 当前持仓状态: 市场{self.market_id}无持仓")
         
         # 检查信号冷却
-        current_time = datetime.now().timestamp()
+        current_time = self.clock.time()
         if (self.last_signal_time and 
             current_time - self.last_signal_time < self.signal_cooldown):
             return
@@ -631,7 +636,7 @@ class UTBotStrategy(BaseStrategy):
             self.logger.info(f"📊 当前持仓状态: 市场{self.market_id}无持仓")
         
         # 检查信号冷却
-        current_time = datetime.now().timestamp()
+        current_time = self.clock.time()
         if (self.last_signal_time and 
             current_time - self.last_signal_time < self.signal_cooldown):
             return
@@ -724,7 +729,7 @@ class UTBotStrategy(BaseStrategy):
                     # 当前是空仓，但上一根K线是买入信号，平空仓并开双倍多仓
                     self.logger.info("📈 上一根K线买入信号 + 当前空仓 → 平空仓并开双倍多仓")
                     await self._close_position(current_price, "信号反向：从空仓转为多仓")
-                    await asyncio.sleep(0.5)  # 等待平仓完成
+                    await self.clock.sleep(0.5)  # 等待平仓完成
                     await self._open_double_position(current_price, "long", "上一根K线买入信号确认")
                     
             elif self.previous_kline_signal == -1:  # 上一根K线是卖出信号
@@ -736,7 +741,7 @@ class UTBotStrategy(BaseStrategy):
                     # 当前是多仓，但上一根K线是卖出信号，平多仓并开双倍空仓
                     self.logger.info("📉 上一根K线卖出信号 + 当前多仓 → 平多仓并开双倍空仓")
                     await self._close_position(current_price, "信号反向：从多仓转为空仓")
-                    await asyncio.sleep(0.5)  # 等待平仓完成
+                    await self.clock.sleep(0.5)  # 等待平仓完成
                     await self._open_double_position(current_price, "short", "上一根K线卖出信号确认")
             
             return True  # 已执行双倍反向订单
@@ -781,11 +786,11 @@ class UTBotStrategy(BaseStrategy):
         if order:
             self._log_signal(f"DOUBLE_{side.upper()}", self.market_id, 
                            price=price, size=actual_size, size_usd=double_size_usd, reason=reason)
-            self.last_signal_time = datetime.now().timestamp()
+            self.last_signal_time = self.clock.time()
         
-    def _get_current_price(self, candlesticks: List[Dict[str, Any]]) -> Optional[float]:
+    def _get_current_price(self, candlesticks: CandleBuffer) -> Optional[float]:
         """获取当前价格"""
-        if not candlesticks:
+        if not len(candlesticks):
             return None
             
         if self.use_heikin_ashi:
@@ -793,74 +798,50 @@ class UTBotStrategy(BaseStrategy):
             return self._calculate_heikin_ashi_close(candlesticks[-1])
         else:
             # 使用普通收盘价
-            return candlesticks[-1]["close"]
+            return candlesticks.last("close")
             
+    def batch_window(self) -> int:
+        """批量计算ATR所需的K线数"""
+        return self.atr_period + 1
+        
+    def compute_batch_columns(self, stacked: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """所有市场最近atr_period根K线收盘价相邻差绝对值的均值（与价格历史上的ATR算法相同）"""
+        closes = stacked["close"][:, -(self.atr_period + 1):]
+        return {"close_atr": np.abs(np.diff(closes, axis=1)).mean(axis=1)}
+        
     def _calculate_heikin_ashi_close(self, candle: Dict[str, Any]) -> float:
         """计算Heikin Ashi收盘价"""
-        # 简化的Heikin Ashi计算
-        # 实际应用中需要更复杂的计算
-        return (candle["open"] + candle["high"] + candle["low"] + candle["close"]) / 4
+        return float(heikin_ashi_close(candle["open"], candle["high"], candle["low"], candle["close"]))
         
     def _calculate_atr(self) -> Optional[float]:
         """计算ATR"""
         if len(self.price_history) < self.atr_period + 1:
             return None
             
-        # 计算真实波幅
-        true_ranges = []
-        for i in range(1, len(self.price_history)):
-            high = self.price_history[i]
-            low = self.price_history[i-1]
-            close_prev = self.price_history[i-1]
-            
-            tr1 = high - low
-            tr2 = abs(high - close_prev)
-            tr3 = abs(low - close_prev)
-            
-            true_ranges.append(max(tr1, tr2, tr3))
-            
-        if len(true_ranges) < self.atr_period:
-            return None
+        # 计算真实波幅（仅有收盘价序列时即相邻价格差的绝对值）
+        true_ranges = np.abs(np.diff(self.price_history.column()))
             
         # 计算ATR
-        atr = np.mean(true_ranges[-self.atr_period:])
+        atr = float(true_ranges[-self.atr_period:].mean())
         self.atr_history.append(atr)
         
         return atr
         
     def _update_trailing_stop(self, current_price: float, atr: float):
-        """更新追踪止损"""
+        """更新追踪止损（与回测内核共用同一递推，首次更新时止损为0即从价格向下偏移nLoss）"""
         nLoss = self.key_value * atr
-        
-        if self.xATRTrailingStop == 0:
-            # 初始化追踪止损
-            self.xATRTrailingStop = current_price - nLoss if current_price > 0 else current_price + nLoss
-        else:
-            # 更新追踪止损
-            if (current_price > self.xATRTrailingStop and 
-                self.price_history[-2] > self.xATRTrailingStop):
-                # 价格在止损线上方且继续上涨
-                self.xATRTrailingStop = max(self.xATRTrailingStop, current_price - nLoss)
-            elif (current_price < self.xATRTrailingStop and 
-                  self.price_history[-2] < self.xATRTrailingStop):
-                # 价格在止损线下方且继续下跌
-                self.xATRTrailingStop = min(self.xATRTrailingStop, current_price + nLoss)
-            elif current_price > self.xATRTrailingStop:
-                # 价格从下方突破止损线
-                self.xATRTrailingStop = current_price - nLoss
-            else:
-                # 价格从上方跌破止损线
-                self.xATRTrailingStop = current_price + nLoss
+        prev_price = self.price_history.last(offset=2) if len(self.price_history) >= 2 else 0.0
+        self.xATRTrailingStop = float(trailing_stop_step(self.xATRTrailingStop, current_price, prev_price, nLoss))
                 
     async def _generate_signal(self, current_price: float):
         """生成交易信号"""
         # 更新仓位状态
         prev_pos = self.pos
         
-        if (self.price_history[-2] < self.xATRTrailingStop and 
+        if (self.price_history.last(offset=2) < self.xATRTrailingStop and 
             current_price > self.xATRTrailingStop):
             self.pos = 1  # 多头信号
-        elif (self.price_history[-2] > self.xATRTrailingStop and 
+        elif (self.price_history.last(offset=2) > self.xATRTrailingStop and 
               current_price < self.xATRTrailingStop):
             self.pos = -1  # 空头信号
         else:
@@ -905,8 +886,7 @@ class UTBotStrategy(BaseStrategy):
                 self.logger.warning(f"⚠️  检测到反向持仓（空仓），先平仓再开多仓")
                 await self._close_position(price, "信号反向：从空仓转为多仓")
                 # 等待平仓完成
-                import asyncio
-                await asyncio.sleep(0.5)
+                await self.clock.sleep(0.5)
             elif position.side == PositionSide.LONG:
                 # ⭐ 修复：已有多仓，跳过重复开仓
                 self.logger.warning(f"🚫 已有多仓持仓 {position.size:.6f}，跳过重复开仓（避免重复持仓）")
@@ -943,7 +923,7 @@ class UTBotStrategy(BaseStrategy):
         if order:
             self._log_signal("LONG", self.market_id, 
                            price=price, trailing_stop=self.xATRTrailingStop, size=actual_size, size_usd=self.position_size_usd)
-            self.last_signal_time = datetime.now().timestamp()
+            self.last_signal_time = self.clock.time()
             
     async def _open_short_position(self, price: float):
         """开空仓"""
@@ -959,8 +939,7 @@ class UTBotStrategy(BaseStrategy):
                 self.logger.warning(f"⚠️  检测到反向持仓（多仓），先平仓再开空仓")
                 await self._close_position(price, "信号反向：从多仓转为空仓")
                 # 等待平仓完成
-                import asyncio
-                await asyncio.sleep(0.5)
+                await self.clock.sleep(0.5)
             elif position.side == PositionSide.SHORT:
                 # ⭐ 修复：已有空仓，跳过重复开仓
                 self.logger.warning(f"🚫 已有空仓持仓 {position.size:.6f}，跳过重复开仓（避免重复持仓）")
@@ -997,7 +976,7 @@ class UTBotStrategy(BaseStrategy):
         if order:
             self._log_signal("SHORT", self.market_id, 
                            price=price, trailing_stop=self.xATRTrailingStop, size=actual_size, size_usd=self.position_size_usd)
-            self.last_signal_time = datetime.now().timestamp()
+            self.last_signal_time = self.clock.time()
             
     async def _close_position(self, price: float, reason: str):
         """平仓"""
@@ -1037,7 +1016,7 @@ class UTBotStrategy(BaseStrategy):
         if order:
             self._log_signal("EXIT", self.market_id, 
                            reason=reason, price=price, trailing_stop=self.xATRTrailingStop)
-            self.last_signal_time = datetime.now().timestamp()
+            self.last_signal_time = self.clock.time()
             
     def get_strategy_params(self) -> Dict[str, Any]:
         """获取策略参数"""
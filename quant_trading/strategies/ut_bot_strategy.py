@@ -4,7 +4,6 @@ UT Bot策略
 """
 
 import numpy as np
-import pandas as pd
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -13,6 +12,10 @@ from enum import Enum
 from .base_strategy import BaseStrategy
 from ..utils.config import Config
 from ..utils.logger import setup_logger
+from ..utils.indicators import Indicators
+from ..utils.kernels import trailing_stop_step
+from ..utils.ring_buffer import CandleBuffer
+from ..utils.latency import LatencyStage
 
 
 class SignalType(Enum):
@@ -102,7 +105,7 @@ class UTBotStrategy(BaseStrategy):
             self.ut_config = self._load_config_from_yaml()
         
         # 策略状态
-        self.market_data_history = {}  # 市场数据历史
+        self.market_data_history: Dict[int, CandleBuffer] = {}  # 市场数据历史
         self.positions = {}  # 当前仓位
         self.stop_losses = {}  # 止损价格
         self.take_profits = {}  # 止盈价格
@@ -251,20 +254,20 @@ class UTBotStrategy(BaseStrategy):
             current_price = tick_data.get('price', 0)
             if current_price > 0:
                 self.current_prices[market_id] = current_price
-                self.last_price_updates[market_id] = datetime.now()
+                self.last_price_updates[market_id] = self.clock.now()
                 
                 # 构建简化的市场数据结构
                 simplified_market_data = {
                     market_id: {
                         'last_price': current_price,
                         'last_tick': tick_data,
-                        'timestamp': tick_data.get('timestamp', datetime.now().timestamp())
+                        'timestamp': tick_data.get('timestamp', self.clock.time())
                     }
                 }
                 
                 # 更新历史数据
                 self._update_market_data_history(market_id, {
-                    'timestamp': tick_data.get('timestamp', datetime.now().timestamp()),
+                    'timestamp': tick_data.get('timestamp', self.clock.time()),
                     'open': current_price,
                     'high': current_price,
                     'low': current_price,
@@ -278,7 +281,7 @@ class UTBotStrategy(BaseStrategy):
                 # 实时生成交易信号
                 await self._generate_real_time_signals(market_id, current_price)
                 
-                self.logger.debug(f"实时tick处理完成 (市场 {market_id}): 价格 {current_price}")
+                self.logger.debug("实时tick处理完成 (市场 %s): 价格 %s", market_id, current_price)
                 
         except Exception as e:
             self.logger.error(f"实时tick处理失败 (市场 {market_id}): {e}")
@@ -293,16 +296,15 @@ class UTBotStrategy(BaseStrategy):
             if len(data) < max(self.ut_config.atr_period, self.ut_config.ema_length):
                 return
             
-            df = pd.DataFrame(data)
-            
-            # 计算ATR
-            self.atrs[market_id] = self._calculate_atr(df, self.ut_config.atr_period)
-            
-            # 计算EMA
-            self.emas[market_id] = self._calculate_ema(df, self.ut_config.ema_length)
-            
-            # 计算UT Bot Alerts指标
-            self._calculate_ut_bot_indicators(market_id, df)
+            with self._latency_span(LatencyStage.INDICATOR, market_id):
+                # 计算ATR
+                self.atrs[market_id] = self._calculate_atr(data, self.ut_config.atr_period)
+                
+                # 计算EMA
+                self.emas[market_id] = self._calculate_ema(data, self.ut_config.ema_length)
+                
+                # 计算UT Bot Alerts指标
+                self._calculate_ut_bot_indicators(market_id, data)
             
         except Exception as e:
             self.logger.error(f"实时指标计算失败 (市场 {market_id}): {e}")
@@ -350,7 +352,7 @@ class UTBotStrategy(BaseStrategy):
                 return True  # 如果没有配置，默认每个tick都处理
             
             # 获取当前时间戳
-            current_time = datetime.now().timestamp()
+            current_time = self.clock.time()
             
             # 检查是否在指定的tick周期内
             # 这里简化处理：根据tick周期间隔来决定是否处理信号
@@ -425,25 +427,24 @@ class UTBotStrategy(BaseStrategy):
     
     def _update_market_data_history(self, market_id: int, tick_data: Dict[str, Any]):
         """更新市场数据历史"""
-        if market_id not in self.market_data_history:
-            self.market_data_history[market_id] = []
+        # 环形缓冲区保留最近1000个数据点，追加为O(1)
+        history = self.market_data_history.get(market_id)
+        if history is None:
+            history = self.market_data_history[market_id] = CandleBuffer(1000)
             
-        self.market_data_history[market_id].append(tick_data)
-        
-        # 保持历史数据长度（保留最近1000个数据点）
-        if len(self.market_data_history[market_id]) > 1000:
-            self.market_data_history[market_id] = self.market_data_history[market_id][-1000:]
+        history.append_record(tick_data)
                 
                        
         
-    def _calculate_atr(self, df: pd.DataFrame, period: int) -> float:
+    def _calculate_atr(self, data: CandleBuffer, period: int) -> float:
         """计算ATR"""
-        if len(df) < period + 1:
+        if len(data) < period + 1:
             return 0.0
             
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
+        # 只取计算所需的最近 period + 1 根
+        high = data.column('high', period + 1)
+        low = data.column('low', period + 1)
+        close = data.column('close', period + 1)
         
         # 计算真实波幅
         tr1 = high[1:] - low[1:]
@@ -454,52 +455,36 @@ class UTBotStrategy(BaseStrategy):
         
         # 计算ATR
         atr = np.mean(true_range[-period:])
-        return atr
+        return float(atr)
         
-    def _calculate_ema(self, df: pd.DataFrame, period: int) -> float:
+    def _calculate_ema(self, data: CandleBuffer, period: int) -> float:
         """计算EMA"""
-        if len(df) < period:
-            return df['close'].iloc[-1]
+        if len(data) < period:
+            return data.last('close')
             
-        close = df['close'].values
-        alpha = 2.0 / (period + 1)
-        ema = close[0]
+        return float(Indicators.ema(data.column('close'), period)[-1])
         
-        for price in close[1:]:
-            ema = alpha * price + (1 - alpha) * ema
-            
-        return ema
-        
-    def _calculate_ut_bot_indicators(self, market_id: int, df: pd.DataFrame):
+    def _calculate_ut_bot_indicators(self, market_id: int, data: CandleBuffer):
         """计算UT Bot Alerts指标"""
         if market_id not in self.atrs or self.atrs[market_id] == 0:
             return
             
         # 获取当前价格
-        current_close = df['close'].iloc[-1]
+        current_close = data.last('close')
         atr = self.atrs[market_id]
         key_value = self.ut_config.key_value
         
         # 计算止损距离
         n_loss = key_value * atr
         
-        # 计算ATR动态止损线
+        # 计算ATR动态止损线（UT Bot Alerts递推，与回测内核 utils.kernels 一致）
         if market_id not in self.atr_trailing_stops:
             self.atr_trailing_stops[market_id] = current_close
             
-        prev_trailing_stop = self.atr_trailing_stops[market_id]
-        
-        # UT Bot Alerts逻辑
-        if current_close > prev_trailing_stop:
-            if prev_trailing_stop > 0:
-                self.atr_trailing_stops[market_id] = max(prev_trailing_stop, current_close - n_loss)
-            else:
-                self.atr_trailing_stops[market_id] = current_close - n_loss
-        else:
-            if prev_trailing_stop > 0 and current_close < prev_trailing_stop:
-                self.atr_trailing_stops[market_id] = min(prev_trailing_stop, current_close + n_loss)
-            else:
-                self.atr_trailing_stops[market_id] = current_close + n_loss
+        prev_close = data.last('close', offset=2) if len(data) >= 2 else 0.0
+        self.atr_trailing_stops[market_id] = float(trailing_stop_step(
+            self.atr_trailing_stops[market_id], current_close, prev_close, n_loss
+        ))
 
             
     async def _handle_buy_signal(self, market_id: int):
@@ -737,7 +722,7 @@ class UTBotStrategy(BaseStrategy):
         if market_id not in self.market_data_history:
             return None
             
-        current_price = self.market_data_history[market_id][-1]['close']
+        current_price = self.market_data_history[market_id].last('close')
         
         if self.ut_config.stoploss_type == "atr":
             # ATR止损
@@ -761,19 +746,16 @@ class UTBotStrategy(BaseStrategy):
             if len(data) < max(high_bars, low_bars):
                 return None
                 
-            recent_highs = [d['high'] for d in data[-high_bars:]]
-            recent_lows = [d['low'] for d in data[-low_bars:]]
-            
             if side == "buy":
-                return min(recent_lows)
+                return float(data.column('low', low_bars).min())
             else:
-                return max(recent_highs)
+                return float(data.column('high', high_bars).max())
                 
         return None
         
     def _calculate_stop_and_target(self, market_id: int, side: str) -> Tuple[float, Optional[float], float]:
         """计算止损、止盈和保本价格"""
-        current_price = self.market_data_history[market_id][-1]['close']
+        current_price = self.market_data_history[market_id].last('close')
         stop_loss = self._calculate_stop_loss_price(market_id, side)
         
         if stop_loss is None:
@@ -4,13 +4,46 @@
 """
 
 from .config import Config
-from .logger import setup_logger
+from .logger import setup_logger, configure_logging, LogOptions
+from .clock import Clock, RealtimeClock, SimulatedClock, REALTIME_CLOCK
 from .data_utils import DataUtils
 from .math_utils import MathUtils
+from .indicators import Indicators
+from .kernels import UTBotSeries, ut_bot, ut_bot_sweep, NUMBA_AVAILABLE
+from .ring_buffer import RingBuffer, CandleBuffer, TickBuffer, Candle, Tick
+from .bar_aggregator import BarAggregator
+from .runtime import Runtime, RuntimeOptions
+from .latency import LatencyTracker, LatencyStage, LatencyHistogram
+from .metrics import MetricsRegistry, ClientMetrics, REGISTRY
 
 __all__ = [
     "Config",
     "setup_logger",
+    "configure_logging",
+    "LogOptions",
+    "Clock",
+    "RealtimeClock",
+    "SimulatedClock",
+    "REALTIME_CLOCK",
     "DataUtils", 
-    "MathUtils"
+    "MathUtils",
+    "Indicators",
+    "UTBotSeries",
+    "ut_bot",
+    "ut_bot_sweep",
+    "NUMBA_AVAILABLE",
+    "RingBuffer",
+    "CandleBuffer",
+    "TickBuffer",
+    "Candle",
+    "Tick",
+    "BarAggregator",
+    "Runtime",
+    "RuntimeOptions",
+    "LatencyTracker",
+    "LatencyStage",
+    "LatencyHistogram",
+    "MetricsRegistry",
+    "ClientMetrics",
+    "REGISTRY"
 ]
@@ -0,0 +1,241 @@
+"""
+流式多周期K线聚合器
+将tick或1分钟K线增量合并到按时钟对齐的任意周期K线中，并在K线走完时发出收盘事件
+"""
+
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .ring_buffer import Candle, CandleBuffer
+
+
+# 收盘事件回调: callback(周期分钟数, 已走完的K线)
+BarCloseCallback = Callable[[int, Candle], None]
+
+
+def to_seconds(timestamp: float) -> float:
+    """时间戳统一为秒（Lighter K线时间戳为毫秒，tick时间戳为秒）"""
+    return timestamp / 1000.0 if timestamp > 1e11 else timestamp
+
+
+class BarAggregator:
+    """
+    流式多周期K线聚合器
+
+    每个周期只保存一根未走完的K线（开盘时间、OHLCV），新数据到来时O(1)合并；
+    K线按 UTC 时钟对齐（开盘时间 = 时间戳向下取整到周期长度），
+    数据跨过周期边界时当前K线收盘，写入该周期的CandleBuffer并触发回调。
+    收盘K线的timestamp为开盘时间，单位与输入一致
+    """
+
+    def __init__(self, timeframes: Iterable[int] = (1,), capacity: int = 1000,
+                 logger: Optional[logging.Logger] = None):
+        """
+        初始化聚合器
+
+        Args:
+            timeframes: 周期列表（分钟），如 [1, 5, 15, 60, 240]
+            capacity: 每个周期保留的已收盘K线数量
+            logger: 日志器（回调异常时记录），默认为模块日志器
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.timeframes: Tuple[int, ...] = tuple(sorted({int(tf) for tf in timeframes}))
+        if not self.timeframes or self.timeframes[0] <= 0:
+            raise ValueError("周期必须为正整数分钟")
+
+        self.history: Dict[int, CandleBuffer] = {tf: CandleBuffer(capacity) for tf in self.timeframes}
+        # 未走完的K线: [开盘时间(秒), open, high, low, close, volume]
+        self._open_bars: Dict[int, Optional[List[float]]] = {tf: None for tf in self.timeframes}
+        # 每个周期最近一根已收盘K线的开盘时间（秒），更早的迟到数据直接丢弃
+        self._last_closed: Dict[int, float] = {tf: float("-inf") for tf in self.timeframes}
+        self._callbacks: List[BarCloseCallback] = []
+
+        # 最近一次合并的基础K线（用于同一根未走完的1分钟K线重复推送时替换而非重复累加）
+        self._last_base_timestamp: Optional[float] = None
+        self._last_base_volume = 0.0
+        # 输入时间戳是否为毫秒（按首条数据确定，收盘K线保持同一单位）
+        self._millis: Optional[bool] = None
+
+    # ==========================================
+    # 订阅
+    # ==========================================
+
+    def add_callback(self, callback: BarCloseCallback):
+        """订阅K线收盘事件"""
+        self._callbacks.append(callback)
+
+    def remove_callback(self, callback: BarCloseCallback):
+        """取消订阅K线收盘事件"""
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    # ==========================================
+    # 数据输入
+    # ==========================================
+
+    def on_tick(self, price: float, volume: float = 0.0,
+                timestamp: Optional[float] = None) -> List[Tuple[int, Candle]]:
+        """
+        合并一笔tick
+
+        Args:
+            price: 成交价或中间价
+            volume: 成交量（订单簿中间价为0）
+            timestamp: 时间戳，默认为当前时间
+
+        Returns:
+            本次触发收盘的 (周期, K线) 列表
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        return self._fold(timestamp, price, price, price, price, volume)
+
+    def on_bar(self, candle: Union[Candle, Dict[str, float]]) -> List[Tuple[int, Candle]]:
+        """
+        合并一根基础K线（通常为1分钟）
+
+        同一根未走完的K线可以反复推送：成交量按差值累加，最高/最低价只会单调扩张，
+        因此重复合并不会重复计数；早于上一根的K线被忽略
+
+        Returns:
+            本次触发收盘的 (周期, K线) 列表
+        """
+        timestamp = float(candle["timestamp"])
+        volume = float(candle.get("volume", 0) or 0)
+
+        if self._last_base_timestamp is not None:
+            if timestamp < self._last_base_timestamp:
+                return []
+            if timestamp == self._last_base_timestamp:
+                volume, self._last_base_volume = volume - self._last_base_volume, volume
+            else:
+                self._last_base_volume = volume
+        else:
+            self._last_base_volume = volume
+        self._last_base_timestamp = timestamp
+
+        return self._fold(timestamp, float(candle["open"]), float(candle["high"]),
+                          float(candle["low"]), float(candle["close"]), volume)
+
+    def sync(self, candles: CandleBuffer) -> List[Tuple[int, Candle]]:
+        """
+        从完整的1分钟K线缓冲区中只合并上次之后的新K线（含最新一根未走完的K线）
+
+        策略每次收到的都是完整历史，首次调用合并全部历史，之后每次通常只合并1~2根
+
+        Returns:
+            本次触发收盘的 (周期, K线) 列表
+        """
+        if len(candles) == 0:
+            return []
+
+        start = 0
+        if self._last_base_timestamp is not None:
+            timestamps = candles.column("timestamp")
+            start = int(np.searchsorted(timestamps, self._last_base_timestamp, side="left"))
+
+        closed = []
+        window = candles.window()
+        for row in window[:, start:].T.tolist():
+            closed.extend(self.on_bar(Candle(*row)))
+        return closed
+
+    def flush(self, now: Optional[float] = None) -> List[Tuple[int, Candle]]:
+        """
+        按时钟关闭已到期的K线（行情清淡、周期结束后没有新数据时使用）
+
+        Args:
+            now: 当前时间戳（秒），默认为当前时间
+
+        Returns:
+            本次触发收盘的 (周期, K线) 列表
+        """
+        now = time.time() if now is None else to_seconds(now)
+        closed = []
+        for tf in self.timeframes:
+            bar = self._open_bars[tf]
+            if bar is not None and now >= bar[0] + tf * 60:
+                closed.append((tf, self._close_bar(tf, bar)))
+                self._open_bars[tf] = None
+        self._emit(closed)
+        return closed
+
+    # ==========================================
+    # 查询
+    # ==========================================
+
+    def closed_bars(self, timeframe: int) -> CandleBuffer:
+        """某周期已收盘K线（不含当前未走完的K线）"""
+        return self.history[timeframe]
+
+    def current_bar(self, timeframe: int) -> Optional[Candle]:
+        """某周期当前未走完的K线"""
+        bar = self._open_bars.get(timeframe)
+        if bar is None:
+            return None
+        return Candle(self._out_timestamp(bar[0]), *bar[1:])
+
+    def reset(self):
+        """清空全部状态"""
+        for tf in self.timeframes:
+            self.history[tf].clear()
+            self._open_bars[tf] = None
+            self._last_closed[tf] = float("-inf")
+        self._last_base_timestamp = None
+        self._last_base_volume = 0.0
+        self._millis = None
+
+    # ==========================================
+    # 内部实现
+    # ==========================================
+
+    def _fold(self, timestamp: float, open_: float, high: float, low: float,
+              close: float, volume: float) -> List[Tuple[int, Candle]]:
+        """将一条数据合并进所有周期的当前K线"""
+        if self._millis is None:
+            self._millis = timestamp > 1e11
+        seconds = to_seconds(timestamp)
+
+        closed = []
+        for tf in self.timeframes:
+            period = tf * 60
+            start = seconds - seconds % period
+            bar = self._open_bars[tf]
+            if start <= self._last_closed[tf]:
+                continue  # 迟到数据，所属K线已收盘
+
+            if bar is None or start > bar[0]:
+                if bar is not None:
+                    closed.append((tf, self._close_bar(tf, bar)))
+                self._open_bars[tf] = [start, open_, high, low, close, volume]
+            elif start == bar[0]:
+                if high > bar[2]:
+                    bar[2] = high
+                if low < bar[3]:
+                    bar[3] = low
+                bar[4] = close
+                bar[5] += volume
+
+        self._emit(closed)
+        return closed
+
+    def _close_bar(self, timeframe: int, bar: List[float]) -> Candle:
+        """将未走完的K线写入历史"""
+        self._last_closed[timeframe] = bar[0]
+        candle = Candle(self._out_timestamp(bar[0]), *bar[1:])
+        self.history[timeframe].append(candle.timestamp, *bar[1:])
+        return candle
+
+    def _out_timestamp(self, seconds: float) -> float:
+        return seconds * 1000.0 if self._millis else seconds
+
+    def _emit(self, closed: List[Tuple[int, Candle]]):
+        for timeframe, candle in closed:
+            for callback in self._callbacks:
+                try:
+                    callback(timeframe, candle)
+                except Exception as e:
+                    self.logger.error(f"K线收盘回调执行失败 ({timeframe}分钟): {e}")
@@ -0,0 +1,111 @@
+"""
+时钟
+策略与各管理器通过注入的时钟读取当前时间，而不是直接调用 datetime.now() / time.time()：
+实盘使用系统时钟，回测与行情回放使用由引擎推进的模拟时钟，
+同一份策略代码可以按CPU最快速度回放历史，冷却时间、频率限制、去重窗口等时间逻辑仍按行情时间计算
+"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import Union
+
+
+TimeLike = Union[datetime, float, int]
+
+
+def to_timestamp(value: TimeLike) -> float:
+    """datetime或秒/毫秒/微秒/纳秒时间戳统一转换为秒"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    value = float(value)
+    if value > 1e17:
+        return value / 1e9
+    if value > 1e14:
+        return value / 1e6
+    if value > 1e11:
+        return value / 1e3
+    return value
+
+
+class Clock:
+    """时钟接口"""
+
+    def time(self) -> float:
+        """当前时间戳（秒）"""
+        raise NotImplementedError
+
+    def now(self) -> datetime:
+        """当前本地时间（与 datetime.now() 相同的无时区datetime）"""
+        return datetime.fromtimestamp(self.time())
+
+    def today(self) -> date:
+        return self.now().date()
+
+    def monotonic(self) -> float:
+        """单调时间（秒），用于计算间隔与滚动窗口"""
+        return self.time()
+
+    @property
+    def is_simulated(self) -> bool:
+        return False
+
+    async def sleep(self, seconds: float):
+        """等待指定时间"""
+        await asyncio.sleep(seconds)
+
+
+class RealtimeClock(Clock):
+    """系统时钟（实盘）"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+
+class SimulatedClock(Clock):
+    """
+    模拟时钟（回测与回放）
+
+    时间只由引擎通过 set_time / advance 推进；sleep 直接把时间推进到到期时刻后让出事件循环，
+    不做真实等待。时间不会倒退：set_time 传入更早的时间时保持不变
+    """
+
+    def __init__(self, start: TimeLike = 0.0):
+        self._time = to_timestamp(start)
+
+    def time(self) -> float:
+        return self._time
+
+    @property
+    def is_simulated(self) -> bool:
+        return True
+
+    def set_time(self, value: TimeLike):
+        """设置当前时间（datetime或时间戳）"""
+        timestamp = to_timestamp(value)
+        if timestamp > self._time:
+            self._time = timestamp
+
+    def reset(self, start: TimeLike):
+        """重新开始（新一轮回测），允许回到更早的时间"""
+        self._time = to_timestamp(start)
+
+    def advance(self, delta: Union[timedelta, float]):
+        """推进时间（timedelta或秒）"""
+        seconds = delta.total_seconds() if isinstance(delta, timedelta) else float(delta)
+        if seconds > 0:
+            self._time += seconds
+
+    async def sleep(self, seconds: float):
+        self.advance(seconds)
+        await asyncio.sleep(0)
+
+
+# 默认时钟：未注入时钟的组件使用系统时间
+REALTIME_CLOCK = RealtimeClock()
@@ -5,7 +5,7 @@
 import yaml
 import os
 from typing import Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -34,6 +34,18 @@ class Config:
     log_level: str = "INFO"
     log_file: Optional[str] = None
     
+    # 日志后端配置（异步队列、JSON输出、限流），完整的log配置段
+    log_config: Dict[str, Any] = field(default_factory=dict)
+    
+    # 运行时配置（事件循环、线程池、GC）
+    runtime_config: Dict[str, Any] = field(default_factory=dict)
+    
+    # 模拟交易所配置（python -m quant_trading.simulator）
+    simulator_config: Dict[str, Any] = field(default_factory=dict)
+    
+    # 回测配置（BacktestEngine）
+    backtest_config: Dict[str, Any] = field(default_factory=dict)
+    
     # 便捷属性访问
     @property
     def lighter_base_url(self) -> str:
@@ -95,7 +107,11 @@ class Config:
             data_sources=config_data.get("data_sources", {}),
             strategies=config_data.get("strategies", {}),
             log_level=config_data.get("logging", config_data.get("log", {})).get("level", "INFO"),
-            log_file=config_data.get("logging", config_data.get("log", {})).get("file")
+            log_file=config_data.get("logging", config_data.get("log", {})).get("file"),
+            log_config=config_data.get("logging", config_data.get("log", {})),
+            runtime_config=config_data.get("runtime", {}),
+            simulator_config=config_data.get("simulator", {}),
+            backtest_config=config_data.get("backtest", {})
         )
         
     @classmethod
@@ -117,7 +133,11 @@ class Config:
             data_sources=config_dict.get("data_sources", {}),
             strategies=config_dict.get("strategies", {}),
             log_level=config_dict.get("log", {}).get("level", "INFO"),
-            log_file=config_dict.get("log", {}).get("file")
+            log_file=config_dict.get("log", {}).get("file"),
+            log_config=config_dict.get("log", {}),
+            runtime_config=config_dict.get("runtime", {}),
+            simulator_config=config_dict.get("simulator", {}),
+            backtest_config=config_dict.get("backtest", {})
         )
         
     def to_dict(self) -> Dict[str, Any]:
@@ -130,9 +150,13 @@ class Config:
             "data_sources": self.data_sources,
             "strategies": self.strategies,
             "log": {
+                **self.log_config,
                 "level": self.log_level,
                 "file": self.log_file
-            }
+            },
+            "runtime": self.runtime_config,
+            "simulator": self.simulator_config,
+            "backtest": self.backtest_config
         }
         
     def save_to_file(self, config_path: str):
@@ -7,6 +7,9 @@ import pandas as pd
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 
+from .indicators import Indicators
+from .ring_buffer import CandleBuffer
+
 
 class DataUtils:
     """数据处理工具类"""
@@ -23,14 +26,7 @@ class DataUtils:
         Returns:
             移动平均线列表
         """
-        if len(prices) < period:
-            return []
-            
-        sma = []
-        for i in range(period - 1, len(prices)):
-            sma.append(np.mean(prices[i - period + 1:i + 1]))
-            
-        return sma
+        return Indicators.sma(prices, period).tolist()
         
     @staticmethod
     def calculate_ema(prices: List[float], period: int, alpha: Optional[float] = None) -> List[float]:
@@ -45,17 +41,7 @@ class DataUtils:
         Returns:
             指数移动平均线列表
         """
-        if len(prices) < period:
-            return []
-            
-        if alpha is None:
-            alpha = 2.0 / (period + 1)
-            
-        ema = [prices[0]]
-        for i in range(1, len(prices)):
-            ema.append(alpha * prices[i] + (1 - alpha) * ema[-1])
-            
-        return ema
+        return Indicators.ema(prices, period, alpha).tolist()
         
     @staticmethod
     def calculate_rsi(prices: List[float], period: int = 14) -> List[float]:
@@ -69,25 +55,7 @@ class DataUtils:
         Returns:
             RSI值列表
         """
-        if len(prices) < period + 1:
-            return []
-            
-        deltas = [prices[i] - prices[i-1] for i in range(1, len(prices))]
-        gains = [d if d > 0 else 0 for d in deltas]
-        losses = [-d if d < 0 else 0 for d in deltas]
-        
-        rsi = []
-        for i in range(period, len(prices)):
-            avg_gain = np.mean(gains[i-period:i])
-            avg_loss = np.mean(losses[i-period:i])
-            
-            if avg_loss == 0:
-                rsi.append(100)
-            else:
-                rs = avg_gain / avg_loss
-                rsi.append(100 - (100 / (1 + rs)))
-                
-        return rsi
+        return Indicators.rsi(prices, period).tolist()
         
     @staticmethod
     def calculate_bollinger_bands(prices: List[float], period: int = 20, 
@@ -103,25 +71,8 @@ class DataUtils:
         Returns:
             (上轨, 中轨, 下轨)
         """
-        if len(prices) < period:
-            return [], [], []
-            
-        sma = DataUtils.calculate_sma(prices, period)
-        if not sma:
-            return [], [], []
-            
-        upper_band = []
-        lower_band = []
-        
-        for i in range(period - 1, len(prices)):
-            period_prices = prices[i - period + 1:i + 1]
-            std = np.std(period_prices)
-            mean = sma[i - period + 1]
-            
-            upper_band.append(mean + std_dev * std)
-            lower_band.append(mean - std_dev * std)
-            
-        return upper_band, sma, lower_band
+        upper_band, middle_band, lower_band = Indicators.bollinger_bands(prices, period, std_dev)
+        return upper_band.tolist(), middle_band.tolist(), lower_band.tolist()
         
     @staticmethod
     def calculate_macd(prices: List[float], fast_period: int = 12, 
@@ -138,30 +89,8 @@ class DataUtils:
         Returns:
             (MACD线, 信号线, 柱状图)
         """
-        if len(prices) < slow_period:
-            return [], [], []
-            
-        ema_fast = DataUtils.calculate_ema(prices, fast_period)
-        ema_slow = DataUtils.calculate_ema(prices, slow_period)
-        
-        # 确保两个EMA长度一致
-        min_len = min(len(ema_fast), len(ema_slow))
-        ema_fast = ema_fast[-min_len:]
-        ema_slow = ema_slow[-min_len:]
-        
-        macd_line = [ema_fast[i] - ema_slow[i] for i in range(len(ema_fast))]
-        
-        if len(macd_line) < signal_period:
-            return macd_line, [], []
-            
-        signal_line = DataUtils.calculate_ema(macd_line, signal_period)
-        
-        # 计算柱状图
-        histogram = []
-        for i in range(len(signal_line)):
-            histogram.append(macd_line[i + len(macd_line) - len(signal_line)] - signal_line[i])
-            
-        return macd_line, signal_line, histogram
+        macd_line, signal_line, histogram = Indicators.macd(prices, fast_period, slow_period, signal_period)
+        return macd_line.tolist(), signal_line.tolist(), histogram.tolist()
         
     @staticmethod
     def calculate_atr(highs: List[float], lows: List[float], closes: List[float], 
@@ -178,21 +107,7 @@ class DataUtils:
         Returns:
             ATR值列表
         """
-        if len(highs) < period + 1:
-            return []
-            
-        true_ranges = []
-        for i in range(1, len(highs)):
-            tr1 = highs[i] - lows[i]
-            tr2 = abs(highs[i] - closes[i-1])
-            tr3 = abs(lows[i] - closes[i-1])
-            true_ranges.append(max(tr1, tr2, tr3))
-            
-        atr = []
-        for i in range(period - 1, len(true_ranges)):
-            atr.append(np.mean(true_ranges[i - period + 1:i + 1]))
-            
-        return atr
+        return Indicators.atr(highs, lows, closes, period).tolist()
         
     @staticmethod
     def detect_support_resistance(prices: List[float], window: int = 5, 
@@ -249,17 +164,57 @@ class DataUtils:
         Returns:
             波动率列表
         """
-        if len(prices) < period + 1:
-            return []
+        return Indicators.volatility(prices, period).tolist()
+        
+    @staticmethod
+    def stack_candlesticks(candles_by_market: Dict[int, List[Dict[str, Any]]],
+                           lookback: int) -> Tuple[List[int], np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+        """
+        将多个市场的K线按时间戳对齐为 (市场数, K线数) 的二维数组
+        
+        时间轴取各市场最近lookback根K线时间戳并集的最后lookback个；
+        某市场缺失的K线沿用前一根，时间轴开头之前没有数据的部分用其第一根K线回填
+        
+        Args:
+            candles_by_market: {market_id: CandleBuffer或K线字典列表}（按时间升序）
+            lookback: 对齐后的K线数量
             
-        returns = [prices[i] / prices[i-1] - 1 for i in range(1, len(prices))]
-        volatility = []
+        Returns:
+            (市场ID列表, 时间戳数组, {"open"/"high"/"low"/"close"/"volume": 二维数组}, 每个市场实际K线数)
+        """
+        market_ids = [m for m, candles in candles_by_market.items() if candles]
+        fields = ("open", "high", "low", "close", "volume")
+        if not market_ids:
+            return [], np.empty(0), {f: np.empty((0, 0)) for f in fields}, np.empty(0, dtype=int)
+            
+        # 每个市场转换为 (K线数, 6) 数组：时间戳 + OHLCV；环形缓冲区直接取窗口视图
+        tails = {}
+        for m in market_ids:
+            candles = candles_by_market[m]
+            if isinstance(candles, CandleBuffer):
+                tails[m] = candles.window(lookback).T
+            else:
+                tails[m] = np.array([(c["timestamp"], c["open"], c["high"], c["low"], c["close"], c.get("volume", 0))
+                                     for c in candles[-lookback:]], dtype=float)
+        timestamps = np.unique(np.concatenate([tails[m][:, 0] for m in market_ids]))[-lookback:]
+        
+        aligned = np.empty((len(fields), len(market_ids), len(timestamps)))
+        bars = np.empty(len(market_ids), dtype=int)
         
-        for i in range(period - 1, len(returns)):
-            period_returns = returns[i - period + 1:i + 1]
-            volatility.append(np.std(period_returns) * np.sqrt(252))  # 年化波动率
+        for row, market_id in enumerate(market_ids):
+            market_ts = tails[market_id][:, 0]
+            if len(market_ts) == len(timestamps) and np.array_equal(market_ts, timestamps):
+                # 常见情况：该市场K线与时间轴完全一致
+                aligned[:, row] = tails[market_id][:, 1:].T
+                bars[row] = len(timestamps)
+                continue
+            # 每个对齐时间点对应的最近一根K线（不早于第一根）
+            index = np.clip(np.searchsorted(market_ts, timestamps, side="right") - 1, 0, None)
+            aligned[:, row] = tails[market_id][index, 1:].T
+            bars[row] = int(np.count_nonzero(market_ts >= timestamps[0]))
             
-        return volatility
+        stacked = {f: aligned[i] for i, f in enumerate(fields)}
+        return market_ids, timestamps, stacked, bars
         
     @staticmethod
     def resample_data(data: List[Dict[str, Any]], target_interval: str) -> List[Dict[str, Any]]:
@@ -0,0 +1,261 @@
+"""
+向量化技术指标
+输入输出均为NumPy数组，供回测和多市场扫描等高频调用场景使用
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+from typing import Optional, Tuple
+
+
+class Indicators:
+    """向量化技术指标类
+
+    各指标的输出长度与DataUtils中对应的列表版本保持一致，
+    DataUtils的列表接口只是这里的薄封装。
+    所有指标均沿最后一维计算，传入 (市场数, K线数) 的二维数组即可一次算出全部市场
+    """
+
+    @staticmethod
+    def sma(values: np.ndarray, period: int) -> np.ndarray:
+        """
+        简单移动平均（前缀和实现，O(n)）
+
+        Args:
+            values: 数值数组
+            period: 周期
+
+        Returns:
+            长度为 n - period + 1 的数组，数据不足时为空数组
+        """
+        values = np.asarray(values, dtype=float)
+        if period <= 0 or values.shape[-1] < period:
+            return np.empty(values.shape[:-1] + (0,))
+
+        # 以首个值为基准平移后再累加，减小长序列前缀和的舍入误差
+        base = values[..., :1]
+        cumsum = np.cumsum(values - base, axis=-1)
+        result = cumsum[..., period - 1:].copy()
+        result[..., 1:] -= cumsum[..., :-period]
+        return result / period + base
+
+    @staticmethod
+    def ema(values: np.ndarray, period: int, alpha: Optional[float] = None) -> np.ndarray:
+        """
+        指数移动平均（线性滤波实现），以第一个值为初始值
+
+        Args:
+            values: 数值数组
+            period: 周期
+            alpha: 平滑因子，如果为None则为 2 / (period + 1)
+
+        Returns:
+            与输入等长的数组，数据不足时为空数组
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape[-1] < period or values.shape[-1] == 0:
+            return np.empty(values.shape[:-1] + (0,))
+
+        if alpha is None:
+            alpha = 2.0 / (period + 1)
+
+        # y[i] = alpha * x[i] + (1 - alpha) * y[i-1]，初始状态使 y[0] = x[0]
+        decay = 1.0 - alpha
+        result, _ = lfilter([alpha], [1.0, -decay], values, axis=-1, zi=decay * values[..., :1])
+        return result
+
+    @staticmethod
+    def rolling_std(values: np.ndarray, period: int) -> np.ndarray:
+        """
+        滚动总体标准差（滑动窗口视图，不复制数据）
+
+        Args:
+            values: 数值数组
+            period: 周期
+
+        Returns:
+            长度为 n - period + 1 的数组，数据不足时为空数组
+        """
+        values = np.asarray(values, dtype=float)
+        if period <= 0 or values.shape[-1] < period:
+            return np.empty(values.shape[:-1] + (0,))
+
+        return sliding_window_view(values, period, axis=-1).std(axis=-1)
+
+    @staticmethod
+    def rsi(prices: np.ndarray, period: int = 14) -> np.ndarray:
+        """
+        RSI指标（窗口内涨跌幅简单平均）
+
+        Args:
+            prices: 价格数组
+            period: 周期
+
+        Returns:
+            长度为 n - period 的数组，数据不足时为空数组
+        """
+        prices = np.asarray(prices, dtype=float)
+        if prices.shape[-1] < period + 1:
+            return np.empty(prices.shape[:-1] + (0,))
+
+        # 窗口求和而非前缀和相减，保证全为0的窗口得到精确的0
+        deltas = np.diff(prices, axis=-1)
+        avg_gain = sliding_window_view(np.clip(deltas, 0.0, None), period, axis=-1).mean(axis=-1)
+        avg_loss = sliding_window_view(np.clip(-deltas, 0.0, None), period, axis=-1).mean(axis=-1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        rsi[avg_loss == 0] = 100.0
+        return rsi
+
+    @staticmethod
+    def bollinger_bands(prices: np.ndarray, period: int = 20,
+                        std_dev: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        布林带
+
+        Args:
+            prices: 价格数组
+            period: 周期
+            std_dev: 标准差倍数
+
+        Returns:
+            (上轨, 中轨, 下轨)
+        """
+        middle = Indicators.sma(prices, period)
+        if middle.shape[-1] == 0:
+            return middle, middle, middle
+
+        band = std_dev * Indicators.rolling_std(prices, period)
+        return middle + band, middle, middle - band
+
+    @staticmethod
+    def macd(prices: np.ndarray, fast_period: int = 12, slow_period: int = 26,
+             signal_period: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        MACD指标
+
+        Args:
+            prices: 价格数组
+            fast_period: 快线周期
+            slow_period: 慢线周期
+            signal_period: 信号线周期
+
+        Returns:
+            (MACD线, 信号线, 柱状图)
+        """
+        prices = np.asarray(prices, dtype=float)
+        empty = np.empty(prices.shape[:-1] + (0,))
+        if prices.shape[-1] < slow_period:
+            return empty, empty, empty
+
+        macd_line = Indicators.ema(prices, fast_period) - Indicators.ema(prices, slow_period)
+        if macd_line.shape[-1] < signal_period:
+            return macd_line, empty, empty
+
+        signal_line = Indicators.ema(macd_line, signal_period)
+        return macd_line, signal_line, macd_line - signal_line
+
+    @staticmethod
+    def true_range(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+        """
+        真实波幅（从第二根K线开始）
+
+        Returns:
+            长度为 n - 1 的数组
+        """
+        highs = np.asarray(highs, dtype=float)
+        lows = np.asarray(lows, dtype=float)
+        closes = np.asarray(closes, dtype=float)
+
+        prev_close = closes[..., :-1]
+        return np.maximum.reduce([
+            highs[..., 1:] - lows[..., 1:],
+            np.abs(highs[..., 1:] - prev_close),
+            np.abs(lows[..., 1:] - prev_close)
+        ])
+
+    @staticmethod
+    def atr(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int = 14) -> np.ndarray:
+        """
+        ATR指标（真实波幅简单平均）
+
+        Args:
+            highs: 最高价数组
+            lows: 最低价数组
+            closes: 收盘价数组
+            period: 周期
+
+        Returns:
+            长度为 n - period 的数组，数据不足时为空数组
+        """
+        highs = np.asarray(highs, dtype=float)
+        if highs.shape[-1] < period + 1:
+            return np.empty(highs.shape[:-1] + (0,))
+
+        return Indicators.sma(Indicators.true_range(highs, lows, closes), period)
+
+    @staticmethod
+    def volatility(prices: np.ndarray, period: int = 20) -> np.ndarray:
+        """
+        年化波动率（收益率滚动标准差 × sqrt(252)）
+
+        Args:
+            prices: 价格数组
+            period: 周期
+
+        Returns:
+            长度为 n - period 的数组，数据不足时为空数组
+        """
+        prices = np.asarray(prices, dtype=float)
+        if prices.shape[-1] < period + 1:
+            return np.empty(prices.shape[:-1] + (0,))
+
+        returns = prices[..., 1:] / prices[..., :-1] - 1.0
+        return Indicators.rolling_std(returns, period) * np.sqrt(252)
+
+    @staticmethod
+    def zscore(values: np.ndarray, period: int = 20) -> np.ndarray:
+        """
+        滚动Z分数（当前值相对窗口均值的标准差倍数）
+
+        Args:
+            values: 数值数组
+            period: 周期
+
+        Returns:
+            长度为 n - period + 1 的数组，零波动窗口为0
+        """
+        values = np.asarray(values, dtype=float)
+        if period <= 0 or values.shape[-1] < period:
+            return np.empty(values.shape[:-1] + (0,))
+
+        # 前缀和求窗口均值与平方均值，O(n)，批量扫描时比滑动窗口标准差快一个数量级
+        shifted = values - values[..., :1]
+        mean = Indicators.sma(shifted, period)
+        mean_sq = Indicators.sma(shifted * shifted, period)
+        variance = mean_sq - mean * mean
+        # 相对阈值过滤平盘窗口的舍入残差
+        flat = variance <= 1e-12 * np.maximum(mean_sq, 1e-300)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            zscore = (shifted[..., period - 1:] - mean) / np.sqrt(np.where(flat, 1.0, variance))
+        return np.where(flat, 0.0, zscore)
+
+    @staticmethod
+    def momentum(values: np.ndarray, period: int = 10) -> np.ndarray:
+        """
+        动量（period根K线的收益率）
+
+        Args:
+            values: 数值数组
+            period: 周期
+
+        Returns:
+            长度为 n - period 的数组
+        """
+        values = np.asarray(values, dtype=float)
+        if period <= 0 or values.shape[-1] <= period:
+            return np.empty(values.shape[:-1] + (0,))
+
+        return values[..., period:] / values[..., :-period] - 1.0
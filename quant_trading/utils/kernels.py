@@ -0,0 +1,214 @@
+"""
+路径依赖指标内核
+UT Bot的ATR追踪止损、仓位状态与买卖交叉信号都依赖上一根K线的结果，无法用NumPy向量化。
+这里把递推写成逐元素循环的内核：安装了Numba时JIT编译（nopython），
+未安装时以纯Python执行（输入先转为列表，避免逐个读取NumPy标量的开销）。
+递推与 strategies/ut_bot_v2.pine 中的 UT Bot Alerts 一致，实盘策略的单步更新也调用同一个 trailing_stop_step
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .indicators import Indicators
+
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    numba = None
+    NUMBA_AVAILABLE = False
+
+
+def jit(func):
+    """有Numba时编译为nopython内核（结果缓存到__pycache__），否则原样返回"""
+    if NUMBA_AVAILABLE:
+        return numba.njit(cache=True)(func)
+    return func
+
+
+def _inputs(*arrays):
+    """内核输入: Numba要求连续float64数组；纯Python下列表索引比NumPy标量快得多"""
+    if NUMBA_AVAILABLE:
+        return tuple(np.ascontiguousarray(array, dtype=np.float64) for array in arrays)
+    return tuple(np.asarray(array, dtype=np.float64).tolist() for array in arrays)
+
+
+def _outputs(n: int, count: int):
+    if NUMBA_AVAILABLE:
+        return tuple(np.empty(n) for _ in range(count))
+    return tuple([0.0] * n for _ in range(count))
+
+
+# ==========================================
+# 内核
+# ==========================================
+
+@jit
+def trailing_stop_step(prev_stop: float, src: float, prev_src: float, n_loss: float) -> float:
+    """
+    ATR追踪止损的单步递推
+
+    Args:
+        prev_stop: 上一根的止损值（无则为0）
+        src: 当前价格
+        prev_src: 上一根价格（无则为0）
+        n_loss: 止损距离（key_value * ATR）
+    """
+    if src > prev_stop and prev_src > prev_stop:
+        return max(prev_stop, src - n_loss)
+    if src < prev_stop and prev_src < prev_stop:
+        return min(prev_stop, src + n_loss)
+    if src > prev_stop:
+        return src - n_loss
+    return src + n_loss
+
+
+@jit
+def _ut_bot_kernel(src, n_loss, stops, positions, buys, sells):
+    """整段序列的追踪止损、仓位状态（1多/-1空/0无）与买卖交叉信号；n_loss为NaN的预热K线止损为NaN"""
+    prev_stop = 0.0   # Pine中的 nz(xATRTrailingStop[1])
+    prev_src = 0.0
+    prev_pos = 0.0
+    prev_valid = False  # 上一根止损有效（非预热）
+    prev_above = False  # 上一根 src > stop
+    prev_below = False  # 上一根 src < stop
+    for i in range(len(src)):
+        price = src[i]
+        loss = n_loss[i]
+        if math.isnan(loss):
+            stops[i] = math.nan
+            positions[i] = prev_pos
+            buys[i] = 0.0
+            sells[i] = 0.0
+            prev_stop = 0.0
+            prev_valid = False
+        else:
+            stop = trailing_stop_step(prev_stop, price, prev_src, loss)
+            if prev_src < prev_stop and price > prev_stop:
+                prev_pos = 1.0
+            elif prev_src > prev_stop and price < prev_stop:
+                prev_pos = -1.0
+            above = price > stop
+            below = price < stop
+            stops[i] = stop
+            positions[i] = prev_pos
+            # ta.crossover(src, stop) / ta.crossover(stop, src)，前一根为NaN时不成立
+            buys[i] = 1.0 if above and prev_valid and not prev_above else 0.0
+            sells[i] = 1.0 if below and prev_valid and not prev_below else 0.0
+            prev_stop = stop
+            prev_valid = True
+            prev_above = above
+            prev_below = below
+        prev_src = price
+
+
+@jit
+def _heikin_ashi_open_kernel(opens, closes, ha_closes, ha_opens):
+    """Heikin Ashi开盘价: (上一根HA开盘 + 上一根HA收盘) / 2，首根为 (开 + 收) / 2"""
+    if len(opens) == 0:
+        return
+    ha_opens[0] = (opens[0] + closes[0]) / 2
+    for i in range(1, len(opens)):
+        ha_opens[i] = (ha_opens[i - 1] + ha_closes[i - 1]) / 2
+
+
+# ==========================================
+# 数组接口
+# ==========================================
+
+@dataclass
+class UTBotSeries:
+    """UT Bot整段序列结果（与输入等长）"""
+    src: np.ndarray             # 信号价格（收盘价或Heikin Ashi收盘价）
+    atr: np.ndarray             # ATR，预热部分为NaN
+    trailing_stop: np.ndarray   # ATR追踪止损，预热部分为NaN
+    position: np.ndarray        # 仓位状态: 1多 / -1空 / 0无
+    buy: np.ndarray             # 买入信号（bool）
+    sell: np.ndarray            # 卖出信号（bool）
+
+
+def heikin_ashi_close(opens: np.ndarray, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """Heikin Ashi收盘价 (开 + 高 + 低 + 收) / 4，不依赖前值，直接向量化"""
+    return (np.asarray(opens, dtype=float) + np.asarray(highs, dtype=float)
+            + np.asarray(lows, dtype=float) + np.asarray(closes, dtype=float)) / 4
+
+
+def heikin_ashi_open(opens: np.ndarray, highs: np.ndarray, lows: np.ndarray, closes: np.ndarray) -> np.ndarray:
+    """Heikin Ashi开盘价（路径依赖，走内核）"""
+    ha_closes = heikin_ashi_close(opens, highs, lows, closes)
+    opens, closes, ha_closes = _inputs(opens, closes, ha_closes)
+    (ha_opens,) = _outputs(len(opens), 1)
+    _heikin_ashi_open_kernel(opens, closes, ha_closes, ha_opens)
+    return np.asarray(ha_opens, dtype=float)
+
+
+def atr_full(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, period: int) -> np.ndarray:
+    """与K线等长的ATR（真实波幅简单平均，同 Indicators.atr），不足period + 1根的位置为NaN"""
+    atr = Indicators.atr(highs, lows, closes, period)
+    full = np.full(len(closes), np.nan)
+    if len(atr):
+        full[len(full) - len(atr):] = atr
+    return full
+
+
+def _signal_source(highs, lows, closes, opens, use_heikin_ashi) -> np.ndarray:
+    if not use_heikin_ashi:
+        return np.asarray(closes, dtype=float)
+    if opens is None:
+        raise ValueError("use_heikin_ashi 需要开盘价")
+    return heikin_ashi_close(opens, highs, lows, closes)
+
+
+def _ut_bot_series(src: np.ndarray, atr: np.ndarray, key_value: float) -> UTBotSeries:
+    src_in, loss_in = _inputs(src, key_value * atr)
+    stops, positions, buys, sells = _outputs(len(src), 4)
+    _ut_bot_kernel(src_in, loss_in, stops, positions, buys, sells)
+    return UTBotSeries(
+        src=src,
+        atr=atr,
+        trailing_stop=np.asarray(stops, dtype=float),
+        position=np.asarray(positions, dtype=np.int8),
+        buy=np.asarray(buys, dtype=bool),
+        sell=np.asarray(sells, dtype=bool),
+    )
+
+
+def ut_bot(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, opens: Optional[np.ndarray] = None,
+           key_value: float = 3.0, atr_period: int = 1, use_heikin_ashi: bool = False) -> UTBotSeries:
+    """
+    一次计算整段K线的UT Bot Alerts
+
+    Args:
+        highs, lows, closes: K线数组
+        opens: 开盘价数组（use_heikin_ashi时必需）
+        key_value: 关键值（止损距离 = key_value * ATR）
+        atr_period: ATR周期
+        use_heikin_ashi: 以Heikin Ashi收盘价作为信号价格
+    """
+    src = _signal_source(highs, lows, closes, opens, use_heikin_ashi)
+    return _ut_bot_series(src, atr_full(highs, lows, closes, atr_period), key_value)
+
+
+def ut_bot_sweep(highs: np.ndarray, lows: np.ndarray, closes: np.ndarray, key_values: Sequence[float],
+                 atr_periods: Sequence[int], opens: Optional[np.ndarray] = None,
+                 use_heikin_ashi: bool = False) -> np.ndarray:
+    """
+    UT Bot参数扫描: 对每组 (key_value, atr_period) 按仓位状态持有到下一根K线，计算总收益（不含费用）
+
+    Returns:
+        形状为 (len(key_values), len(atr_periods)) 的总收益率数组
+    """
+    closes = np.asarray(closes, dtype=float)
+    src = _signal_source(highs, lows, closes, opens, use_heikin_ashi)
+    returns = np.diff(closes) / closes[:-1]
+    results = np.empty((len(key_values), len(atr_periods)))
+    for j, atr_period in enumerate(atr_periods):
+        atr = atr_full(highs, lows, closes, atr_period)
+        for i, key_value in enumerate(key_values):
+            position = _ut_bot_series(src, atr, key_value).position
+            # 当根K线收盘时的仓位承担下一根的涨跌
+            results[i, j] = np.expm1(np.sum(np.log1p(position[:-1] * returns)))
+    return results
@@ -0,0 +1,374 @@
+"""
+热路径延迟埋点
+用单调纳秒时钟为 行情接收 -> 解析 -> 订单簿更新 -> tick回调 -> 指标 -> 信号 -> 风控 -> 签名 -> 发送
+各阶段计时，按 (阶段, 市场, 策略) 记录到低开销的HDR风格直方图，并可导出为Prometheus文本格式
+"""
+
+import json
+import time
+from contextvars import ContextVar
+from enum import Enum
+from functools import wraps
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+class LatencyStage(Enum):
+    """埋点阶段"""
+    RECEIVE = "receive"              # WebSocket消息从收到到同步处理完成的总耗时
+    PARSE = "parse"                  # JSON解析
+    BOOK_UPDATE = "book_update"      # SDK合并订单簿增量
+    TICK_CALLBACK = "tick_callback"  # DataManager处理tick（缓存、K线、回调分发）
+    INDICATOR = "indicator"          # 策略指标计算
+    SIGNAL = "signal"                # 策略信号与下单决策
+    RISK_CHECK = "risk_check"        # 签名前风控检查
+    SIGN = "sign"                    # 交易签名
+    SEND = "send"                    # 发送交易（REST往返）
+    TICK_TO_ORDER = "tick_to_order"  # 端到端：触发决策的tick到达 -> 订单发送完成
+
+
+# 当前执行上下文的标签 (市场ID, 策略名)，由引擎运行策略/提交订单时设置
+_labels: ContextVar[Tuple[Optional[int], Optional[str]]] = ContextVar("latency_labels", default=(None, None))
+
+now_ns = time.perf_counter_ns
+
+
+class LatencyHistogram:
+    """
+    HDR风格直方图（对数-线性分桶）
+
+    每个2的幂区间等分为 2^sub_bucket_bits 个子桶，相对误差不超过 1/2^sub_bucket_bits；
+    记录一次只需一次位运算和一次列表自增，桶数组按需增长
+    """
+
+    __slots__ = ("sub_bits", "sub_count", "counts", "count", "total", "min", "max")
+
+    def __init__(self, sub_bucket_bits: int = 5):
+        self.sub_bits = sub_bucket_bits
+        self.sub_count = 1 << sub_bucket_bits
+        self.counts: List[int] = [0] * (2 * self.sub_count)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.sub_bits - 1
+        if shift <= 0:
+            return value
+        return shift * self.sub_count + (value >> shift)
+
+    def _bucket_bounds(self, index: int) -> Tuple[int, int]:
+        """桶的 [下界, 上界) 纳秒"""
+        if index < 2 * self.sub_count:
+            return index, index + 1
+        shift = index // self.sub_count - 1
+        mantissa = index - shift * self.sub_count
+        return mantissa << shift, (mantissa + 1) << shift
+
+    def record(self, value: int):
+        """记录一个值（纳秒）"""
+        if value < 0:
+            value = 0
+        index = self._index(value)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "LatencyHistogram"):
+        """合并另一个相同精度的直方图"""
+        if other.count == 0:
+            return
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self):
+        """清空"""
+        self.counts = [0] * (2 * self.sub_count)
+        self.count = self.total = self.min = self.max = 0
+
+    def percentiles(self, quantiles: Iterable[float]) -> List[float]:
+        """多个分位数（0~100），返回纳秒值（桶中点，不超过最大值）"""
+        quantiles = list(quantiles)
+        if self.count == 0:
+            return [0.0] * len(quantiles)
+        cumulative = np.cumsum(self.counts)
+        results = []
+        for q in quantiles:
+            rank = max(1, int(np.ceil(q / 100.0 * self.count)))
+            index = int(np.searchsorted(cumulative, rank))
+            low, high = self._bucket_bounds(index)
+            results.append(float(min((low + high - 1) / 2.0, self.max)))
+        return results
+
+    def percentile(self, q: float) -> float:
+        """分位数（0~100），纳秒"""
+        return self.percentiles((q,))[0]
+
+    def count_below(self, bounds_ns: Iterable[int]) -> List[int]:
+        """不超过各上界的累计计数（用于Prometheus的le分桶，精度为子桶宽度）"""
+        cumulative = np.cumsum(self.counts)
+        results = []
+        for bound in bounds_ns:
+            index = min(self._index(int(bound)), len(cumulative) - 1)
+            results.append(int(cumulative[index]))
+        return results
+
+    def snapshot(self) -> Dict[str, float]:
+        """统计摘要（微秒）"""
+        p50, p90, p99, p999 = self.percentiles((50, 90, 99, 99.9))
+        return {
+            "count": self.count,
+            "mean_us": self.total / self.count / 1000 if self.count else 0.0,
+            "min_us": self.min / 1000,
+            "p50_us": p50 / 1000,
+            "p90_us": p90 / 1000,
+            "p99_us": p99 / 1000,
+            "p999_us": p999 / 1000,
+            "max_us": self.max / 1000,
+        }
+
+
+class _Span:
+    """计时区间（with语句），退出时记录耗时"""
+
+    __slots__ = ("tracker", "stage", "market_id", "strategy", "started")
+
+    def __init__(self, tracker: "LatencyTracker", stage: LatencyStage,
+                 market_id: Optional[int], strategy: Optional[str]):
+        self.tracker = tracker
+        self.stage = stage
+        self.market_id = market_id
+        self.strategy = strategy
+
+    def __enter__(self):
+        self.started = now_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.tracker.record(self.stage, now_ns() - self.started, self.market_id, self.strategy)
+        return False
+
+
+class _Labels:
+    """设置当前上下文的标签（with语句）"""
+
+    __slots__ = ("labels", "token")
+
+    def __init__(self, market_id: Optional[int], strategy: Optional[str]):
+        self.labels = (market_id, strategy)
+
+    def __enter__(self):
+        self.token = _labels.set(self.labels)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _labels.reset(self.token)
+        return False
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class LatencyTracker:
+    """
+    延迟埋点记录器
+
+    阶段耗时按 (阶段, 市场, 策略) 分别记录；未显式传入的市场和策略取自当前上下文标签
+    （引擎运行策略、提交订单时设置），因此SDK内部的签名/发送也能归到对应的市场和策略。
+    关闭时所有记录调用直接返回
+    """
+
+    # Prometheus导出的le分桶（秒）
+    PROMETHEUS_BUCKETS = (
+        0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+        0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    )
+
+    def __init__(self, enabled: bool = True, sub_bucket_bits: int = 5):
+        """
+        Args:
+            enabled: 是否启用
+            sub_bucket_bits: 直方图每个2的幂区间的子桶位数（5位 = 32个子桶，相对误差约3%）
+        """
+        self.enabled = enabled
+        self.sub_bucket_bits = sub_bucket_bits
+        self.histograms: Dict[Tuple[LatencyStage, Optional[int], Optional[str]], LatencyHistogram] = {}
+        # 各市场最近一条tick的到达时间，以及待发送订单的 (市场, 策略, 触发tick到达时间)
+        self._tick_received: Dict[int, int] = {}
+        self._pending_orders: Dict[str, Tuple[int, Optional[str], Optional[int]]] = {}
+
+    # ==========================================
+    # 记录
+    # ==========================================
+
+    def record(self, stage: LatencyStage, duration_ns: int,
+               market_id: Optional[int] = None, strategy: Optional[str] = None):
+        """记录一次阶段耗时（纳秒）"""
+        if not self.enabled:
+            return
+        if market_id is None or strategy is None:
+            context_market, context_strategy = _labels.get()
+            if market_id is None:
+                market_id = context_market
+            if strategy is None:
+                strategy = context_strategy
+        key = (stage, market_id, strategy)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram(self.sub_bucket_bits)
+        histogram.record(duration_ns)
+
+    def span(self, stage: LatencyStage, market_id: Optional[int] = None, strategy: Optional[str] = None):
+        """阶段计时区间: with tracker.span(LatencyStage.INDICATOR, market_id): ..."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _Span(self, stage, market_id, strategy)
+
+    def labels(self, market_id: Optional[int] = None, strategy: Optional[str] = None):
+        """设置当前上下文的市场/策略标签: with tracker.labels(strategy=name): ..."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return _Labels(market_id, strategy)
+
+    def mark_tick(self, market_id: int, received_ns: int):
+        """记录某市场最近一条tick的到达时间（端到端延迟的起点）"""
+        if self.enabled:
+            self._tick_received[market_id] = received_ns
+
+    def order_created(self, order_id: str, market_id: int):
+        """订单创建时记下触发它的tick到达时间与当前策略"""
+        if self.enabled:
+            self._pending_orders[order_id] = (market_id, _labels.get()[1], self._tick_received.get(market_id))
+
+    def order_labels(self, order_id: str, market_id: int):
+        """提交订单时的上下文标签（策略为创建订单时正在运行的策略）"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        pending = self._pending_orders.get(order_id)
+        return _Labels(market_id, pending[1] if pending else None)
+
+    def order_sent(self, order_id: str, submitted: bool = True):
+        """订单发送完成（或被拒绝）时记录端到端延迟"""
+        pending = self._pending_orders.pop(order_id, None)
+        if pending is None or pending[2] is None or not submitted or not self.enabled:
+            return
+        market_id, strategy, received = pending
+        self.record(LatencyStage.TICK_TO_ORDER, now_ns() - received, market_id, strategy)
+
+    # ==========================================
+    # SDK客户端埋点（包装实例方法，不修改SDK）
+    # ==========================================
+
+    def instrument_ws_client(self, ws_client):
+        """为WsClient的消息处理、JSON解析与订单簿合并计时，并记下消息到达时间"""
+        on_message = ws_client.on_message
+        update_order_book_state = ws_client.update_order_book_state
+        tracker = self
+
+        @wraps(on_message)
+        def timed_on_message(ws, message):
+            received = now_ns()
+            ws_client.message_received_ns = received
+            if isinstance(message, (str, bytes)):
+                message = json.loads(message)
+                parsed = now_ns()
+                tracker.record(LatencyStage.PARSE, parsed - received)
+            try:
+                return on_message(ws, message)
+            finally:
+                tracker.record(LatencyStage.RECEIVE, now_ns() - received)
+
+        @wraps(update_order_book_state)
+        def timed_update_order_book_state(market_id, order_book):
+            started = now_ns()
+            try:
+                return update_order_book_state(market_id, order_book)
+            finally:
+                tracker.record(LatencyStage.BOOK_UPDATE, now_ns() - started, int(market_id))
+
+        ws_client.on_message = timed_on_message
+        ws_client.update_order_book_state = timed_update_order_book_state
+        return ws_client
+
+    def instrument_signer(self, signer_client):
+        """为SignerClient的下单签名与交易发送计时（市场与策略取自提交订单时的上下文标签）"""
+        if signer_client is None:
+            return signer_client
+        sign_create_order = signer_client.sign_create_order
+        send_tx = signer_client.send_tx
+        tracker = self
+
+        @wraps(sign_create_order)
+        def timed_sign_create_order(*args, **kwargs):
+            with tracker.span(LatencyStage.SIGN):
+                return sign_create_order(*args, **kwargs)
+
+        @wraps(send_tx)
+        async def timed_send_tx(*args, **kwargs):
+            with tracker.span(LatencyStage.SEND):
+                return await send_tx(*args, **kwargs)
+
+        signer_client.sign_create_order = timed_sign_create_order
+        signer_client.send_tx = timed_send_tx
+        return signer_client
+
+    # ==========================================
+    # 导出
+    # ==========================================
+
+    def reset(self):
+        """清空所有直方图"""
+        self.histograms.clear()
+        self._pending_orders.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """按阶段汇总: {阶段: {"market=<id>,strategy=<name>": 统计摘要（微秒）}}"""
+        stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (stage, market_id, strategy), histogram in sorted(
+                self.histograms.items(), key=lambda item: (item[0][0].value, str(item[0][1]), str(item[0][2]))):
+            label = f"market={'' if market_id is None else market_id},strategy={strategy or ''}"
+            stats.setdefault(stage.value, {})[label] = histogram.snapshot()
+        return stats
+
+    def to_prometheus(self, metric: str = "quant_trading_latency_seconds") -> str:
+        """导出为Prometheus文本格式的直方图"""
+        lines = [
+            f"# HELP {metric} 热路径各阶段延迟",
+            f"# TYPE {metric} histogram",
+        ]
+        bounds_ns = [int(bound * 1e9) for bound in self.PROMETHEUS_BUCKETS]
+        for (stage, market_id, strategy), histogram in list(self.histograms.items()):
+            labels = (f'stage="{stage.value}",market="{"" if market_id is None else market_id}",'
+                      f'strategy="{strategy or ""}"')
+            for bound, count in zip(self.PROMETHEUS_BUCKETS, histogram.count_below(bounds_ns)):
+                lines.append(f'{metric}_bucket{{{labels},le="{bound:g}"}} {count}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{labels}}} {histogram.total / 1e9:.9f}")
+            lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
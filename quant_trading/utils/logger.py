@@ -1,11 +1,238 @@
 """
 日志管理
+
+默认每个日志器直接写控制台（与原有行为一致）。调用 configure_logging 后，
+所有通过 setup_logger 创建的日志器改为写入一个有界队列，由后台线程统一格式化并写控制台/文件：
+热路径上只做级别判断、限流判断和一次入队，消息格式化（%参数）与磁盘写入都在后台线程完成。
+支持按调用位置限流重复日志，以及JSON结构化输出（extra字段原样输出）
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# LogRecord的标准属性，JSON输出时其余属性视为extra结构化字段
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+@dataclass
+class LogOptions:
+    """日志选项（对应config.yaml的log配置段）"""
+    level: str = "INFO"
+    file: Optional[str] = None               # 日志文件路径，None表示只写控制台
+    async_mode: bool = True                  # 通过队列由后台线程写日志
+    queue_size: int = 10000                  # 队列容量，队列满时丢弃新日志而不阻塞调用方
+    json_format: bool = False                # 输出JSON结构化日志
+    rate_limit_interval: float = 0.0         # 限流窗口（秒），0表示不限流
+    rate_limit_burst: int = 20               # 每个调用位置在一个窗口内最多输出的条数
+
+    @classmethod
+    def from_config(cls, config) -> "LogOptions":
+        """从配置读取日志选项"""
+        log_config = getattr(config, "log_config", None) or {}
+        return cls(
+            level=getattr(config, "log_level", None) or log_config.get("level", "INFO"),
+            file=getattr(config, "log_file", None) or log_config.get("file"),
+            async_mode=log_config.get("async", True),
+            queue_size=log_config.get("queue_size", 10000),
+            json_format=log_config.get("json", False),
+            rate_limit_interval=log_config.get("rate_limit_interval", 0.0),
+            rate_limit_burst=log_config.get("rate_limit_burst", 20),
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON结构化日志: 每条日志一行，extra传入的字段作为顶层键"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按调用位置（日志器、文件、行号）限流
+
+    同一位置在每个窗口内最多放行burst条，其余丢弃并计数；
+    窗口结束后放行的第一条日志附带被抑制的条数。按位置而不是按消息文本计数，
+    因此f-string生成的不同文本也会被视为同一条重复日志。ERROR及以上级别不限流
+    """
+
+    def __init__(self, interval: float, burst: int = 20):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.suppressed_total = 0
+        # 位置 -> [窗口开始时间, 窗口内已放行条数, 被抑制条数]
+        self._windows: Dict[Tuple[str, str, int], List[float]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = record.created
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = int(window[2]) if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.suppressed = suppressed
+                record.msg = f"{record.msg}（过去 {self.interval:g} 秒内另有 {suppressed} 条相同位置的日志被抑制）"
+            return True
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+        window[2] += 1
+        self.suppressed_total += 1
+        return False
+
+
+class _LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    入队时不格式化消息（标准QueueHandler会在调用方线程里格式化），
+    %参数留给后台线程；队列积压超过容量时丢弃并计数，不阻塞事件循环。
+    使用无锁的SimpleQueue，容量按qsize近似判断
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, maxsize: int):
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.maxsize:
+            self.dropped += 1
+            return
+        self.queue.put(record)
+
+
+class _LoggingState:
+    """进程内的日志后端状态"""
+    lock = threading.Lock()
+    options: Optional[LogOptions] = None
+    handlers: List[logging.Handler] = []       # 挂到各日志器上的处理器
+    queue_handler: Optional[_LazyQueueHandler] = None
+    listener: Optional[logging.handlers.QueueListener] = None
+    rate_limiter: Optional[RateLimitFilter] = None
+    managed: Dict[str, logging.Logger] = {}    # setup_logger创建的日志器
+
+
+def _build_output_handlers(options: LogOptions) -> List[logging.Handler]:
+    """实际输出的处理器（控制台与文件）"""
+    formatter = JsonFormatter() if options.json_format else logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if options.file:
+        log_dir = os.path.dirname(options.file)
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        handlers.append(logging.FileHandler(options.file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def _attach(logger: logging.Logger, level: str):
+    """把已配置的处理器与限流器挂到日志器上"""
+    logger.setLevel(getattr(logging, level.upper()))
+    logger.handlers.clear()
+    for handler in _LoggingState.handlers:
+        logger.addHandler(handler)
+    # 限流挂在日志器上（每条日志只判断一次），被抑制的日志不进入队列
+    for log_filter in [f for f in logger.filters if isinstance(f, RateLimitFilter)]:
+        logger.removeFilter(log_filter)
+    if _LoggingState.rate_limiter is not None:
+        logger.addFilter(_LoggingState.rate_limiter)
+    # 处理器已直接挂在日志器上，避免根日志器再输出一遍
+    logger.propagate = False
+
+
+def configure_logging(options: LogOptions):
+    """
+    配置进程内的日志后端（启动脚本在创建引擎前调用）
+
+    已经通过 setup_logger 创建的日志器会切换到新的处理器；重复调用会先关闭旧的后台线程
+
+    Args:
+        options: 日志选项
+    """
+    shutdown_logging()
+    with _LoggingState.lock:
+        output_handlers = _build_output_handlers(options)
+        rate_limiter = RateLimitFilter(options.rate_limit_interval, options.rate_limit_burst) \
+            if options.rate_limit_interval > 0 else None
+
+        if options.async_mode:
+            queue_handler = _LazyQueueHandler(queue.SimpleQueue(), options.queue_size)
+            listener = logging.handlers.QueueListener(queue_handler.queue, *output_handlers,
+                                                      respect_handler_level=False)
+            listener.start()
+            handlers: List[logging.Handler] = [queue_handler]
+        else:
+            queue_handler, listener = None, None
+            handlers = output_handlers
+
+        # lighter SDK导入时调用 logging.basicConfig(level=DEBUG)，根日志器为DEBUG时
+        # websockets/aiohttp会为每个帧、每个请求生成调试日志；恢复为配置的级别
+        logging.getLogger().setLevel(getattr(logging, options.level.upper()))
+        
+        _LoggingState.options = options
+        _LoggingState.handlers = handlers
+        _LoggingState.queue_handler = queue_handler
+        _LoggingState.listener = listener
+        _LoggingState.rate_limiter = rate_limiter
+        for logger in _LoggingState.managed.values():
+            level = logging.getLevelName(logger.level) if logger.level else options.level
+            _attach(logger, level)
+
+
+def shutdown_logging():
+    """停止后台线程并写完队列中剩余的日志"""
+    with _LoggingState.lock:
+        listener = _LoggingState.listener
+        _LoggingState.listener = None
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logging_stats() -> Dict[str, Any]:
+    """日志后端统计（队列积压、因队列满丢弃与被限流抑制的条数）"""
+    queue_handler = _LoggingState.queue_handler
+    rate_limiter = _LoggingState.rate_limiter
+    return {
+        "async": queue_handler is not None,
+        "queue_depth": queue_handler.queue.qsize() if queue_handler else 0,
+        "dropped": queue_handler.dropped if queue_handler else 0,
+        "suppressed": rate_limiter.suppressed_total if rate_limiter else 0,
+    }
 
 
 def setup_logger(name: str, level: str = "INFO", log_file: Optional[str] = None) -> logging.Logger:
@@ -21,16 +248,25 @@ def setup_logger(name: str, level: str = "INFO", log_file: Optional[str] = None)
         日志器对象
     """
     logger = logging.getLogger(name)
+    
+    # 已配置日志后端：共用后台队列与输出处理器
+    if _LoggingState.options is not None:
+        _attach(logger, level)
+        _LoggingState.managed[name] = logger
+        if log_file:
+            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+            logger.addHandler(file_handler)
+        return logger
+    _LoggingState.managed[name] = logger
+    
     logger.setLevel(getattr(logging, level.upper()))
     
     # 清除现有的处理器
     logger.handlers.clear()
     
     # 创建格式化器
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
     
     # 控制台处理器
     console_handler = logging.StreamHandler()
@@ -0,0 +1,345 @@
+"""
+Prometheus指标注册表
+进程内的计数器、仪表与直方图，以Prometheus文本格式导出；
+并为lighter SDK的REST客户端与nonce管理器挂载计数与耗时统计（包装方法，不修改SDK）
+"""
+
+import math
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+from .logger import get_logging_stats
+from .runtime import Runtime
+
+
+# 默认的耗时分桶（秒）：覆盖本机调用到慢速REST往返
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+# 抓取时求值的函数: 返回单个值（无标签）或 {标签值元组: 值}
+ValueFunction = Callable[[], Union[float, Dict[LabelValues, float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """样本值保留完整精度（整数按整数输出，避免 :g 只保留6位有效数字使大计数器失真）"""
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+class _ValueChild:
+    """计数器/仪表的单个标签组合"""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    """直方图的单个标签组合（各桶计数为非累计值，导出时累加）"""
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class MetricFamily:
+    """同名指标的所有标签组合"""
+
+    TYPE = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[LabelValues, object] = {}
+        self._function: Optional[ValueFunction] = None
+        if not self.labelnames:
+            # 无标签指标从0开始导出，便于计算速率
+            self.children[()] = self._new_child()
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def labels(self, *values) -> object:
+        """按标签值取子指标（不存在时创建）"""
+        key = tuple(str(value) for value in values)
+        child = self.children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，收到 {key}")
+            child = self.children[key] = self._new_child()
+        return child
+
+    def set_function(self, function: ValueFunction):
+        """改为在抓取时调用函数取值（用于队列深度等已有统计）"""
+        self._function = function
+
+    def _samples(self) -> List[Tuple[LabelValues, float]]:
+        if self._function is not None:
+            result = self._function()
+            if isinstance(result, dict):
+                return [(tuple(str(value) for value in key), value) for key, value in result.items()]
+            return [((), result)]
+        return [(key, child.value) for key, child in list(self.children.items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(MetricFamily):
+    """只增计数器"""
+
+    TYPE = "counter"
+
+    def inc(self, amount: float = 1.0):
+        """无标签计数器自增"""
+        self.labels().inc(amount)
+
+
+class Gauge(MetricFamily):
+    """可增可减的仪表"""
+
+    TYPE = "gauge"
+
+    def set(self, value: float):
+        """设置无标签仪表的值"""
+        self.labels().set(value)
+
+
+class Histogram(MetricFamily):
+    """固定分桶直方图（秒）"""
+
+    TYPE = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """无标签直方图记录一个值"""
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for key, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {child.count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {child.sum:.9f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表（同名指标只创建一次）"""
+
+    def __init__(self):
+        self.families: Dict[str, MetricFamily] = {}
+        self.collectors: List[Callable[[], str]] = []
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(family, cls):
+            raise ValueError(f"指标 {name} 已注册为 {family.TYPE}")
+        return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], str]):
+        """添加自行生成Prometheus文本的采集器（如延迟埋点直方图）"""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], str]):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    def render(self) -> str:
+        """导出所有指标为Prometheus文本格式"""
+        lines: List[str] = []
+        for family in list(self.families.values()):
+            try:
+                lines.extend(family.render())
+            except Exception as e:
+                lines.append(f"# 指标 {family.name} 导出失败: {e}")
+        text = "\n".join(lines) + "\n"
+        for collector in list(self.collectors):
+            try:
+                text += collector()
+            except Exception as e:
+                text += f"# 采集器导出失败: {e}\n"
+        return text
+
+
+# 进程级默认注册表
+REGISTRY = MetricsRegistry()
+
+# REST客户端
+REST_REQUESTS = REGISTRY.counter(
+    "quant_trading_rest_requests_total", "REST请求数", ("method", "endpoint", "status"))
+REST_LATENCY = REGISTRY.histogram(
+    "quant_trading_rest_request_seconds", "REST请求耗时（到收到响应头）", ("method", "endpoint"))
+REST_RATE_LIMITED = REGISTRY.counter(
+    "quant_trading_rest_rate_limited_total", "REST请求被限流（HTTP 429）次数", ("endpoint",))
+
+# WebSocket行情
+WS_MESSAGES = REGISTRY.counter(
+    "quant_trading_ws_messages_total", "WebSocket消息数", ("channel", "market"))
+WS_RECONNECTS = REGISTRY.counter(
+    "quant_trading_ws_reconnects_total", "WebSocket断线重连次数")
+
+# 订单与签名
+ORDER_SUBMIT_LATENCY = REGISTRY.histogram(
+    "quant_trading_order_submit_seconds", "订单提交耗时（风控、签名与发送）", ("market", "status"))
+NONCE_RESYNCS = REGISTRY.counter(
+    "quant_trading_nonce_resyncs_total", "nonce重新同步次数（invalid nonce时从API刷新，发送失败时回退）",
+    ("api_key_index", "reason"))
+
+# 事件循环
+LOOP_LAG = REGISTRY.gauge(
+    "quant_trading_event_loop_lag_seconds", "事件循环延迟（最近一次与最大值）", ("kind",))
+LOOP_SLOW = REGISTRY.counter(
+    "quant_trading_event_loop_slow_total", "事件循环延迟超过阈值的次数")
+
+
+def _loop_lag() -> Dict[LabelValues, float]:
+    monitor = Runtime.monitor
+    if monitor is None:
+        return {}
+    return {("last",): monitor.last_lag, ("max",): monitor.max_lag}
+
+
+LOOP_LAG.set_function(_loop_lag)
+LOOP_SLOW.set_function(lambda: {(): Runtime.monitor.slow_count} if Runtime.monitor else {})
+
+# 日志后端
+REGISTRY.gauge("quant_trading_log_queue_depth", "日志队列积压").set_function(
+    lambda: get_logging_stats()["queue_depth"])
+REGISTRY.counter("quant_trading_log_dropped_total", "日志队列满时丢弃的日志数").set_function(
+    lambda: get_logging_stats()["dropped"])
+REGISTRY.counter("quant_trading_log_suppressed_total", "被限流抑制的重复日志数").set_function(
+    lambda: get_logging_stats()["suppressed"])
+
+
+class ClientMetrics:
+    """lighter SDK客户端的指标埋点"""
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """请求URL归一化为端点（去掉主机与查询参数，纯数字路径段替换为{id}以控制标签基数）"""
+        path = urlparse(url).path or "/"
+        return "/".join("{id}" if segment.isdigit() else segment for segment in path.split("/"))
+
+    @staticmethod
+    def instrument_rest():
+        """
+        为 RESTClientObject.request 计数与计时（按方法、端点与状态码），并统计429限流
+
+        包装类方法，进程内所有ApiClient（包括SignerClient内部的客户端）都生效；重复调用无副作用
+        """
+        from lighter.rest import RESTClientObject
+
+        request = RESTClientObject.request
+        if getattr(request, "_metrics_instrumented", False):
+            return
+
+        @wraps(request)
+        async def timed_request(self, method, url, *args, **kwargs):
+            endpoint = ClientMetrics.endpoint(url)
+            method = method.upper()
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = await request(self, method, url, *args, **kwargs)
+                status = str(response.status)
+                return response
+            finally:
+                REST_LATENCY.labels(method, endpoint).observe(time.perf_counter() - started)
+                REST_REQUESTS.labels(method, endpoint, status).inc()
+                if status == "429":
+                    REST_RATE_LIMITED.labels(endpoint).inc()
+
+        timed_request._metrics_instrumented = True
+        RESTClientObject.request = timed_request
+
+    @staticmethod
+    def instrument_nonce_manager(signer_client):
+        """统计SignerClient的nonce重新同步（包装实例的nonce管理器方法）"""
+        nonce_manager = getattr(signer_client, "nonce_manager", None)
+        if nonce_manager is None:
+            return
+        hard_refresh_nonce = nonce_manager.hard_refresh_nonce
+        acknowledge_failure = nonce_manager.acknowledge_failure
+
+        @wraps(hard_refresh_nonce)
+        def counted_hard_refresh_nonce(api_key, *args, **kwargs):
+            NONCE_RESYNCS.labels(api_key, "invalid_nonce").inc()
+            return hard_refresh_nonce(api_key, *args, **kwargs)
+
+        @wraps(acknowledge_failure)
+        def counted_acknowledge_failure(api_key_index, *args, **kwargs):
+            NONCE_RESYNCS.labels(api_key_index, "rollback").inc()
+            return acknowledge_failure(api_key_index, *args, **kwargs)
+
+        nonce_manager.hard_refresh_nonce = counted_hard_refresh_nonce
+        nonce_manager.acknowledge_failure = counted_acknowledge_failure
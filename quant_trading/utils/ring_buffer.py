@@ -0,0 +1,298 @@
+"""
+环形缓冲区
+以NumPy列存储固定容量的K线/tick历史，替代不断切片裁剪的字典列表
+"""
+
+import numpy as np
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+class Candle:
+    """K线记录（__slots__，支持 candle["close"] / candle.get("close") 的字典式访问）"""
+
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume")
+
+    def __init__(self, timestamp: float, open: float, high: float, low: float,
+                 close: float, volume: float = 0.0):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __getitem__(self, key: str) -> float:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def to_dict(self) -> Dict[str, float]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"Candle({self.to_dict()})"
+
+
+class Tick:
+    """tick记录（__slots__，支持字典式访问）"""
+
+    __slots__ = ("timestamp", "price", "bid", "ask", "bid_size", "ask_size")
+
+    def __init__(self, timestamp: float, price: float, bid: float = 0.0, ask: float = 0.0,
+                 bid_size: float = 0.0, ask_size: float = 0.0):
+        self.timestamp = timestamp
+        self.price = price
+        self.bid = bid
+        self.ask = ask
+        self.bid_size = bid_size
+        self.ask_size = ask_size
+
+    __getitem__ = Candle.__getitem__
+    __contains__ = Candle.__contains__
+    get = Candle.get
+    keys = Candle.keys
+    to_dict = Candle.to_dict
+
+    def __repr__(self) -> str:
+        return f"Tick({self.to_dict()})"
+
+
+class RingBuffer:
+    """
+    固定容量的列式环形缓冲区
+
+    每个字段一行、容量两倍长度的数组，每次追加同时写入 i 和 i + capacity 两处，
+    因此最近n条数据总是一段连续内存：追加为O(1)，取窗口不复制
+    """
+
+    record_type: Optional[type] = None
+
+    def __init__(self, capacity: int, fields: Sequence[str] = ("value",), dtype=np.float64):
+        """
+        初始化环形缓冲区
+
+        Args:
+            capacity: 最大保存条数
+            fields: 字段名
+            dtype: 数据类型
+        """
+        if capacity <= 0:
+            raise ValueError("capacity必须大于0")
+
+        self.capacity = capacity
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self._field_index = {name: i for i, name in enumerate(self.fields)}
+        self._data = np.zeros((len(self.fields), 2 * capacity), dtype=dtype)
+        self._head = 0   # 下一次写入位置
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == self.capacity
+
+    def append(self, *values: float):
+        """追加一条数据（按字段顺序传值）"""
+        head = self._head
+        self._data[:, head] = values
+        self._data[:, head + self.capacity] = values
+        self._head = (head + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def append_record(self, record: Union[Dict[str, Any], Any]):
+        """追加一条字典或记录对象（缺失字段记为0）"""
+        self.append(*[float(record.get(name, 0) or 0) for name in self.fields])
+
+    def update_last(self, *values: float):
+        """覆盖最新一条数据（例如未走完K线的更新）"""
+        if self._size == 0:
+            self.append(*values)
+            return
+        last = (self._head - 1) % self.capacity
+        self._data[:, last] = values
+        self._data[:, last + self.capacity] = values
+
+    def extend_arrays(self, *columns: Iterable[float]):
+        """批量追加（每个字段一个等长数组），向量化写入"""
+        block = np.asarray([np.asarray(c, dtype=self._data.dtype) for c in columns])
+        count = block.shape[1] if block.ndim == 2 else 0
+        if count == 0:
+            return
+        if count >= self.capacity:
+            block = block[:, -self.capacity:]
+            self._data[:, :self.capacity] = block
+            self._data[:, self.capacity:] = block
+            self._head = 0
+            self._size = self.capacity
+            return
+
+        positions = (self._head + np.arange(count)) % self.capacity
+        self._data[:, positions] = block
+        self._data[:, positions + self.capacity] = block
+        self._head = (self._head + count) % self.capacity
+        self._size = min(self._size + count, self.capacity)
+
+    def extend(self, records: Iterable[Union[Dict[str, Any], Any]]):
+        """批量追加字典或记录对象"""
+        rows = [[float(r.get(name, 0) or 0) for name in self.fields] for r in records]
+        if rows:
+            self.extend_arrays(*np.asarray(rows, dtype=self._data.dtype).T)
+
+    def clear(self):
+        """清空缓冲区"""
+        self._head = 0
+        self._size = 0
+
+    def _bounds(self, n: Optional[int]) -> Tuple[int, int]:
+        count = self._size if n is None else max(0, min(n, self._size))
+        end = self._head + self.capacity
+        return end - count, end
+
+    def window(self, n: Optional[int] = None) -> np.ndarray:
+        """最近n条数据的 (字段数, n) 视图（不复制，勿在追加后继续持有）"""
+        start, end = self._bounds(n)
+        return self._data[:, start:end]
+
+    def column(self, name: Optional[str] = None, n: Optional[int] = None) -> np.ndarray:
+        """某字段最近n条数据的连续视图，name为None时取第一个字段"""
+        start, end = self._bounds(n)
+        index = 0 if name is None else self._field_index[name]
+        return self._data[index, start:end]
+
+    def last(self, name: Optional[str] = None, offset: int = 1) -> float:
+        """倒数第offset条数据的某字段值"""
+        if offset > self._size or offset <= 0:
+            raise IndexError("环形缓冲区索引越界")
+        index = 0 if name is None else self._field_index[name]
+        return float(self._data[index, self._head + self.capacity - offset])
+
+    def _make_record(self, position: int):
+        values = self._data[:, position].tolist()
+        if self.record_type is not None:
+            return self.record_type(*values)
+        return dict(zip(self.fields, values))
+
+    def __getitem__(self, key: Union[int, slice]):
+        """整数索引返回一条记录，切片返回记录列表（兼容原列表接口）"""
+        start, end = self._bounds(None)
+        if isinstance(key, slice):
+            return [self._make_record(start + i) for i in range(*key.indices(self._size))]
+        if key < 0:
+            key += self._size
+        if key < 0 or key >= self._size:
+            raise IndexError("环形缓冲区索引越界")
+        return self._make_record(start + key)
+
+    def __iter__(self) -> Iterator[Any]:
+        start, end = self._bounds(None)
+        for position in range(start, end):
+            yield self._make_record(position)
+
+    def to_dicts(self, n: Optional[int] = None) -> List[Dict[str, float]]:
+        """最近n条数据转换为字典列表（用于序列化）"""
+        window = self.window(n)
+        return [dict(zip(self.fields, row)) for row in window.T.tolist()]
+
+
+class CandleBuffer(RingBuffer):
+    """OHLCV K线环形缓冲区"""
+
+    FIELDS = ("timestamp", "open", "high", "low", "close", "volume")
+    record_type = Candle
+
+    def __init__(self, capacity: int = 1000):
+        super().__init__(capacity, self.FIELDS)
+
+    def merge(self, candles: Iterable[Union[Dict[str, Any], Candle]]):
+        """
+        合并按时间升序的K线：时间戳相同则覆盖最新一根，更新的追加，更旧的忽略
+
+        Args:
+            candles: K线字典或Candle列表
+        """
+        for candle in candles:
+            timestamp = float(candle["timestamp"])
+            if self._size:
+                last_timestamp = self.last("timestamp")
+                if timestamp < last_timestamp:
+                    continue
+                if timestamp == last_timestamp:
+                    self.update_last(*[float(candle.get(name, 0) or 0) for name in self.FIELDS])
+                    continue
+            self.append_record(candle)
+
+    def reconcile(self, candles: Sequence[Union[Dict[str, Any], Candle]]) -> int:
+        """
+        用权威K线（如REST接口）校正历史：时间戳相同则覆盖，缺失的补入，整体保持时间升序
+
+        Args:
+            candles: K线字典或Candle列表
+
+        Returns:
+            被覆盖或补入的K线数量
+        """
+        if not candles:
+            return 0
+
+        incoming = np.asarray([[float(c.get(name, 0) or 0) for name in self.FIELDS] for c in candles]).T
+        current = self.window()
+        if self._size:
+            # 逐根比较，只有存在差异时才重建缓冲区
+            index = np.searchsorted(current[0], incoming[0])
+            found = (index < self._size) & (current[0, np.minimum(index, self._size - 1)] == incoming[0])
+            same = found.copy()
+            same[found] = np.all(current[:, index[found]] == incoming[:, found], axis=0)
+            changed = int(np.count_nonzero(~same))
+        else:
+            changed = incoming.shape[1]
+        if changed == 0:
+            return 0
+
+        # 合并后按时间戳排序，同一时间戳保留权威K线
+        merged = np.concatenate([current, incoming], axis=1)
+        priority = np.concatenate([np.zeros(current.shape[1]), np.ones(incoming.shape[1])])
+        order = np.lexsort((priority, merged[0]))
+        merged = merged[:, order]
+        keep = np.append(merged[0, 1:] != merged[0, :-1], True)
+
+        self.clear()
+        self.extend_arrays(*merged[:, keep])
+        return changed
+
+    @classmethod
+    def from_records(cls, candles: Sequence[Union[Dict[str, Any], Candle]],
+                     capacity: Optional[int] = None) -> "CandleBuffer":
+        """由K线列表创建缓冲区，容量默认与列表等长"""
+        buffer = cls(capacity or max(len(candles), 1))
+        buffer.extend(candles)
+        return buffer
+
+
+class TickBuffer(RingBuffer):
+    """tick环形缓冲区"""
+
+    FIELDS = ("timestamp", "price", "bid", "ask", "bid_size", "ask_size")
+    record_type = Tick
+
+    def __init__(self, capacity: int = 10000):
+        super().__init__(capacity, self.FIELDS)
+
+
+def as_candle_buffer(candles: Union[CandleBuffer, Sequence[Dict[str, Any]], None]) -> CandleBuffer:
+    """K线数据统一为CandleBuffer：已是缓冲区则原样返回，列表则转换"""
+    if isinstance(candles, CandleBuffer):
+        return candles
+    return CandleBuffer.from_records(candles or [])
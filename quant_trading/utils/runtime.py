@@ -0,0 +1,228 @@
+"""
+运行时引导
+按配置选择事件循环（uvloop可选）、设置默认线程池大小、检测阻塞事件循环的慢回调，
+并调整GC阈值或冻结启动阶段创建的对象，供各启动脚本统一使用
+"""
+
+import asyncio
+import gc
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, Optional, Tuple
+
+from .config import Config
+
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    uvloop = None
+    UVLOOP_AVAILABLE = False
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RuntimeOptions:
+    """运行时选项（对应config.yaml的runtime配置段）"""
+    use_uvloop: bool = False                 # 使用uvloop（未安装时回退到默认事件循环）
+    thread_pool_workers: int = 0             # 默认线程池大小，0表示使用Python默认值
+    slow_callback_ms: float = 0.0            # 事件循环延迟超过该值（毫秒）时告警，0表示关闭
+    loop_monitor_interval: float = 0.1       # 事件循环延迟采样间隔（秒）
+    loop_debug: bool = False                 # 启用asyncio调试模式（记录每个慢回调的位置，开销较大）
+    gc_thresholds: Optional[Tuple[int, int, int]] = None  # GC阈值 (gen0, gen1, gen2)，None表示不修改
+    gc_freeze: bool = False                  # 启动完成后冻结已有对象，之后的GC不再扫描它们
+
+    @classmethod
+    def from_config(cls, config: Optional[Config]) -> "RuntimeOptions":
+        """从配置读取运行时选项"""
+        runtime_config = getattr(config, "runtime_config", None) or {}
+        thresholds = runtime_config.get("gc_thresholds")
+        return cls(
+            use_uvloop=runtime_config.get("use_uvloop", False),
+            thread_pool_workers=runtime_config.get("thread_pool_workers", 0),
+            slow_callback_ms=runtime_config.get("slow_callback_ms", 0.0),
+            loop_monitor_interval=runtime_config.get("loop_monitor_interval", 0.1),
+            loop_debug=runtime_config.get("loop_debug", False),
+            gc_thresholds=tuple(thresholds) if thresholds else None,
+            gc_freeze=runtime_config.get("gc_freeze", False),
+        )
+
+    @classmethod
+    def from_file(cls, config_path: str = "config.yaml") -> "RuntimeOptions":
+        """从配置文件读取运行时选项（启动脚本在加载完整配置前需要先确定事件循环），文件不存在时使用默认值"""
+        if not os.path.exists(config_path):
+            return cls()
+        return cls.from_config(Config.from_file(config_path))
+
+
+class LoopMonitor:
+    """
+    事件循环延迟监控
+
+    以固定间隔sleep并测量实际唤醒时间与预期的差值：差值即为这段时间内
+    阻塞事件循环的回调耗时，超过阈值时告警。与asyncio调试模式不同，
+    它对uvloop同样有效，且开销只有一个定时任务
+    """
+
+    def __init__(self, threshold: float, interval: float = 0.1):
+        """
+        Args:
+            threshold: 告警阈值（秒）
+            interval: 采样间隔（秒）
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.samples = 0
+        self.slow_count = 0
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            self.samples += 1
+            self.last_lag = lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.threshold:
+                self.slow_count += 1
+                logger.warning(f"事件循环被阻塞 {lag * 1000:.1f} ms（阈值 {self.threshold * 1000:.1f} ms）")
+
+    def get_stats(self) -> Dict[str, float]:
+        """延迟统计"""
+        return {
+            "samples": self.samples,
+            "slow_count": self.slow_count,
+            "last_lag_ms": self.last_lag * 1000,
+            "max_lag_ms": self.max_lag * 1000,
+        }
+
+
+class Runtime:
+    """运行时引导工具"""
+
+    # 当前进程中运行的延迟监控（configure_loop创建）
+    monitor: Optional[LoopMonitor] = None
+
+    @staticmethod
+    def install_event_loop_policy(options: RuntimeOptions) -> str:
+        """
+        按选项安装事件循环策略（需在创建事件循环之前调用）
+
+        Returns:
+            实际使用的事件循环名称 "uvloop" 或 "asyncio"
+        """
+        if options.use_uvloop:
+            if UVLOOP_AVAILABLE:
+                asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+                return "uvloop"
+            logger.warning("配置启用了uvloop但未安装（pip install uvloop），使用默认事件循环")
+        return "asyncio"
+
+    @staticmethod
+    def apply_gc_options(options: RuntimeOptions):
+        """设置GC阈值（提高gen0阈值可减少热路径上频繁的小规模回收）"""
+        if options.gc_thresholds:
+            gc.set_threshold(*options.gc_thresholds)
+            logger.info(f"GC阈值: {gc.get_threshold()}")
+
+    @staticmethod
+    def freeze_startup_objects(options: RuntimeOptions):
+        """
+        冻结启动阶段创建的对象（模块、配置、引擎与策略实例等长期存活的对象）
+
+        在启动完成、进入主循环前调用；之后的完整回收不再扫描这些对象，缩短GC停顿
+        """
+        if options.gc_freeze:
+            gc.collect()
+            gc.freeze()
+            logger.info(f"已冻结 {gc.get_freeze_count()} 个启动对象")
+
+    @staticmethod
+    def configure_loop(loop: asyncio.AbstractEventLoop, options: RuntimeOptions):
+        """
+        配置正在运行的事件循环：默认线程池、调试模式与延迟监控
+
+        Args:
+            loop: 事件循环
+            options: 运行时选项
+        """
+        if options.thread_pool_workers > 0:
+            loop.set_default_executor(ThreadPoolExecutor(
+                max_workers=options.thread_pool_workers, thread_name_prefix="quant_trading"
+            ))
+
+        if options.slow_callback_ms > 0:
+            threshold = options.slow_callback_ms / 1000.0
+            if options.loop_debug:
+                # 调试模式下asyncio会记录每个超过阈值的回调（仅默认事件循环支持）
+                loop.set_debug(True)
+                loop.slow_callback_duration = threshold
+            Runtime.monitor = LoopMonitor(threshold, options.loop_monitor_interval)
+            Runtime.monitor.start()
+
+    @staticmethod
+    def run(main: Awaitable[Any], config: Optional[Config] = None,
+            options: Optional[RuntimeOptions] = None) -> Any:
+        """
+        按配置引导运行时并运行主协程（替代asyncio.run）
+
+        Args:
+            main: 主协程
+            config: 配置对象（读取runtime配置段）
+            options: 运行时选项，优先于config
+
+        Returns:
+            主协程的返回值
+        """
+        options = options or RuntimeOptions.from_config(config)
+        loop_name = Runtime.install_event_loop_policy(options)
+        Runtime.apply_gc_options(options)
+        logger.info(f"运行时: 事件循环 {loop_name}, 线程池 {options.thread_pool_workers or '默认'}, "
+                    f"慢回调阈值 {options.slow_callback_ms or '关闭'} ms, GC冻结 {options.gc_freeze}")
+
+        async def bootstrap():
+            Runtime.configure_loop(asyncio.get_running_loop(), options)
+            try:
+                return await main
+            finally:
+                if Runtime.monitor is not None:
+                    await Runtime.monitor.stop()
+
+        return asyncio.run(bootstrap())
+
+    @staticmethod
+    def get_stats() -> Dict[str, Any]:
+        """运行时状态（事件循环类型、GC与延迟监控统计）"""
+        try:
+            loop_type = type(asyncio.get_running_loop()).__module__.split(".")[0]
+        except RuntimeError:
+            loop_type = None
+        return {
+            "event_loop": loop_type,
+            "gc_threshold": gc.get_threshold(),
+            "gc_counts": gc.get_count(),
+            "gc_frozen": gc.get_freeze_count(),
+            "loop_monitor": Runtime.monitor.get_stats() if Runtime.monitor else None,
+        }
@@ -15,6 +15,8 @@ sys.path.insert(0, str(project_root))
 
 from quant_trading import TradingEngine, Config
 from quant_trading.strategies import MeanReversionStrategy, MomentumStrategy, ArbitrageStrategy, UTBotStrategy
+from quant_trading.utils.runtime import Runtime, RuntimeOptions
+from quant_trading.utils.logger import LogOptions, configure_logging
 from datetime import datetime, timedelta
 import numpy as np
 
@@ -616,6 +618,9 @@ async def start_trading_engine(config, user_config):
             print("❌ 取消启动")
             return
         
+        # 日志后端（异步队列、限流、JSON）需在创建引擎之前配置
+        configure_logging(LogOptions.from_config(config))
+        
         # 创建交易引擎
         engine = TradingEngine(config)
         
@@ -728,6 +733,9 @@ async def start_trading_engine(config, user_config):
         # 启动监控任务（后台运行）
         monitor_task = asyncio.create_task(monitor_connection_and_positions(engine, config))
         
+        # 冻结启动阶段创建的长期对象（按runtime.gc_freeze配置）
+        Runtime.freeze_startup_objects(RuntimeOptions.from_config(config))
+        
         # 启动交易引擎
         await engine.start()
         
@@ -775,7 +783,8 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        exit_code = asyncio.run(main())
+        # 按config.yaml的runtime配置选择事件循环、线程池与GC参数
+        exit_code = Runtime.run(main(), options=RuntimeOptions.from_file('config.yaml'))
         sys.exit(exit_code)
     except KeyboardInterrupt:
         print("\n👋 再见!")
@@ -4,7 +4,7 @@ Lighter量化交易程序启动脚本 - 多市场版本
 支持多时间周期确认和多市场并发交易
 """
 
-import asyncio
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -14,7 +14,11 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from quant_trading import TradingEngine, Config
-from quant_trading.strategies import UTBotStrategy, MultiMarketStrategyWrapper
+from quant_trading.strategies import MultiMarketStrategyWrapper
+from quant_trading.strategies.ut_bot import UTBotStrategy
+from quant_trading.core import ShardCoordinator, shard_markets
+from quant_trading.utils.runtime import Runtime, RuntimeOptions
+from quant_trading.utils.logger import LogOptions, configure_logging
 from datetime import datetime
 
 def print_banner():
@@ -31,7 +35,37 @@ def print_banner():
     print("=" * 70)
     print()
 
-async def main():
+def build_ut_bot_strategy(config, market_id):
+    """按config.yaml的ut_bot配置创建单个市场的UT Bot策略"""
+    ut_config = config.strategies.get('ut_bot', {})
+    return UTBotStrategy(
+        config=config,
+        market_id=market_id,
+        key_value=ut_config.get('key_value', 1.0),
+        atr_period=ut_config.get('atr_period', 10),
+        use_heikin_ashi=ut_config.get('use_heikin_ashi', False),
+        position_size=ut_config.get('position_size', 2.0),
+        stop_loss=ut_config.get('stop_loss', 0.02),
+        take_profit=ut_config.get('take_profit', 0.01),
+        leverage=ut_config.get('leverage', 10.0),
+        margin_mode=ut_config.get('margin_mode', 'isolated'),
+        order_type=ut_config.get('order_type', 'market'),
+        limit_price_offset=ut_config.get('limit_price_offset', 0.002),
+        enable_multi_timeframe=ut_config.get('enable_multi_timeframe', False)
+    )
+
+def build_shard_strategies(config, market_ids):
+    """分片工作进程的策略工厂：每个市场一个UT Bot策略（在子进程中调用）"""
+    return [build_ut_bot_strategy(config, market_id) for market_id in market_ids]
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Lighter量化交易程序 - 多市场版本")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="工作进程数量（默认读取config.yaml的trading.shards）")
+    return parser.parse_args()
+
+async def main(shards=None):
     """主函数"""
     print_banner()
     
@@ -41,6 +75,7 @@ async def main():
         return 1
     
     config = Config.from_file('config.yaml')
+    configure_logging(LogOptions.from_config(config))
     print("✅ 已从 config.yaml 加载配置")
     print()
     
@@ -78,6 +113,27 @@ async def main():
     print("🚀 启动交易引擎...")
     print()
     
+    # 多进程分片模式：行情与策略按市场分组运行在多个工作进程，签名与风控集中在当前进程
+    if shards is None:
+        shards = config.trading_config.get('shards', 1)
+    if shards > 1 and len(market_ids) > 1:
+        groups = shard_markets(market_ids, shards)
+        print(f"📊 多进程分片模式: {len(groups)} 个工作进程")
+        for shard_id, group in enumerate(groups):
+            print(f"  工作进程 {shard_id}: 市场 {group}")
+        print("按 Ctrl+C 停止程序")
+        print()
+        
+        coordinator = ShardCoordinator(config, market_ids, shards, build_shard_strategies)
+        try:
+            await coordinator.run()
+        except KeyboardInterrupt:
+            print("\n⏹️  收到停止信号，正在关闭...")
+        finally:
+            await coordinator.stop()
+            print("✅ 交易引擎已停止")
+        return 0
+    
     try:
         # 创建交易引擎
         engine = TradingEngine(config)
@@ -85,21 +141,7 @@ async def main():
         # 如果只有一个市场，使用单市场模式
         if len(market_ids) == 1:
             print(f"📊 单市场模式: 市场 {market_ids[0]}")
-            strategy = UTBotStrategy(
-                config=config,
-                market_id=market_ids[0],
-                key_value=ut_config.get('key_value', 1.0),
-                atr_period=ut_config.get('atr_period', 10),
-                use_heikin_ashi=ut_config.get('use_heikin_ashi', False),
-                position_size=ut_config.get('position_size', 2.0),
-                stop_loss=ut_config.get('stop_loss', 0.02),
-                take_profit=ut_config.get('take_profit', 0.01),
-                leverage=ut_config.get('leverage', 10.0),
-                margin_mode=ut_config.get('margin_mode', 'isolated'),
-                order_type=ut_config.get('order_type', 'market'),
-                limit_price_offset=ut_config.get('limit_price_offset', 0.002),
-                enable_multi_timeframe=enable_multi_timeframe
-            )
+            strategy = build_ut_bot_strategy(config, market_ids[0])
             engine.add_strategy(strategy)
         else:
             # 多市场模式
@@ -141,6 +183,9 @@ async def main():
         print("按 Ctrl+C 停止程序")
         print()
         
+        # 冻结启动阶段创建的长期对象（按runtime.gc_freeze配置）
+        Runtime.freeze_startup_objects(RuntimeOptions.from_config(config))
+        
         # 启动交易引擎
         await engine.start()
         
@@ -160,7 +205,9 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        exit_code = asyncio.run(main())
+        args = parse_args()
+        # 按config.yaml的runtime配置选择事件循环、线程池与GC参数
+        exit_code = Runtime.run(main(args.shards), options=RuntimeOptions.from_file('config.yaml'))
         sys.exit(exit_code or 0)
     except KeyboardInterrupt:
         print("\n👋 再见!")
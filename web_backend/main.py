@@ -7,7 +7,7 @@ from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import asyncio
 import logging
@@ -22,6 +22,14 @@ from services.trading_service import TradingService
 from services.data_service import DataService
 from services.websocket_manager import WebSocketManager
 from models.database import init_database
+from quant_trading.utils.runtime import Runtime, RuntimeOptions, UVLOOP_AVAILABLE
+from quant_trading.utils.metrics import REGISTRY, ClientMetrics
+
+
+# 运行时配置（事件循环、线程池、GC）读取项目根目录的config.yaml
+runtime_options = RuntimeOptions.from_file(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yaml")
+)
 
 
 # 全局服务实例
@@ -38,6 +46,13 @@ async def lifespan(app: FastAPI):
     # 启动时初始化
     logging.info("启动Web后端服务...")
     
+    # 线程池、慢回调检测与GC阈值（事件循环类型由uvicorn的loop参数决定）
+    Runtime.apply_gc_options(runtime_options)
+    Runtime.configure_loop(asyncio.get_running_loop(), runtime_options)
+    
+    # 统计本进程内lighter REST请求（计数、耗时与429限流）
+    ClientMetrics.instrument_rest()
+    
     # 初始化数据库
     await init_database()
     
@@ -51,6 +66,7 @@ async def lifespan(app: FastAPI):
     asyncio.create_task(trading_service.start_background_tasks())
     
     logging.info("Web后端服务启动完成")
+    Runtime.freeze_startup_objects(runtime_options)
     
     yield
     
@@ -61,6 +77,8 @@ async def lifespan(app: FastAPI):
         await websocket_manager.stop()
     if trading_service:
         await trading_service.stop()
+    if Runtime.monitor:
+        await Runtime.monitor.stop()
     
     logging.info("Web后端服务已关闭")
 
@@ -128,6 +146,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus指标"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket连接端点"""
@@ -207,5 +231,6 @@ if __name__ == "__main__":
         host=settings.HOST,
         port=settings.PORT,
         reload=settings.DEBUG,
-        log_level="info"
+        log_level="info",
+        loop="uvloop" if runtime_options.use_uvloop and UVLOOP_AVAILABLE else "asyncio"
     )
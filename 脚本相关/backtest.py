@@ -15,30 +15,47 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from quant_trading import Config
-from quant_trading.backtesting import BacktestEngine
+from quant_trading.backtesting import BacktestCache, BacktestEngine, PortfolioBacktestEngine
 from quant_trading.strategies import MeanReversionStrategy, MomentumStrategy, ArbitrageStrategy
 
 
-def generate_sample_data(market_id: int, days: int = 30) -> list:
-    """生成示例数据"""
+# 策略名 -> (策略类, 默认参数, 需要的市场)
+STRATEGIES = {
+    "mean_reversion": (MeanReversionStrategy, {"market_id": 0, "lookback_period": 20, "threshold": 2.0}, [0]),
+    "momentum": (MomentumStrategy, {"market_id": 0, "short_period": 5, "long_period": 20,
+                                    "momentum_threshold": 0.02}, [0]),
+    "arbitrage": (ArbitrageStrategy, {"market_id_1": 0, "market_id_2": 1, "price_threshold": 0.01}, [0, 1]),
+}
+
+
+def generate_sample_data(market_id: int, days: int = 30, seed: int = None, end_time: datetime = None) -> list:
+    """
+    生成示例数据
+
+    Args:
+        market_id: 市场ID
+        days: 天数
+        seed: 随机种子，给定时相同参数生成完全相同的数据（可以命中回测缓存）
+        end_time: 数据结束时间，默认当前时间
+    """
     import random
-    import numpy as np
     
+    rng = random.Random(None if seed is None else seed * 1000 + market_id)
     data = []
     base_price = 100.0
-    current_time = datetime.now() - timedelta(days=days)
+    current_time = (end_time or datetime.now()) - timedelta(days=days)
     
     for i in range(days * 24 * 60):  # 每分钟一个数据点
         # 随机游走
-        change = random.gauss(0, 0.001)
+        change = rng.gauss(0, 0.001)
         base_price *= (1 + change)
         
         # 生成OHLCV数据
-        high = base_price * (1 + abs(random.gauss(0, 0.005)))
-        low = base_price * (1 - abs(random.gauss(0, 0.005)))
-        open_price = base_price * (1 + random.gauss(0, 0.002))
+        high = base_price * (1 + abs(rng.gauss(0, 0.005)))
+        low = base_price * (1 - abs(rng.gauss(0, 0.005)))
+        open_price = base_price * (1 + rng.gauss(0, 0.002))
         close_price = base_price
-        volume = random.uniform(1000, 10000)
+        volume = rng.uniform(1000, 10000)
         
         data.append({
             "timestamp": int(current_time.timestamp()),
@@ -54,53 +71,59 @@ def generate_sample_data(market_id: int, days: int = 30) -> list:
     return data
 
 
-async def run_backtest(strategy_name: str, config: Config, days: int = 30):
-    """运行回测"""
+def parse_grid(items: list) -> dict:
+    """解析 --param name=v1,v2,... 为参数网格（值按JSON解析，失败时作为字符串）"""
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition("=")
+        if not name or not values:
+            raise ValueError(f"参数网格格式应为 name=v1,v2: {item}")
+        parsed = []
+        for value in values.split(","):
+            try:
+                parsed.append(json.loads(value))
+            except ValueError:
+                parsed.append(value)
+        grid[name.strip()] = parsed
+    return grid
+
+
+async def run_backtest(strategy_name: str, config: Config, days: int = 30, seed: int = None,
+                       cache: BacktestCache = None, grid: dict = None):
+    """运行回测（给定参数网格时扫描所有网格点，已缓存的点直接读取）"""
     print(f"开始回测策略: {strategy_name}")
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"未知策略: {strategy_name}")
+    strategy_cls, params, market_ids = STRATEGIES[strategy_name]
+    
+    # 创建回测引擎（参数扫描时未缓存的网格点在一次回放中一起计算）
+    backtest_engine = PortfolioBacktestEngine(config) if grid else BacktestEngine(config)
     
-    # 创建回测引擎
-    backtest_engine = BacktestEngine(config)
+    # 设置回测时间（给定种子时对齐到当天零点，同一天内重复运行使用相同的数据与时间窗口）
+    end_date = datetime.now()
+    if seed is not None:
+        end_date = end_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    start_date = end_date - timedelta(days=days)
     
     # 生成示例数据
-    sample_data = generate_sample_data(0, days)
-    backtest_engine.load_historical_data(0, sample_data)
+    for market_id in market_ids:
+        backtest_engine.load_historical_data(market_id, generate_sample_data(market_id, days, seed, end_date))
     
-    # 创建策略
-    if strategy_name == "mean_reversion":
-        strategy = MeanReversionStrategy(
-            config=config,
-            market_id=0,
-            lookback_period=20,
-            threshold=2.0
-        )
-    elif strategy_name == "momentum":
-        strategy = MomentumStrategy(
-            config=config,
-            market_id=0,
-            short_period=5,
-            long_period=20,
-            momentum_threshold=0.02
-        )
-    elif strategy_name == "arbitrage":
-        # 为套利策略生成两个市场的数据
-        sample_data_2 = generate_sample_data(1, days)
-        backtest_engine.load_historical_data(1, sample_data_2)
-        
-        strategy = ArbitrageStrategy(
-            config=config,
-            market_id_1=0,
-            market_id_2=1,
-            price_threshold=0.01
-        )
-    else:
-        raise ValueError(f"未知策略: {strategy_name}")
+    cache = cache or BacktestCache(enabled=False)
     
-    # 设置回测时间
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=days)
+    # 参数扫描
+    if grid:
+        results = await cache.sweep(backtest_engine, strategy_cls, grid, params, start_date, end_date)
+        print(f"\n=== {strategy_name} 参数扫描 ({len(results)} 个网格点) ===")
+        for point, result in results:
+            values = ", ".join(f"{name}={point[name]}" for name in grid)
+            print(f"{values}: 总收益率 {result.total_return:.2%}, 夏普比率 {result.sharpe_ratio:.2f}, "
+                  f"最大回撤 {result.max_drawdown:.2%}, 交易次数 {result.total_trades}")
+        print(f"缓存命中 {cache.hits}, 新计算 {cache.misses}")
+        return results
     
     # 运行回测
-    result = await backtest_engine.run_backtest(strategy, start_date, end_date)
+    result = await cache.run_backtest(backtest_engine, strategy_cls, params, start_date, end_date)
     
     # 打印结果
     result.print_summary()
@@ -125,6 +148,14 @@ async def main():
                        default="all", help="要回测的策略")
     parser.add_argument("--days", "-d", type=int, default=30, 
                        help="回测天数")
+    parser.add_argument("--seed", type=int, default=None,
+                       help="示例数据随机种子（给定时数据可复现，重复运行可命中回测缓存）")
+    parser.add_argument("--param", "-p", action="append", default=[], metavar="NAME=V1,V2",
+                       help="参数网格扫描，可重复指定多个参数，例如 --param threshold=1.5,2.0,2.5")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="不读取也不写入回测结果缓存")
+    parser.add_argument("--cache-dir", type=str, default=None,
+                       help="回测结果缓存目录，默认读取 backtest.cache_dir")
     
     args = parser.parse_args()
     
@@ -142,15 +173,24 @@ async def main():
         print(f"配置加载失败: {e}")
         return 1
         
+    # 回测结果缓存
+    cache = BacktestCache.from_config(config)
+    if args.cache_dir:
+        cache.directory = args.cache_dir
+    if args.no_cache or args.seed is None:
+        # 未给定种子时每次的示例数据都不同，缓存不会命中
+        cache.enabled = False
+        
     # 运行回测
     try:
+        grid = parse_grid(args.param)
         if args.strategy == "all":
-            strategies = ["mean_reversion", "momentum", "arbitrage"]
+            strategies = list(STRATEGIES)
             for strategy_name in strategies:
-                await run_backtest(strategy_name, config, args.days)
+                await run_backtest(strategy_name, config, args.days, args.seed, cache, grid)
                 print("\n" + "="*50 + "\n")
         else:
-            await run_backtest(args.strategy, config, args.days)
+            await run_backtest(args.strategy, config, args.days, args.seed, cache, grid)
             
     except Exception as e:
         print(f"回测运行错误: {e}")